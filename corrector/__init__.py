@@ -5,4 +5,12 @@ __all__ = [
     "text_utils",
     "prompt",
     "model",
+    "batch",
+    "ratelimit",
+    "cancel",
+    "estimate",
+    "metrics",
+    "reasons",
+    "report",
+    "doccache",
 ]
@@ -0,0 +1,287 @@
+"""Multi-document batch runs for the CLI.
+
+Documents are planned up front (directories and globs are expanded) and processed in a
+process pool: DOCX parsing, tokenizing and export are CPU-bound, so each document runs in
+its own process while LLM requests are paced by one governor shared by the whole pool
+(``FileGovernorState`` in a temporary file).
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from . import jsonio
+from .docx_utils import TrackChanges, parse_document, read_paragraphs
+from .engine import auto_chunk_words, paragraphs_to_text, plan_chunks, process_document
+from .metrics import METRICS, format_report, merge_snapshots
+from .model import GeminiCorrector, HeuristicCorrector
+from .ratelimit import FileGovernorState, LLMGovernor, set_governor
+from .text_utils import count_word_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = (".docx", ".txt")
+# Artefactos generados por el propio corrector: nunca son entradas
+_OUTPUT_MARKERS = (".corrected.", ".corrections.", ".accepted.")
+
+
+@dataclass
+class DocumentJob:
+    input_path: str
+    out_path: str
+    log_path: str
+    log_docx_path: str | None
+    model_name: str
+    base_prompt: str
+    chunk_words: int = 8000
+    overlap_words: int = 800
+    auto_chunk: bool = True
+    local_heuristics: bool = False
+    preserve_format: bool = True
+    output_format: str | None = None
+    with_reasons: bool | None = None
+    track_changes: TrackChanges | None = None
+
+
+@dataclass
+class DocumentResult:
+    input_path: str
+    words: int = 0
+    corrections: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+    llm_metrics: dict | None = None
+
+
+def is_input_candidate(path: Path) -> bool:
+    name = path.name
+    if name.startswith("~$") or name.startswith("."):
+        return False
+    if any(marker in name for marker in _OUTPUT_MARKERS):
+        return False
+    return path.suffix.lower() in SUPPORTED_SUFFIXES
+
+
+def plan_inputs(specs: Iterable[str]) -> list[Path]:
+    """Expand files, directories and glob patterns into an ordered, de-duplicated list."""
+    planned: list[Path] = []
+    seen: set[Path] = set()
+
+    def _add(p: Path) -> None:
+        key = p.resolve()
+        if key not in seen:
+            seen.add(key)
+            planned.append(p)
+
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            for child in sorted(p.iterdir()):
+                if child.is_file() and is_input_candidate(child):
+                    _add(child)
+        elif glob.has_magic(spec):
+            for match in sorted(glob.glob(spec, recursive=True)):
+                match_path = Path(match)
+                if match_path.is_file() and is_input_candidate(match_path):
+                    _add(match_path)
+        elif p.is_file():
+            _add(p)
+        else:
+            raise FileNotFoundError(f"No existe el archivo: {p}")
+    return planned
+
+
+def output_names(inputs: Sequence[Path]) -> list[str]:
+    """Base name of each input's outputs: its stem, unless another input shares it.
+
+    Inputs sharing a stem (``a/cap1.docx`` and ``b/cap1.docx``, or ``cap1.docx`` and
+    ``cap1.txt``) are named after their path relative to the common root, extension
+    included (``a__cap1.docx``), so their outputs never overwrite each other.
+    """
+    stems = [p.stem.lower() for p in inputs]
+    resolved = [p.resolve() for p in inputs]
+    root = Path(os.path.commonpath([r.parent for r in resolved])) if resolved else Path()
+    names = []
+    for p, r, stem in zip(inputs, resolved, stems, strict=True):
+        if stems.count(stem) == 1:
+            names.append(p.stem)
+        else:
+            names.append("__".join(r.relative_to(root).parts))
+    lowered = [n.lower() for n in names]
+    clashes = sorted({n for n in lowered if lowered.count(n) > 1})
+    if clashes:
+        raise ValueError(f"Nombres de salida repetidos: {', '.join(clashes)}")
+    return names
+
+
+def build_jobs(
+    inputs: Sequence[Path],
+    out_dir: Path,
+    *,
+    model_name: str,
+    base_prompt: str,
+    chunk_words: int,
+    overlap_words: int,
+    auto_chunk: bool,
+    local_heuristics: bool,
+    preserve_format: bool,
+    log_docx: bool,
+    output_format: str | None = None,
+    with_reasons: bool | None = None,
+    track_changes: TrackChanges | None = None,
+) -> list[DocumentJob]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs: list[DocumentJob] = []
+    for p, name in zip(inputs, output_names(inputs), strict=True):
+        ext = ".docx" if p.suffix.lower() == ".docx" else ".txt"
+        jobs.append(
+            DocumentJob(
+                input_path=str(p),
+                out_path=str(out_dir / f"{name}.corrected{ext}"),
+                log_path=str(out_dir / f"{name}.corrections.jsonl"),
+                log_docx_path=(str(out_dir / f"{name}.corrections.docx") if log_docx else None),
+                model_name=model_name,
+                base_prompt=base_prompt,
+                chunk_words=chunk_words,
+                overlap_words=overlap_words,
+                auto_chunk=auto_chunk,
+                local_heuristics=local_heuristics,
+                preserve_format=preserve_format,
+                output_format=output_format,
+                with_reasons=with_reasons,
+                track_changes=track_changes,
+            )
+        )
+    return jobs
+
+
+def run_document(job: DocumentJob) -> DocumentResult:
+    """Correct one document. Runs inside a pool process (or inline for single jobs)."""
+    t0 = time.perf_counter()
+    result = DocumentResult(input_path=job.input_path)
+    METRICS.reset()  # pool processes are reused: keep per-document figures
+    try:
+        parsed = parse_document(job.input_path)
+        paragraphs = parsed.texts if parsed else read_paragraphs(job.input_path)
+        # Tokenized and planned once: the sizing, the word count and the correction share it
+        tokens = tokenize(paragraphs_to_text(paragraphs))
+        result.words = count_word_tokens(tokens)
+        chunk_words, overlap_words = job.chunk_words, job.overlap_words
+        if job.auto_chunk:
+            sized = auto_chunk_words(tokens, job.base_prompt)
+            if sized:
+                chunk_words, overlap_words = sized
+        chunks = plan_chunks(tokens, chunk_words=chunk_words, overlap_words=overlap_words)
+        if job.local_heuristics:
+            corrector = HeuristicCorrector()
+        else:
+            corrector = GeminiCorrector(
+                model_name=job.model_name,
+                base_prompt_text=job.base_prompt,
+                output_format=job.output_format,
+                with_reasons=job.with_reasons,
+            )
+        entries = process_document(
+            job.input_path,
+            job.out_path,
+            job.log_path,
+            corrector,
+            preserve_format=job.preserve_format,
+            log_docx_path=job.log_docx_path,
+            enable_docx_log=job.log_docx_path is not None,
+            parsed=parsed,
+            track_changes=job.track_changes,
+            tokens=tokens,
+            chunks=chunks,
+        )
+        result.corrections = len(entries)
+    except Exception as exc:  # one bad document must not abort the batch
+        logger.exception("Error procesando %s", job.input_path)
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.llm_metrics = METRICS.snapshot()
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def _init_pool_process(governor_path: str) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s", datefmt="%H:%M:%S")
+    set_governor(LLMGovernor(FileGovernorState(governor_path)))
+
+
+def run_batch(
+    jobs: Sequence[DocumentJob], *, max_workers: int | None = None, summary_path: Path | None = None
+) -> list[DocumentResult]:
+    """Run jobs through a process pool, logging aggregate progress and throughput."""
+    total = len(jobs)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, total or 1))
+    logger.info(f"📚 {total} documento(s) planificados, {workers} proceso(s)")
+    started = time.perf_counter()
+    results: list[DocumentResult] = []
+    words_done = 0
+
+    def _progress(res: DocumentResult) -> None:
+        nonlocal words_done
+        results.append(res)
+        words_done += res.words
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        status = "❌ " + res.error if res.error else f"✅ {res.corrections} correcciones"
+        logger.info(
+            f"[{len(results)}/{total}] {Path(res.input_path).name}: {status} "
+            f"en {res.seconds:.1f}s — {words_done / elapsed * 60:,.0f} palabras/min, "
+            f"{len(results) / elapsed * 3600:.1f} docs/h"
+        )
+
+    if workers == 1:
+        for job in jobs:
+            _progress(run_document(job))
+    else:
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=mp.get_context(),
+                initializer=_init_pool_process,
+                initargs=(str(Path(tmp) / "llm-governor.json"),),
+            ) as pool,
+        ):
+            futures = [pool.submit(run_document, job) for job in jobs]
+            for fut in as_completed(futures):
+                _progress(fut.result())
+
+    # Keep the summary in plan order regardless of completion order
+    order = {job.input_path: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda r: order.get(r.input_path, 0))
+    report = format_report(merge_snapshots(r.llm_metrics for r in results))
+    if report:
+        logger.info(f"📊 Métricas LLM del lote:\n{report}")
+    if summary_path is not None:
+        write_summary(summary_path, results, seconds=time.perf_counter() - started, workers=workers)
+    return results
+
+
+def write_summary(
+    path: Path, results: Sequence[DocumentResult], *, seconds: float, workers: int
+) -> None:
+    words = sum(r.words for r in results)
+    summary = {
+        "documents": len(results),
+        "failed": sum(1 for r in results if r.error),
+        "workers": workers,
+        "words": words,
+        "corrections": sum(r.corrections for r in results),
+        "seconds": round(seconds, 3),
+        "words_per_minute": round(words / seconds * 60, 1) if seconds > 0 else None,
+        "llm_metrics": merge_snapshots(r.llm_metrics for r in results),
+        "results": [asdict(r) for r in results],
+    }
+    path.write_bytes(jsonio.dumpb(summary, indent=True))
+    logger.info(f"📝 Resumen del lote: {path}")
@@ -0,0 +1,93 @@
+"""Cooperative cancellation of a correction in progress.
+
+Whoever runs a correction creates a ``CancelToken`` and activates it with
+``cancel_scope``; anyone else (the ``POST /runs/{id}/cancel`` endpoint, a lease
+heartbeat that lost its lease) calls ``token.cancel()``. The correction does not stop
+mid-request: ``check_cancelled`` runs between chunks and before each LLM attempt, and
+``cancellable_sleep`` replaces the sleeps of retries and quota waits, so a cancelled
+correction stops at the next of those points by raising ``Cancelled``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+
+class Cancelled(Exception):
+    """The correction was cancelled; ``partial`` holds what was corrected until then.
+
+    ``partial`` is a ``CorrectionResult`` of the chunks finished before the
+    cancellation (the rest unchanged), set by whoever merges them, else None.
+    """
+
+    def __init__(self, reason: str = "cancelado") -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.partial: Any = None
+        self.chunks_done = 0
+        self.chunks_total = 0
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared by every thread working on one correction."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason = "cancelado"
+
+    def cancel(self, reason: str = "cancelado") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Raise ``Cancelled`` if the token was cancelled."""
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep ``seconds``, or raise ``Cancelled`` as soon as the token is cancelled."""
+        if self._event.wait(max(0.0, seconds)):
+            raise Cancelled(self.reason)
+
+
+_token: ContextVar[CancelToken | None] = ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken | None) -> Iterator[None]:
+    """Make ``token`` the one checked inside the block (on this thread)."""
+    reset = _token.set(token)
+    try:
+        yield
+    finally:
+        _token.reset(reset)
+
+
+def current_token() -> CancelToken | None:
+    return _token.get()
+
+
+def check_cancelled() -> None:
+    """Raise ``Cancelled`` if the active token was cancelled (no-op without one)."""
+    token = _token.get()
+    if token is not None:
+        token.check()
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """``time.sleep`` that the active token interrupts by raising ``Cancelled``."""
+    token = _token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
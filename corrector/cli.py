@@ -3,11 +3,13 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from .docx_utils import read_paragraphs
-from .engine import process_document
+from .batch import build_jobs, plan_inputs, run_batch
+from .docx_utils import TrackChanges, parse_document, read_paragraphs
+from .engine import auto_chunk_words, process_document
+from .estimate import CostEstimate, estimate_file, summarize
 from .model import GeminiCorrector, HeuristicCorrector
-from .prompt import build_json_prompt, load_base_prompt
-from .text_utils import count_word_tokens, tokenize
+from .prompt import load_base_prompt
+from .text_utils import tokenize
 
 try:
     from settings import get_settings
@@ -26,7 +28,12 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         description="Corrector ortográfico/contextual en español (DOCX)"
     )
-    parser.add_argument("input", help="Ruta del documento DOCX de entrada")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        metavar="input",
+        help="Documento(s) DOCX de entrada; admite directorios y patrones glob",
+    )
     parser.add_argument("--out", dest="out", help="Ruta de salida DOCX", default=None)
     parser.add_argument("--log", dest="log", help="Ruta del log JSONL", default=None)
     parser.add_argument(
@@ -78,11 +85,116 @@ def main() -> None:
     parser.add_argument(
         "--no-log-docx", action="store_true", help="No generar el reporte DOCX del log"
     )
+    parser.add_argument(
+        "--track-changes",
+        action="store_true",
+        help=(
+            "Escribir las correcciones como control de cambios (w:ins/w:del) en el DOCX "
+            "corregido; el reporte DOCX solo se genera si se pide con --log-docx"
+        ),
+    )
+    parser.add_argument(
+        "--revision-author",
+        dest="revision_author",
+        default="Corrector",
+        help="Autor de las revisiones con --track-changes",
+    )
+    parser.add_argument(
+        "--out-dir",
+        dest="out_dir",
+        default="outputs",
+        help="Directorio de salida cuando se procesan varios documentos",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        dest="jobs",
+        type=int,
+        default=None,
+        help="Procesos en paralelo para varios documentos (por defecto: nº de CPUs)",
+    )
+    parser.add_argument(
+        "--summary",
+        dest="summary",
+        default=None,
+        help="Ruta del resumen JSON del lote (por defecto OUT_DIR/run_summary.json)",
+    )
+    parser.add_argument(
+        "--compact-output",
+        action="store_true",
+        help="Respuesta compacta del modelo: tuplas con códigos de motivo (menos tokens de salida)",
+    )
+    parser.add_argument(
+        "--with-reasons",
+        action="store_true",
+        help="Con --compact-output, pedir también un motivo breve en texto libre",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Estimar peticiones, tokens, tiempo y coste sin llamar al modelo",
+    )
     args = parser.parse_args()
 
-    in_path = Path(args.input)
-    if not in_path.exists():
-        raise SystemExit(f"No existe el archivo: {in_path}")
+    try:
+        inputs = plan_inputs(args.inputs)
+    except FileNotFoundError as exc:
+        raise SystemExit(str(exc)) from exc
+    if not inputs:
+        raise SystemExit("No se encontraron documentos de entrada")
+
+    base_prompt = load_base_prompt(args.base_prompt_path)
+
+    if args.dry_run:
+        estimates = [
+            estimate_file(
+                str(p),
+                model_name=args.model_name,
+                base_prompt=base_prompt,
+                chunk_words=args.chunk_words,
+                overlap_words=args.overlap_words,
+                auto_chunk=args.auto_chunk,
+                compact_output=args.compact_output,
+            )
+            for p in inputs
+        ]
+        _print_estimates(inputs, estimates)
+        return
+
+    # Sin flag explícito se respeta LLM_OUTPUT_FORMAT / LLM_WITH_REASONS
+    output_format = "compact" if args.compact_output else None
+    with_reasons = True if args.with_reasons else None
+    track_changes = TrackChanges(author=args.revision_author) if args.track_changes else None
+    # Con control de cambios la tabla de correcciones es opcional (y cara en libros grandes)
+    log_docx = not args.no_log_docx and (not args.track_changes or bool(args.log_docx))
+
+    single = len(args.inputs) == 1 and len(inputs) == 1 and Path(args.inputs[0]).is_file()
+    if not single:
+        if args.out or args.log or args.log_docx:
+            parser.error("--out/--log/--log-docx solo admiten un documento; use --out-dir")
+        out_dir = Path(args.out_dir)
+        jobs = build_jobs(
+            inputs,
+            out_dir,
+            model_name=args.model_name,
+            base_prompt=base_prompt,
+            chunk_words=args.chunk_words,
+            overlap_words=args.overlap_words,
+            auto_chunk=args.auto_chunk,
+            local_heuristics=args.local_heuristics,
+            preserve_format=not args.no_preserve_format,
+            log_docx=log_docx,
+            output_format=output_format,
+            with_reasons=with_reasons,
+            track_changes=track_changes,
+        )
+        summary_path = Path(args.summary) if args.summary else out_dir / "run_summary.json"
+        results = run_batch(jobs, max_workers=args.jobs, summary_path=summary_path)
+        if any(r.error for r in results):
+            raise SystemExit(1)
+        return
+
+    in_path = inputs[0]
 
     # Si no se especifica salida, usar directorio outputs/
     if args.out:
@@ -106,42 +218,26 @@ def main() -> None:
         outputs_dir.mkdir(exist_ok=True)
         log_docx_path = outputs_dir / f"{in_path.stem}.corrections.docx"
 
-    base_prompt = load_base_prompt(args.base_prompt_path)
     if args.local_heuristics:
         corrector = HeuristicCorrector()
     else:
-        corrector = GeminiCorrector(model_name=args.model_name, base_prompt_text=base_prompt)
+        corrector = GeminiCorrector(
+            model_name=args.model_name,
+            base_prompt_text=base_prompt,
+            output_format=output_format,
+            with_reasons=with_reasons,
+        )
 
     # Auto-dimensionado de chunk si se solicita
     chunk_words = args.chunk_words
     overlap_words = args.overlap_words
+    # Parsear una sola vez: la estimación, la corrección y la escritura comparten el parseo
+    parsed = parse_document(str(in_path))
     if args.auto_chunk:
-        paragraphs_for_est = read_paragraphs(str(in_path))
-        full_text = "\n".join(paragraphs_for_est)
-        tokens = tokenize(full_text)
-        if tokens:
-            # Muestra de hasta 2000 tokens para estimación
-            sample_tokens = tokens[: min(2000, len(tokens))]
-            base_chars = len(build_json_prompt(base_prompt, []))
-            sample_chars = len(build_json_prompt(base_prompt, sample_tokens))
-            # Estimar tokens LLM ~ chars/4
-            base_llm_tokens = max(base_chars // 4, 1)
-            sample_llm_tokens = max((sample_chars - base_chars) // 4, 1)
-            word_count = max(count_word_tokens(sample_tokens), 1)
-            tokens_per_word = max(sample_llm_tokens / word_count, 2.0)
-            # Ventana por modelo (simple): 128k para Gemini 1.5*
-            model_ctx = 128_000
-            if "1.5" not in args.model_name:
-                model_ctx = 128_000
-            target_ratio = 0.15  # Reducido de 0.7 a 0.15 para chunks más pequeños
-            output_reserve = 2000
-            margin = 500
-            input_budget = int(model_ctx * target_ratio) - output_reserve - margin - base_llm_tokens
-            est_chunk_words = int(max(input_budget / tokens_per_word, 300))
-            # Límites razonables - reducidos para mejor progreso visible
-            est_chunk_words = max(300, min(est_chunk_words, 1000))
-            chunk_words = est_chunk_words
-            overlap_words = max(int(chunk_words * 0.10), 200)
+        paragraphs_for_est = parsed.texts if parsed else read_paragraphs(str(in_path))
+        sized = auto_chunk_words(tokenize("\n".join(paragraphs_for_est)), base_prompt)
+        if sized:
+            chunk_words, overlap_words = sized
 
     process_document(
         str(in_path),
@@ -151,9 +247,42 @@ def main() -> None:
         chunk_words=chunk_words,
         overlap_words=overlap_words,
         preserve_format=not args.no_preserve_format,
-        log_docx_path=(str(log_docx_path) if not args.no_log_docx else None),
-        enable_docx_log=(not args.no_log_docx),
+        log_docx_path=(str(log_docx_path) if log_docx else None),
+        enable_docx_log=log_docx,
+        parsed=parsed,
+        track_changes=track_changes,
+    )
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+
+def _print_estimates(inputs: list[Path], estimates: list[CostEstimate]) -> None:
+    for path, e in zip(inputs, estimates, strict=True):
+        print(
+            f"{path.name}: {e.words:,} palabras, {e.chunks} chunk(s) de ~{e.chunk_words or 'auto'} "
+            f"palabras, {e.requests} petición(es), ~{e.input_tokens:,} tokens entrada / "
+            f"~{e.output_tokens:,} salida, {_format_seconds(e.expected_seconds)} "
+            f"(peor caso {_format_seconds(e.worst_case_seconds)})"
+        )
+    total = summarize(estimates)
+    model = estimates[0].model_name if estimates else ""
+    print("")
+    print(
+        f"Total ({model}): {total['documents']} documento(s), {total['words']:,} palabras, "
+        f"{total['requests']} petición(es), ~{total['input_tokens']:,} tokens entrada / "
+        f"~{total['output_tokens']:,} salida"
+    )
+    print(
+        f"Tiempo estimado: {_format_seconds(total['expected_seconds'])} "
+        f"(peor caso con reintentos y fallback: {_format_seconds(total['worst_case_seconds'])})"
     )
+    for name, usd in total["cost_usd"].items():
+        print(f"Coste estimado con {name}: ${usd:.4f}")
+    print("(Estimación sin llamadas al modelo)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,412 @@
+"""On-disk cache of parsed documents, keyed by the SHA-256 of the uploaded file.
+
+One entry holds everything the pipeline derives from a document before any correction:
+the paragraph texts, a compact token table (start offset, kind and line per token as
+packed arrays; token text and end are implied by the next start), the sentence boundary
+index and, for DOCX, the run boundaries and paragraph byte spans of ``ParsedDocx``.
+Loading an entry skips the XML parse and the tokenizer: on a 1,000-page manuscript, loading the entry and rebuilding
+the ``Token`` objects takes ~0.9s against ~3s to parse and tokenize (see
+``scripts/bench_parse_cache.py``), and counts (words, tokens, sentences) are read straight
+from the arrays without building tokens at all.
+
+Entries are named ``<checksum>.v<FORMAT_VERSION>.bin`` and written atomically. Bump
+``FORMAT_VERSION`` whenever the layout, the tokenizer or the DOCX reader rules change:
+entries of other versions are never read and age out through the LRU eviction, which
+keeps the directory under ``max_bytes`` by removing the least recently used files.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zipfile
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+
+from .docx_utils import DOCUMENT_PART, DocxParagraph, ParsedDocx, parse_document, read_paragraphs
+from .text_utils import Token, _is_sentence_end_or_closer_seq, tokenize
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+MAGIC = b"BKPC"
+TOKEN_KINDS = ("word", "number", "punct", "space", "newline")
+_KIND_CODES = {k: i for i, k in enumerate(TOKEN_KINDS)}
+_HEADER = struct.Struct("<4sHI")  # magic, version, metadata length
+_SECTION = struct.Struct("<Q")
+# Array sections, in file order (metadata JSON and text come first)
+_ARRAYS = (
+    ("paragraph_lengths", "I"),
+    ("token_starts", "I"),
+    ("token_kinds", "B"),
+    ("token_lines", "I"),
+    ("sentence_ends", "I"),
+    ("run_counts", "I"),
+    ("run_lengths", "I"),
+    ("fixed_counts", "I"),
+    ("fixed_offsets", "I"),
+    ("spans", "Q"),
+)
+_CLOSERS = frozenset((")", "]", "}", '"', "'", "»", "«", "“", "”", "’"))
+
+
+@contextmanager
+def _gc_paused():
+    """Building ~1M small objects triggers many useless GC passes; none of them is garbage."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _sentence_ends(tokens: list[Token]) -> array:
+    """Last token of each sentence, as ``sentence_bounds`` delimits them (closers included)."""
+    ends = array("I")
+    n = len(tokens)
+    i = 0
+    while i < n:
+        if _is_sentence_end_or_closer_seq(tokens, i):
+            # Closers right after the EOS belong to that sentence
+            while i + 1 < n and tokens[i + 1].kind == "punct" and tokens[i + 1].text in _CLOSERS:
+                i += 1
+            ends.append(i)
+        i += 1
+    return ends
+
+
+@dataclass
+class CachedDocument:
+    """A document as stored in the parse cache. Build it with ``CachedDocument.build``."""
+
+    checksum: str
+    kind: str  # "docx" (with paragraph spans) or "text"
+    text: str  # paragraphs joined with "\n", as the engine tokenizes them
+    paragraph_lengths: array
+    token_starts: array
+    token_kinds: array
+    token_lines: array
+    sentence_ends: array  # token indices that close a sentence (EOS, closers or newline)
+    source_size: int = 0  # bytes of the file the entry was built from
+    # word/document.xml the spans point into, as listed in the zip directory
+    part_size: int = 0
+    part_crc: int = 0
+    prefix: str = "w"
+    max_id: int = 0
+    # Per paragraph: its w:t lengths and tab/break offsets (DocxParagraph), flattened
+    run_counts: array = field(default_factory=lambda: array("I"))
+    run_lengths: array = field(default_factory=lambda: array("I"))
+    fixed_counts: array = field(default_factory=lambda: array("I"))
+    fixed_offsets: array = field(default_factory=lambda: array("I"))
+    spans: array = field(default_factory=lambda: array("Q"))  # start, end per paragraph
+    # In-memory objects of a fresh build, handed out instead of being rebuilt
+    _tokens: list[Token] | None = field(default=None, repr=False, compare=False)
+    _parsed: ParsedDocx | None = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def build(cls, path: str, checksum: str) -> CachedDocument:
+        parsed = parse_document(path)
+        paragraphs = parsed.texts if parsed is not None else read_paragraphs(path)
+        text = "\n".join(paragraphs)
+        tokens = tokenize(text)
+        doc = cls(
+            checksum=checksum,
+            kind="docx" if parsed is not None else "text",
+            text=text,
+            source_size=os.path.getsize(path),
+            paragraph_lengths=array("I", map(len, paragraphs)),
+            token_starts=array("I", (t.start for t in tokens)),
+            token_kinds=array("B", (_KIND_CODES[t.kind] for t in tokens)),
+            token_lines=array("I", (t.line for t in tokens)),
+            sentence_ends=_sentence_ends(tokens),
+            _tokens=tokens,
+            _parsed=parsed,
+        )
+        if parsed is not None:
+            with zipfile.ZipFile(path) as zf:
+                info = zf.getinfo(DOCUMENT_PART)
+            doc.part_size, doc.part_crc = info.file_size, info.CRC
+            doc.prefix, doc.max_id = parsed.prefix, parsed.max_id
+            for p, span in zip(parsed.paragraphs, parsed.spans, strict=True):
+                doc.run_counts.append(len(p.run_lengths))
+                doc.run_lengths.extend(p.run_lengths)
+                doc.fixed_counts.append(len(p.fixed_offsets))
+                doc.fixed_offsets.extend(p.fixed_offsets)
+                doc.spans.extend(span)
+        return doc
+
+    @property
+    def paragraphs(self) -> list[str]:
+        out: list[str] = []
+        pos = 0
+        for n in self.paragraph_lengths:
+            out.append(self.text[pos : pos + n])
+            pos += n + 1
+        return out
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_starts)
+
+    @property
+    def word_count(self) -> int:
+        return self.token_kinds.tobytes().count(_KIND_CODES["word"])
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_ends)
+
+    def tokens(self) -> list[Token]:
+        """Token list identical to ``tokenize(self.text)``; callers may modify it."""
+        if self._tokens is not None:
+            return list(self._tokens)
+        starts = self.token_starts
+        ends = starts[1:]
+        ends.append(len(self.text))
+        with _gc_paused():
+            return list(
+                map(
+                    Token,
+                    count(),
+                    map(self.text.__getitem__, map(slice, starts, ends)),
+                    starts,
+                    ends,
+                    map(TOKEN_KINDS.__getitem__, self.token_kinds),
+                    self.token_lines,
+                )
+            )
+
+    def sentence_span(self, token_index: int) -> tuple[int, int]:
+        """Token range ``[start, end)`` between the sentence boundaries around a token.
+
+        Unlike ``text_utils.sentence_bounds`` the range is not trimmed of the whitespace
+        around it; it is an O(log n) lookup instead of a scan.
+        """
+        k = bisect_left(self.sentence_ends, token_index)
+        start = self.sentence_ends[k - 1] + 1 if k else 0
+        end = self.sentence_ends[k] + 1 if k < len(self.sentence_ends) else self.token_count
+        return start, end
+
+    def parsed(self, path: str) -> ParsedDocx | None:
+        """``ParsedDocx`` for the DOCX at ``path`` (whose checksum this entry was built for).
+
+        Nothing is inflated: paragraphs and spans come from the cache, and the size and
+        CRC of ``word/document.xml`` in the zip directory tell whether the spans fit.
+        """
+        if self.kind != "docx":
+            return None
+        if self._parsed is not None:
+            return self._parsed
+        try:
+            with zipfile.ZipFile(path) as zf:
+                info = zf.getinfo(DOCUMENT_PART)
+            fits = (info.file_size, info.CRC) == (self.part_size, self.part_crc)
+        except KeyError:
+            fits = False
+        if not fits:
+            # Not the file this entry was built from: the spans would be wrong
+            logger.warning(f"⚠️ {path} no coincide con la caché de parseo; se vuelve a parsear")
+            self._parsed = parse_document(path)
+            return self._parsed
+        paragraphs: list[DocxParagraph] = []
+        runs, fixed = self.run_lengths, self.fixed_offsets
+        r = f = 0
+        with _gc_paused():
+            for text, nr, nf in zip(
+                self.paragraphs, self.run_counts, self.fixed_counts, strict=True
+            ):
+                paragraphs.append(
+                    DocxParagraph(text, runs[r : r + nr].tolist(), fixed[f : f + nf].tolist())
+                )
+                r += nr
+                f += nf
+        spans = list(zip(self.spans[::2], self.spans[1::2], strict=True))
+        self._parsed = ParsedDocx(path, paragraphs, spans, self.prefix, self.max_id)
+        return self._parsed
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps(
+            {
+                "checksum": self.checksum,
+                "kind": self.kind,
+                "source_size": self.source_size,
+                "part_size": self.part_size,
+                "part_crc": self.part_crc,
+                "prefix": self.prefix,
+                "max_id": self.max_id,
+                "byteorder": sys.byteorder,
+                "paragraphs": len(self.paragraph_lengths),
+                "tokens": self.token_count,
+                "words": self.word_count,
+                "sentences": self.sentence_count,
+            }
+        ).encode("utf-8")
+        parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)), meta]
+        for data in (
+            self.text.encode("utf-8"),
+            *(getattr(self, name).tobytes() for name, _ in _ARRAYS),
+        ):
+            parts.append(_SECTION.pack(len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> CachedDocument:
+        """Decode an entry; raises ``ValueError`` for other versions or damaged data."""
+        if len(data) < _HEADER.size:
+            raise ValueError("entrada de caché truncada")
+        magic, version, meta_len = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"formato de caché no soportado: {magic!r} v{version}")
+        pos = _HEADER.size
+        meta = json.loads(data[pos : pos + meta_len])
+        pos += meta_len
+        sections: list[bytes] = []
+        for _ in range(1 + len(_ARRAYS)):
+            (size,) = _SECTION.unpack_from(data, pos)
+            pos += _SECTION.size
+            if pos + size > len(data):
+                raise ValueError("entrada de caché truncada")
+            sections.append(data[pos : pos + size])
+            pos += size
+        arrays = {}
+        for (name, typecode), raw in zip(_ARRAYS, sections[1:], strict=True):
+            arr = array(typecode)
+            arr.frombytes(raw)
+            if meta["byteorder"] != sys.byteorder:
+                arr.byteswap()
+            arrays[name] = arr
+        doc = cls(
+            checksum=meta["checksum"],
+            kind=meta["kind"],
+            text=sections[0].decode("utf-8"),
+            source_size=meta["source_size"],
+            part_size=meta["part_size"],
+            part_crc=meta["part_crc"],
+            prefix=meta["prefix"],
+            max_id=meta["max_id"],
+            **arrays,
+        )
+        if doc.token_count != meta["tokens"] or len(doc.paragraph_lengths) != meta["paragraphs"]:
+            raise ValueError("entrada de caché inconsistente")
+        return doc
+
+
+class ParseCache:
+    """Directory of ``CachedDocument`` entries with a total size limit (LRU by mtime)."""
+
+    def __init__(self, root: str | Path, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def entry_path(self, checksum: str) -> Path:
+        return self.root / f"{checksum}.v{FORMAT_VERSION}.bin"
+
+    def get(self, checksum: str) -> CachedDocument | None:
+        path = self.entry_path(checksum)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            doc = CachedDocument.from_bytes(data)
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"⚠️ Entrada de caché inválida {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if doc.checksum != checksum:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return doc
+
+    def put(self, doc: CachedDocument) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = doc.to_bytes()
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp_", suffix=".bin")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.entry_path(doc.checksum))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def load(self, path: str, checksum: str | None) -> CachedDocument:
+        """Cached entry for ``checksum``, building (and storing) it from ``path`` on a miss.
+
+        Without a checksum the document is parsed and nothing is stored. A file that is no
+        longer the one the entry was built from (e.g. recreated from the text backup) is
+        parsed again without touching the entry.
+        """
+        stale = False
+        if checksum:
+            hit = self.get(checksum)
+            if hit is not None:
+                if hit.source_size == os.path.getsize(path):
+                    return hit
+                logger.warning(f"⚠️ {path} no coincide con la caché de parseo ({checksum[:8]})")
+                stale = True
+        doc = CachedDocument.build(path, checksum or "")
+        if checksum and not stale:
+            try:
+                self.put(doc)
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudo guardar en la caché de parseo: {e}")
+        return doc
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits; returns bytes freed."""
+        with self._lock:
+            entries = []
+            for p in self.root.glob("*.bin"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            for _, size, p in sorted(entries, key=lambda e: e[0]):
+                if total - freed <= self.max_bytes:
+                    break
+                p.unlink(missing_ok=True)
+                freed += size
+            return freed
+
+
+_default: ParseCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide cache under ``PARSE_CACHE_DIR`` (default ``$STORAGE_DIR/.parse_cache``),
+    limited to ``PARSE_CACHE_MAX_MB`` (default 512)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            root = os.environ.get("PARSE_CACHE_DIR") or os.path.join(
+                os.environ.get("STORAGE_DIR", "./storage"), ".parse_cache"
+            )
+            try:
+                max_mb = float(os.environ.get("PARSE_CACHE_MAX_MB", "512"))
+            except ValueError:
+                max_mb = 512.0
+            _default = ParseCache(root, int(max_mb * 1024 * 1024))
+        return _default
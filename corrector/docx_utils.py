@@ -1,7 +1,25 @@
 from __future__ import annotations
 
+import contextlib
+import copy
+import difflib
+import functools
+import html
+import re
+import shutil
+import struct
 import zipfile
+import zlib
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import IO
 from xml.etree import ElementTree as ET
+from xml.parsers import expat
+from xml.sax.saxutils import escape as xml_escape
+
+from .text_utils import TextEdit
 
 try:  # optional dependency
     from docx import Document  # type: ignore
@@ -9,18 +27,221 @@ except Exception:  # pragma: no cover - optional
     Document = None  # type: ignore
 
 
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCUMENT_PART = "word/document.xml"
+_W = f"{{{W_NS}}}"
+# Inline run content that is not a w:t but still stands for a character of the text.
+# Line breaks become a space: a "\n" would split the paragraph in the engine.
+_RUN_CHARS = {
+    f"{_W}tab": "\t",
+    f"{_W}ptab": "\t",
+    f"{_W}br": " ",
+    f"{_W}cr": " ",
+    f"{_W}noBreakHyphen": "-",
+}
+
+
+class UnsplicedEditError(ValueError):
+    """Raised when an edit targets a paragraph with no w:t node to splice it into.
+
+    Callers fall back to ``write_paragraphs`` for that document, so no edit is lost.
+    """
+
+
+@dataclass
+class DocxParagraph:
+    """A body-level paragraph as read by the streaming reader.
+
+    ``run_lengths`` holds the text length of each ``w:t`` node in document order and
+    ``fixed_offsets`` the offsets in ``text`` of characters that come from run content
+    other than ``w:t`` (tabs, breaks), so a writer can map text positions back to nodes.
+    """
+
+    text: str
+    run_lengths: list[int] = field(default_factory=list)
+    fixed_offsets: list[int] = field(default_factory=list)
+
+
+@dataclass
+class ParsedDocx:
+    """A DOCX read once and shared by the read, correct and write stages.
+
+    ``paragraphs`` are those of ``iter_docx_paragraphs``, and ``spans`` their byte ranges
+    ``(start, end)`` in ``word/document.xml``, recorded in the same streaming pass.
+    ``prefix`` is the prefix of the main namespace and ``max_id`` the highest ``w:id``.
+    The writer streams the part again and only decodes the spans of edited paragraphs,
+    so no stage holds the whole XML in memory.
+    """
+
+    path: str
+    paragraphs: list[DocxParagraph]
+    spans: list[tuple[int, int]]
+    prefix: str = "w"
+    max_id: int = 0
+
+    @property
+    def texts(self) -> list[str]:
+        return [p.text for p in self.paragraphs]
+
+
+def parse_docx(path: str) -> ParsedDocx:
+    """Stream ``word/document.xml`` once, keeping paragraph texts, run boundaries and spans."""
+    paragraphs: list[DocxParagraph] = []
+    spans: list[tuple[int, int]] = []
+    with zipfile.ZipFile(path) as zf, zf.open(DOCUMENT_PART) as f:
+        scan = _DocumentScan(f)
+        for para, start, end in scan.paragraphs():
+            paragraphs.append(para)
+            spans.append((start, end))
+    return ParsedDocx(path, paragraphs, spans, scan.prefix, scan.max_id)
+
+
+def parse_document(path: str) -> ParsedDocx | None:
+    """``ParsedDocx`` for a DOCX input; None for plain text or when the main part is not at
+    ``word/document.xml`` (read those with ``read_paragraphs``)."""
+    if not path.lower().endswith(".docx"):
+        return None
+    try:
+        return parse_docx(path)
+    except KeyError:
+        return None
+
+
+def _unescape(text: str) -> str:
+    return html.unescape(text) if "&" in text else text
+
+
+# Bytes of word/document.xml read (and copied by the writer) at a time
+_READ_SIZE = 1 << 16
+
+
+class _DocumentScan:
+    """One streaming pass over ``word/document.xml`` with expat.
+
+    ``paragraphs()`` yields each body-level paragraph with its byte span in the part:
+    expat reports where every event starts, so a paragraph ends where the event after
+    its close tag starts. ``prefix`` and ``max_id`` are final once it is exhausted.
+    """
+
+    def __init__(self, f: IO[bytes]) -> None:
+        self._f = f
+        self.prefix = "w"
+        self.max_id = 0
+
+    def paragraphs(self) -> Iterator[tuple[DocxParagraph, int, int]]:
+        body_q, p_q, t_q, r_q = (f"{W_NS} {n}" for n in ("body", "p", "t", "r"))
+        run_chars = {f"{W_NS} {k[len(_W) :]}": v for k, v in _RUN_CHARS.items()}
+        id_q = f"{W_NS} id"
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.namespace_prefixes = True  # names are "uri local prefix"
+        ready: deque[tuple[DocxParagraph, int, int]] = deque()
+        stack: list[str] = []
+        p_depth = 0  # nesting of w:p; 1 = inside a body-level paragraph
+        p_start = 0
+        closed: DocxParagraph | None = None  # its span ends where the next event starts
+        t_parts: list[str] | None = None  # text of the open w:t of the paragraph
+        parts: list[str] = []
+        run_lengths: list[int] = []
+        fixed: list[int] = []
+        pos = 0
+
+        def event() -> None:
+            nonlocal closed
+            if closed is not None:
+                ready.append((closed, p_start, parser.CurrentByteIndex))
+                closed = None
+
+        def start(name: str, attrs: dict[str, str]) -> None:
+            nonlocal p_depth, p_start, t_parts, parts, run_lengths, fixed, pos
+            event()
+            prefix = name.partition(" ")[2].partition(" ")[2]
+            key = name[: -len(prefix) - 1] if prefix else name
+            if key == p_q:
+                if p_depth == 0 and len(stack) == 2 and stack[1] == body_q:
+                    p_depth = 1
+                    p_start = parser.CurrentByteIndex
+                    parts, run_lengths, fixed, pos = [], [], [], 0
+                elif p_depth:
+                    p_depth += 1
+            elif key == body_q:
+                self.prefix = prefix
+            elif key == t_q and p_depth == 1:
+                t_parts = []
+            for attr, value in attrs.items():
+                if attr.startswith(id_q) and attr[len(id_q) : len(id_q) + 1] in ("", " "):
+                    if value.isdigit():
+                        self.max_id = max(self.max_id, int(value))
+            stack.append(key)
+
+        def end(name: str) -> None:
+            nonlocal p_depth, t_parts, pos, closed
+            event()
+            key = stack.pop()
+            if p_depth == 1:
+                if key == t_q and t_parts is not None:
+                    text = "".join(t_parts)
+                    parts.append(text)
+                    run_lengths.append(len(text))
+                    pos += len(text)
+                    t_parts = None
+                elif key in run_chars and stack and stack[-1] == r_q:
+                    parts.append(run_chars[key])
+                    fixed.append(pos)
+                    pos += 1
+            if key == p_q and p_depth:
+                p_depth -= 1
+                if p_depth == 0:
+                    closed = DocxParagraph("".join(parts), run_lengths, fixed)
+
+        def characters(data: str) -> None:
+            event()
+            if t_parts is not None:
+                t_parts.append(data)
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = characters
+        parser.CommentHandler = lambda data: event()
+        parser.ProcessingInstructionHandler = lambda target, data: event()
+        size = 0
+        while chunk := self._f.read(_READ_SIZE):
+            size += len(chunk)
+            parser.Parse(chunk, False)
+            while ready:
+                yield ready.popleft()
+        parser.Parse(b"", True)
+        yield from ready
+        if closed is not None:
+            yield closed, p_start, size
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[DocxParagraph]:
+    """Stream the body-level paragraphs of a DOCX without building the XML tree.
+
+    Mirrors ``doc.paragraphs`` of python-docx (direct ``w:p`` children of ``w:body``; text
+    of nested paragraphs such as text boxes is skipped). Only the open paragraph is kept,
+    so memory stays flat regardless of document size.
+    """
+    with zipfile.ZipFile(path) as zf, zf.open(DOCUMENT_PART) as f:
+        for para, _, _ in _DocumentScan(f).paragraphs():
+            yield para
+
+
+def read_docx_paragraphs(path: str) -> list[DocxParagraph]:
+    return list(iter_docx_paragraphs(path))
+
+
 def read_paragraphs(path: str) -> list[str]:
-    if Document is not None and path.lower().endswith(".docx"):
-        try:
-            doc = Document(path)  # type: ignore
-            return [p.text for p in doc.paragraphs]
-        except Exception:
-            pass
     if path.lower().endswith(".txt"):
         with open(path, encoding="utf-8") as f:
             return [line.rstrip("\n") for line in f]
-    # Fallback: minimal DOCX parse via zip + XML
-    return _read_docx_zip(path)
+    try:
+        return [p.text for p in iter_docx_paragraphs(path)]
+    except KeyError:
+        # Main part not at word/document.xml: let python-docx resolve it from the rels
+        if Document is None:
+            raise
+        return [p.text for p in Document(path).paragraphs]  # type: ignore
 
 
 def write_paragraphs(paragraphs: list[str], path: str) -> None:
@@ -41,24 +262,6 @@ def write_paragraphs(paragraphs: list[str], path: str) -> None:
     _write_minimal_docx(paragraphs, path)
 
 
-def _read_docx_zip(path: str) -> list[str]:
-    texts: list[str] = []
-    with zipfile.ZipFile(path) as zf:
-        with zf.open("word/document.xml") as f:
-            xml = f.read()
-    # Namespaces used in docx
-    ns = {
-        "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
-    }
-    root = ET.fromstring(xml)
-    for p in root.findall(".//w:p", ns):
-        parts: list[str] = []
-        for t in p.findall(".//w:t", ns):
-            parts.append(t.text or "")
-        texts.append("".join(parts))
-    return texts
-
-
 def _write_minimal_docx(paragraphs: list[str], path: str) -> None:
     # Build a minimal docx package with only document.xml and content types
     document_xml = _build_document_xml(paragraphs)
@@ -88,52 +291,590 @@ def _build_document_xml(paragraphs: list[str]) -> str:
     return ET.tostring(root, encoding="utf-8", xml_declaration=True).decode("utf-8")
 
 
-def write_docx_preserving_runs(input_path: str, paragraphs: list[str], output_path: str) -> None:
+def write_docx_preserving_runs(
+    source: str | ParsedDocx, paragraphs: list[str], output_path: str
+) -> None:
     """Rewrite document.xml text while preserving run structure and formatting.
 
-    It copies the original .docx package and only replaces the text content in w:t nodes
-    to match the provided paragraphs. If the number of paragraphs differs, extra paragraphs
-    are left unchanged.
+    Only paragraphs whose text differs from the source are touched: the difference is
+    turned into character edits and spliced into their w:t nodes (see ``write_docx_edits``).
+    If the number of paragraphs differs, extra paragraphs are left unchanged.
     """
-    with zipfile.ZipFile(input_path, "r") as zf:
-        xml = zf.read("word/document.xml")
-        infolist = zf.infolist()
-        files = {
-            i.filename: zf.read(i.filename) for i in infolist if i.filename != "word/document.xml"
-        }
-
-    ns = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
-    root = ET.fromstring(xml)
-    paras = root.findall(".//w:body/w:p", ns)
-
-    for idx, p in enumerate(paras):
+    if isinstance(source, ParsedDocx):
+        originals: Iterable[DocxParagraph] = source.paragraphs
+    else:
+        originals = iter_docx_paragraphs(source)
+    edits: list[TextEdit] = []
+    for idx, para in enumerate(originals):
         if idx >= len(paragraphs):
             break
-        new_text = paragraphs[idx]
-        t_nodes = list(p.findall(".//w:t", ns))
-        if not t_nodes:
-            r = ET.SubElement(p, f"{{{ns['w']}}}r")
-            t = ET.SubElement(r, f"{{{ns['w']}}}t")
-            t_nodes = [t]
-        prev_lengths = [len(t.text or "") for t in t_nodes]
-        total_prev = sum(prev_lengths)
+        if para.text != paragraphs[idx]:
+            edits.extend(diff_edits(idx, para.text, paragraphs[idx]))
+    write_docx_edits(source, edits, output_path)
+
+
+def diff_edits(paragraph: int, old: str, new: str) -> list[TextEdit]:
+    """Character edits turning ``old`` into ``new``."""
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [
+        TextEdit(paragraph, i1, i2, new[j1:j2])
+        for op, i1, i2, j1, j2 in matcher.get_opcodes()
+        if op != "equal"
+    ]
+
+
+def write_docx_edits(
+    source: str | ParsedDocx,
+    edits: Iterable[TextEdit],
+    output_path: str,
+    *,
+    track_changes: TrackChanges | None = None,
+) -> None:
+    """Write a copy of a DOCX applying text edits to the w:t nodes of the edited paragraphs.
+
+    ``word/document.xml`` is streamed from the input to the output: only the spans of the
+    edited paragraphs (from the ``ParsedDocx``, or a ``parse_docx`` pass for a path) are
+    decoded and their affected w:t contents replaced. Every other zip member is copied
+    byte for byte, without decompressing or recompressing it (see ``_raw_layout`` for the
+    exceptions), by a zip writer of this module.
+
+    With ``track_changes`` the edits are written as Word revisions instead (``w:del`` with
+    the original text, ``w:ins`` with the replacement) carrying its author and date, in
+    the same pass, so editors can accept or reject each one.
+    """
+    by_paragraph: dict[int, list[TextEdit]] = {}
+    for e in edits:
+        by_paragraph.setdefault(e.paragraph, []).append(e)
+
+    if isinstance(source, ParsedDocx):
+        parsed: ParsedDocx | None = source
+        input_path = source.path
+    else:
+        parsed = parse_docx(source) if by_paragraph else None
+        input_path = source
+    with (
+        zipfile.ZipFile(input_path, "r") as zin,
+        open(input_path, "rb") as raw_in,
+        open(output_path, "wb") as out,
+    ):
+        zout = _ZipWriter(out)
+        for item in zin.infolist():
+            if item.filename == DOCUMENT_PART and parsed is not None and by_paragraph:
+                with zin.open(item) as src, zout.open(item) as dst:
+                    _write_spliced_part(src, dst, parsed, by_paragraph, track_changes)
+                continue
+            layout = _raw_layout(raw_in, item)
+            if layout is not None:
+                zout.copy_raw(raw_in, item, *layout)
+            else:
+                with zin.open(item) as src, zout.open(item) as dst:
+                    shutil.copyfileobj(src, dst, _READ_SIZE)
+        zout.close(zin.comment)
+
+
+def _write_spliced_part(
+    src: IO[bytes],
+    dst: IO[bytes],
+    parsed: ParsedDocx,
+    by_paragraph: dict[int, list[TextEdit]],
+    track_changes: TrackChanges | None,
+) -> None:
+    """Stream the main part into ``dst``, splicing the edits into their paragraph spans."""
+    revisions = (
+        _Revisions(parsed.prefix, parsed.max_id, track_changes)
+        if track_changes is not None
+        else None
+    )
+    pos = 0
+    for index in sorted(by_paragraph):
+        if index >= len(parsed.spans):
+            break
+        start, end = parsed.spans[index]
+        _copy_bytes(src, dst, start - pos)
+        xml = src.read(end - start).decode("utf-8")
+        dst.write(_splice_paragraph(xml, parsed.prefix, by_paragraph[index], revisions))
+        pos = end
+    shutil.copyfileobj(src, dst, _READ_SIZE)
+
+
+def _copy_bytes(src: IO[bytes], dst: IO[bytes], size: int) -> None:
+    while size > 0:
+        chunk = src.read(min(size, _READ_SIZE))
+        if not chunk:
+            raise ValueError("el zip de entrada es más corto que las posiciones leídas")
+        dst.write(chunk)
+        size -= len(chunk)
+
+
+# Zip records written by _ZipWriter (APPNOTE 4.3.7, 4.3.12 and 4.3.16), without zip64
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP_LIMIT = 0xFFFFFFFF
+
+
+class _ZipWriter:
+    """Output archive of ``write_docx_edits``: raw copies of members and newly deflated ones.
+
+    ``zipfile`` cannot add a member's compressed bytes as they are, so the local headers,
+    the central directory and the end record are written here. There is no zip64: an
+    output that would need it raises ValueError.
+    """
+
+    def __init__(self, fp: IO[bytes]) -> None:
+        self._fp = fp
+        self._central: list[bytes] = []
+
+    def copy_raw(self, src: IO[bytes], item: zipfile.ZipInfo, name: bytes, length: int) -> None:
+        """Copy ``length`` bytes of ``src`` from the local header of ``item`` on."""
+        offset = self._offset(length)
+        src.seek(item.header_offset)
+        _copy_bytes(src, self._fp, length)
+        self._add_central(item, name, offset)
+
+    @contextlib.contextmanager
+    def open(self, item: zipfile.ZipInfo) -> Iterator[_MemberWriter]:
+        """Write a member with the name and attributes of ``item`` from the bytes given.
+
+        Stored members stay stored; any other is deflated. The sizes and CRC go into the
+        local header once the data is written, so the output must be seekable.
+        """
+        try:
+            name, flags = item.filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            name, flags = item.filename.encode("utf-8"), 0x800  # UTF-8 name flag
+        method = (
+            zipfile.ZIP_STORED if item.compress_type == zipfile.ZIP_STORED else zipfile.ZIP_DEFLATED
+        )
+        offset = self._offset(_LOCAL_HEADER.size + len(name))
+        self._fp.write(self._local_header(item, name, flags, method, 0, 0, 0))
+        member = _MemberWriter(self._fp, method)
+        yield member
+        crc, compress_size, file_size = member.close()
+        end = self._fp.tell()
+        if end > _ZIP_LIMIT or file_size > _ZIP_LIMIT:
+            raise ValueError(f"{item.filename} necesita zip64, que este escritor no soporta")
+        self._fp.seek(offset)
+        self._fp.write(self._local_header(item, name, flags, method, crc, compress_size, file_size))
+        self._fp.seek(end)
+        entry = copy.copy(item)
+        entry.flag_bits, entry.compress_type, entry.extract_version = flags, method, 20
+        entry.CRC, entry.compress_size, entry.file_size = crc, compress_size, file_size
+        entry.extra, entry.internal_attr = b"", 0
+        self._add_central(entry, name, offset)
+
+    def close(self, comment: bytes = b"") -> None:
+        """Write the central directory and the end record."""
+        offset = self._offset(sum(len(entry) for entry in self._central))
+        for entry in self._central:
+            self._fp.write(entry)
+        size = self._fp.tell() - offset
+        count = len(self._central)
+        if count > 0xFFFF:
+            raise ValueError("el zip de salida necesita zip64, que este escritor no soporta")
+        self._fp.write(
+            _END_RECORD.pack(b"PK\x05\x06", 0, 0, count, count, size, offset, len(comment))
+        )
+        self._fp.write(comment)
+
+    def _offset(self, length: int) -> int:
+        offset = self._fp.tell()
+        if offset + length > _ZIP_LIMIT:
+            raise ValueError("el zip de salida necesita zip64, que este escritor no soporta")
+        return offset
+
+    @staticmethod
+    def _local_header(
+        item: zipfile.ZipInfo,
+        name: bytes,
+        flags: int,
+        method: int,
+        crc: int,
+        compress_size: int,
+        file_size: int,
+    ) -> bytes:
+        time, date = _dos_date_time(item.date_time)
+        return (
+            _LOCAL_HEADER.pack(
+                b"PK\x03\x04",
+                20,
+                flags,
+                method,
+                time,
+                date,
+                crc,
+                compress_size,
+                file_size,
+                len(name),
+                0,
+            )
+            + name
+        )
+
+    def _add_central(self, item: zipfile.ZipInfo, name: bytes, offset: int) -> None:
+        time, date = _dos_date_time(item.date_time)
+        header = _CENTRAL_HEADER.pack(
+            b"PK\x01\x02",
+            item.create_system << 8 | item.create_version,
+            item.extract_version,
+            item.flag_bits,
+            item.compress_type,
+            time,
+            date,
+            item.CRC,
+            item.compress_size,
+            item.file_size,
+            len(name),
+            len(item.extra),
+            len(item.comment),
+            0,
+            item.internal_attr,
+            item.external_attr,
+            offset,
+        )
+        self._central.append(header + name + item.extra + item.comment)
+
+
+class _MemberWriter:
+    """File-like sink of ``_ZipWriter.open``: counts, checksums and (optionally) deflates."""
+
+    def __init__(self, fp: IO[bytes], method: int) -> None:
+        self._fp = fp
+        self._deflate = (
+            zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            if method == zipfile.ZIP_DEFLATED
+            else None
+        )
+        self._crc = 0
+        self._size = 0
+        self._compress_size = 0
+
+    def write(self, data: bytes) -> int:
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._emit(self._deflate.compress(data) if self._deflate is not None else data)
+        return len(data)
+
+    def close(self) -> tuple[int, int, int]:
+        """Flush the compressor; CRC, compressed size and size of the member."""
+        if self._deflate is not None:
+            self._emit(self._deflate.flush())
+            self._deflate = None
+        return self._crc, self._compress_size, self._size
+
+    def _emit(self, data: bytes) -> None:
+        self._fp.write(data)
+        self._compress_size += len(data)
+
+
+def _dos_date_time(date_time: tuple[int, int, int, int, int, int]) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day
+
+
+def _raw_layout(src: IO[bytes], item: zipfile.ZipInfo) -> tuple[bytes, int] | None:
+    """Local name and length (header to data descriptor) of ``item`` if it can be copied raw.
+
+    Only plain members are copied raw: zip64 ones, those whose local header does not match
+    the central directory, and those whose data descriptor is not the 12/16-byte form, are
+    decompressed and written again instead.
+    """
+    if (
+        item.file_size >= _ZIP_LIMIT
+        or item.compress_size >= _ZIP_LIMIT
+        or item.header_offset >= _ZIP_LIMIT
+        or _has_zip64_extra(item.extra)
+    ):
+        return None
+    src.seek(item.header_offset)
+    header = src.read(_LOCAL_HEADER.size)
+    if len(header) < _LOCAL_HEADER.size:
+        return None
+    signature, _, flags, method, _, _, crc, compress_size, file_size, name_len, extra_len = (
+        _LOCAL_HEADER.unpack(header)
+    )
+    if signature != b"PK\x03\x04" or (flags, method) != (item.flag_bits, item.compress_type):
+        return None
+    if not flags & 0x08 and (crc, compress_size, file_size) != (
+        item.CRC,
+        item.compress_size,
+        item.file_size,
+    ):
+        return None
+    name = src.read(name_len)
+    if len(name) != name_len or _has_zip64_extra(src.read(extra_len)):
+        return None
+    length = _LOCAL_HEADER.size + name_len + extra_len + item.compress_size
+    if flags & 0x08:  # data descriptor after the data (optional signature)
+        src.seek(item.header_offset + length)
+        tail = src.read(16)
+        signed = tail[:4] == b"PK\x07\x08"
+        descriptor = tail[4:16] if signed else tail[:12]
+        if len(descriptor) != 12 or struct.unpack("<LLL", descriptor) != (
+            item.CRC,
+            item.compress_size,
+            item.file_size,
+        ):
+            return None
+        length += 16 if signed else 12
+    return name, length
+
+
+def _has_zip64_extra(extra: bytes) -> bool:
+    """Whether an extra field holds a zip64 block (header id 0x0001)."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[pos : pos + 4])
+        if header_id == 0x0001:
+            return True
+        pos += 4 + size
+    return False
+
+
+def _qname(prefix: str, local: str) -> str:
+    return f"{prefix}:{local}" if prefix else local
+
+
+# Markup of a paragraph's XML: a comment, CDATA section or processing instruction (no
+# groups), or a tag whose quoted attribute values may hold ">"
+_TAG = re.compile(
+    r"<!--.*?-->|<!\[CDATA\[.*?]]>|<\?.*?\?>"
+    r"|<(/?)([^\s/>!?]+)((?:[^>\"']|\"[^\"]*\"|'[^']*')*?)(/?)>",
+    re.S,
+)
+# Markup that may sit inside a w:t: CDATA (its text kept), comments and PIs (dropped)
+_TEXT_MARKUP = re.compile(r"<!\[CDATA\[(.*?)]]>|<!--.*?-->|<\?.*?\?>", re.S)
+
+
+@functools.lru_cache(maxsize=8)
+def _piece_names(pfx: str) -> tuple[str, str, str, str, dict[str, str]]:
+    run_chars = {_qname(pfx, k[len(_W) :]): v for k, v in _RUN_CHARS.items()}
+    return (
+        _qname(pfx, "p"),
+        _qname(pfx, "t"),
+        _qname(pfx, "r"),
+        _qname(pfx, "rPr"),
+        run_chars,
+    )
+
+
+def _paragraph_pieces(xml: str, start: int, end: int, pfx: str) -> list[tuple]:
+    """Node handles of the paragraph at ``xml[start:end]``, in document order.
+
+    ``("t", tag_start, content_start, content_end, self_closing, rpr_start, rpr_end)`` for
+    each w:t (with the span of its run's w:rPr) and ``("f", char)`` for each tab/break.
+    """
+    p_q, t_q, r_q, rpr_q, run_chars = _piece_names(pfx)
+    pieces: list[tuple] = []
+    stack: list[str] = []
+    p_depth = 0
+    open_t: tuple[int, int] | None = None
+    rpr = (0, 0)  # span of the current run's w:rPr
+    for m in _TAG.finditer(xml, start, end):
+        closing, name, _, self_closing = m.groups()
+        if name is None:  # comment, CDATA or processing instruction
+            continue
+        if closing:
+            stack.pop()
+            if p_depth == 1:
+                if name == t_q and open_t is not None:
+                    pieces.append(("t", open_t[0], open_t[1], m.start(), False, *rpr))
+                    open_t = None
+                elif name == rpr_q and stack and stack[-1] == r_q:
+                    rpr = (rpr[0], m.end())
+            if name == p_q:
+                p_depth -= 1
+            continue
+        if name == p_q:
+            p_depth += 0 if self_closing else 1
+        elif p_depth == 1:
+            if name == t_q:
+                if self_closing:
+                    pieces.append(("t", m.start(), m.end(), m.end(), True, *rpr))
+                else:
+                    open_t = (m.start(), m.end())
+            elif name == r_q:
+                rpr = (0, 0)
+            elif name == rpr_q and stack and stack[-1] == r_q:
+                rpr = (m.start(), m.end())
+            elif name in run_chars and stack and stack[-1] == r_q:
+                pieces.append(("f", run_chars[name]))
+        if not self_closing:
+            stack.append(name)
+    return pieces
+
+
+def _node_text(content: str) -> str:
+    """Text of a w:t from its raw content, as the streaming reader sees it."""
+    if "<" not in content:
+        return _unescape(content)
+    parts: list[str] = []
+    pos = 0
+    for m in _TEXT_MARKUP.finditer(content):
+        parts.append(_unescape(content[pos : m.start()]))
+        parts.append(m.group(1) or "")
+        pos = m.end()
+    parts.append(_unescape(content[pos:]))
+    return "".join(parts)
+
+
+def _node_ops(
+    texts: list[str], starts: list[int], edits: list[TextEdit]
+) -> list[list[tuple[int, int, str]]]:
+    """Split non-overlapping paragraph edits into ``(start, end, text)`` ops per w:t node.
+
+    The replacement goes to the node where the edit starts; the following nodes it spans
+    only lose their covered prefix. Ops of each node are sorted by position.
+    """
+    ends = [s + len(t) for s, t in zip(starts, texts, strict=True)]
+    ops: list[list[tuple[int, int, str]]] = [[] for _ in texts]
+    for e in edits:
+        first = next(
+            (
+                i
+                for i in range(len(texts))
+                if starts[i] <= e.start < ends[i] or (e.start == e.end == ends[i])
+            ),
+            None,
+        )
+        if first is None:
+            first = next((i for i in range(len(texts)) if starts[i] >= e.start), None)
+            if first is None:
+                if not texts:
+                    raise UnsplicedEditError(
+                        f"El párrafo {e.paragraph} no tiene nodos w:t donde aplicar la edición"
+                    )
+                first = len(texts) - 1
+        local = max(e.start - starts[first], 0)
+        cut = max(min(e.end, ends[first]) - starts[first], local)
+        ops[first].append((local, cut, e.text))
+        for j in range(first + 1, len(texts)):
+            if starts[j] >= e.end:
+                break
+            ops[j].append((0, min(e.end, ends[j]) - starts[j], ""))
+    for node in ops:
+        node.sort()
+    return ops
+
+
+def _apply_ops(text: str, ops: list[tuple[int, int, str]]) -> str:
+    out: list[str] = []
+    pos = 0
+    for start, end, new in ops:
+        out.append(text[pos:start])
+        out.append(new)
+        pos = max(pos, end)
+    out.append(text[pos:])
+    return "".join(out)
+
+
+@dataclass
+class TrackChanges:
+    """Revision metadata for the track-changes writer (``w:ins``/``w:del``)."""
+
+    author: str = "Corrector"
+    date: datetime | None = None  # default: time of writing (UTC)
+
+
+class _Revisions:
+    """Renders edited w:t contents as tracked deletions/insertions with unique ids."""
+
+    def __init__(self, pfx: str, max_id: int, track: TrackChanges) -> None:
+        self.t_q, self.r_q = _qname(pfx, "t"), _qname(pfx, "r")
+        self.del_q, self.ins_q = _qname(pfx, "del"), _qname(pfx, "ins")
+        self.del_text_q = _qname(pfx, "delText")
+        # Attributes must be namespaced: declare a prefix when the main namespace is default
+        attr = pfx or "w"
+        ns_decl = "" if pfx else f' xmlns:w="{W_NS}"'
+        date = (track.date or datetime.now(UTC)).astimezone(UTC)
+        self.meta = (
+            f'{ns_decl} {attr}:author="{html.escape(track.author)}" '
+            f'{attr}:date="{date.strftime("%Y-%m-%dT%H:%M:%SZ")}"'
+        )
+        self.id_attr = attr
+        self.next_id = max_id + 1
+
+    def _open(self, name: str) -> str:
+        rid = self.next_id
+        self.next_id += 1
+        return f'<{name} {self.id_attr}:id="{rid}"{self.meta}>'
+
+    def render(self, text: str, ops: list[tuple[int, int, str]], rpr: str) -> str:
+        """Content of a w:t whose run is split around each op.
+
+        The current run is closed before the op, the deleted text goes into a ``w:del``
+        run and the new text into a ``w:ins`` run (both with the original run
+        properties), and a new run with the same properties reopens for the rest.
+        """
+        t_q, r_q = self.t_q, self.r_q
+        out: list[str] = []
         pos = 0
-        if total_prev == 0:
-            t_nodes[0].text = new_text
-            for t in t_nodes[1:]:
-                t.text = ""
+        for start, end, new in ops:
+            start = max(start, pos)
+            out.append(xml_escape(text[pos:start]))
+            out.append(f"</{t_q}></{r_q}>")
+            if end > start:
+                out.append(
+                    f"{self._open(self.del_q)}<{r_q}>{rpr}"
+                    f'<{self.del_text_q} xml:space="preserve">{xml_escape(text[start:end])}'
+                    f"</{self.del_text_q}></{r_q}></{self.del_q}>"
+                )
+            if new:
+                out.append(
+                    f"{self._open(self.ins_q)}<{r_q}>{rpr}"
+                    f'<{t_q} xml:space="preserve">{xml_escape(new)}</{t_q}></{r_q}></{self.ins_q}>'
+                )
+            out.append(f'<{r_q}>{rpr}<{t_q} xml:space="preserve">')
+            pos = max(pos, end)
+        out.append(xml_escape(text[pos:]))
+        return "".join(out)
+
+
+def _splice_paragraph(
+    xml: str, pfx: str, edits: list[TextEdit], revisions: _Revisions | None
+) -> bytes:
+    """A body-level paragraph (its XML, ``<w:p>`` to ``</w:p>``) with ``edits`` applied."""
+    t_q = _qname(pfx, "t")
+    t_pieces: list[tuple] = []
+    texts: list[str] = []
+    starts: list[int] = []
+    offset = 0
+    for piece in _paragraph_pieces(xml, 0, len(xml), pfx):
+        if piece[0] == "t":
+            text = _node_text(xml[piece[2] : piece[3]])
+            t_pieces.append(piece)
+            starts.append(offset)
+            texts.append(text)
+            offset += len(text)
         else:
-            for i, t in enumerate(t_nodes):
-                length = prev_lengths[i]
-                if i == len(t_nodes) - 1:
-                    chunk = new_text[pos:]
-                else:
-                    chunk = new_text[pos : pos + length]
-                t.text = chunk
-                pos += len(chunk)
-
-    new_xml = ET.tostring(root, encoding="utf-8", xml_declaration=True)
-    with zipfile.ZipFile(output_path, "w") as zf:
-        for name, content in files.items():
-            zf.writestr(name, content)
-        zf.writestr("word/document.xml", new_xml)
+            offset += 1
+    node_ops = _node_ops(texts, starts, edits)
+    out: list[str] = []
+    pos = 0
+    for piece, text, ops in zip(t_pieces, texts, node_ops, strict=True):
+        if not ops:
+            continue
+        _, tag_start, content_start, content_end, self_closing, rpr_start, rpr_end = piece
+        if revisions is not None:
+            content = revisions.render(text, ops, xml[rpr_start:rpr_end])
+            preserve = True
+        else:
+            new = _apply_ops(text, ops)
+            if new == text:
+                continue
+            content = xml_escape(new)
+            preserve = new != new.strip()
+        tag = xml[tag_start:content_start]
+        if self_closing or (preserve and "xml:space" not in tag):
+            attrs = tag[len(t_q) + 1 :].rstrip("/>").rstrip()
+            if "xml:space" not in attrs:
+                attrs += ' xml:space="preserve"'
+            tag = f"<{t_q}{attrs}>"
+            closing = f"</{t_q}>" if self_closing else ""
+        else:
+            closing = ""
+        out.append(xml[pos:tag_start])
+        out.append(tag + content + closing)
+        pos = content_end
+    out.append(xml[pos:])
+    return "".join(out).encode("utf-8")
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
-import json
 import logging
+from bisect import bisect_right
 from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from pathlib import Path
 
-from .docx_utils import read_paragraphs, write_docx_preserving_runs, write_paragraphs
+from . import jsonio
+from .cancel import Cancelled, CancelToken, cancel_scope, check_cancelled, current_token
+from .docx_utils import (
+    ParsedDocx,
+    TrackChanges,
+    UnsplicedEditError,
+    parse_document,
+    read_paragraphs,
+    write_docx_edits,
+    write_paragraphs,
+)
+from .metrics import METRICS
 from .model import BaseCorrector, CorrectionSpec
+from .prompt import build_json_prompt
+from .reasons import expand_reason
+from .report import _safe_get, write_corrections_report
 from .text_utils import (
+    TextEdit,
     Token,
     apply_token_corrections,
     build_context,
     build_sentence_context,
+    count_word_tokens,
     detokenize,
     split_tokens_by_char_budget,
     split_tokens_in_chunks,
@@ -36,6 +52,7 @@ class LogEntry:
     context: str
     chunk_index: int
     sentence: str
+    reason_code: str | None = None  # catalog code when the model used the compact format
 
 
 def paragraphs_to_text(paragraphs: Sequence[str]) -> str:
@@ -46,48 +63,186 @@ def text_to_paragraphs(text: str) -> list[str]:
     return text.split("\n")
 
 
+def auto_chunk_words(tokens: Sequence[Token], base_prompt: str) -> tuple[int, int] | None:
+    """Size chunks (words, overlap) from a token sample and the model context window.
+
+    Returns None when there are no tokens to sample.
+    """
+    if not tokens:
+        return None
+    # Muestra de hasta 2000 tokens para estimación
+    sample_tokens = list(tokens[: min(2000, len(tokens))])
+    base_chars = len(build_json_prompt(base_prompt, []))
+    sample_chars = len(build_json_prompt(base_prompt, sample_tokens))
+    # Estimar tokens LLM ~ chars/4
+    base_llm_tokens = max(base_chars // 4, 1)
+    sample_llm_tokens = max((sample_chars - base_chars) // 4, 1)
+    word_count = max(count_word_tokens(sample_tokens), 1)
+    tokens_per_word = max(sample_llm_tokens / word_count, 2.0)
+    # Ventana por modelo (simple): 128k
+    model_ctx = 128_000
+    target_ratio = 0.15  # Reducido de 0.7 a 0.15 para chunks más pequeños
+    output_reserve = 2000
+    margin = 500
+    input_budget = int(model_ctx * target_ratio) - output_reserve - margin - base_llm_tokens
+    est_chunk_words = int(max(input_budget / tokens_per_word, 300))
+    # Límites razonables - reducidos para mejor progreso visible
+    est_chunk_words = max(300, min(est_chunk_words, 1000))
+    return est_chunk_words, max(int(est_chunk_words * 0.10), 200)
+
+
+def plan_chunks(
+    tokens: Sequence[Token], *, chunk_words: int = 0, overlap_words: int = 0
+) -> list[tuple[int, int]]:
+    """Return the (start, end) token ranges that will be sent to the corrector."""
+    if chunk_words and chunk_words > 0:
+        return split_tokens_in_chunks(tokens, max_words=chunk_words, overlap_words=overlap_words)
+    # Auto-chunk by approximate character budget using ~70% of 128k tokens context
+    CONTEXT_TOKENS = 128_000
+    CHAR_PER_TOKEN_EST = 4
+    FRACTION = 0.7
+    char_budget = int(CONTEXT_TOKENS * CHAR_PER_TOKEN_EST * FRACTION)
+    overlap_chars = int(char_budget * 0.03)
+    return split_tokens_by_char_budget(tokens, char_budget=char_budget, overlap_chars=overlap_chars)
+
+
+@dataclass
+class CorrectionResult:
+    paragraphs: list[str]
+    log_entries: list[LogEntry]
+    # Character edits actually applied, relative to the input paragraphs
+    edits: list[TextEdit]
+
+
+def token_edits(
+    paragraphs: Sequence[str], before: Sequence[Token], after: Sequence[Token]
+) -> list[TextEdit]:
+    """Paragraph-relative edits for the tokens whose text changed."""
+    starts: list[int] = []
+    offset = 0
+    for p in paragraphs:
+        starts.append(offset)
+        offset += len(p) + 1
+    edits: list[TextEdit] = []
+    for old, new in zip(before, after, strict=True):
+        if old.text != new.text:
+            idx = bisect_right(starts, old.start) - 1
+            edits.append(TextEdit(idx, old.start - starts[idx], old.end - starts[idx], new.text))
+    return edits
+
+
 def process_paragraphs(
     paragraphs: Sequence[str],
     corrector: BaseCorrector,
     *,
     chunk_words: int = 0,
     overlap_words: int = 0,
+    cancel: CancelToken | None = None,
 ) -> tuple[list[str], list[LogEntry]]:
-    # Tokenize full document text to create stable global token ids
-    full_text = paragraphs_to_text(paragraphs)
-    tokens = tokenize(full_text)
+    result = correct_paragraphs(
+        paragraphs, corrector, chunk_words=chunk_words, overlap_words=overlap_words, cancel=cancel
+    )
+    return result.paragraphs, result.log_entries
+
+
+def correct_paragraphs(
+    paragraphs: Sequence[str],
+    corrector: BaseCorrector,
+    *,
+    chunk_words: int = 0,
+    overlap_words: int = 0,
+    tokens: list[Token] | None = None,
+    chunks: Sequence[tuple[int, int]] | None = None,
+    cancel: CancelToken | None = None,
+) -> CorrectionResult:
+    """Correct ``paragraphs`` chunk by chunk.
+
+    ``cancel`` (default: the token of the active ``cancel_scope``) is checked between
+    chunks and inside the corrector's retries; once cancelled, ``Cancelled`` is raised
+    with ``partial`` set to the merge of the chunks corrected so far.
+    """
+    # Tokenize full document text to create stable global token ids (``tokens`` lets a
+    # caller pass ``tokenize(paragraphs_to_text(paragraphs))`` it already has, e.g. cached)
+    if tokens is None:
+        tokens = tokenize(paragraphs_to_text(paragraphs))
+
+    # Compute chunks as ranges of token indices (or reuse a plan_chunks result made earlier)
+    ranges = (
+        list(chunks)
+        if chunks is not None
+        else plan_chunks(tokens, chunk_words=chunk_words, overlap_words=overlap_words)
+    )
+    logger.info(f"Procesando documento en {len(ranges)} chunk(s)...")
+    corrections: list[list[CorrectionSpec]] = []
+    with cancel_scope(cancel or current_token()):
+        try:
+            for chunk_idx in range(len(ranges)):
+                corrections.append(correct_chunk(tokens, ranges, chunk_idx, corrector))
+        except Cancelled as e:
+            attach_partial(e, paragraphs, tokens, ranges, corrections)
+            raise
+    return merge_chunk_corrections(paragraphs, tokens, ranges, corrections)
+
+
+def correct_chunk(
+    tokens: Sequence[Token],
+    ranges: Sequence[tuple[int, int]],
+    chunk_idx: int,
+    corrector: BaseCorrector,
+) -> list[CorrectionSpec]:
+    """Send one chunk to the corrector; the specs keep the chunk-local token ids.
+
+    Chunks are independent, so they may be corrected in any order or in parallel (see
+    ``server.scheduler.ChunkFanout``); ``merge_chunk_corrections`` puts them together.
+    """
+    check_cancelled()
+    start, end = ranges[chunk_idx]
+    total_chunks = len(ranges)
+    logger.info(f"📄 Procesando chunk {chunk_idx + 1}/{total_chunks} (tokens {start}-{end})...")
+    # Local ids start from 0; map back to global by +start
+    local_tokens = [
+        Token(i - start, t.text, t.start, t.end, t.kind, t.line)
+        for i, t in enumerate(tokens[start:end], start=start)
+    ]
+    logger.info(f"🔄 Enviando chunk {chunk_idx + 1}/{total_chunks} al corrector...")
+    corrections = corrector.correct_tokens(local_tokens)
+    logger.info(
+        f"✅ Chunk {chunk_idx + 1}/{total_chunks}: {len(corrections)} correcciones encontradas"
+    )
+    return corrections
+
+
+def attach_partial(
+    error: Cancelled,
+    paragraphs: Sequence[str],
+    tokens: list[Token],
+    ranges: Sequence[tuple[int, int]],
+    corrections_by_chunk: Sequence[Sequence[CorrectionSpec] | None],
+) -> None:
+    """Set ``error.partial`` to the merge of the chunks done (None or missing = not done)."""
+    done = [c or [] for c in corrections_by_chunk]
+    done += [[] for _ in range(len(ranges) - len(done))]
+    error.partial = merge_chunk_corrections(paragraphs, tokens, ranges, done)
+    error.chunks_done = sum(1 for c in corrections_by_chunk if c is not None)
+    error.chunks_total = len(ranges)
 
-    # Compute chunks as ranges of token indices
-    # Compute chunks as ranges of token indices
-    if chunk_words and chunk_words > 0:
-        ranges = split_tokens_in_chunks(tokens, max_words=chunk_words, overlap_words=overlap_words)
-    else:
-        # Auto-chunk by approximate character budget using ~70% of 128k tokens context
-        CONTEXT_TOKENS = 128_000
-        CHAR_PER_TOKEN_EST = 4
-        FRACTION = 0.7
-        char_budget = int(CONTEXT_TOKENS * CHAR_PER_TOKEN_EST * FRACTION)
-        overlap_chars = int(char_budget * 0.03)
-        ranges = split_tokens_by_char_budget(
-            tokens, char_budget=char_budget, overlap_chars=overlap_chars
-        )
 
+def merge_chunk_corrections(
+    paragraphs: Sequence[str],
+    tokens: list[Token],
+    ranges: Sequence[tuple[int, int]],
+    corrections_by_chunk: Sequence[Sequence[CorrectionSpec]],
+) -> CorrectionResult:
+    """Apply the corrections of every chunk in chunk order and build the result.
+
+    Walking the chunks in order, whatever order they were corrected in, keeps the
+    sequential behaviour: on overlapping tokens the earlier chunk wins.
+    """
     applied_global: dict[int, CorrectionSpec] = {}
     log_entries: list[LogEntry] = []
-    total_chunks = len(ranges)
-    logger.info(f"Procesando documento en {total_chunks} chunk(s)...")
-    for chunk_idx, (start, end) in enumerate(ranges):
-        logger.info(f"📄 Procesando chunk {chunk_idx + 1}/{total_chunks} (tokens {start}-{end})...")
-        # Local ids start from 0; map back to global by +start
-        local_tokens = [
-            Token(i - start, t.text, t.start, t.end, t.kind, t.line)
-            for i, t in enumerate(tokens[start:end], start=start)
-        ]
-        logger.info(f"🔄 Enviando chunk {chunk_idx + 1}/{total_chunks} al corrector...")
-        corrections = corrector.correct_tokens(local_tokens)
-        logger.info(
-            f"✅ Chunk {chunk_idx + 1}/{total_chunks}: {len(corrections)} correcciones encontradas"
-        )
+    for chunk_idx, ((start, _), corrections) in enumerate(
+        zip(ranges, corrections_by_chunk, strict=True)
+    ):
         for c in corrections:
             global_id = start + c.token_id
             if 0 <= global_id < len(tokens):
@@ -121,7 +276,10 @@ def process_paragraphs(
 
                 # Detectar si es una eliminación (replacement vacío o muy diferente)
                 corrected_text = c.replacement
-                reason_text = c.reason
+                # Compact output carries a catalog code (and a note only if asked for)
+                reason_text = (
+                    expand_reason(c.reason_code, c.reason or None) if c.reason_code else c.reason
+                )
 
                 # Si el replacement parece ser el siguiente token, probablemente es una eliminación
                 if (
@@ -129,9 +287,9 @@ def process_paragraphs(
                     and c.replacement.strip() == tokens[global_id + 1].text.strip()
                 ):
                     corrected_text = ""
-                    reason_text = f"[ELIMINACIÓN] {c.reason}"
+                    reason_text = f"[ELIMINACIÓN] {reason_text}"
                 elif c.replacement.strip() == "":
-                    reason_text = f"[ELIMINACIÓN] {c.reason}"
+                    reason_text = f"[ELIMINACIÓN] {reason_text}"
 
                 entry = LogEntry(
                     token_id=global_id,
@@ -142,11 +300,13 @@ def process_paragraphs(
                     context=build_context(tokens, global_id, radius=3),
                     chunk_index=chunk_idx,
                     sentence=build_sentence_context(tokens, global_id),
+                    reason_code=c.reason_code,
                 )
                 log_entries.append(entry)
                 applied_global[global_id] = c
 
     # Apply all corrections to the global token list
+    original_tokens = tokens
     if applied_global:
         ordered = [
             type(
@@ -165,7 +325,12 @@ def process_paragraphs(
 
     corrected_text = detokenize(tokens)
     corrected_paragraphs = text_to_paragraphs(corrected_text)
-    return corrected_paragraphs, log_entries
+    report = METRICS.report()
+    if report:
+        logger.info(f"📊 Métricas LLM:\n{report}")
+    return CorrectionResult(
+        corrected_paragraphs, log_entries, token_edits(paragraphs, original_tokens, tokens)
+    )
 
 
 def process_document(
@@ -179,20 +344,40 @@ def process_document(
     preserve_format: bool = True,
     log_docx_path: str | None = None,
     enable_docx_log: bool = True,
-) -> None:
-    paragraphs = read_paragraphs(input_path)
-    corrected_paragraphs, log_entries = process_paragraphs(
-        paragraphs, corrector, chunk_words=chunk_words, overlap_words=overlap_words
+    parsed: ParsedDocx | None = None,
+    track_changes: TrackChanges | None = None,
+    tokens: list[Token] | None = None,
+    chunks: Sequence[tuple[int, int]] | None = None,
+) -> list[LogEntry]:
+    """Correct a document and write the corrected copy, the JSONL log and the DOCX report.
+
+    ``parsed`` is the already parsed input (see ``parse_document``); pass it when the
+    caller has read the document before, so it is not parsed twice. The corrected DOCX is
+    written from the same parse, which keeps paragraph indices aligned with the edits;
+    with ``track_changes`` the corrections are written as Word revisions. ``tokens`` and
+    ``chunks`` go to ``correct_paragraphs`` when the caller already has them.
+    """
+    if parsed is None:
+        parsed = parse_document(input_path)
+    paragraphs = parsed.texts if parsed is not None else read_paragraphs(input_path)
+    result = correct_paragraphs(
+        paragraphs,
+        corrector,
+        chunk_words=chunk_words,
+        overlap_words=overlap_words,
+        tokens=tokens,
+        chunks=chunks,
     )
-    # Preserve formatting for DOCX outputs by rewriting document.xml text only
-    if (
-        preserve_format
-        and output_path.lower().endswith(".docx")
-        and input_path.lower().endswith(".docx")
-    ):
-        write_docx_preserving_runs(input_path, corrected_paragraphs, output_path)
+    log_entries = result.log_entries
+    # Preserve formatting for DOCX outputs: splice the edits into the changed w:t nodes only
+    if preserve_format and parsed is not None and output_path.lower().endswith(".docx"):
+        try:
+            write_docx_edits(parsed, result.edits, output_path, track_changes=track_changes)
+        except UnsplicedEditError as e:
+            logger.warning(f"⚠️ {e}: se reescribe el documento sin conservar el formato")
+            write_paragraphs(result.paragraphs, output_path)
     else:
-        write_paragraphs(corrected_paragraphs, output_path)
+        write_paragraphs(result.paragraphs, output_path)
     _write_log_jsonl(log_path, log_entries)
     if enable_docx_log:
         if log_docx_path:
@@ -206,36 +391,39 @@ def process_document(
                 # Fallback: mismo directorio que el log JSONL
                 docx_path = str(Path(log_path).with_suffix(".docx"))
         _write_log_docx(docx_path, log_entries, source_filename=Path(input_path).name)
+    return log_entries
+
+
+# Columns of the CSV changelog; the JSONL log adds the reason code
+CHANGELOG_FIELDS = (
+    "token_id",
+    "line",
+    "original",
+    "corrected",
+    "reason",
+    "context",
+    "chunk_index",
+    "sentence",
+)
+LOG_FIELDS = (*CHANGELOG_FIELDS, "reason_code")
 
 
-def _write_log_jsonl(path: str, entries: Iterable[LogEntry]) -> None:
-    p = Path(path)
-    with p.open("w", encoding="utf-8") as f:
-        for e in entries:
-            f.write(
-                json.dumps(
-                    {
-                        "token_id": e.token_id,
-                        "line": e.line,
-                        "original": e.original,
-                        "corrected": e.corrected,
-                        "reason": e.reason,
-                        "context": e.context,
-                        "chunk_index": e.chunk_index,
-                        "sentence": e.sentence,
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n"
-            )
+def log_entry_to_dict(e: LogEntry) -> dict:
+    return {
+        "token_id": e.token_id,
+        "line": e.line,
+        "original": e.original,
+        "corrected": e.corrected,
+        "reason": e.reason,
+        "context": e.context,
+        "chunk_index": e.chunk_index,
+        "sentence": e.sentence,
+        "reason_code": e.reason_code,
+    }
 
 
-def _safe_get(obj, name: str, default=None):
-    if hasattr(obj, name):
-        return getattr(obj, name)
-    if isinstance(obj, dict):
-        return obj.get(name, default)
-    return default
+def _write_log_jsonl(path: str | Path, entries: Iterable[LogEntry]) -> None:
+    jsonio.write_jsonl(path, (log_entry_to_dict(e) for e in entries))
 
 
 def _write_log_docx(
@@ -243,98 +431,7 @@ def _write_log_docx(
 ) -> None:
     entries_list = list(entries)
     if Document is not None:
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.oxml import OxmlElement
-        from docx.oxml.ns import qn
-        from docx.shared import Inches, Pt, RGBColor
-
-        doc = Document()  # type: ignore
-
-        # Título
-        title = doc.add_heading("Informe de Correcciones", level=1)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Información del documento
-        if source_filename:
-            p = doc.add_paragraph()
-            p.add_run("Documento: ").bold = True
-            p.add_run(source_filename)
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        p = doc.add_paragraph()
-        p.add_run("Total de correcciones: ").bold = True
-        p.add_run(str(len(entries_list)))
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        doc.add_paragraph()  # Espacio
-
-        # Crear tabla con estilo
-        table = doc.add_table(rows=1, cols=5)
-        table.style = "Light Grid Accent 1"
-
-        # Encabezados
-        hdr_cells = table.rows[0].cells
-        headers = ["#", "Original → Corregido", "Motivo", "Contexto", "Línea"]
-
-        for i, header_text in enumerate(headers):
-            hdr_cells[i].text = header_text
-            # Formatear encabezado
-            for paragraph in hdr_cells[i].paragraphs:
-                for run in paragraph.runs:
-                    run.font.bold = True
-                    run.font.size = Pt(11)
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-            # Color de fondo del encabezado
-            shading_elm = OxmlElement("w:shd")
-            shading_elm.set(qn("w:fill"), "4472C4")
-            hdr_cells[i]._element.get_or_add_tcPr().append(shading_elm)
-
-        # Ajustar anchos de columna
-        table.columns[0].width = Inches(0.4)  # #
-        table.columns[1].width = Inches(2.0)  # Original → Corregido
-        table.columns[2].width = Inches(3.5)  # Motivo
-        table.columns[3].width = Inches(1.5)  # Contexto
-        table.columns[4].width = Inches(0.6)  # Línea
-
-        # Llenar tabla
-        for i, e in enumerate(entries_list, start=1):
-            row_cells = table.add_row().cells
-
-            # Número
-            row_cells[0].text = str(i)
-            row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-            # Original → Corregido
-            original = str(_safe_get(e, "original", ""))
-            corrected = str(_safe_get(e, "corrected", ""))
-            p = row_cells[1].paragraphs[0]
-            p.clear()
-            run_original = p.add_run(original)
-            run_original.font.color.rgb = RGBColor(192, 0, 0)  # Rojo
-            run_original.font.bold = True
-            p.add_run(" → ")
-            run_corrected = p.add_run(corrected)
-            run_corrected.font.color.rgb = RGBColor(0, 176, 80)  # Verde
-            run_corrected.font.bold = True
-
-            # Motivo
-            row_cells[2].text = str(_safe_get(e, "reason", ""))
-
-            # Contexto
-            context = str(_safe_get(e, "context", ""))
-            row_cells[3].text = context if len(context) < 50 else context[:47] + "..."
-
-            # Línea
-            row_cells[4].text = str(_safe_get(e, "line", ""))
-            row_cells[4].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-            # Formatear fuente de la fila
-            for cell in row_cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.size = Pt(10)
-
-        doc.save(path)
+        write_corrections_report(path, entries_list, source_filename=source_filename)
         return
     # Fallback: write a minimal paragraphs DOCX via write_paragraphs
     paras: list[str] = []
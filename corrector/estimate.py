@@ -0,0 +1,334 @@
+"""Dry-run cost and time estimation.
+
+Tokenizes a document and plans its chunks exactly as ``process_paragraphs`` would, then
+estimates LLM input/output tokens, request count, wall time under the client-side pacing
+and fallback chain, and monetary cost per provider. No model call is ever made.
+
+Results are cached by document checksum (plus the parameters that affect the plan), so
+re-estimating an unchanged document is free.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+
+from .doccache import CachedDocument
+from .docx_utils import read_paragraphs
+from .engine import auto_chunk_words, paragraphs_to_text, plan_chunks
+from .model import gemini_min_interval
+from .prompt import build_json_prompt
+from .text_utils import Token, count_word_tokens, tokenize
+
+# ~4 characters per LLM token (same heuristic as the auto-chunk sizing)
+CHARS_PER_LLM_TOKEN = 4
+# Observed density of corrections in manuscripts and size of one verbose correction object
+CORRECTIONS_PER_1K_WORDS = 10
+OUTPUT_TOKENS_PER_CORRECTION = 40
+OUTPUT_TOKENS_BASE = 15
+# Compact positional format: [id, "reemplazo", "COD"] (~+8 tokens with a free-text reason)
+OUTPUT_TOKENS_PER_COMPACT_CORRECTION = 12
+# Retry policy of the correctors: 3 attempts with 2s, 4s backoff before falling back
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = (2, 4)
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Pricing (USD per 1M tokens) and latency profile of an LLM."""
+
+    name: str
+    provider: str
+    input_usd_per_m: float
+    output_usd_per_m: float
+    output_tokens_per_s: float
+    overhead_s: float
+    thinking_tokens: int = 0
+
+
+# List prices at the time of writing; update when providers change them.
+MODEL_PROFILES: dict[str, ModelProfile] = {
+    p.name: p
+    for p in (
+        ModelProfile("gemini-2.5-pro", "gemini", 1.25, 10.0, 80, 6.0, thinking_tokens=1500),
+        ModelProfile("gemini-2.5-flash", "gemini", 0.30, 2.50, 200, 1.5, thinking_tokens=600),
+        ModelProfile("gemini-2.5-flash-lite", "gemini", 0.10, 0.40, 300, 1.0),
+        ModelProfile("gpt-5", "azure", 1.25, 10.0, 60, 5.0, thinking_tokens=1000),
+        ModelProfile("gpt-4.1", "azure", 2.0, 8.0, 90, 1.5),
+        ModelProfile("gpt-4.1-mini", "azure", 0.40, 1.60, 120, 1.0),
+    )
+}
+
+
+def model_profile(model_name: str) -> ModelProfile:
+    """Return the profile for a model name, matching the longest known prefix."""
+    name = model_name.lower()
+    if name in MODEL_PROFILES:
+        return MODEL_PROFILES[name]
+    for key in sorted(MODEL_PROFILES, key=len, reverse=True):
+        if name.startswith(key) or key in name:
+            return MODEL_PROFILES[key]
+    if "flash" in name:
+        return MODEL_PROFILES["gemini-2.5-flash"]
+    return MODEL_PROFILES["gemini-2.5-pro"]
+
+
+def min_interval_for(profile: ModelProfile) -> float:
+    """Client-side pacing applied between requests (see ``GeminiCorrector``)."""
+    return float(gemini_min_interval(profile.name)) if profile.provider == "gemini" else 0.0
+
+
+def default_fallback_models() -> list[str]:
+    """Fallback chain configured for ``GeminiCorrector``: Azure first, then Gemini fallback."""
+    chain: list[str] = []
+    try:
+        from settings import get_settings
+
+        settings = get_settings()
+        if settings.azure_openai_api_key and settings.azure_openai_endpoint:
+            chain.append(settings.azure_openai_deployment_name or "gpt-5")
+        chain.append(settings.gemini_fallback_model or "gemini-2.5-flash")
+    except Exception:
+        chain.append("gemini-2.5-flash")
+    return chain
+
+
+@dataclass
+class CostEstimate:
+    model_name: str
+    checksum: str | None
+    words: int
+    tokens: int
+    chunks: int
+    chunk_words: int
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    min_interval_seconds: float
+    expected_seconds: float
+    worst_case_seconds: float
+    fallback_models: list[str] = field(default_factory=list)
+    cost_usd: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _request_seconds(profile: ModelProfile, output_tokens: int) -> float:
+    return profile.overhead_s + output_tokens / profile.output_tokens_per_s
+
+
+def _paced_seconds(latencies: Sequence[float], interval: float) -> float:
+    # Requests are sequential within a document and start at least `interval` apart
+    if not latencies:
+        return 0.0
+    return sum(max(interval, lat) for lat in latencies[:-1]) + latencies[-1]
+
+
+def _chunk_input_tokens(
+    base_prompt: str, tokens: Sequence[Token], start: int, end: int, *, compact: bool = False
+) -> int:
+    local = [
+        Token(i - start, t.text, t.start, t.end, t.kind, t.line)
+        for i, t in enumerate(tokens[start:end], start=start)
+    ]
+    prompt = build_json_prompt(base_prompt, local, compact=compact)
+    return max(len(prompt) // CHARS_PER_LLM_TOKEN, 1)
+
+
+def estimate_tokens(
+    tokens: Sequence[Token],
+    *,
+    model_name: str,
+    base_prompt: str = "",
+    chunk_words: int = 0,
+    overlap_words: int = 0,
+    fallback_models: Sequence[str] | None = None,
+    checksum: str | None = None,
+    compact_output: bool = False,
+) -> CostEstimate:
+    profile = model_profile(model_name)
+    per_correction = (
+        OUTPUT_TOKENS_PER_COMPACT_CORRECTION if compact_output else OUTPUT_TOKENS_PER_CORRECTION
+    )
+    chain = list(fallback_models) if fallback_models is not None else default_fallback_models()
+    ranges = plan_chunks(tokens, chunk_words=chunk_words, overlap_words=overlap_words)
+
+    input_per_chunk: list[int] = []
+    output_per_chunk: list[int] = []
+    for start, end in ranges:
+        input_per_chunk.append(
+            _chunk_input_tokens(base_prompt, tokens, start, end, compact=compact_output)
+        )
+        words = count_word_tokens(tokens[start:end])
+        expected_corrections = words * CORRECTIONS_PER_1K_WORDS / 1000
+        output_per_chunk.append(int(OUTPUT_TOKENS_BASE + expected_corrections * per_correction))
+
+    input_tokens = sum(input_per_chunk)
+    output_tokens = sum(output_per_chunk)
+    interval = min_interval_for(profile)
+    latencies = [_request_seconds(profile, o + profile.thinking_tokens) for o in output_per_chunk]
+    expected = _paced_seconds(latencies, interval)
+
+    # Worst case: every attempt on the primary model fails and the first fallback answers
+    worst = expected
+    if chain and latencies:
+        fb = model_profile(chain[0])
+        worst = _paced_seconds(
+            [
+                MAX_ATTEMPTS * profile.overhead_s
+                + sum(RETRY_BACKOFF_SECONDS)
+                + _request_seconds(fb, o + fb.thinking_tokens)
+                for o in output_per_chunk
+            ],
+            interval,
+        )
+
+    costs: dict[str, float] = {}
+    for name in [model_name, *chain]:
+        p = model_profile(name)
+        out_total = output_tokens + p.thinking_tokens * len(ranges)
+        costs[name] = round(
+            (input_tokens * p.input_usd_per_m + out_total * p.output_usd_per_m) / 1_000_000, 4
+        )
+
+    return CostEstimate(
+        model_name=model_name,
+        checksum=checksum,
+        words=count_word_tokens(tokens),
+        tokens=len(tokens),
+        chunks=len(ranges),
+        chunk_words=chunk_words,
+        requests=len(ranges),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens + profile.thinking_tokens * len(ranges),
+        min_interval_seconds=interval,
+        expected_seconds=round(expected, 1),
+        worst_case_seconds=round(worst, 1),
+        fallback_models=chain,
+        cost_usd=costs,
+    )
+
+
+_CACHE_MAX = 256
+_cache: OrderedDict[tuple, CostEstimate] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(checksum: str, **params) -> tuple:
+    base_prompt = params.pop("base_prompt", "")
+    prompt_hash = hashlib.sha1(base_prompt.encode("utf-8")).hexdigest()
+    fallbacks = params.pop("fallback_models", None)
+    return (
+        checksum,
+        prompt_hash,
+        tuple(fallbacks) if fallbacks is not None else None,
+        tuple(sorted(params.items())),
+    )
+
+
+def file_checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def estimate_paragraphs(
+    paragraphs: Sequence[str] | None,
+    *,
+    model_name: str,
+    base_prompt: str = "",
+    chunk_words: int = 0,
+    overlap_words: int = 0,
+    auto_chunk: bool = False,
+    fallback_models: Sequence[str] | None = None,
+    checksum: str | None = None,
+    loader=None,
+    compact_output: bool = False,
+) -> CostEstimate:
+    """Estimate a document, serving repeated requests for the same checksum from cache.
+
+    Either ``paragraphs`` or a zero-argument ``loader`` returning them (or a
+    ``CachedDocument``, whose tokens skip the tokenizer) must be given; the loader is only
+    called on a cache miss.
+    """
+    key = None
+    if checksum:
+        key = _cache_key(
+            checksum,
+            model_name=model_name,
+            base_prompt=base_prompt,
+            chunk_words=chunk_words,
+            overlap_words=overlap_words,
+            auto_chunk=auto_chunk,
+            fallback_models=fallback_models,
+            compact_output=compact_output,
+        )
+        with _cache_lock:
+            hit = _cache.get(key)
+            if hit is not None:
+                _cache.move_to_end(key)
+                return hit
+
+    tokens = None
+    if paragraphs is None:
+        if loader is None:
+            raise ValueError("paragraphs or loader is required")
+        loaded = loader()
+        if isinstance(loaded, CachedDocument):
+            tokens = loaded.tokens()
+        else:
+            paragraphs = loaded
+    if tokens is None:
+        tokens = tokenize(paragraphs_to_text(paragraphs))
+    if auto_chunk:
+        sized = auto_chunk_words(tokens, base_prompt)
+        if sized:
+            chunk_words, overlap_words = sized
+    est = estimate_tokens(
+        tokens,
+        model_name=model_name,
+        base_prompt=base_prompt,
+        chunk_words=chunk_words,
+        overlap_words=overlap_words,
+        fallback_models=fallback_models,
+        checksum=checksum,
+        compact_output=compact_output,
+    )
+
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = est
+            _cache.move_to_end(key)
+            while len(_cache) > _CACHE_MAX:
+                _cache.popitem(last=False)
+    return est
+
+
+def estimate_file(path: str, **kwargs) -> CostEstimate:
+    return estimate_paragraphs(
+        None, checksum=file_checksum(path), loader=lambda: read_paragraphs(path), **kwargs
+    )
+
+
+def summarize(estimates: Sequence[CostEstimate]) -> dict:
+    """Aggregate per-document estimates (documents are processed one after another)."""
+    costs: dict[str, float] = {}
+    for e in estimates:
+        for name, usd in e.cost_usd.items():
+            costs[name] = round(costs.get(name, 0.0) + usd, 4)
+    return {
+        "documents": len(estimates),
+        "words": sum(e.words for e in estimates),
+        "requests": sum(e.requests for e in estimates),
+        "input_tokens": sum(e.input_tokens for e in estimates),
+        "output_tokens": sum(e.output_tokens for e in estimates),
+        "expected_seconds": round(sum(e.expected_seconds for e in estimates), 1),
+        "worst_case_seconds": round(sum(e.worst_case_seconds for e in estimates), 1),
+        "cost_usd": costs,
+    }
@@ -0,0 +1,111 @@
+"""Single JSON serialization path for LLM responses, JSONL logs and API payloads.
+
+Uses ``orjson`` when it is installed (``pip install corrector[fast]``) and falls back to
+the standard library otherwise. Both backends give the same bytes: UTF-8 without ASCII
+escaping, compact separators (or a 2-space indent), and non-JSON values (datetimes,
+enums, UUIDs, paths, dataclasses) converted by the one ``_default`` handler.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime as dt
+import json
+import logging
+import uuid
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from pathlib import Path, PurePath
+from typing import Any
+
+try:  # optional fast backend
+    import orjson as _orjson  # type: ignore
+except Exception:  # pragma: no cover
+    _orjson = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+HAS_ORJSON = _orjson is not None
+# JSONL lines are buffered and flushed in blocks of this many rows
+WRITE_BATCH_ROWS = 1000
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch this one
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: str | bytes) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def _default(obj: Any) -> Any:
+    """Non-JSON values, converted the same way whichever backend serializes."""
+    if isinstance(obj, (dt.datetime, dt.date, dt.time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (uuid.UUID, PurePath)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumpb(obj: Any, *, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 bytes."""
+    if _orjson is not None:
+        # Datetimes and dataclasses go through _default too; int keys become strings
+        option = (
+            _orjson.OPT_PASSTHROUGH_DATETIME
+            | _orjson.OPT_PASSTHROUGH_DATACLASS
+            | _orjson.OPT_NON_STR_KEYS
+        )
+        if indent:
+            option |= _orjson.OPT_INDENT_2
+        return _orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def dumps(obj: Any, *, indent: bool = False) -> str:
+    return dumpb(obj, indent=indent).decode("utf-8")
+
+
+def write_jsonl(
+    path: str | Path, rows: Iterable[Any], *, batch_rows: int = WRITE_BATCH_ROWS
+) -> int:
+    """Write one JSON document per line, flushing in batches. Returns the row count."""
+    count = 0
+    buf: list[bytes] = []
+    with open(path, "wb") as f:
+        for row in rows:
+            buf.append(dumpb(row))
+            count += 1
+            if len(buf) >= batch_rows:
+                buf.append(b"")
+                f.write(b"\n".join(buf))
+                buf.clear()
+        if buf:
+            buf.append(b"")
+            f.write(b"\n".join(buf))
+    return count
+
+
+def read_jsonl(path: str | Path) -> Iterator[Any]:
+    """Yield the documents of a JSONL file, skipping blank and malformed lines."""
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except (JSONDecodeError, ValueError):
+                logger.debug(f"Línea JSONL inválida en {path}")
+                continue
@@ -0,0 +1,113 @@
+"""Per-provider LLM call metrics (parse outcomes, retries, latency).
+
+A process-wide ``METRICS`` registry is updated by the correctors. ``report()`` renders a
+one-line-per-provider summary for the logs; ``snapshot()`` returns plain dicts for run
+summaries and can be merged across processes with ``merge_snapshots``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class ProviderStats:
+    requests: int = 0
+    chunks: int = 0
+    chunk_seconds: float = 0.0
+    parse_ok: int = 0
+    parse_salvaged: int = 0
+    parse_failed: int = 0
+    retries: int = 0
+    retried_chunks: int = 0
+    retried_chunk_seconds: float = 0.0
+    output_tokens: int = 0
+    output_token_responses: int = 0
+
+    @property
+    def parse_failure_rate(self) -> float:
+        total = self.parse_ok + self.parse_salvaged + self.parse_failed
+        return self.parse_failed / total if total else 0.0
+
+
+class LLMMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, ProviderStats] = {}
+
+    def _get(self, provider: str) -> ProviderStats:
+        st = self._stats.get(provider)
+        if st is None:
+            st = self._stats[provider] = ProviderStats()
+        return st
+
+    def record_parse(self, provider: str, status: str) -> None:
+        """Record one response parse; status is "ok", "salvaged" or "failed"."""
+        with self._lock:
+            st = self._get(provider)
+            st.requests += 1
+            if status == "ok":
+                st.parse_ok += 1
+            elif status == "salvaged":
+                st.parse_salvaged += 1
+            else:
+                st.parse_failed += 1
+
+    def record_output_tokens(self, provider: str, tokens: int) -> None:
+        """Record the output tokens the provider billed for one response."""
+        with self._lock:
+            st = self._get(provider)
+            st.output_tokens += tokens
+            st.output_token_responses += 1
+
+    def record_chunk(self, provider: str, seconds: float, attempts: int) -> None:
+        with self._lock:
+            st = self._get(provider)
+            st.chunks += 1
+            st.chunk_seconds += seconds
+            if attempts > 1:
+                st.retries += attempts - 1
+                st.retried_chunks += 1
+                st.retried_chunk_seconds += seconds
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: asdict(st) for name, st in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def report(self) -> str:
+        return format_report(self.snapshot())
+
+
+def merge_snapshots(snapshots: Iterable[dict[str, dict]]) -> dict[str, dict]:
+    merged: dict[str, dict] = {}
+    for snap in snapshots:
+        for provider, values in (snap or {}).items():
+            acc = merged.setdefault(provider, asdict(ProviderStats()))
+            for key, value in values.items():
+                acc[key] = acc.get(key, 0) + value
+    return merged
+
+
+def format_report(snapshot: dict[str, dict]) -> str:
+    lines: list[str] = []
+    for provider, values in sorted(snapshot.items()):
+        st = ProviderStats(**values)
+        avg = st.chunk_seconds / st.chunks if st.chunks else 0.0
+        retried_avg = st.retried_chunk_seconds / st.retried_chunks if st.retried_chunks else 0.0
+        out_avg = st.output_tokens / st.output_token_responses if st.output_token_responses else 0.0
+        lines.append(
+            f"{provider}: {st.requests} respuestas, fallos de parseo "
+            f"{st.parse_failed} ({st.parse_failure_rate:.1%}), rescatadas {st.parse_salvaged}; "
+            f"{st.chunks} chunks a {avg:.1f}s de media, {out_avg:.0f} tokens de salida/respuesta; "
+            f"{st.retried_chunks} con reintentos ({st.retries} reintentos, {retried_avg:.1f}s de media)"
+        )
+    return "\n".join(lines)
+
+
+METRICS = LLMMetrics()
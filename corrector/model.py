@@ -2,13 +2,20 @@ from __future__ import annotations
 
 import json
 import logging
+import re
 import time
 from typing import Any, Protocol
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from pydantic.json_schema import SkipJsonSchema
 
+from . import jsonio
+from .cancel import Cancelled, cancellable_sleep, check_cancelled
 from .llm import LLMNotConfigured, get_gemini_client
+from .metrics import METRICS
 from .prompt import build_json_prompt
+from .ratelimit import ModelQuota, estimate_tokens, get_governor, quota_from_env
+from .reasons import normalize_code
 from .text_utils import Token
 
 logger = logging.getLogger(__name__)
@@ -19,6 +26,8 @@ class CorrectionSpec(BaseModel):
     replacement: str
     reason: str
     original: str | None = None
+    # Compact output: code from corrector.reasons (never part of the wire schema)
+    reason_code: SkipJsonSchema[str | None] = None
 
 
 class BaseCorrector(Protocol):
@@ -29,12 +38,204 @@ class CorrectionsResponse(BaseModel):
     corrections: list[CorrectionSpec] = []
 
 
-class GeminiCorrector:
-    # Class-level rate limiting (shared across all instances)
-    _last_request_time = 0
-    _min_interval_seconds = 30  # 2 req/min = 30 seconds between requests for gemini-2.5-pro
+class CompactCorrectionsResponse(BaseModel):
+    """Each item: [token_id, replacement, reason code], plus a short reason when asked."""
+
+    c: list[list[str]] = []
+
+
+# Input tokens per minute of the Gemini free tier, for pro and flash alike
+GEMINI_TPM = 250_000
+# Azure deployments: quota of a standard GPT deployment unless LLM_RPM/LLM_TPM say otherwise
+AZURE_QUOTA = ModelQuota(rpm=60, tpm=150_000)
+
+
+def gemini_min_interval(model_name: str) -> int:
+    """Seconds between requests that keep a Gemini model under its RPM quota."""
+    if "flash" in model_name.lower():
+        return 4  # 15 req/min for flash
+    return 30  # 2 req/min for pro
+
+
+def gemini_quota(model_name: str) -> ModelQuota:
+    """Per-minute quota the governor enforces for a Gemini model (LLM_RPM/LLM_TPM override)."""
+    return quota_from_env(ModelQuota(rpm=60 // gemini_min_interval(model_name), tpm=GEMINI_TPM))
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    msg = str(e)
+    return "429" in msg or "RESOURCE_EXHAUSTED" in msg or "RateLimit" in type(e).__name__
+
+
+class CorrectionsParseError(ValueError):
+    """Raised when an LLM response contains no usable corrections payload."""
+
+
+CORRECTIONS_FUNCTION = "return_corrections"
+# "schema": response schema / strict json_schema; "tools": function calling; "json": legacy
+STRUCTURED_OUTPUT_MODES = ("schema", "tools", "json")
+# "verbose": one object per correction; "compact": positional tuples with reason codes
+OUTPUT_FORMATS = ("verbose", "compact")
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+def _items_to_specs(items: list[Any]) -> tuple[list[CorrectionSpec], int]:
+    specs: list[CorrectionSpec] = []
+    invalid = 0
+    for it in items:
+        if not isinstance(it, dict):
+            invalid += 1
+            continue
+        try:
+            specs.append(CorrectionSpec.model_validate(it))
+        except ValidationError:
+            invalid += 1
+    return specs, invalid
+
+
+def _tuples_to_specs(items: list[Any]) -> tuple[list[CorrectionSpec], int]:
+    specs: list[CorrectionSpec] = []
+    invalid = 0
+    for it in items:
+        try:
+            token_id, replacement = int(it[0]), it[1]
+            code = it[2] if len(it) > 2 else None
+            note = it[3] if len(it) > 3 else None
+        except (TypeError, ValueError, IndexError, KeyError):
+            invalid += 1
+            continue
+        if not isinstance(replacement, str):
+            invalid += 1
+            continue
+        specs.append(
+            CorrectionSpec(
+                token_id=token_id,
+                replacement=replacement,
+                reason=str(note) if note else "",
+                reason_code=normalize_code(str(code) if code is not None else None),
+            )
+        )
+    return specs, invalid
+
+
+def _salvage_items(text: str, key_name: str = "corrections") -> list[Any]:
+    """Decode every complete element of a (possibly truncated or malformed) JSON array."""
+    key = text.find(f'"{key_name}"')
+    start = text.find("[", key if key >= 0 else 0)
+    if start < 0:
+        return []
+    decoder = json.JSONDecoder()
+    items: list[Any] = []
+    pos, n = start + 1, len(text)
+    while pos < n:
+        while pos < n and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= n or text[pos] == "]":
+            break
+        try:
+            obj, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        items.append(obj)
+    return items
+
+
+def parse_corrections(
+    text: str | None, *, compact: bool = False
+) -> tuple[list[CorrectionSpec], str]:
+    """Parse an LLM corrections payload tolerantly.
+
+    Returns the valid corrections and a status: "ok" when the payload parsed cleanly,
+    "salvaged" when only part of it was usable (truncated array, invalid items) and
+    "failed" when nothing usable was found. ``compact`` selects the positional format.
+    """
+    if not text or not text.strip():
+        return [], "failed"
+    key_name, to_specs = ("c", _tuples_to_specs) if compact else ("corrections", _items_to_specs)
+    cleaned = _CODE_FENCE.sub("", text)
+    try:
+        data = jsonio.loads(cleaned)
+    except jsonio.JSONDecodeError:
+        items = _salvage_items(cleaned, key_name)
+        if not items:
+            return [], "failed"
+        specs, _ = to_specs(items)
+        return specs, ("salvaged" if specs else "failed")
+    items = data.get(key_name) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return [], "failed"
+    specs, invalid = to_specs(items)
+    if invalid:
+        return specs, ("salvaged" if specs else "failed")
+    return specs, "ok"
+
+
+def _response_text(resp: Any) -> str | None:
+    text = getattr(resp, "text", None)
+    if text:
+        return text
+    # Try alternative attributes
+    cands = getattr(resp, "candidates", None)
+    if cands:
+        content = getattr(cands[0], "content", None)
+        parts = getattr(content, "parts", None) if content else None
+        if parts:
+            return getattr(parts[0], "text", None)
+    return None
+
+
+def _structured_output_mode(requested: str | None) -> str:
+    mode = requested
+    if mode is None:
+        try:
+            from settings import get_settings
 
-    def __init__(self, model_name: str | None = None, base_prompt_text: str | None = None) -> None:
+            mode = get_settings().llm_structured_output
+        except Exception:
+            mode = None
+    mode = (mode or "schema").lower()
+    return mode if mode in STRUCTURED_OUTPUT_MODES else "schema"
+
+
+def _output_options(output_format: str | None, with_reasons: bool | None) -> tuple[bool, bool]:
+    """Resolve (compact, with_reasons), defaulting to LLM_OUTPUT_FORMAT / LLM_WITH_REASONS."""
+    if output_format is None or with_reasons is None:
+        try:
+            from settings import get_settings
+
+            settings = get_settings()
+            output_format = output_format or settings.llm_output_format
+            with_reasons = settings.llm_with_reasons if with_reasons is None else with_reasons
+        except Exception:
+            pass
+    fmt = (output_format or "verbose").lower()
+    return fmt == "compact", bool(with_reasons)
+
+
+def _response_schema(compact: bool) -> type[BaseModel]:
+    return CompactCorrectionsResponse if compact else CorrectionsResponse
+
+
+def _usage_output_tokens(usage: Any, *names: str) -> int | None:
+    for name in names:
+        value = getattr(usage, name, None) if usage is not None else None
+        if isinstance(value, int):
+            return value
+    return None
+
+
+class GeminiCorrector:
+    # Requests are paced by the process-wide governor (corrector.ratelimit.get_governor)
+    def __init__(
+        self,
+        model_name: str | None = None,
+        base_prompt_text: str | None = None,
+        *,
+        structured_output: str | None = None,
+        output_format: str | None = None,
+        with_reasons: bool | None = None,
+    ) -> None:
         # If model_name not provided, try to load from settings
         if model_name is None:
             try:
@@ -53,178 +254,231 @@ class GeminiCorrector:
 
         self.model_name = model_name
         self.base_prompt_text = base_prompt_text or ""
+        self.structured_output = _structured_output_mode(structured_output)
+        self.compact, self.with_reasons = _output_options(output_format, with_reasons)
         self._client = None
 
-        # Adjust rate limit based on model
-        if "flash" in model_name.lower():
-            GeminiCorrector._min_interval_seconds = 4  # 15 req/min for flash
-        else:
-            GeminiCorrector._min_interval_seconds = 30  # 2 req/min for pro
-
     def _ensure_client(self):
         if self._client is None:
             self._client = get_gemini_client()
 
+    def _generation_config(self) -> dict[str, Any]:
+        # Function calling only carries the verbose objects; compact uses the response schema
+        if self.structured_output == "tools" and not self.compact:
+            return {
+                "tools": _build_tools_from_pydantic(CORRECTIONS_FUNCTION, CorrectionsResponse),
+                "tool_config": {
+                    "function_calling_config": {
+                        "mode": "ANY",
+                        "allowed_function_names": [CORRECTIONS_FUNCTION],
+                    }
+                },
+            }
+        if self.structured_output != "json":
+            return {
+                "response_mime_type": "application/json",
+                "response_schema": _response_schema(self.compact),
+            }
+        return {"response_mime_type": "application/json"}
+
+    def _generate(self, model: str, prompt: str) -> list[CorrectionSpec]:
+        """Call Gemini once and parse the structured response (raises on unusable output)."""
+        provider = f"gemini/{model}"
+        permit = get_governor().acquire(provider, gemini_quota(model), estimate_tokens(prompt))
+        try:
+            resp = self._client.models.generate_content(
+                model=model,
+                contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                config=self._generation_config(),
+            )
+        except BaseException as e:
+            permit.release(ok=False, rate_limited=is_rate_limit_error(e))
+            raise
+        output_tokens = _usage_output_tokens(
+            getattr(resp, "usage_metadata", None), "candidates_token_count"
+        )
+        permit.release(output_tokens=output_tokens)
+        if output_tokens is not None:
+            METRICS.record_output_tokens(provider, output_tokens)
+        args = None if self.compact else _extract_function_call(resp, CORRECTIONS_FUNCTION)
+        parsed = getattr(resp, "parsed", None)
+        if args is not None:
+            items = args.get("corrections")
+            specs, invalid = _items_to_specs(items if isinstance(items, list) else [])
+            status = "ok" if isinstance(items, list) and not invalid else "salvaged"
+            if not specs and status != "ok":
+                status = "failed"
+        elif isinstance(parsed, CorrectionsResponse):
+            specs, status = list(parsed.corrections), "ok"
+        elif isinstance(parsed, CompactCorrectionsResponse):
+            specs, invalid = _tuples_to_specs(parsed.c)
+            status = "salvaged" if invalid else "ok"
+            if invalid and not specs:
+                status = "failed"
+        else:
+            specs, status = parse_corrections(_response_text(resp), compact=self.compact)
+        METRICS.record_parse(provider, status)
+        if status == "failed":
+            raise CorrectionsParseError(f"Unusable response from {model}")
+        if status == "salvaged":
+            logger.warning(
+                f"⚠️  Partial response from {model}: salvaged {len(specs)} correction(s)"
+            )
+        return specs
+
     def correct_tokens(self, tokens: list[Token]) -> list[CorrectionSpec]:
         self._ensure_client()
-        prompt = build_json_prompt(self.base_prompt_text, tokens)
-
-        # Rate limiting: wait if needed
-        current_time = time.time()
-        time_since_last = current_time - GeminiCorrector._last_request_time
-        if time_since_last < GeminiCorrector._min_interval_seconds:
-            wait_time = GeminiCorrector._min_interval_seconds - time_since_last
-            logger.info(f"⏱️  Rate limiting: waiting {wait_time:.1f}s before next request...")
-            time.sleep(wait_time)
-
-        GeminiCorrector._last_request_time = time.time()
+        prompt = build_json_prompt(
+            self.base_prompt_text, tokens, compact=self.compact, with_reasons=self.with_reasons
+        )
 
         max_retries = 3
         base_delay = 2  # seconds
-
-        for attempt in range(max_retries):
-            try:
-                # Determine which model to use
-                current_model = self.model_name
-                if attempt > 0:
-                    logger.info(f"🔄 Retry {attempt + 1}/{max_retries} with {current_model}")
-                else:
-                    logger.info(f"🤖 Using Gemini model: {current_model}")
-
-                # Use models.generate_content with JSON output
-                resp = self._client.models.generate_content(
-                    model=current_model,
-                    contents=[{"role": "user", "parts": [{"text": prompt}]}],
-                    config={"response_mime_type": "application/json"},
-                )
-
-                # Extract text from response
-                text = getattr(resp, "text", None)
-                if not text:
-                    # Try alternative attributes
-                    if hasattr(resp, "candidates") and resp.candidates:
-                        cand = resp.candidates[0]
-                        if hasattr(cand, "content") and cand.content:
-                            if hasattr(cand.content, "parts") and cand.content.parts:
-                                part = cand.content.parts[0]
-                                text = getattr(part, "text", None)
-
-                if text:
-                    data = json.loads(text)
-                    items = data.get("corrections") if isinstance(data, dict) else data
-                    if isinstance(items, list):
-                        return [CorrectionSpec(**it) for it in items]
-                return []
-
-            except LLMNotConfigured:
-                raise
-            except BaseException as e:
-                # Catch ALL exceptions including Gemini API errors
-                error_msg = str(e)
-                error_type = type(e).__name__
-                is_server_error = (
-                    "503" in error_msg
-                    or "UNAVAILABLE" in error_msg
-                    or "overloaded" in error_msg.lower()
-                )
-                is_rate_limit = "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg
-
-                logger.warning(
-                    f"Caught {error_type}: is_server_error={is_server_error}, is_rate_limit={is_rate_limit}, attempt={attempt}/{max_retries}"
-                )
-
-                # Extract retry delay from 429 error if present
-                retry_delay = None
-                if is_rate_limit and "retry" in error_msg.lower():
-                    import re
-
-                    match = re.search(r"retry.*?(\d+\.?\d*)\s*s", error_msg, re.IGNORECASE)
-                    if match:
-                        retry_delay = float(match.group(1))
-
-                if (is_server_error or is_rate_limit) and attempt < max_retries - 1:
-                    # Use Google's suggested delay for 429, otherwise exponential backoff
-                    if is_rate_limit and retry_delay:
-                        delay = retry_delay
-                        logger.warning(
-                            f"⚠️  Rate limit exceeded (429), retrying in {delay}s... (attempt {attempt + 1}/{max_retries})"
-                        )
+        started = time.perf_counter()
+        attempt = 0
+
+        try:
+            for attempt in range(max_retries):
+                try:
+                    check_cancelled()
+                    # Determine which model to use
+                    current_model = self.model_name
+                    if attempt > 0:
+                        logger.info(f"🔄 Retry {attempt + 1}/{max_retries} with {current_model}")
                     else:
-                        # Exponential backoff: 2s, 4s, 8s
-                        delay = base_delay * (2**attempt)
-                        logger.warning(
-                            f"⚠️  Model overloaded (503), retrying in {delay}s... (attempt {attempt + 1}/{max_retries})"
-                        )
-                    time.sleep(delay)
-                    continue
-                elif (is_server_error or is_rate_limit) and attempt == max_retries - 1:
-                    # Last retry failed, try Azure OpenAI GPT-5 first, then flash
-                    error_type = "rate limit" if is_rate_limit else "server overload"
-                    logger.warning(
-                        f"⚠️  {self.model_name} failed after {max_retries} retries ({error_type}), trying Azure OpenAI GPT-5"
+                        logger.info(f"🤖 Using Gemini model: {current_model}")
+
+                    return self._generate(current_model, prompt)
+
+                except (LLMNotConfigured, Cancelled):
+                    raise
+                except BaseException as e:
+                    # Catch ALL exceptions including Gemini API errors
+                    error_msg = str(e)
+                    error_type = type(e).__name__
+                    is_server_error = (
+                        "503" in error_msg
+                        or "UNAVAILABLE" in error_msg
+                        or "overloaded" in error_msg.lower()
                     )
+                    is_rate_limit = is_rate_limit_error(e)
+                    is_parse_error = isinstance(e, CorrectionsParseError)
+                    retryable = is_server_error or is_rate_limit or is_parse_error
 
-                    # Try Azure OpenAI first
-                    try:
-                        from settings import get_settings
+                    logger.warning(
+                        f"Caught {error_type}: is_server_error={is_server_error}, is_rate_limit={is_rate_limit}, is_parse_error={is_parse_error}, attempt={attempt}/{max_retries}"
+                    )
 
-                        settings = get_settings()
-                        if settings.azure_openai_api_key and settings.azure_openai_endpoint:
-                            azure_corrector = AzureOpenAICorrector(
-                                base_prompt_text=self.base_prompt_text
+                    # Extract retry delay from 429 error if present
+                    retry_delay = None
+                    if is_rate_limit and "retry" in error_msg.lower():
+                        match = re.search(r"retry.*?(\d+\.?\d*)\s*s", error_msg, re.IGNORECASE)
+                        if match:
+                            retry_delay = float(match.group(1))
+
+                    if retryable and attempt < max_retries - 1:
+                        # Use Google's suggested delay for 429, otherwise exponential backoff
+                        if is_rate_limit:
+                            # The governor holds every caller of this model, not only us
+                            delay = retry_delay or base_delay * (2**attempt)
+                            get_governor().cooldown(f"gemini/{current_model}", delay)
+                            logger.warning(
+                                f"⚠️  Rate limit exceeded (429), retrying in {delay}s... (attempt {attempt + 1}/{max_retries})"
                             )
-                            result = azure_corrector.correct_tokens(tokens)
-                            if result:
-                                logger.info("✅ Fallback to Azure OpenAI GPT-5 succeeded")
-                                return result
-                    except Exception as azure_error:
+                            continue
+                        elif is_parse_error:
+                            delay = base_delay
+                            logger.warning(
+                                f"⚠️  Unparseable response, retrying in {delay}s... (attempt {attempt + 1}/{max_retries})"
+                            )
+                        else:
+                            # Exponential backoff: 2s, 4s, 8s
+                            delay = base_delay * (2**attempt)
+                            logger.warning(
+                                f"⚠️  Model overloaded (503), retrying in {delay}s... (attempt {attempt + 1}/{max_retries})"
+                            )
+                        cancellable_sleep(delay)
+                        continue
+                    elif retryable and attempt == max_retries - 1:
+                        # Last retry failed, try Azure OpenAI GPT-5 first, then flash
+                        if is_rate_limit:
+                            error_type = "rate limit"
+                        elif is_parse_error:
+                            error_type = "unparseable response"
+                        else:
+                            error_type = "server overload"
                         logger.warning(
-                            f"⚠️  Azure OpenAI fallback failed: {azure_error}, trying Gemini fallback"
+                            f"⚠️  {self.model_name} failed after {max_retries} retries ({error_type}), trying Azure OpenAI GPT-5"
                         )
 
-                    # If Azure failed, try fallback Gemini model
-                    try:
-                        from settings import get_settings
-
-                        settings = get_settings()
-                        fallback_model = settings.gemini_fallback_model or "gemini-2.5-flash"
-                        logger.info(f"🔄 Trying fallback model: {fallback_model}")
+                        # Try Azure OpenAI first
+                        try:
+                            from settings import get_settings
+
+                            settings = get_settings()
+                            if settings.azure_openai_api_key and settings.azure_openai_endpoint:
+                                azure_corrector = AzureOpenAICorrector(
+                                    base_prompt_text=self.base_prompt_text,
+                                    structured_output=self.structured_output,
+                                    output_format="compact" if self.compact else "verbose",
+                                    with_reasons=self.with_reasons,
+                                )
+                                result = azure_corrector.correct_tokens(tokens)
+                                if result:
+                                    logger.info("✅ Fallback to Azure OpenAI GPT-5 succeeded")
+                                    return result
+                        except Cancelled:
+                            raise
+                        except Exception as azure_error:
+                            logger.warning(
+                                f"⚠️  Azure OpenAI fallback failed: {azure_error}, trying Gemini fallback"
+                            )
 
-                        resp = self._client.models.generate_content(
-                            model=fallback_model,
-                            contents=[{"role": "user", "parts": [{"text": prompt}]}],
-                            config={"response_mime_type": "application/json"},
-                        )
-                        text = getattr(resp, "text", None)
-                        if not text:
-                            if hasattr(resp, "candidates") and resp.candidates:
-                                cand = resp.candidates[0]
-                                if hasattr(cand, "content") and cand.content:
-                                    if hasattr(cand.content, "parts") and cand.content.parts:
-                                        part = cand.content.parts[0]
-                                        text = getattr(part, "text", None)
-                        if text:
-                            data = json.loads(text)
-                            items = data.get("corrections") if isinstance(data, dict) else data
-                            if isinstance(items, list):
-                                logger.info(f"✅ Fallback to {fallback_model} succeeded")
-                                return [CorrectionSpec(**it) for it in items]
-                    except Exception as fallback_error:
-                        logger.error(f"❌ All fallbacks failed: {fallback_error}")
-                    return []
-                else:
-                    # Non-server error, log and return empty
-                    logger.warning(f"Error in correct_tokens: {e}", exc_info=True)
-                    return []
+                        # If Azure failed, try fallback Gemini model
+                        try:
+                            from settings import get_settings
+
+                            settings = get_settings()
+                            fallback_model = settings.gemini_fallback_model or "gemini-2.5-flash"
+                            logger.info(f"🔄 Trying fallback model: {fallback_model}")
+
+                            result = self._generate(fallback_model, prompt)
+                            logger.info(f"✅ Fallback to {fallback_model} succeeded")
+                            return result
+                        except Cancelled:
+                            raise
+                        except Exception as fallback_error:
+                            logger.error(f"❌ All fallbacks failed: {fallback_error}")
+                        return []
+                    else:
+                        # Non-server error, log and return empty
+                        logger.warning(f"Error in correct_tokens: {e}", exc_info=True)
+                        return []
+        finally:
+            METRICS.record_chunk(
+                f"gemini/{self.model_name}", time.perf_counter() - started, attempt + 1
+            )
 
         return []
 
 
+_AZURE_SYSTEM_PROMPT = "You are a text analysis assistant that returns JSON."
+
+
 class AzureOpenAICorrector:
     """Corrector using Azure OpenAI GPT-5."""
 
-    def __init__(self, base_prompt_text: str | None = None) -> None:
+    def __init__(
+        self,
+        base_prompt_text: str | None = None,
+        *,
+        structured_output: str | None = None,
+        output_format: str | None = None,
+        with_reasons: bool | None = None,
+    ) -> None:
         self.base_prompt_text = base_prompt_text or ""
+        self.structured_output = _structured_output_mode(structured_output)
+        self.compact, self.with_reasons = _output_options(output_format, with_reasons)
         self._client = None
 
     def _ensure_client(self):
@@ -249,120 +503,161 @@ class AzureOpenAICorrector:
             except ImportError as err:
                 raise LLMNotConfigured("openai package not installed") from err
 
+    def _response_format(self) -> dict[str, Any]:
+        if self.structured_output == "json":
+            return {"type": "json_object"}
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "corrections",
+                "strict": True,
+                "schema": _strict_json_schema(_response_schema(self.compact)),
+            },
+        }
+
+    def _generate(self, client: Any, deployment: str, prompt: str) -> list[CorrectionSpec]:
+        """Call Azure once and parse the structured response (raises on unusable output)."""
+        # Sanitized system prompt to avoid Azure content filter
+        # Based on azure_content_filter_deep_dive.md:
+        # - Use neutral, high-level description
+        # - Avoid words like "correct", "detect", "execute"
+        permit = get_governor().acquire(
+            f"azure/{deployment}", quota_from_env(AZURE_QUOTA), estimate_tokens(prompt)
+        )
+        try:
+            response = client.chat.completions.create(
+                model=deployment,
+                messages=[
+                    {"role": "system", "content": _AZURE_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format=self._response_format(),
+            )
+        except BaseException as e:
+            permit.release(ok=False, rate_limited=is_rate_limit_error(e))
+            raise
+        output_tokens = _usage_output_tokens(getattr(response, "usage", None), "completion_tokens")
+        permit.release(output_tokens=output_tokens)
+        if output_tokens is not None:
+            METRICS.record_output_tokens(f"azure/{deployment}", output_tokens)
+        specs, status = parse_corrections(response.choices[0].message.content, compact=self.compact)
+        METRICS.record_parse(f"azure/{deployment}", status)
+        if status == "failed":
+            raise CorrectionsParseError(f"Unusable response from {deployment}")
+        if status == "salvaged":
+            logger.warning(
+                f"⚠️  Partial response from {deployment}: salvaged {len(specs)} correction(s)"
+            )
+        return specs
+
     def correct_tokens(self, tokens: list[Token]) -> list[CorrectionSpec]:
         self._ensure_client()
         # Use sanitized prompt for Azure to avoid content filter
-        prompt = build_json_prompt(self.base_prompt_text, tokens, sanitize_for_azure=True)
+        prompt = build_json_prompt(
+            self.base_prompt_text,
+            tokens,
+            sanitize_for_azure=True,
+            compact=self.compact,
+            with_reasons=self.with_reasons,
+        )
 
         max_retries = 3
         base_delay = 2
+        started = time.perf_counter()
+        attempt = 0
+
+        try:
+            for attempt in range(max_retries):
+                try:
+                    check_cancelled()
+                    if attempt > 0:
+                        logger.info(f"🔄 Retry {attempt + 1}/{max_retries} with Azure GPT-5")
+                    else:
+                        logger.info(f"🤖 Using Azure OpenAI model: {self.deployment_name}")
 
-        for attempt in range(max_retries):
-            try:
-                if attempt > 0:
-                    logger.info(f"🔄 Retry {attempt + 1}/{max_retries} with Azure GPT-5")
-                else:
-                    logger.info(f"🤖 Using Azure OpenAI model: {self.deployment_name}")
-
-                # Sanitized system prompt to avoid Azure content filter
-                # Based on azure_content_filter_deep_dive.md:
-                # - Use neutral, high-level description
-                # - Avoid words like "correct", "detect", "execute"
-                response = self._client.chat.completions.create(
-                    model=self.deployment_name,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a text analysis assistant that returns JSON.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    response_format={"type": "json_object"},
-                )
-
-                text = response.choices[0].message.content
-                if text:
-                    data = json.loads(text)
-                    items = data.get("corrections") if isinstance(data, dict) else data
-                    if isinstance(items, list):
-                        return [CorrectionSpec(**it) for it in items]
-                return []
+                    return self._generate(self._client, self.deployment_name, prompt)
 
-            except LLMNotConfigured:
-                raise
-            except Exception as e:
-                error_msg = str(e)
-                # Check for Azure content filter (jailbreak detection)
-                is_content_filter = (
-                    "content_filter" in error_msg or "ResponsibleAIPolicyViolation" in error_msg
-                )
-
-                if is_content_filter:
-                    logger.warning(
-                        "⚠️  Azure GPT-5 content filter triggered, trying GPT-4.1 fallback"
+                except (LLMNotConfigured, Cancelled):
+                    raise
+                except Exception as e:
+                    error_msg = str(e)
+                    # Check for Azure content filter (jailbreak detection)
+                    is_content_filter = (
+                        "content_filter" in error_msg or "ResponsibleAIPolicyViolation" in error_msg
                     )
-                    # Try GPT-4.1 as fallback
-                    try:
-                        from settings import get_settings
-
-                        settings = get_settings()
-                        if settings.azure_openai_fallback_deployment_name:
-                            fallback_deployment = settings.azure_openai_fallback_deployment_name
-                            fallback_api_version = (
-                                settings.azure_openai_fallback_api_version or "2025-01-01-preview"
-                            )
 
-                            logger.info(
-                                f"🤖 Using Azure OpenAI fallback model: {fallback_deployment}"
+                    if is_content_filter:
+                        logger.warning(
+                            "⚠️  Azure GPT-5 content filter triggered, trying GPT-4.1 fallback"
+                        )
+                        # Try GPT-4.1 as fallback
+                        try:
+                            from settings import get_settings
+
+                            settings = get_settings()
+                            if settings.azure_openai_fallback_deployment_name:
+                                fallback_deployment = settings.azure_openai_fallback_deployment_name
+                                fallback_api_version = (
+                                    settings.azure_openai_fallback_api_version
+                                    or "2025-01-01-preview"
+                                )
+
+                                logger.info(
+                                    f"🤖 Using Azure OpenAI fallback model: {fallback_deployment}"
+                                )
+
+                                # Create new client with fallback API version
+                                from openai import AzureOpenAI
+
+                                fallback_client = AzureOpenAI(
+                                    api_key=settings.azure_openai_api_key,
+                                    api_version=fallback_api_version,
+                                    azure_endpoint=settings.azure_openai_endpoint,
+                                )
+
+                                result = self._generate(
+                                    fallback_client, fallback_deployment, prompt
+                                )
+                                logger.info("✅ Azure GPT-4.1 fallback succeeded")
+                                return result
+                        except Cancelled:
+                            raise
+                        except Exception as fallback_error:
+                            logger.warning(
+                                f"⚠️  Azure GPT-4.1 fallback also failed: {fallback_error}"
                             )
 
-                            # Create new client with fallback API version
-                            from openai import AzureOpenAI
+                        # If GPT-4.1-mini also failed, return empty to trigger Flash fallback
+                        logger.warning("⚠️  All Azure models failed, falling back to Gemini Flash")
+                        return []  # Return empty to trigger Flash fallback in caller
 
-                            fallback_client = AzureOpenAI(
-                                api_key=settings.azure_openai_api_key,
-                                api_version=fallback_api_version,
-                                azure_endpoint=settings.azure_openai_endpoint,
-                            )
-
-                            response = fallback_client.chat.completions.create(
-                                model=fallback_deployment,
-                                messages=[
-                                    {
-                                        "role": "system",
-                                        "content": "You are a text analysis assistant that returns JSON.",
-                                    },
-                                    {"role": "user", "content": prompt},
-                                ],
-                                response_format={"type": "json_object"},
-                            )
+                    if self.structured_output != "json" and (
+                        "json_schema" in error_msg or "response_format" in error_msg
+                    ):
+                        # Older API versions reject json_schema: degrade to plain JSON mode
+                        logger.warning(
+                            "⚠️  Azure deployment rejected json_schema, using json_object instead"
+                        )
+                        self.structured_output = "json"
 
-                            text = response.choices[0].message.content
-                            if text:
-                                data = json.loads(text)
-                                items = data.get("corrections") if isinstance(data, dict) else data
-                                if isinstance(items, list):
-                                    logger.info("✅ Azure GPT-4.1 fallback succeeded")
-                                    return [CorrectionSpec(**it) for it in items]
-                    except Exception as fallback_error:
-                        logger.warning(f"⚠️  Azure GPT-4.1 fallback also failed: {fallback_error}")
-
-                    # If GPT-4.1-mini also failed, return empty to trigger Flash fallback
-                    logger.warning("⚠️  All Azure models failed, falling back to Gemini Flash")
-                    return []  # Return empty to trigger Flash fallback in caller
-
-                logger.warning(
-                    f"Azure OpenAI error (attempt {attempt + 1}/{max_retries}): {error_msg}"
-                )
+                    logger.warning(
+                        f"Azure OpenAI error (attempt {attempt + 1}/{max_retries}): {error_msg}"
+                    )
 
-                if attempt < max_retries - 1:
-                    delay = base_delay * (2**attempt)
-                    logger.warning(f"⚠️  Retrying in {delay}s...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(f"❌ Azure OpenAI failed after {max_retries} retries")
-                    return []
+                    if attempt < max_retries - 1:
+                        delay = base_delay * (2**attempt)
+                        logger.warning(f"⚠️  Retrying in {delay}s...")
+                        cancellable_sleep(delay)
+                        continue
+                    else:
+                        logger.error(f"❌ Azure OpenAI failed after {max_retries} retries")
+                        return []
+        finally:
+            METRICS.record_chunk(
+                f"azure/{getattr(self, 'deployment_name', 'gpt-5')}",
+                time.perf_counter() - started,
+                attempt + 1,
+            )
 
         return []
 
@@ -429,9 +724,44 @@ def _preserve_case(original: str, replacement: str) -> str:
     return replacement
 
 
+def _inline_schema(schema: dict[str, Any], *, strict: bool = False) -> dict[str, Any]:
+    """Resolve ``$ref``/``$defs`` and drop keywords LLM schema validators reject.
+
+    With ``strict=True`` every object lists all its properties as required and forbids
+    additional properties, as OpenAI/Azure strict ``json_schema`` mode demands.
+    """
+    defs = schema.get("$defs", {})
+
+    def _walk(node: Any) -> Any:
+        if isinstance(node, list):
+            return [_walk(v) for v in node]
+        if not isinstance(node, dict):
+            return node
+        if "$ref" in node:
+            return _walk(defs[node["$ref"].rsplit("/", 1)[-1]])
+        out: dict[str, Any] = {}
+        for key, value in node.items():
+            if key in ("$defs", "title", "default"):
+                continue
+            if key == "properties":
+                out[key] = {name: _walk(prop) for name, prop in value.items()}
+            else:
+                out[key] = _walk(value)
+        if strict and out.get("type") == "object":
+            out["required"] = list(out.get("properties", {}))
+            out["additionalProperties"] = False
+        return out
+
+    return _walk(schema)
+
+
+def _strict_json_schema(model: type[BaseModel]) -> dict[str, Any]:
+    return _inline_schema(model.model_json_schema(), strict=True)
+
+
 def _build_tools_from_pydantic(function_name: str, model: type[BaseModel]) -> list[dict[str, Any]]:
     """Build Gemini 'tools' function_declarations from a Pydantic model schema."""
-    schema: dict[str, Any] = model.model_json_schema()
+    schema: dict[str, Any] = _inline_schema(model.model_json_schema())
     # Ensure top-level is an object; Gemini expects JSON Schema draft
     if schema.get("type") != "object":
         schema = {"type": "object", "properties": {"value": schema}, "required": ["value"]}
@@ -2,8 +2,20 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from .reasons import catalog_prompt
 from .text_utils import Token
 
+VERBOSE_SCHEMA = (
+    '{"corrections": [{"token_id": int, "replacement": str, "reason": str, "original"?: str}]}'
+)
+
+
+def compact_schema(with_reasons: bool = False) -> str:
+    """Positional contract: one array per correction, no ``original`` echo."""
+    if with_reasons:
+        return '{"c": [[token_id, "reemplazo", "CÓDIGO", "motivo breve"]]}'
+    return '{"c": [[token_id, "reemplazo", "CÓDIGO"]]}'
+
 
 def load_base_prompt(path: str | None = None) -> str:
     if path is None:
@@ -17,7 +29,12 @@ def load_base_prompt(path: str | None = None) -> str:
 
 
 def build_json_prompt(
-    base_prompt: str, tokens: list[Token], sanitize_for_azure: bool = False
+    base_prompt: str,
+    tokens: list[Token],
+    sanitize_for_azure: bool = False,
+    *,
+    compact: bool = False,
+    with_reasons: bool = False,
 ) -> str:
     """Build a compact instruction asking for precise token-level corrections.
 
@@ -28,7 +45,18 @@ def build_json_prompt(
         base_prompt: Base instruction text
         tokens: List of tokens to analyze
         sanitize_for_azure: If True, use sanitized prompt to avoid Azure content filter
+        compact: Ask for positional tuples with reason codes instead of objects
+        with_reasons: In compact mode, also ask for a short free-text reason
     """
+    if compact:
+        schema_line = (
+            f"Schema: {compact_schema(with_reasons)}\n" f"- Codes: {catalog_prompt()}.\n"
+            if sanitize_for_azure
+            else f"Esquema: {compact_schema(with_reasons)}\n" f"- Códigos: {catalog_prompt()}.\n"
+        )
+    else:
+        schema_line = ("Schema: " if sanitize_for_azure else "Esquema: ") + VERBOSE_SCHEMA + "\n"
+
     # Render tokens with ids for deterministic referencing
     rendered_tokens = []
     for t in tokens:
@@ -62,7 +90,7 @@ def build_json_prompt(
 
         schema = (
             "Return valid JSON UTF-8 without additional text. "
-            'Schema: {"corrections": [{"token_id": int, "replacement": str, "reason": str, "original"?: str}]}\n'
+            f"{schema_line}"
             "- token_id references the exact token index.\n"
             "- Review word/number tokens as needed.\n"
             "- Maintain proper capitalization and accents.\n"
@@ -81,7 +109,7 @@ def build_json_prompt(
         schema = (
             "Si dispones de herramientas, llama a 'return_corrections' con la lista de correcciones. "
             "En ausencia de herramientas, responde SOLO con JSON válido UTF-8 sin texto adicional. "
-            'Esquema: {"corrections": [{"token_id": int, "replacement": str, "reason": str, "original"?: str}]}\n'
+            f"{schema_line}"
             "- token_id apunta al índice exacto del token a corregir.\n"
             "- Solo corrige tokens de tipo palabra/número si es necesario (no reescribas todo).\n"
             "- Mantén mayúsculas adecuadas y acentos.\n"
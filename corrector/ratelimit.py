@@ -0,0 +1,319 @@
+"""LLM call governor: per-model RPM/TPM quotas shared by every thread and process.
+
+Callers ask ``get_governor().acquire(...)`` for a permit before each request and block
+until the model's one-minute window has room, instead of firing and sleeping after a
+429. Each permit is released with the outcome: errors shrink the rate the governor
+hands out (a 429 halves it and may impose the provider's cooldown) and successes
+restore it step by step, so the live error rate drives the pace.
+
+The state is private to the process by default. ``FileGovernorState`` keeps it in a
+lock-protected JSON file so several processes (``corrector.batch`` pools, several
+``corrector-worker`` processes with ``LLM_GOVERNOR_FILE``) share one quota.
+
+Usage (requests, input and output tokens) is attributed to the ``UsageScope`` active
+when the permit is acquired (``llm_usage_scope``); a scope with ``rpm`` also caps that
+user's requests per minute. ``drain_usage`` hands the totals to whoever records them.
+Waiting for a permit is a ``cancellable_sleep``: a cancelled correction stops waiting.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+try:  # POSIX file locks for the shared state
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+from .cancel import cancellable_sleep
+
+WINDOW_SECONDS = 60.0
+# Throttle: share of the quota handed out, cut on errors and restored on successes
+MIN_FACTOR = 0.1
+RATE_LIMIT_DECREASE = 0.5
+ERROR_DECREASE = 0.8
+SUCCESS_INCREASE = 0.1
+# Error rate over the window above which a failed call also cuts the throttle
+ERROR_RATE_THRESHOLD = 0.2
+# Longest single sleep while waiting for a permit (the window is re-read after it)
+MAX_WAIT_SLICE = 5.0
+
+
+@dataclass(frozen=True)
+class ModelQuota:
+    rpm: int
+    tpm: int
+
+
+def quota_from_env(default: ModelQuota) -> ModelQuota:
+    """``default`` with the LLM_RPM / LLM_TPM overrides applied."""
+    try:
+        rpm = int(os.environ.get("LLM_RPM", str(default.rpm)))
+        tpm = int(os.environ.get("LLM_TPM", str(default.tpm)))
+    except ValueError:
+        return default
+    return ModelQuota(rpm=max(1, rpm), tpm=max(1, tpm))
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Input tokens of a prompt, ~4 characters per token (as ``auto_chunk_words``)."""
+    return max(1, len(prompt) // 4)
+
+
+class GovernorTimeout(TimeoutError):
+    """Raised when no permit frees up within the ``acquire`` timeout."""
+
+
+@dataclass(frozen=True)
+class UsageScope:
+    user_id: str
+    rpm: int | None = None  # plan's requests per minute for this user, if limited
+
+
+_scope: ContextVar[UsageScope | None] = ContextVar("llm_usage_scope", default=None)
+
+
+@contextmanager
+def llm_usage_scope(scope: UsageScope | None) -> Iterator[None]:
+    """Attribute the LLM calls made inside the block (on this thread) to ``scope``."""
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+class GovernorState(Protocol):
+    def transaction(self) -> Any:
+        """Context manager yielding the mutable state dict under an exclusive lock."""
+        ...
+
+
+class MemoryGovernorState:
+    """State private to this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: dict[str, Any] = {}
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            yield self._data
+
+
+class FileGovernorState:
+    """State in a JSON file under ``flock``, shared by every process that opens ``path``."""
+
+    def __init__(self, path: str | Path) -> None:
+        if fcntl is None:
+            raise RuntimeError("FileGovernorState necesita fcntl (POSIX)")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict[str, Any]]:
+        with self._lock, open(self.path, "r+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read()
+                data = json.loads(raw) if raw.strip() else {}
+                yield data
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(data))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Permit:
+    """One granted request; ``release`` it with the outcome once the call returns."""
+
+    def __init__(
+        self, governor: LLMGovernor, key: str, scope: UsageScope | None, tokens: int
+    ) -> None:
+        self._governor = governor
+        self.key = key
+        self.scope = scope
+        self.tokens = tokens
+        self._released = False
+
+    def release(
+        self, ok: bool = True, *, rate_limited: bool = False, output_tokens: int | None = None
+    ) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._governor._release(self, ok, rate_limited, output_tokens or 0)
+
+
+class LLMGovernor:
+    """Grants LLM call permits under per-model RPM/TPM quotas; see the module docstring."""
+
+    def __init__(
+        self,
+        state: GovernorState | None = None,
+        *,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = cancellable_sleep,
+    ) -> None:
+        self._state = state or MemoryGovernorState()
+        self._clock = clock
+        self._sleep = sleep
+        self._usage_lock = threading.Lock()
+        self._usage: dict[str, dict[str, int]] = {}
+
+    def acquire(
+        self, key: str, quota: ModelQuota, tokens: int, *, timeout: float | None = None
+    ) -> Permit:
+        """Block until a request of ``tokens`` input tokens to ``key`` fits its quota."""
+        scope = _scope.get()
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._state.transaction() as state:
+                now = self._clock()
+                wait = self._try_grant(state, key, quota, tokens, scope, now)
+            if wait <= 0:
+                return Permit(self, key, scope, tokens)
+            if deadline is not None and now + wait > deadline:
+                raise GovernorTimeout(f"Sin permiso LLM para {key} en {timeout:.0f}s")
+            self._sleep(min(wait, MAX_WAIT_SLICE))
+
+    def cooldown(self, key: str, seconds: float) -> None:
+        """Hold every permit for ``key`` for ``seconds`` (a provider's retry-after)."""
+        with self._state.transaction() as state:
+            model = state.setdefault(key, _empty_model())
+            model["cooldown_until"] = max(model["cooldown_until"], self._clock() + seconds)
+
+    def _try_grant(
+        self,
+        state: dict[str, Any],
+        key: str,
+        quota: ModelQuota,
+        tokens: int,
+        scope: UsageScope | None,
+        now: float,
+    ) -> float:
+        """Record a grant and return 0, or return the seconds until one may fit."""
+        model = state.setdefault(key, _empty_model())
+        _prune(model, now)
+        if model["cooldown_until"] > now:
+            return model["cooldown_until"] - now
+        grants = model["grants"]
+        rpm = max(1, int(quota.rpm * model["factor"]))
+        if len(grants) >= rpm:
+            return grants[-rpm][0] + WINDOW_SECONDS - now
+        used = sum(t for _, t in grants)
+        if grants and used + tokens > quota.tpm:
+            # Wait for the oldest grants to leave the window until the request fits
+            for at, t in grants:
+                used -= t
+                if used + tokens <= quota.tpm:
+                    return at + WINDOW_SECONDS - now
+            return grants[-1][0] + WINDOW_SECONDS - now  # alone in the window, then
+        user = None
+        if scope is not None and scope.rpm:
+            user = state.setdefault(f"user:{scope.user_id}", _empty_model())
+            _prune(user, now)
+            if len(user["grants"]) >= scope.rpm:
+                return user["grants"][-scope.rpm][0] + WINDOW_SECONDS - now
+            user["grants"].append([now, tokens])
+        grants.append([now, tokens])
+        return 0.0
+
+    def _release(self, permit: Permit, ok: bool, rate_limited: bool, output_tokens: int) -> None:
+        with self._state.transaction() as state:
+            now = self._clock()
+            model = state.setdefault(permit.key, _empty_model())
+            _prune(model, now)
+            model["outcomes"].append([now, ok])
+            if rate_limited:
+                model["factor"] = max(MIN_FACTOR, model["factor"] * RATE_LIMIT_DECREASE)
+            elif not ok and _error_rate(model) > ERROR_RATE_THRESHOLD:
+                model["factor"] = max(MIN_FACTOR, model["factor"] * ERROR_DECREASE)
+            elif ok:
+                model["factor"] = min(1.0, model["factor"] + SUCCESS_INCREASE)
+        if permit.scope is not None:
+            with self._usage_lock:
+                usage = self._usage.setdefault(permit.scope.user_id, {})
+                for metric, amount in (
+                    ("llm_requests", 1),
+                    ("llm_input_tokens", permit.tokens),
+                    ("llm_output_tokens", output_tokens),
+                ):
+                    usage[metric] = usage.get(metric, 0) + amount
+
+    def drain_usage(self, user_id: str) -> dict[str, int]:
+        """Usage attributed to ``user_id`` in this process since the last drain."""
+        with self._usage_lock:
+            return self._usage.pop(user_id, {})
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per model: requests and tokens in the window, throttle factor, error rate."""
+        with self._state.transaction() as state:
+            now = self._clock()
+            out = {}
+            for key, model in state.items():
+                if key.startswith("user:"):
+                    continue
+                _prune(model, now)
+                out[key] = {
+                    "requests": len(model["grants"]),
+                    "tokens": sum(t for _, t in model["grants"]),
+                    "factor": model["factor"],
+                    "error_rate": _error_rate(model),
+                }
+            return out
+
+
+def _empty_model() -> dict[str, Any]:
+    return {"grants": [], "outcomes": [], "factor": 1.0, "cooldown_until": 0.0}
+
+
+def _prune(model: dict[str, Any], now: float) -> None:
+    since = now - WINDOW_SECONDS
+    for name in ("grants", "outcomes"):
+        entries = model[name]
+        drop = 0
+        while drop < len(entries) and entries[drop][0] <= since:
+            drop += 1
+        if drop:
+            del entries[:drop]
+
+
+def _error_rate(model: dict[str, Any]) -> float:
+    outcomes = model["outcomes"]
+    return sum(1 for _, ok in outcomes if not ok) / len(outcomes) if outcomes else 0.0
+
+
+_governor: LLMGovernor | None = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> LLMGovernor:
+    """Process-wide governor; file-backed (shared) when LLM_GOVERNOR_FILE is set."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            path = os.environ.get("LLM_GOVERNOR_FILE")
+            _governor = LLMGovernor(FileGovernorState(path) if path else None)
+        return _governor
+
+
+def set_governor(governor: LLMGovernor | None) -> None:
+    """Replace the process-wide governor (pool initializers, tests); None resets it."""
+    global _governor
+    with _governor_lock:
+        _governor = governor
@@ -0,0 +1,56 @@
+"""Reason-code catalog for the compact correction output format.
+
+In compact mode the model answers each correction with a short code instead of a
+free-text reason. Codes map onto the server's ``SuggestionType`` values and expand back
+into a readable Spanish reason for the logs and reports.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ReasonCode:
+    code: str
+    suggestion_type: str  # value of server.models.SuggestionType
+    label: str
+
+
+REASON_CODES: dict[str, ReasonCode] = {
+    r.code: r
+    for r in (
+        ReasonCode("ORT", "ortografia", "Ortografía"),
+        ReasonCode("TIL", "ortografia", "Ortografía: tilde"),
+        ReasonCode("MAY", "ortografia", "Ortografía: mayúsculas/minúsculas"),
+        ReasonCode("PUN", "puntuacion", "Puntuación"),
+        ReasonCode("CON", "concordancia", "Concordancia de género/número"),
+        ReasonCode("VER", "concordancia", "Concordancia verbal"),
+        ReasonCode("LEX", "lexico", "Léxico: palabra confundida por contexto"),
+        ReasonCode("EST", "estilo", "Estilo"),
+        ReasonCode("DEL", "otro", "Palabra sobrante"),
+        ReasonCode("OTR", "otro", "Otra corrección"),
+    )
+}
+
+DEFAULT_CODE = "OTR"
+
+
+def normalize_code(code: str | None) -> str:
+    key = (code or "").strip().upper()[:3]
+    return key if key in REASON_CODES else DEFAULT_CODE
+
+
+def expand_reason(code: str | None, note: str | None = None) -> str:
+    """Readable reason for a code, with the model's free-text note when it gave one."""
+    label = REASON_CODES[normalize_code(code)].label
+    return f"{label}: {note}" if note else label
+
+
+def suggestion_type_for(code: str | None) -> str:
+    return REASON_CODES[normalize_code(code)].suggestion_type
+
+
+def catalog_prompt() -> str:
+    """One-line rendering of the catalog for the prompt."""
+    return ", ".join(f"{r.code}={r.label}" for r in REASON_CODES.values())
@@ -0,0 +1,185 @@
+"""Corrections report DOCX (the ``.corrections.docx`` table).
+
+The skeleton (title, summary lines, table style, styled header row and one data row with
+placeholders) is built once with python-docx and cached. Report rows are then rendered
+from that data row's XML and streamed into ``word/document.xml``, so a report costs the
+same per row whatever its size, instead of python-docx's ``table.add_row()`` and the
+per-cell/per-run font loops that slow down as the table grows.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+from xml.sax.saxutils import escape as xml_escape
+
+try:  # optional dependency
+    from docx import Document  # type: ignore
+except Exception:  # pragma: no cover - optional
+    Document = None  # type: ignore
+
+DOCUMENT_PART = "word/document.xml"
+HEADERS = ("#", "Original → Corregido", "Motivo", "Contexto", "Línea")
+CONTEXT_MAX_CHARS = 50
+# Rendered rows are written to the zip stream in blocks of this size
+ROWS_PER_WRITE = 500
+
+_MARK = re.compile(r"@@(\w+)@@")
+# XML 1.0 forbids these control characters; python-docx would reject them
+_CONTROL_CHARS = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _safe_get(obj, name: str, default=None):
+    if hasattr(obj, name):
+        return getattr(obj, name)
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return default
+
+
+def _build_skeleton(with_source: bool) -> bytes:
+    """python-docx report with placeholders: the styling reference for the fast path."""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.shared import Inches, Pt, RGBColor
+
+    doc = Document()  # type: ignore
+
+    title = doc.add_heading("Informe de Correcciones", level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    if with_source:
+        p = doc.add_paragraph()
+        p.add_run("Documento: ").bold = True
+        p.add_run("@@source@@")
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    p = doc.add_paragraph()
+    p.add_run("Total de correcciones: ").bold = True
+    p.add_run("@@total@@")
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph()
+
+    table = doc.add_table(rows=1, cols=5)
+    table.style = "Light Grid Accent 1"
+    hdr_cells = table.rows[0].cells
+    for i, header_text in enumerate(HEADERS):
+        hdr_cells[i].text = header_text
+        for paragraph in hdr_cells[i].paragraphs:
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.size = Pt(11)
+                run.font.color.rgb = RGBColor(255, 255, 255)
+        shading_elm = OxmlElement("w:shd")
+        shading_elm.set(qn("w:fill"), "4472C4")
+        hdr_cells[i]._element.get_or_add_tcPr().append(shading_elm)
+
+    for column, width in zip(table.columns, (0.4, 2.0, 3.5, 1.5, 0.6), strict=True):
+        column.width = Inches(width)
+
+    row_cells = table.add_row().cells
+    row_cells[0].text = "@@n@@"
+    row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p = row_cells[1].paragraphs[0]
+    run_original = p.add_run("@@original@@")
+    run_original.font.color.rgb = RGBColor(192, 0, 0)
+    run_original.font.bold = True
+    p.add_run(" → ")
+    run_corrected = p.add_run("@@corrected@@")
+    run_corrected.font.color.rgb = RGBColor(0, 176, 80)
+    run_corrected.font.bold = True
+    row_cells[2].text = "@@reason@@"
+    row_cells[3].text = "@@context@@"
+    row_cells[4].text = "@@line@@"
+    row_cells[4].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    for cell in row_cells:
+        for paragraph in cell.paragraphs:
+            for run in paragraph.runs:
+                run.font.size = Pt(10)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def _to_format(xml: str) -> str:
+    """Turn ``@@name@@`` placeholders into ``str.format`` fields (text may hold spaces)."""
+    xml = xml.replace("{", "{{").replace("}", "}}")
+    xml = xml.replace("<w:t>@@", '<w:t xml:space="preserve">@@')
+    return _MARK.sub(r"{\1}", xml)
+
+
+@functools.lru_cache(maxsize=2)
+def _template(with_source: bool) -> tuple[str, str, str, dict[str, bytes]]:
+    """``(head, row, tail, other_parts)``: document.xml around the placeholder data row."""
+    with zipfile.ZipFile(io.BytesIO(_build_skeleton(with_source))) as zf:
+        xml = zf.read(DOCUMENT_PART).decode("utf-8")
+        parts = {i.filename: zf.read(i) for i in zf.infolist() if i.filename != DOCUMENT_PART}
+    mark = xml.index("@@n@@")
+    row_start = xml.rindex("<w:tr>", 0, mark)
+    row_end = xml.index("</w:tr>", mark) + len("</w:tr>")
+    return (
+        _to_format(xml[:row_start]),
+        _to_format(xml[row_start:row_end]),
+        xml[row_end:],
+        parts,
+    )
+
+
+def _xml_text(value) -> str:
+    """Escaped run text; tabs and line breaks become w:tab/w:br like python-docx does."""
+    text = xml_escape(str(value).translate(_CONTROL_CHARS))
+    if "\t" in text or "\n" in text or "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = text.replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+        text = text.replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+    return text
+
+
+def _row_values(n: int, e) -> dict[str, str]:
+    context = str(_safe_get(e, "context", ""))
+    if len(context) >= CONTEXT_MAX_CHARS:
+        context = context[: CONTEXT_MAX_CHARS - 3] + "..."
+    return {
+        "n": str(n),
+        "original": _xml_text(_safe_get(e, "original", "")),
+        "corrected": _xml_text(_safe_get(e, "corrected", "")),
+        "reason": _xml_text(_safe_get(e, "reason", "")),
+        "context": _xml_text(context),
+        "line": _xml_text(_safe_get(e, "line", "")),
+    }
+
+
+def _iter_rows(row: str, entries: Iterable) -> Iterator[str]:
+    for n, e in enumerate(entries, start=1):
+        yield row.format_map(_row_values(n, e))
+
+
+def write_corrections_report(
+    path: str, entries: Iterable, *, source_filename: str | None = None
+) -> None:
+    """Write the corrections table report for ``entries`` (LogEntry objects or dicts)."""
+    entries_list = list(entries)
+    head, row, tail, parts = _template(bool(source_filename))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+        with zf.open(DOCUMENT_PART, "w") as f:
+            f.write(
+                head.format(
+                    source=_xml_text(source_filename or ""), total=len(entries_list)
+                ).encode("utf-8")
+            )
+            block: list[str] = []
+            for rendered in _iter_rows(row, entries_list):
+                block.append(rendered)
+                if len(block) >= ROWS_PER_WRITE:
+                    f.write("".join(block).encode("utf-8"))
+                    block.clear()
+            f.write("".join(block).encode("utf-8"))
+            f.write(tail.encode("utf-8"))
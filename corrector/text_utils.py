@@ -71,6 +71,16 @@ class Correction:
 StringErrorOrStr = str
 
 
+@dataclass
+class TextEdit:
+    """Replace ``text[start:end]`` of paragraph ``paragraph`` (0-based) with ``text``."""
+
+    paragraph: int
+    start: int
+    end: int
+    text: str
+
+
 def apply_token_corrections(tokens: list[Token], corrections: Sequence[Correction]) -> list[Token]:
     # Apply in order of token_id ascending, but replacing text only
     corrected = list(tokens)
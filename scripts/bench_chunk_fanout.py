@@ -0,0 +1,91 @@
+"""Latencia de un único documento grande según el número de workers del pool.
+
+Un ``Worker`` real (hilos, planificador en memoria, sin BD) corrige un documento de
+``--chunks`` chunks con un corrector que tarda ``--call`` segundos por llamada, como un
+LLM. Con 1 hilo se corrige chunk a chunk; con más, los hilos libres toman chunks del
+documento en curso (``ChunkFanout``) y la fusión ordenada da el mismo resultado.
+
+Uso:
+    python scripts/bench_chunk_fanout.py [--chunks 40] [--call 0.1] [--workers 1 2 4 8]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from corrector.engine import correct_paragraphs, plan_chunks
+from corrector.model import HeuristicCorrector
+from corrector.text_utils import tokenize
+from server import worker as worker_mod
+from server.scheduler import InMemoryScheduler, RunJob, User
+
+PARAGRAPH = "La baca del coche estaba sucia y luego decidió ojear el libro con calma."
+CHUNK_WORDS = 100
+
+
+class SlowCorrector(HeuristicCorrector):
+    def __init__(self, seconds: float) -> None:
+        self._seconds = seconds
+
+    def correct_tokens(self, tokens):
+        time.sleep(self._seconds)
+        return super().correct_tokens(tokens)
+
+
+def run(workers: int, paragraphs: list[str], call: float) -> tuple[float, list[str]]:
+    sched = InMemoryScheduler(workers)
+    sched.register_user(User(id="u", plan="premium"))
+    worker_mod.get_job_queue = lambda: sched
+    w = worker_mod.Worker(poll_interval=5.0, size=workers)
+    tokens = tokenize("\n".join(paragraphs))
+    ranges = plan_chunks(tokens, chunk_words=CHUNK_WORDS)
+    done = threading.Event()
+    result = []
+
+    def process(task) -> None:
+        result.append(w._correct(paragraphs, SlowCorrector(call), tokens, ranges))
+        done.set()
+
+    w._try_lock_task = lambda task, owner=None: True
+    w._process_task = process
+    w.start()
+    try:
+        t0 = time.perf_counter()
+        sched.enqueue_run(RunJob("u", "r", "p", ["libro"], "rapido"))
+        done.wait(600)
+        elapsed = time.perf_counter() - t0
+    finally:
+        w.stop()
+    return elapsed, result[0].paragraphs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--call", type=float, default=0.1, help="segundos por llamada")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    words_per_paragraph = len(PARAGRAPH.split())
+    paragraphs = [PARAGRAPH] * (args.chunks * CHUNK_WORDS // words_per_paragraph)
+    tokens = tokenize("\n".join(paragraphs))
+    expected = correct_paragraphs(paragraphs, HeuristicCorrector(), chunk_words=CHUNK_WORDS)
+    chunks = len(plan_chunks(tokens, chunk_words=CHUNK_WORDS))
+    print(f"1 documento de {chunks} chunks, {args.call * 1000:.0f} ms por llamada")
+    base = None
+    for workers in args.workers:
+        elapsed, corrected = run(workers, paragraphs, args.call)
+        base = base or elapsed
+        same = "igual" if corrected == expected.paragraphs else "DISTINTO"
+        print(
+            f"  {workers:2d} worker(s)  {elapsed:6.2f} s  x{base / elapsed:4.1f}  "
+            f"resultado {same} que secuencial"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Latencia cola→inicio del worker: sondeo cada 0,5 s frente a despertar por notificación.
+
+Un pool real de ``Worker`` (hilos, planificador en memoria, sin BD ni modelo: el
+lease y la corrección se sustituyen por una espera de ``--work`` segundos) recibe
+documentos con llegadas de Poisson. Para cada modo se mide el tiempo desde
+``enqueue_run`` hasta que un hilo empieza el documento (media, p95, máximo, en ms) y,
+con la cola ya vacía, cuántas veces por segundo despiertan los hilos para nada.
+
+- ``sondeo``: el comportamiento anterior, ``sleep(0.5)`` cuando no hay nada que despachar.
+- ``notificación``: ``enqueue_run``/``finish`` despiertan al instante a los hilos en espera.
+
+Uso:
+    python scripts/bench_dispatch.py [--docs 60] [--workers 2] [--rate 4] [--work 0.05]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server import worker as worker_mod
+from server.scheduler import InMemoryScheduler, QueueNotifier, RunJob, User
+
+OLD_POLL_SECONDS = 0.5
+QUIET_SECONDS = 3.0
+
+
+class SleepNotifier(QueueNotifier):
+    """Antes: nadie avisa; el hilo inactivo duerme el intervalo completo."""
+
+    def wait(self, seen: int, timeout: float) -> bool:
+        time.sleep(timeout)
+        return False
+
+
+def run(mode: str, docs: int, workers: int, rate: float, work: float, seed: int) -> dict:
+    sched = InMemoryScheduler(workers)
+    if mode == "sondeo":
+        sched.notifier = SleepNotifier()
+    sched.register_user(User(id="u", plan="premium"))
+    worker_mod.get_job_queue = lambda: sched
+    # Espera de respaldo: la del bucle anterior en modo sondeo; larga con notificaciones
+    poll = OLD_POLL_SECONDS if mode == "sondeo" else 5.0
+    w = worker_mod.Worker(poll_interval=poll, size=workers)
+
+    enqueued: dict[str, float] = {}
+    latencies: list[float] = []
+    lock = threading.Lock()
+    done = threading.Event()
+    idle_wakeups = [0]
+    claim = sched.claim
+
+    def counting_claim(owner: str):
+        task = claim(owner)
+        if task is None:
+            with lock:
+                idle_wakeups[0] += 1
+        return task
+
+    def fake_process(task) -> None:
+        started = time.perf_counter()
+        with lock:
+            latencies.append(started - enqueued[task.document_id])
+            if len(latencies) == docs:
+                done.set()
+        time.sleep(work)
+
+    sched.claim = counting_claim
+    w._try_lock_task = lambda task, owner=None: True
+    w._process_task = fake_process
+    w.start()
+    rng = random.Random(seed)
+    try:
+        for i in range(docs):
+            time.sleep(rng.expovariate(rate))
+            doc_id = f"d{i}"
+            enqueued[doc_id] = time.perf_counter()
+            sched.enqueue_run(RunJob("u", f"r{i}", "p", [doc_id], "rapido"))
+        done.wait(60)
+        time.sleep(work + 0.1)
+        # Cola vacía: solo cuentan los despertares del bucle inactivo
+        with lock:
+            idle_wakeups[0] = 0
+        time.sleep(QUIET_SECONDS)
+        with lock:
+            wakeups = idle_wakeups[0] / QUIET_SECONDS
+    finally:
+        w.stop()
+    ms = sorted(x * 1000 for x in latencies)
+    return {
+        "mean": statistics.fmean(ms),
+        "p95": ms[int(0.95 * (len(ms) - 1))],
+        "max": ms[-1],
+        "wakeups": wakeups,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=4.0, help="documentos por segundo")
+    parser.add_argument("--work", type=float, default=0.05, help="segundos por documento")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.docs} documentos, {args.workers} hilos, {args.rate}/s, "
+        f"{args.work * 1000:.0f} ms por documento (latencia cola→inicio en ms)"
+    )
+    for mode in ("sondeo", "notificación"):
+        r = run(mode, args.docs, args.workers, args.rate, args.work, args.seed)
+        print(
+            f"  {mode:13s} media {r['mean']:7.1f}  p95 {r['p95']:7.1f}  máx {r['max']:7.1f}  "
+            f"despertares sin trabajo {r['wakeups']:4.1f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
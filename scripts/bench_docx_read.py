@@ -0,0 +1,110 @@
+"""Benchmark de lectura DOCX: lector en streaming (expat) frente a python-docx.
+
+Genera un manuscrito sintético (por defecto ~1.000 páginas, con varias runs con formato
+por párrafo) y mide, cada método en un proceso aparte, el tiempo de parseo y la memoria
+máxima residente (ru_maxrss).
+
+Uso:
+    python scripts/bench_docx_read.py [--pages 1000] [--docx ruta.docx]
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+PARAGRAPHS_PER_PAGE = 25
+WORDS = "el la de que y en un una por con para los las del se su al lo como más pero".split()
+
+
+def build_docx(path: Path, pages: int) -> None:
+    rng = random.Random(0)
+    rpr = ["<w:rPr><w:b/></w:rPr>", "<w:rPr><w:i/></w:rPr>", ""]
+    body: list[str] = []
+    for _ in range(pages * PARAGRAPHS_PER_PAGE):
+        runs = []
+        for k in range(3):
+            text = " ".join(rng.choice(WORDS) for _ in range(6)) + " "
+            runs.append(f'<w:r>{rpr[k]}<w:t xml:space="preserve">{text}</w:t></w:r>')
+        body.append('<w:p><w:pPr><w:jc w:val="both"/></w:pPr>' + "".join(runs) + "</w:p>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        "<w:body>" + "".join(body) + "<w:sectPr/></w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        zf.writestr(
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+            "</Relationships>",
+        )
+        zf.writestr("word/document.xml", document)
+
+
+def _measure(method: str, path: str) -> None:
+    from docx import Document
+
+    from corrector.docx_utils import iter_docx_paragraphs
+
+    # Imports first, so the RSS delta only reflects the parse
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if method == "python-docx":
+        count = len([p.text for p in Document(path).paragraphs])
+    else:
+        count = sum(1 for _ in iter_docx_paragraphs(path))
+    seconds = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"paragraphs": count, "seconds": seconds, "rss_kb": peak - base}))
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        _measure(sys.argv[2], sys.argv[3])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--docx", default=None, help="Usar un DOCX existente")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.docx) if args.docx else Path(tmp) / "manuscrito.docx"
+        if not args.docx:
+            build_docx(path, args.pages)
+        print(f"{path.name}: {path.stat().st_size / 1e6:.1f} MB")
+        for method in ("python-docx", "streaming"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--measure", method, str(path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"  {method:12s} {r['paragraphs']:7,d} párrafos  {r['seconds']:6.2f}s  "
+                f"+{r['rss_kb'] / 1024:7.1f} MB RSS"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark de escritura DOCX: reescritura mínima frente al escritor anterior.
+
+Genera un libro sintético con imágenes (incompresibles, como las fotos reales), cambia
+~2% de los párrafos y mide, cada escritor en un proceso aparte, el tiempo y la memoria
+máxima residente. El escritor anterior (leer todas las partes a memoria, reparsear y
+reserializar document.xml y recomprimir todo) se reproduce aquí como referencia.
+"mínimo" parte de los textos finales (diff contra el original); "ediciones" recibe la lista
+de ediciones ya calculada, como hace el motor.
+
+Uso:
+    python scripts/bench_docx_write.py [--pages 1000] [--images 40] [--image-mb 1]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_docx_read import build_docx
+
+CHANGED_FRACTION = 0.02
+
+
+def legacy_write(input_path: str, paragraphs: list[str], output_path: str) -> None:
+    with zipfile.ZipFile(input_path, "r") as zf:
+        xml = zf.read("word/document.xml")
+        files = {
+            i.filename: zf.read(i.filename)
+            for i in zf.infolist()
+            if i.filename != "word/document.xml"
+        }
+    ns = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+    root = ET.fromstring(xml)
+    for idx, p in enumerate(root.findall(".//w:body/w:p", ns)):
+        if idx >= len(paragraphs):
+            break
+        t_nodes = list(p.findall(".//w:t", ns))
+        if not t_nodes:
+            continue
+        lengths = [len(t.text or "") for t in t_nodes]
+        pos = 0
+        for i, t in enumerate(t_nodes):
+            chunk = (
+                paragraphs[idx][pos:]
+                if i == len(t_nodes) - 1
+                else paragraphs[idx][pos : pos + lengths[i]]
+            )
+            t.text = chunk
+            pos += len(chunk)
+    new_xml = ET.tostring(root, encoding="utf-8", xml_declaration=True)
+    with zipfile.ZipFile(output_path, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+        zf.writestr("word/document.xml", new_xml)
+
+
+def _measure(method: str, path: str, out: str) -> None:
+    from corrector.docx_utils import (
+        diff_edits,
+        read_paragraphs,
+        write_docx_edits,
+        write_docx_preserving_runs,
+    )
+
+    paragraphs = read_paragraphs(path)
+    original = list(paragraphs)
+    rng = random.Random(1)
+    changed = rng.sample(range(len(paragraphs)), int(len(paragraphs) * CHANGED_FRACTION))
+    for i in changed:
+        paragraphs[i] = paragraphs[i].replace(" la ", " las ", 1)
+    # El motor ya conoce las ediciones por token; aquí se obtienen antes de medir
+    edits = [e for i in changed for e in diff_edits(i, original[i], paragraphs[i])]
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if method == "anterior":
+        legacy_write(path, paragraphs, out)
+    elif method == "ediciones":
+        write_docx_edits(path, edits, out)
+    else:
+        write_docx_preserving_runs(path, paragraphs, out)
+    seconds = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert read_paragraphs(out) == paragraphs
+    print(json.dumps({"seconds": seconds, "rss_kb": peak - base}))
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        _measure(sys.argv[2], sys.argv[3], sys.argv[4])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--image-mb", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "libro.docx"
+        build_docx(path, args.pages)
+        with zipfile.ZipFile(path, "a", zipfile.ZIP_DEFLATED) as zf:
+            for i in range(args.images):
+                zf.writestr(f"word/media/image{i + 1}.jpeg", os.urandom(int(args.image_mb * 1e6)))
+        print(
+            f"{path.name}: {path.stat().st_size / 1e6:.1f} MB, {args.images} imágenes, "
+            f"{CHANGED_FRACTION:.0%} de párrafos cambiados"
+        )
+        for method in ("anterior", "mínimo", "ediciones"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--measure", method, str(path), f"{tmp}/out.docx"],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"  {method:9s} {r['seconds']:6.2f}s  +{r['rss_kb'] / 1024:7.1f} MB RSS")
+
+
+if __name__ == "__main__":
+    main()
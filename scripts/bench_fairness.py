@@ -0,0 +1,137 @@
+"""Reparto de los workers entre planes: round-robin simple frente a deficit round-robin.
+
+Simulación en tiempo virtual (sin hilos ni modelo) del ``InMemoryScheduler``: usuarios
+free que corrigen libros enteros (un documento de ``--book`` chunks por run) compiten
+con usuarios premium que envían capítulos cortos (runs de 3 documentos de 2-8 chunks).
+Todos mantienen trabajo en cola durante toda la simulación y cada chunk tarda 1 s.
+
+Para cada planificador se informa:
+
+- Índice de Jain del servicio ponderado (chunks servidos / peso del plan) por usuario:
+  1.0 es un reparto exactamente proporcional a los pesos, 1/n el peor.
+- Reparto de chunks entre planes, throughput (chunks/min) y ocupación de los workers.
+- Espera p95 (cola→inicio) de los documentos premium.
+
+Uso:
+    python scripts/bench_fairness.py [--free 6] [--premium 3] [--workers 4] [--book 200]
+"""
+
+import argparse
+import heapq
+import random
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server.scheduler import InMemoryScheduler, RunJob, User
+
+OUTSTANDING_DOCS = 6  # each user tops its queue up to this many documents
+SECONDS_PER_CHUNK = 1.0
+
+
+class RoundRobin(InMemoryScheduler):
+    """Antes: un documento por turno, sin pesos ni coste."""
+
+    def _next_ready_user(self) -> str | None:
+        if not self._ring:
+            return None
+        user_id = next(iter(self._ring))
+        self._ring.move_to_end(user_id)
+        self._deficit[user_id] = 1 << 40  # never short of credit
+        return user_id
+
+
+def jain(xs: list[float]) -> float:
+    return sum(xs) ** 2 / (len(xs) * sum(x * x for x in xs)) if any(xs) else 1.0
+
+
+def simulate(factory, free: int, premium: int, workers: int, book: int, horizon: float, seed):
+    rng = random.Random(seed)
+    now = [0.0]
+    sched = factory(workers, clock=lambda: now[0])
+    users = [User(id=f"free{i}", plan="free") for i in range(free)]
+    users += [User(id=f"prem{i}", plan="premium") for i in range(premium)]
+    for user in users:
+        sched.register_user(user)
+    outstanding: dict[str, int] = defaultdict(int)
+    served: dict[str, int] = defaultdict(int)
+    waits: list[float] = []
+    runs = iter(range(1 << 40))
+
+    def top_up(user: User) -> None:
+        while outstanding[user.id] < OUTSTANDING_DOCS:
+            run_id = f"r{next(runs)}"
+            chunks = [book] if user.plan == "free" else [rng.randint(2, 8) for _ in range(3)]
+            docs = [f"{run_id}-{i}" for i in range(len(chunks))]
+            sizes = {d: (c * 1_000, c) for d, c in zip(docs, chunks, strict=True)}
+            sched.enqueue_run(RunJob(user.id, run_id, "p", docs, "rapido", sizes=sizes))
+            outstanding[user.id] += len(docs)
+
+    running: list[tuple[float, int, object]] = []
+    seq = iter(range(1 << 40))
+    while True:
+        for user in users:
+            top_up(user)
+        while (task := sched.try_dispatch()) is not None:
+            if task.user_id.startswith("prem"):
+                waits.append(now[0] - task.created_at)
+            end = now[0] + task.chunks * SECONDS_PER_CHUNK
+            heapq.heappush(running, (end, next(seq), task))
+        end, _, task = heapq.heappop(running)
+        if end > horizon:
+            break
+        now[0] = end
+        sched.finish(task)
+        served[task.user_id] += task.chunks
+        outstanding[task.user_id] -= 1
+
+    weights = {u.id: u.limits().scheduler_weight for u in users}
+    total = sum(served.values())
+    waits.sort()
+    return {
+        "jain": jain([served[u.id] / weights[u.id] for u in users]),
+        "premium_share": sum(v for k, v in served.items() if k.startswith("prem")) / total,
+        "throughput": total / (horizon / 60),
+        "busy": total * SECONDS_PER_CHUNK / (workers * horizon),
+        "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--free", type=int, default=6)
+    parser.add_argument("--premium", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--book", type=int, default=200, help="chunks por libro free")
+    parser.add_argument("--hours", type=float, default=6.0, help="horas simuladas")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    weights = {p: User(id="x", plan=p).limits().scheduler_weight for p in ("free", "premium")}
+    ideal = args.premium * weights["premium"]
+    ideal /= ideal + args.free * weights["free"]
+    print(
+        f"{args.free} free (libros de {args.book} chunks) + {args.premium} premium "
+        f"(capítulos), {args.workers} workers, {args.hours:g} h; "
+        f"reparto premium proporcional a los pesos: {ideal:.0%}"
+    )
+    schedulers = {
+        "round-robin": lambda w, clock: RoundRobin(w, policy="fifo", clock=clock),
+        "drr + fifo": lambda w, clock: InMemoryScheduler(w, policy="fifo", clock=clock),
+        "drr + sjf": lambda w, clock: InMemoryScheduler(w, policy="sjf", clock=clock),
+    }
+    for name, factory in schedulers.items():
+        r = simulate(
+            factory, args.free, args.premium, args.workers, args.book, args.hours * 3600, args.seed
+        )
+        print(
+            f"  {name:13s} Jain {r['jain']:.3f}  premium {r['premium_share']:4.0%}  "
+            f"{r['throughput']:6.1f} chunks/min  ocupación {r['busy']:4.0%}  "
+            f"espera p95 premium {r['wait_p95']:7.0f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
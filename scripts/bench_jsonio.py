@@ -0,0 +1,142 @@
+"""Micro-benchmark del camino JSON con un libro de 20k sugerencias.
+
+Compara el flujo anterior (json stdlib, una escritura por línea y dos relecturas del JSONL
+para el CSV y la carta de edición) con el actual (corrector.jsonio: orjson si está
+instalado, escritura por bloques y CSV/resumen desde las entradas en memoria), además del
+parseo de la respuesta del LLM y la serialización de la lista de sugerencias de la API.
+
+Uso:
+    python scripts/bench_jsonio.py [--suggestions 20000] [--repeat 5]
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from corrector import jsonio
+from corrector.engine import (
+    CHANGELOG_FIELDS,
+    LogEntry,
+    _write_log_jsonl,
+    log_entry_to_dict,
+)
+
+
+def _entries(n: int) -> list[LogEntry]:
+    return [
+        LogEntry(
+            token_id=i * 7,
+            line=i // 12 + 1,
+            original="baca",
+            corrected="vaca",
+            reason="Confusión baca/vaca por contexto (animal)",
+            context="…vio una baca pastando en el prado…",
+            chunk_index=i // 2000,
+            sentence="Al amanecer vio una baca pastando en el prado junto al río.",
+        )
+        for i in range(n)
+    ]
+
+
+def _legacy(entries: list[LogEntry], folder: Path) -> None:
+    jsonl = folder / "legacy.jsonl"
+    with jsonl.open("w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(log_entry_to_dict(e), ensure_ascii=False) + "\n")
+    # CSV y resumen releían el JSONL recién escrito
+    with (folder / "legacy.csv").open("w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(CHANGELOG_FIELDS)
+        with jsonl.open(encoding="utf-8") as f:
+            for line in f:
+                obj = json.loads(line)
+                writer.writerow([obj.get(k, "") for k in CHANGELOG_FIELDS])
+    reasons: Counter[str] = Counter()
+    with jsonl.open(encoding="utf-8") as f:
+        for line in f:
+            reasons[json.loads(line).get("reason", "")] += 1
+
+
+def _current(entries: list[LogEntry], folder: Path) -> None:
+    _write_log_jsonl(folder / "current.jsonl", entries)
+    with (folder / "current.csv").open("w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(CHANGELOG_FIELDS)
+        writer.writerows([getattr(e, k) for k in CHANGELOG_FIELDS] for e in entries)
+    Counter(e.reason for e in entries)
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suggestions", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    entries = _entries(args.suggestions)
+    rows = [log_entry_to_dict(e) for e in entries]
+    llm_payload = json.dumps(
+        {
+            "corrections": [
+                {"token_id": r["token_id"], "replacement": "vaca", "reason": r["reason"]}
+                for r in rows
+            ]
+        },
+        ensure_ascii=False,
+    )
+    api_payload = {"run_id": "x", "total": len(rows), "suggestions": rows}
+
+    backend = "orjson" if jsonio.HAS_ORJSON else "stdlib (orjson no instalado)"
+    print(f"{args.suggestions:,} sugerencias, mejor de {args.repeat}, backend {backend}")
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        cases = [
+            (
+                "JSONL + CSV + resumen",
+                lambda: _legacy(entries, folder),
+                lambda: _current(entries, folder),
+            ),
+            (
+                "respuesta LLM (loads)",
+                lambda: json.loads(llm_payload),
+                lambda: jsonio.loads(llm_payload),
+            ),
+            (
+                "lista API (dumps)",
+                lambda: json.dumps(api_payload, ensure_ascii=False).encode("utf-8"),
+                lambda: jsonio.dumpb(api_payload),
+            ),
+            (
+                "lectura JSONL",
+                lambda: list(
+                    map(json.loads, io.StringIO((folder / "current.jsonl").read_text("utf-8")))
+                ),
+                lambda: list(jsonio.read_jsonl(folder / "current.jsonl")),
+            ),
+        ]
+        _current(entries, folder)
+        for name, old, new in cases:
+            t_old, t_new = _best(old, args.repeat), _best(new, args.repeat)
+            print(
+                f"  {name:24s} antes {t_old * 1000:8.1f} ms  ahora {t_new * 1000:8.1f} ms  x{t_old / t_new:4.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compara el tamaño de salida del formato verboso y del compacto (sin llamar al modelo).
+
+Serializa las mismas correcciones en ambos contratos, estima tokens de salida por chunk
+(~4 caracteres/token) y los segundos de generación con el perfil del modelo.
+
+Para medir con el modelo real, procesa el mismo documento con y sin --compact-output y
+compara "llm_metrics" (tokens de salida/respuesta y segundos por chunk) en run_summary.json.
+
+Uso:
+    python scripts/bench_output_format.py [--corrections 80] [--model gemini-2.5-pro]
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from corrector.estimate import CHARS_PER_LLM_TOKEN, model_profile
+from corrector.reasons import REASON_CODES
+
+SAMPLES = [
+    ("baca", "vaca", "LEX", "Confusión baca/vaca por contexto (animal)"),
+    ("ojear", "hojear", "LEX", "Confusión ojear/hojear (pasar páginas)"),
+    ("esta", "está", "TIL", "Falta tilde en el verbo estar"),
+    ("haber", "a ver", "ORT", "Confusión haber/a ver"),
+    ("los", "las", "CON", "Concordancia de género con el sustantivo"),
+    ("fueron", "fue", "VER", "Concordancia verbal con sujeto singular"),
+    ("dijo,", "dijo:", "PUN", "Dos puntos antes de cita directa"),
+    ("Lunes", "lunes", "MAY", "Los días de la semana van en minúscula"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corrections", type=int, default=80, help="Correcciones por chunk")
+    parser.add_argument("--model", default="gemini-2.5-pro")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    picks = [(rng.randrange(60_000), *rng.choice(SAMPLES)) for _ in range(args.corrections)]
+    assert all(code in REASON_CODES for *_, code, _ in picks)
+
+    payloads = {
+        "verbose": {
+            "corrections": [
+                {"token_id": tid, "replacement": new, "reason": reason, "original": old}
+                for tid, old, new, _, reason in picks
+            ]
+        },
+        "compact": {"c": [[str(tid), new, code] for tid, _, new, code, _ in picks]},
+        "compact+motivos": {
+            "c": [[str(tid), new, code, reason] for tid, _, new, code, reason in picks]
+        },
+    }
+
+    profile = model_profile(args.model)
+    base = None
+    print(f"{args.corrections} correcciones por chunk, modelo {profile.name}")
+    for name, payload in payloads.items():
+        text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        tokens = len(text) // CHARS_PER_LLM_TOKEN
+        seconds = tokens / profile.output_tokens_per_s
+        base = base or tokens
+        print(
+            f"  {name:16s} {len(text):7,d} caracteres  ~{tokens:6,d} tokens de salida  "
+            f"~{seconds:5.1f}s/chunk  ({tokens / base:.0%} del verboso)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark de la caché de parseo: parseo + tokenización frente a carga desde la caché.
+
+Genera un manuscrito sintético y mide, cada método en un proceso aparte (caché de disco
+ya caliente para "caché"), lo que necesita el worker antes de corregir: textos, tokens y
+nodos del DOCX. "recuentos" solo lee palabras/tokens/frases de la entrada, como haría una
+vista previa, sin construir los tokens.
+
+Uso:
+    python scripts/bench_parse_cache.py [--pages 1000]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_docx_read import build_docx
+
+CHECKSUM = "bench"
+
+
+def _measure(method: str, path: str, cache_dir: str) -> None:
+    from corrector.doccache import ParseCache
+    from corrector.docx_utils import parse_docx
+    from corrector.text_utils import tokenize
+
+    cache = ParseCache(cache_dir)
+    t0 = time.perf_counter()
+    if method == "parseo":
+        parsed = parse_docx(path)
+        tokens = tokenize("\n".join(parsed.texts))
+        count = len(tokens)
+    elif method == "caché":
+        doc = cache.get(CHECKSUM)
+        parsed = doc.parsed(path)
+        count = len(doc.tokens())
+    else:
+        doc = cache.get(CHECKSUM)
+        count = doc.token_count
+        _ = (doc.word_count, doc.sentence_count)
+    seconds = time.perf_counter() - t0
+    print(json.dumps({"tokens": count, "seconds": seconds}))
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        _measure(sys.argv[2], sys.argv[3], sys.argv[4])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    from corrector.doccache import ParseCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "manuscrito.docx"
+        build_docx(path, args.pages)
+        cache = ParseCache(Path(tmp) / "cache")
+        cache.load(str(path), CHECKSUM)
+        entry = cache.entry_path(CHECKSUM).stat().st_size
+        print(f"{path.name}: {path.stat().st_size / 1e6:.1f} MB, entrada: {entry / 1e6:.1f} MB")
+        for method in ("parseo", "caché", "recuentos"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--measure", method, str(path), str(cache.root)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"  {method:10s} {r['tokens']:9,d} tokens  {r['seconds']:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
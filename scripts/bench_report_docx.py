@@ -0,0 +1,148 @@
+"""Benchmark del reporte DOCX de correcciones: plantilla XML frente a python-docx.
+
+Genera N entradas de log sintéticas y mide, cada método en un proceso aparte, el tiempo
+y la memoria máxima residente. El método anterior (python-docx: add_row por corrección
+y bucles de fuente por celda/run) se reproduce aquí como referencia; ambos informes deben
+tener el mismo texto en todas las celdas.
+
+Uso:
+    python scripts/bench_report_docx.py [--rows 10000] [--rows 1000 ...]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _entries(n: int):
+    from corrector.engine import LogEntry
+
+    return [
+        LogEntry(
+            token_id=i * 7,
+            line=i // 12 + 1,
+            original="baca",
+            corrected="vaca",
+            reason="Confusión baca/vaca por contexto (animal)",
+            context="…vio una baca pastando en el prado junto al río, al amanecer…",
+            chunk_index=i // 2000,
+            sentence="Al amanecer vio una baca pastando en el prado junto al río.",
+        )
+        for i in range(n)
+    ]
+
+
+def legacy_report(path: str, entries, source_filename: str) -> None:
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.shared import Inches, Pt, RGBColor
+
+    doc = Document()
+    title = doc.add_heading("Informe de Correcciones", level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p = doc.add_paragraph()
+    p.add_run("Documento: ").bold = True
+    p.add_run(source_filename)
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p = doc.add_paragraph()
+    p.add_run("Total de correcciones: ").bold = True
+    p.add_run(str(len(entries)))
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+    table = doc.add_table(rows=1, cols=5)
+    table.style = "Light Grid Accent 1"
+    hdr_cells = table.rows[0].cells
+    for i, header_text in enumerate(["#", "Original → Corregido", "Motivo", "Contexto", "Línea"]):
+        hdr_cells[i].text = header_text
+        for paragraph in hdr_cells[i].paragraphs:
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.size = Pt(11)
+                run.font.color.rgb = RGBColor(255, 255, 255)
+        shading_elm = OxmlElement("w:shd")
+        shading_elm.set(qn("w:fill"), "4472C4")
+        hdr_cells[i]._element.get_or_add_tcPr().append(shading_elm)
+    for column, width in zip(table.columns, (0.4, 2.0, 3.5, 1.5, 0.6), strict=True):
+        column.width = Inches(width)
+    for i, e in enumerate(entries, start=1):
+        row_cells = table.add_row().cells
+        row_cells[0].text = str(i)
+        row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p = row_cells[1].paragraphs[0]
+        p.clear()
+        run_original = p.add_run(e.original)
+        run_original.font.color.rgb = RGBColor(192, 0, 0)
+        run_original.font.bold = True
+        p.add_run(" → ")
+        run_corrected = p.add_run(e.corrected)
+        run_corrected.font.color.rgb = RGBColor(0, 176, 80)
+        run_corrected.font.bold = True
+        row_cells[2].text = e.reason
+        row_cells[3].text = e.context if len(e.context) < 50 else e.context[:47] + "..."
+        row_cells[4].text = str(e.line)
+        row_cells[4].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        for cell in row_cells:
+            for paragraph in cell.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = Pt(10)
+    doc.save(path)
+
+
+def _measure(method: str, rows: int, out: str) -> None:
+    from corrector.report import write_corrections_report
+
+    entries = _entries(rows)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if method == "python-docx":
+        legacy_report(out, entries, "libro.docx")
+    else:
+        write_corrections_report(out, entries, source_filename="libro.docx")
+    seconds = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": seconds, "rss_kb": peak - base}))
+
+
+def _cell_texts(path: str) -> list[list[str]]:
+    from docx import Document
+
+    return [[c.text for c in r.cells] for r in Document(path).tables[0].rows]
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        _measure(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append", help="Correcciones (repetible)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows or [1000, 10000]:
+            print(f"{rows:,} correcciones")
+            outputs = {}
+            for method in ("python-docx", "plantilla"):
+                outputs[method] = f"{tmp}/{method}_{rows}.docx"
+                out = subprocess.run(
+                    [sys.executable, __file__, "--measure", method, str(rows), outputs[method]],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                r = json.loads(out.strip().splitlines()[-1])
+                print(f"  {method:12s} {r['seconds']:7.2f}s  +{r['rss_kb'] / 1024:7.1f} MB RSS")
+            same = _cell_texts(outputs["python-docx"]) == _cell_texts(outputs["plantilla"])
+            print(f"  mismo contenido de tabla: {'sí' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
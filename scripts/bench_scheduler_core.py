@@ -0,0 +1,64 @@
+"""Coste por operación del planificador en memoria con 100k tareas en cola.
+
+Encola ``--tasks`` documentos (runs premium de 3 documentos) repartidos entre
+``--users`` usuarios y mide, con la cola llena, cuánto cuesta despachar y terminar una
+tarea (µs por ``finish`` más los ``try_dispatch`` que libera). Con un usuario se ve el coste de
+recorrer su cola; con muchos, el de recorrer la lista de usuarios en cada despacho.
+
+Uso:
+    python scripts/bench_scheduler_core.py [--tasks 100000] [--ops 2000] [--workers 8]
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server.scheduler import InMemoryScheduler, RunJob, User
+
+DOCS_PER_RUN = 3
+
+
+def run(policy: str, users: int, tasks: int, ops: int, workers: int) -> dict:
+    sched = InMemoryScheduler(workers, policy=policy)
+    for u in range(users):
+        sched.register_user(User(id=f"u{u}", plan="premium"))
+    runs = tasks // DOCS_PER_RUN
+    t0 = time.perf_counter()
+    for r in range(runs):
+        docs = [f"r{r}-d{i}" for i in range(DOCS_PER_RUN)]
+        sizes = {d: (1_000 + (r * 7919 + i) % 50_000, 1) for i, d in enumerate(docs)}
+        sched.enqueue_run(RunJob(f"u{r % users}", f"r{r}", "p", docs, "rapido", sizes=sizes))
+    enqueue_us = (time.perf_counter() - t0) / (runs * DOCS_PER_RUN) * 1e6
+
+    running = deque(iter(sched.try_dispatch, None))
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        sched.finish(running.popleft())
+        running.extend(iter(sched.try_dispatch, None))
+    pair_us = (time.perf_counter() - t0) / ops * 1e6
+    return {"enqueue": enqueue_us, "pair": pair_us}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=2_000, help="pares despacho+fin medidos")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{args.tasks} tareas en cola, {args.workers} hilos (µs por operación)")
+    for policy in ("fifo", "sjf"):
+        for users in (1, 1_000):
+            r = run(policy, users, args.tasks, args.ops, args.workers)
+            print(
+                f"  {policy:4s} {users:5d} usuario(s)  encolar {r['enqueue']:6.1f}  "
+                f"despachar+terminar {r['pair']:9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
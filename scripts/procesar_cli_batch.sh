@@ -12,22 +12,16 @@ cd "$(dirname "$0")/.."
 
 echo "[BATCH] Procesando $(ls "$CORRECCIONES_DIR"/*.docx 2>/dev/null | wc -l) documentos..."
 
-count=0
-for docx in "$CORRECCIONES_DIR"/*.docx; do
-    [ -f "$docx" ] || continue
+# Corrección de todo el directorio en una sola invocación (pool de procesos)
+python -m corrector.cli "$CORRECCIONES_DIR" --out-dir "$TEMP_OUTPUT" --auto-chunk
 
+# Mover solo los archivos de correcciones al output final
+count=0
+for report in "$TEMP_OUTPUT"/*.corrections.docx; do
+    [ -f "$report" ] || continue
     count=$((count + 1))
-    filename=$(basename "$docx")
-    echo "[$count] Procesando: $filename"
-
-    # Ejecutar corrección
-    python -m corrector.cli "$docx" --out "$TEMP_OUTPUT/${filename%.docx}.corrected.docx" --log "$TEMP_OUTPUT/${filename%.docx}.jsonl" --log-docx "$TEMP_OUTPUT/${filename%.docx}.corrections.docx" --auto-chunk
-
-    # Mover solo el archivo de correcciones al output final
-    if [ -f "$TEMP_OUTPUT/${filename%.docx}.corrections.docx" ]; then
-        cp "$TEMP_OUTPUT/${filename%.docx}.corrections.docx" "$OUTPUT_DIR/"
-        echo "    [OK] Guardado en $OUTPUT_DIR/${filename%.docx}.corrections.docx"
-    fi
+    cp "$report" "$OUTPUT_DIR/"
+    echo "    [OK] Guardado en $OUTPUT_DIR/$(basename "$report")"
 done
 
 echo ""
@@ -0,0 +1,207 @@
+"""Artifact stage of a run document: every export written from the in-memory entries.
+
+The corrected document, JSONL log, CSV changelog, DOCX report and editorial summary do not
+depend on each other, so they are written concurrently on a shared thread pool from the
+same ``LogEntry`` list (nothing re-reads the JSONL). zlib compression and file I/O release
+the GIL, which is where the DOCX writers spend their time. Each artifact records its size
+and SHA-256 for the ``Export`` row.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from corrector.docx_utils import (
+    ParsedDocx,
+    TrackChanges,
+    UnsplicedEditError,
+    write_docx_edits,
+    write_paragraphs,
+)
+from corrector.engine import (
+    CHANGELOG_FIELDS,
+    CorrectionResult,
+    LogEntry,
+    _write_log_docx as write_report_docx,
+    _write_log_jsonl,
+)
+
+from .models import ExportKind
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_BYTES = 1 << 20
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                workers = int(os.environ.get("ARTIFACT_WORKERS", "4"))
+            except ValueError:
+                workers = 4
+            _pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="artifact")
+        return _pool
+
+
+@dataclass
+class Artifact:
+    kind: ExportKind
+    path: Path
+    size: int = 0
+    checksum: str = ""  # SHA-256, hex
+    seconds: float = 0.0
+
+
+@dataclass
+class ArtifactInputs:
+    """Everything the writers need, already in memory once corrections are merged."""
+
+    out_base: Path
+    stem: str
+    source_filename: str
+    result: CorrectionResult
+    parsed: ParsedDocx | None
+    corrected_ext: str = ".docx"
+    track_changes: TrackChanges | None = None
+    report_docx: bool = True
+
+    @property
+    def entries(self) -> list[LogEntry]:
+        return self.result.log_entries
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_changelog_csv(path: Path, entries: list[LogEntry]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f_out:
+        writer = csv.writer(f_out)
+        writer.writerow(CHANGELOG_FIELDS)
+        writer.writerows([getattr(e, field) for field in CHANGELOG_FIELDS] for e in entries)
+
+
+def write_summary_md(path: Path, *, docname: str, entries: list[LogEntry]) -> None:
+    total = len(entries)
+    reasons: Counter[str] = Counter(e.reason for e in entries)
+
+    top_reasons = reasons.most_common(10)
+    lines: list[str] = []
+    lines.append(f"# Carta de edición — {docname}")
+    lines.append("")
+    lines.append(f"Total de correcciones: {total}")
+    if top_reasons:
+        lines.append("")
+        lines.append("## Principales motivos")
+        for r, c in top_reasons:
+            if not r:
+                r = "(sin motivo)"
+            lines.append(f"- {r}: {c}")
+    lines.append("")
+    lines.append("## Observaciones")
+    lines.append("- Este resumen se genera automáticamente a partir del log de correcciones.")
+    lines.append("- Revise las decisiones finales en el documento con control de cambios.")
+    lines.append("")
+    lines.append("## Próximos pasos sugeridos")
+    lines.append("- Acepte/rechace cambios en DOCX según criterio editorial.")
+    lines.append("- Revise consistencias intercapítulos y glosario del proyecto.")
+
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def _writers(inputs: ArtifactInputs) -> list[tuple[ExportKind, Path, Callable[[Path], None]]]:
+    base, stem, entries = inputs.out_base, inputs.stem, inputs.entries
+
+    def corrected(path: Path) -> None:
+        if inputs.parsed is not None:
+            try:
+                write_docx_edits(
+                    inputs.parsed,
+                    inputs.result.edits,
+                    str(path),
+                    track_changes=inputs.track_changes,
+                )
+                return
+            except UnsplicedEditError as e:
+                logger.warning(f"⚠️ {e}: se reescribe {path.name} sin conservar el formato")
+        write_paragraphs(inputs.result.paragraphs, str(path))
+
+    writers: list[tuple[ExportKind, Path, Callable[[Path], None]]] = [
+        (ExportKind.docx, base / f"{stem}.corrected{inputs.corrected_ext}", corrected),
+        (
+            ExportKind.jsonl,
+            base / f"{stem}.corrections.jsonl",
+            lambda p: _write_log_jsonl(p, entries),
+        ),
+    ]
+    if inputs.report_docx:
+        writers.append(
+            (
+                ExportKind.docx,
+                base / f"{stem}.corrections.docx",
+                lambda p: write_report_docx(
+                    str(p), entries, source_filename=inputs.source_filename
+                ),
+            )
+        )
+    writers.append(
+        (ExportKind.csv, base / f"{stem}.changelog.csv", lambda p: write_changelog_csv(p, entries))
+    )
+    writers.append(
+        (
+            ExportKind.md,
+            base / f"{stem}.summary.md",
+            lambda p: write_summary_md(p, docname=stem, entries=entries),
+        )
+    )
+    return writers
+
+
+def _write_one(kind: ExportKind, path: Path, write: Callable[[Path], None]) -> Artifact:
+    t0 = time.perf_counter()
+    write(path)
+    return Artifact(
+        kind=kind,
+        path=path,
+        size=path.stat().st_size,
+        checksum=file_checksum(path),
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def submit_artifacts(inputs: ArtifactInputs) -> list[Future[Artifact]]:
+    """Start every writer on the artifact pool; collect them with ``collect_artifacts``."""
+    pool = _executor()
+    return [pool.submit(_write_one, kind, path, fn) for kind, path, fn in _writers(inputs)]
+
+
+def collect_artifacts(futures: list[Future[Artifact]]) -> list[Artifact]:
+    """Wait for all writers (even if one fails) and return the artifacts in plan order."""
+    wait(futures)
+    artifacts = [f.result() for f in futures]  # re-raises the first writer error
+    for a in artifacts:
+        logger.info(f"📦 {a.path.name}: {a.size:,} bytes en {a.seconds:.2f}s")
+    return artifacts
+
+
+def write_artifacts(inputs: ArtifactInputs) -> list[Artifact]:
+    return collect_artifacts(submit_artifacts(inputs))
@@ -3,12 +3,13 @@ Setup demo data for showcasing the corrector functionality.
 Creates sample projects, runs, and correction artifacts.
 """
 
-import json
 import os
 from pathlib import Path
 
 from sqlmodel import Session, select
 
+from corrector import jsonio
+
 from .db import engine
 from .models import (
     Document,
@@ -312,9 +313,7 @@ def setup_demo_data():
 
         # Create corrections JSONL file
         corrections_file = artifacts_dir / f"{demo_run.id}_documento_ejemplo.corrections.jsonl"
-        with open(corrections_file, "w", encoding="utf-8") as f:
-            for correction in SAMPLE_CORRECTIONS:
-                f.write(json.dumps(correction, ensure_ascii=False) + "\n")
+        jsonio.write_jsonl(corrections_file, SAMPLE_CORRECTIONS)
         print(f"✅ Created corrections file: {corrections_file}")
 
         # Create export record for corrections
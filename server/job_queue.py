@@ -0,0 +1,710 @@
+"""Durable job queue: the queued ``RunDocument`` rows are the queue.
+
+Two backends share the ``JobQueue`` interface used by the worker and the API:
+
+- ``DBJobQueue`` (default, ``JOB_QUEUE=db``): ``enqueue_run`` stores each document's
+  queue priority on its row and ``claim`` leases the next row with one conditional
+  UPDATE that also re-checks the plan limits (documents and runs per user), so any
+  number of API/worker processes share the queue without double processing. On
+  PostgreSQL claims are serialized with an advisory lock, since they share the
+  round-robin state; SQLite serializes writers by itself.
+- ``InMemoryScheduler`` (``JOB_QUEUE=memory``): the process-local fair-share scheduler,
+  rebuilt from the DB on startup; the worker leases each dispatched task separately.
+
+Order: users share the workers by the weighted deficit round-robin of the in-memory
+scheduler, with each user's credit, ring position and turn kept in ``SchedulerCredit``;
+``claim`` reads the best claimable row of every ready user and picks among them. Within
+a user, rows go by the stored priority: ``words + aging * enqueued_at`` ("sjf") or
+``enqueued_at`` ("fifo"), the same keys the in-memory scheduler uses. On SQLite two
+processes may read the same credit before either writes it; the conditional UPDATE
+still prevents double claims, only the share drifts.
+
+Leases: the worker renews the lease of every document in hand (``renew_lease``, a
+heartbeat every TTL/4) until its export is saved, so a long AI run keeps it. Once
+corrected, ``mark_exporting`` moves the row to ``exporting``: it keeps its lease but no
+longer counts towards the plan limits, which only count live ``processing`` rows.
+``reap_expired_leases`` requeues a document whose holder went silent for a whole TTL
+(with ``attempt_count`` backoff) or, past ``MAX_ATTEMPTS``, moves it to ``dead_letter``.
+
+Cancellation: ``cancel_run_documents`` moves the queued and in-progress rows of a run
+to ``canceled`` and drops their leases, so the holders' next heartbeat fails and they
+stop (see ``server.worker``); ``JobQueue.cancel_run`` drops what the backend keeps of
+the run in memory.
+
+Dispatch is event driven: each backend has a ``notifier`` that ``enqueue_run`` and
+``finish`` signal and idle workers wait on. ``DBJobQueue`` on PostgreSQL relays it to
+every process with LISTEN/NOTIFY; elsewhere (SQLite) it wakes the process's own
+workers and other processes fall back to their idle poll.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+import time
+from typing import Protocol
+
+from sqlalchemy import and_, case, delete, distinct, exists, func, or_, select, text, update
+from sqlalchemy.orm import aliased
+
+from .limits import FREE, PREMIUM, SYSTEM_MAX_WORKERS, PlanLimits
+from .models import (
+    Document,
+    Role,
+    Run,
+    RunDocument,
+    RunDocumentStatus,
+    RunStatus,
+    SchedulerCredit,
+    User,
+)
+from .scheduler import (
+    AGING_WORDS_PER_SECOND,
+    DEFAULT_SECONDS_PER_WORD,
+    DEFAULT_TASK_WORDS,
+    DRR_QUANTUM_CHUNKS,
+    ETA_SMOOTHING,
+    POLICIES,
+    DocumentTask,
+    QueueNotifier,
+    RunJob,
+    User as SUser,
+    chunk_cost,
+    drr_passes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows tried per claim on SQLite when the first candidates are taken meanwhile
+CLAIM_CANDIDATES = 8
+# Leases: a holder renews its lease (heartbeat) every TTL/4; one silent for the whole
+# TTL is taken as crashed and reaped
+LEASE_TTL_SECONDS = 60.0
+# Reaped documents are retried after RETRY_BACKOFF_SECONDS * 2**(attempt - 1), capped,
+# and go to dead_letter once they have lost MAX_ATTEMPTS leases
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30.0
+RETRY_BACKOFF_MAX_SECONDS = 600.0
+# LISTEN/NOTIFY channel for new work on PostgreSQL
+NOTIFY_CHANNEL = "corrector_queue"
+
+
+class JobQueue(Protocol):
+    # True when claim() already leased the RunDocument row (no separate lock needed)
+    durable: bool
+    # Signalled on new work or freed capacity; idle workers wait on it
+    notifier: QueueNotifier
+
+    @property
+    def system_max_workers(self) -> int: ...
+
+    def set_system_max_workers(self, workers: int) -> None: ...
+
+    def register_user(self, user: SUser) -> None: ...
+
+    def enqueue_run(self, job: RunJob) -> None: ...
+
+    def claim(self, owner: str) -> DocumentTask | None: ...
+
+    def finish(self, task: DocumentTask) -> None: ...
+
+    def release(self, task: DocumentTask) -> None: ...
+
+    def cancel_run(self, run_id: str) -> int: ...
+
+    def run_eta(self, run_id: str) -> float | None: ...
+
+
+class PgQueueNotifier(QueueNotifier):
+    """``QueueNotifier`` across processes through PostgreSQL LISTEN/NOTIFY.
+
+    ``notify`` also sends ``pg_notify``; the first ``wait`` starts a listener thread on
+    a dedicated connection that wakes this process's waiters on every notification.
+    """
+
+    def __init__(self, engine) -> None:
+        super().__init__()
+        self._engine = engine
+        self._listener: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def notify(self) -> None:
+        self.wake()
+        try:
+            with self._engine.connect() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+                conn.commit()
+        except Exception:
+            logger.warning("No se pudo enviar NOTIFY a la cola", exc_info=True)
+
+    def wait(self, seen: int, timeout: float) -> bool:
+        with self._start_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="queue-listener", daemon=True
+                )
+                self._listener.start()
+        return super().wait(seen, timeout)
+
+    def _listen(self) -> None:
+        import select as select_mod
+
+        while True:
+            raw = None
+            try:
+                raw = self._engine.raw_connection()
+                conn = raw.driver_connection  # psycopg2
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select_mod.select([conn], [], [], 60.0)[0]:
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            self.wake()
+            except Exception:
+                logger.warning("LISTEN de la cola interrumpido; reconectando", exc_info=True)
+                # Wake waiters so they claim now rather than at their idle poll
+                self.wake()
+                time.sleep(5.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+
+def _last_seen(row):
+    """When the lease holder last showed signs of life: its last heartbeat or the claim."""
+    return func.coalesce(row.heartbeat_at, row.locked_at)
+
+
+def claimable(now: dt.datetime, deadline: dt.datetime):
+    """Rows a worker may lease: queued, past their retry backoff and not leased since ``deadline``.
+
+    Documents whose holder died stay ``processing`` until ``reap_expired_leases`` requeues
+    them, so every lost lease counts towards ``MAX_ATTEMPTS``.
+    """
+    return and_(
+        RunDocument.status == RunDocumentStatus.queued,
+        or_(RunDocument.available_at.is_(None), RunDocument.available_at <= now),
+        or_(RunDocument.locked_by.is_(None), _last_seen(RunDocument) <= deadline),
+    )
+
+
+def _live(row, deadline: dt.datetime):
+    return and_(row.status == RunDocumentStatus.processing, _last_seen(row) > deadline)
+
+
+def _active_docs(user_id, deadline: dt.datetime):
+    """Documents of ``user_id`` in progress under a live lease (scalar subquery)."""
+    active, active_run = aliased(RunDocument), aliased(Run)
+    return (
+        select(func.count(active.id))
+        .join(active_run, active_run.id == active.run_id)
+        .where(active_run.submitted_by == user_id, _live(active, deadline))
+        .scalar_subquery()
+    )
+
+
+def _within_limits(user_id, run_id, max_docs, max_runs, deadline: dt.datetime):
+    """Plan limits as SQL: arguments are columns of the outer query or plain values."""
+    active, active_run = aliased(RunDocument), aliased(Run)
+    active_runs = (
+        select(func.count(distinct(active.run_id)))
+        .join(active_run, active_run.id == active.run_id)
+        .where(active_run.submitted_by == user_id, _live(active, deadline))
+        .scalar_subquery()
+    )
+    run_active = exists().where(active.run_id == run_id, _live(active, deadline))
+    return and_(_active_docs(user_id, deadline) < max_docs, or_(run_active, active_runs < max_runs))
+
+
+def _live_counts(deadline: dt.datetime):
+    """Live documents and runs per user, and live documents per run (grouped subqueries).
+
+    Rows in progress are at most a few per worker, so both groupings are small and are
+    computed once per claim instead of once per candidate row.
+    """
+    by_user = (
+        select(
+            Run.submitted_by.label("user_id"),
+            func.count(RunDocument.id).label("docs"),
+            func.count(distinct(RunDocument.run_id)).label("runs"),
+        )
+        .join(Run, Run.id == RunDocument.run_id)
+        .where(_live(RunDocument, deadline))
+        .group_by(Run.submitted_by)
+        .subquery("live_by_user")
+    )
+    by_run = (
+        select(RunDocument.run_id.label("run_id"))
+        .where(_live(RunDocument, deadline))
+        .group_by(RunDocument.run_id)
+        .subquery("live_by_run")
+    )
+    return by_user, by_run
+
+
+def _plan_limit(field: str):
+    """Per-plan limit from the submitter's role (as ``scheduler.User.limits``)."""
+    return case((User.role == Role.premium, getattr(PREMIUM, field)), else_=getattr(FREE, field))
+
+
+def _row_limits(row) -> PlanLimits:
+    plan = row.role.value if hasattr(row.role, "value") else (row.role or "free")
+    return SUser(id=row.submitted_by, plan=plan).limits()
+
+
+def _drr_pick(heads: list) -> tuple[int, list[tuple[str, int, int, bool]]]:
+    """Deficit round-robin over the claim candidates: one row per ready user, in ring order.
+
+    Same turns and credit as ``InMemoryScheduler._next_drr_user``. Returns the index of
+    the winner in ``heads`` and every user's new ``(user_id, deficit, ring, turn)``, the
+    winner already charged for its document.
+    """
+    order = list(range(len(heads)))
+    deficit = [h.deficit or 0 for h in heads]
+    cost = [chunk_cost(h.word_count, h.chunk_count) for h in heads]
+    quantum = [DRR_QUANTUM_CHUNKS * _row_limits(h).scheduler_weight for h in heads]
+    if heads[0].turn and deficit[0] >= cost[0]:
+        winner = 0
+    else:
+        if heads[0].turn:
+            order.append(order.pop(0))  # its turn is over: to the back of the ring
+        pos, passes = drr_passes((cost[i] - deficit[i], quantum[i]) for i in order)
+        # Users up to the winner are reached `passes` times, the ones after it one less
+        for k, i in enumerate(order):
+            deficit[i] += (passes if k <= pos else passes - 1) * quantum[i]
+        order = order[pos:] + order[:pos]
+        winner = order[0]
+    deficit[winner] -= cost[winner]
+    state = [(heads[i].submitted_by, deficit[i], ring, i == winner) for ring, i in enumerate(order)]
+    return winner, state
+
+
+class DBJobQueue:
+    """Queue backed by the ``RunDocument`` table; see the module docstring."""
+
+    durable = True
+
+    def __init__(
+        self,
+        system_max_workers: int = SYSTEM_MAX_WORKERS,
+        *,
+        policy: str = "sjf",
+        lock_ttl: float = LEASE_TTL_SECONDS,
+        aging_words_per_s: float = AGING_WORDS_PER_SECOND,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Política de planificación desconocida: {policy}")
+        self.policy = policy
+        self._system_max_workers = system_max_workers
+        self._lock_ttl = lock_ttl
+        self._aging = aging_words_per_s
+        self._lock = threading.Lock()
+        # Claims of this process, for the throughput learned in finish()
+        self._started: dict[tuple[str, str], float] = {}
+        self.seconds_per_word = DEFAULT_SECONDS_PER_WORD
+        from .db import engine
+
+        self.notifier = (
+            PgQueueNotifier(engine) if engine.dialect.name == "postgresql" else QueueNotifier()
+        )
+
+    @property
+    def system_max_workers(self) -> int:
+        return self._system_max_workers
+
+    def set_system_max_workers(self, workers: int) -> None:
+        self._system_max_workers = max(1, workers)
+        self.notifier.wake()
+
+    def register_user(self, user: SUser) -> None:
+        """Plans are read from the ``user`` table at claim time."""
+
+    def _priority(self, words: int | None, enqueued_at: float) -> float:
+        if self.policy == "fifo":
+            return enqueued_at
+        return (words if words is not None else DEFAULT_TASK_WORDS) + self._aging * enqueued_at
+
+    def enqueue_run(self, job: RunJob) -> None:
+        """Give the run's queued rows their priority; documents over the plan's limit fail."""
+        from .db import session_scope
+
+        now = time.time()
+        with session_scope() as session:
+            user = session.get(User, job.user_id)
+            plan = (
+                (user.role.value if hasattr(user.role, "value") else user.role) if user else "free"
+            )
+            lim = SUser(id=job.user_id, plan=plan).limits()
+            rows = {
+                rd.document_id: rd
+                for rd in session.scalars(
+                    select(RunDocument).where(RunDocument.run_id == job.run_id)
+                )
+            }
+            for i, doc_id in enumerate(job.documents):
+                rd = rows.get(doc_id)
+                if rd is None or rd.status != RunDocumentStatus.queued:
+                    continue
+                if i >= lim.max_docs_per_run:
+                    rd.status = RunDocumentStatus.failed
+                    rd.last_error = f"límite del plan: {lim.max_docs_per_run} documento(s) por run"
+                else:
+                    words = job.sizes.get(doc_id, (None, None))[0]
+                    rd.priority = self._priority(words, now)
+                session.add(rd)
+        self.notifier.notify()
+
+    def claim(self, owner: str) -> DocumentTask | None:
+        """Lease the next runnable queued document for ``owner``; None if there is none."""
+        from .db import engine, session_scope
+
+        postgres = engine.dialect.name == "postgresql"
+        now = dt.datetime.utcnow()
+        deadline = now - dt.timedelta(seconds=self._lock_ttl)
+        live_user, live_run = _live_counts(deadline)
+        user_docs = func.coalesce(live_user.c.docs, 0)
+        priority = func.coalesce(RunDocument.priority, 0.0)
+        candidates = (
+            select(
+                RunDocument.id,
+                RunDocument.run_id,
+                RunDocument.document_id,
+                RunDocument.use_ai,
+                Run.project_id,
+                Run.mode,
+                Run.submitted_by,
+                User.role,
+                Document.word_count,
+                Document.chunk_count,
+                priority.label("priority"),
+                func.row_number()
+                .over(partition_by=Run.submitted_by, order_by=(priority, RunDocument.id))
+                .label("rank"),
+            )
+            .join(Run, Run.id == RunDocument.run_id)
+            .outerjoin(User, User.id == Run.submitted_by)
+            .outerjoin(Document, Document.id == RunDocument.document_id)
+            .outerjoin(live_user, live_user.c.user_id == Run.submitted_by)
+            .outerjoin(live_run, live_run.c.run_id == RunDocument.run_id)
+            .where(
+                claimable(now, deadline),
+                # Plan limits (re-checked per user in the UPDATE below)
+                user_docs < _plan_limit("max_docs_concurrent"),
+                or_(
+                    live_run.c.run_id.is_not(None),
+                    func.coalesce(live_user.c.runs, 0) < _plan_limit("max_runs_concurrent"),
+                ),
+            )
+            .subquery("candidates")
+        )
+        # The next row of each ready user, in ring order; newly ready users join at the back
+        heads_stmt = (
+            select(candidates, SchedulerCredit.deficit, SchedulerCredit.ring, SchedulerCredit.turn)
+            .outerjoin(SchedulerCredit, SchedulerCredit.user_id == candidates.c.submitted_by)
+            .where(candidates.c.rank == 1)
+            .order_by(
+                SchedulerCredit.ring.is_(None),
+                SchedulerCredit.ring,
+                candidates.c.priority,
+                candidates.c.submitted_by,
+            )
+        )
+
+        with session_scope() as session:
+            if postgres:
+                # Claims read and update the shared round-robin state: one at a time
+                session.execute(
+                    text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": NOTIFY_CHANNEL}
+                )
+            heads = session.execute(heads_stmt).all()
+            ready = [h.submitted_by for h in heads]
+            for _ in range(CLAIM_CANDIDATES):
+                if not heads:
+                    return None
+                index, state = _drr_pick(heads)
+                row = heads[index]
+                lim = _row_limits(row)
+                result = session.execute(
+                    update(RunDocument)
+                    .where(
+                        RunDocument.id == row.id,
+                        claimable(now, deadline),
+                        _within_limits(
+                            row.submitted_by,
+                            row.run_id,
+                            lim.max_docs_concurrent,
+                            lim.max_runs_concurrent,
+                            deadline,
+                        ),
+                    )
+                    .values(
+                        locked_by=owner,
+                        locked_at=now,
+                        heartbeat_at=now,
+                        available_at=None,
+                        status=RunDocumentStatus.processing,
+                        attempt_count=RunDocument.attempt_count + 1,
+                    )
+                )
+                if result.rowcount != 1:
+                    del heads[index]  # taken meanwhile, or the user reached a limit
+                    continue
+                self._save_credit(session, state, ready)
+                task = DocumentTask(
+                    project_id=row.project_id,
+                    document_id=row.document_id,
+                    user_id=row.submitted_by,
+                    run_id=row.run_id,
+                    mode=row.mode.value if hasattr(row.mode, "value") else str(row.mode),
+                    use_ai=bool(row.use_ai) and lim.ai_enabled,
+                    words=row.word_count,
+                    chunks=row.chunk_count,
+                )
+                with self._lock:
+                    self._started[(task.run_id, task.document_id)] = time.time()
+                return task
+        return None
+
+    @staticmethod
+    def _save_credit(session, state: list[tuple[str, int, int, bool]], ready: list[str]) -> None:
+        """Store the round-robin state after a claim; users no longer ready leave the ring,
+        and their credit is dropped once they have nothing queued."""
+        for user_id, deficit, ring, turn in state:
+            session.merge(SchedulerCredit(user_id=user_id, deficit=deficit, ring=ring, turn=turn))
+        session.execute(
+            update(SchedulerCredit)
+            .where(SchedulerCredit.user_id.not_in(ready))
+            .values(ring=None, turn=False)
+        )
+        queued = (
+            exists()
+            .where(
+                RunDocument.status == RunDocumentStatus.queued,
+                Run.id == RunDocument.run_id,
+                Run.submitted_by == SchedulerCredit.user_id,
+            )
+            .correlate(SchedulerCredit)
+        )
+        session.execute(delete(SchedulerCredit).where(SchedulerCredit.ring.is_(None), ~queued))
+
+    def finish(self, task: DocumentTask) -> None:
+        """The worker updates the row itself; learn the throughput used for ETAs."""
+        with self._lock:
+            started = self._started.pop((task.run_id, task.document_id), None)
+            if started is not None and task.words:
+                sample = (time.time() - started) / task.words
+                self.seconds_per_word += ETA_SMOOTHING * (sample - self.seconds_per_word)
+
+    def release(self, task: DocumentTask) -> None:
+        """A claimed task that was not processed: forget it without learning from it."""
+        with self._lock:
+            self._started.pop((task.run_id, task.document_id), None)
+
+    def cancel_run(self, run_id: str) -> int:
+        """Nothing to drop: ``cancel_run_documents`` took the rows out of the queue."""
+        self.notifier.notify()  # their plan slots are free for the user's other runs
+        return 0
+
+    def run_eta(self, run_id: str) -> float | None:
+        """Same estimate as ``InMemoryScheduler.run_eta``, from the rows in the DB.
+
+        Only the queued rows ordered up to the run's last one count, summed in SQL (the
+        ``status, priority`` index), plus the live rows, which are a few per worker.
+        """
+        from .db import session_scope
+
+        now = dt.datetime.utcnow()
+        deadline = now - dt.timedelta(seconds=self._lock_ttl)
+        priority = func.coalesce(RunDocument.priority, 0.0)
+        words = func.coalesce(Document.word_count, DEFAULT_TASK_WORDS)
+        with session_scope() as session:
+            last = session.execute(
+                select(priority.label("priority"), RunDocument.id)
+                .where(
+                    RunDocument.run_id == run_id,
+                    RunDocument.status == RunDocumentStatus.queued,
+                )
+                .order_by(priority.desc(), RunDocument.id.desc())
+                .limit(1)
+            ).first()
+            queued_words = None
+            if last is not None:
+                queued_words = session.execute(
+                    select(func.sum(words))
+                    .select_from(RunDocument)
+                    .outerjoin(Document, Document.id == RunDocument.document_id)
+                    .where(
+                        RunDocument.status == RunDocumentStatus.queued,
+                        or_(
+                            priority < last.priority,
+                            and_(priority == last.priority, RunDocument.id <= last.id),
+                        ),
+                    )
+                ).scalar_one()
+            active = session.execute(
+                select(RunDocument.run_id, RunDocument.locked_at, Document.word_count)
+                .outerjoin(Document, Document.id == RunDocument.document_id)
+                .where(_live(RunDocument, deadline))
+            ).all()
+
+        def expected(words: int | None) -> float:
+            return (words if words is not None else DEFAULT_TASK_WORDS) * self.seconds_per_word
+
+        left = [
+            (r.run_id, max(0.0, expected(r.word_count) - (now - r.locked_at).total_seconds()))
+            for r in active
+        ]
+        if queued_words is None:
+            return max((s for rid, s in left if rid == run_id), default=None)
+        work = queued_words * self.seconds_per_word + sum(s for _, s in left)
+        return work / max(1, self._system_max_workers)
+
+
+def retry_backoff(attempt: int) -> float:
+    """Seconds before a document that lost its ``attempt``-th lease is claimable again."""
+    return min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** max(0, attempt - 1))
+
+
+# Statuses of a leased row: correcting, then writing its exports
+LEASED_STATUSES = (RunDocumentStatus.processing, RunDocumentStatus.exporting)
+
+
+def renew_lease(run_id: str, document_id: str, owner: str) -> bool:
+    """Heartbeat: extend ``owner``'s lease; False if the lease is no longer its own."""
+    from .db import session_scope
+
+    with session_scope() as session:
+        result = session.execute(
+            update(RunDocument)
+            .where(
+                RunDocument.run_id == run_id,
+                RunDocument.document_id == document_id,
+                RunDocument.locked_by == owner,
+                RunDocument.status.in_(LEASED_STATUSES),
+            )
+            .values(heartbeat_at=dt.datetime.utcnow())
+        )
+        return result.rowcount == 1
+
+
+def mark_exporting(run_id: str, document_id: str) -> bool:
+    """Move a corrected document to ``exporting``, out of its user's plan limits.
+
+    False if the row is no longer ``processing`` (canceled or reaped meanwhile).
+    """
+    from .db import session_scope
+
+    with session_scope() as session:
+        result = session.execute(
+            update(RunDocument)
+            .where(
+                RunDocument.run_id == run_id,
+                RunDocument.document_id == document_id,
+                RunDocument.status == RunDocumentStatus.processing,
+            )
+            .values(status=RunDocumentStatus.exporting)
+        )
+        return result.rowcount == 1
+
+
+def reap_expired_leases(
+    lock_ttl: float = LEASE_TTL_SECONDS, max_attempts: int = MAX_ATTEMPTS
+) -> tuple[int, int]:
+    """Requeue documents whose lease holder stopped heartbeating, with backoff.
+
+    A document that already lost ``max_attempts`` leases goes to ``dead_letter`` and its
+    run fails. Every worker process may run this: each row is taken by one conditional
+    UPDATE. Returns ``(requeued, dead_lettered)``.
+    """
+    from .db import session_scope
+
+    now = dt.datetime.utcnow()
+    deadline = now - dt.timedelta(seconds=lock_ttl)
+    expired = and_(
+        RunDocument.status.in_(LEASED_STATUSES),
+        or_(RunDocument.locked_at.is_(None), _last_seen(RunDocument) <= deadline),
+    )
+    requeued = dead = 0
+    with session_scope() as session:
+        rows = session.execute(
+            select(RunDocument.id, RunDocument.run_id, RunDocument.attempt_count).where(expired)
+        ).all()
+        for row in rows:
+            values: dict = {"locked_by": None, "locked_at": None, "heartbeat_at": None}
+            if row.attempt_count >= max_attempts:
+                values.update(
+                    status=RunDocumentStatus.dead_letter,
+                    last_error=f"lease perdido {row.attempt_count} veces (worker caído)",
+                )
+            else:
+                backoff = retry_backoff(row.attempt_count)
+                values.update(
+                    status=RunDocumentStatus.queued,
+                    available_at=now + dt.timedelta(seconds=backoff),
+                    last_error=f"lease expirado en el intento {row.attempt_count}",
+                )
+            result = session.execute(
+                update(RunDocument).where(RunDocument.id == row.id, expired).values(**values)
+            )
+            if result.rowcount != 1:
+                continue  # renewed or reaped by another process meanwhile
+            if values["status"] == RunDocumentStatus.dead_letter:
+                dead += 1
+                run = session.get(Run, row.run_id)
+                if run:
+                    run.status = RunStatus.failed
+                    session.add(run)
+                logger.error(f"☠️ Documento {row.id} a dead-letter: {values['last_error']}")
+            else:
+                requeued += 1
+                logger.warning(
+                    f"♻️ Lease expirado: documento {row.id} reencolado en {backoff:.0f}s "
+                    f"(intento {row.attempt_count}/{max_attempts})"
+                )
+    return requeued, dead
+
+
+def cancel_run_documents(run_id: str) -> tuple[int, int]:
+    """Cancel the unfinished documents of ``run_id`` and the run itself.
+
+    Queued and in-progress rows become ``canceled`` with their lease released; finished
+    ones keep their status. Returns ``(queued, in_progress)`` canceled.
+    """
+    from .db import session_scope
+
+    now = dt.datetime.utcnow()
+    counts = {}
+    with session_scope() as session:
+        for status, statuses in (
+            (RunDocumentStatus.queued, [RunDocumentStatus.queued]),
+            (RunDocumentStatus.processing, LEASED_STATUSES),
+        ):
+            result = session.execute(
+                update(RunDocument)
+                .where(RunDocument.run_id == run_id, RunDocument.status.in_(statuses))
+                .values(
+                    status=RunDocumentStatus.canceled,
+                    locked_by=None,
+                    locked_at=None,
+                    heartbeat_at=None,
+                    available_at=None,
+                    last_error="cancelado por el usuario",
+                )
+            )
+            counts[status] = result.rowcount
+        run = session.get(Run, run_id)
+        if run:
+            run.status = RunStatus.canceled
+            run.finished_at = now
+            session.add(run)
+    logger.info(
+        f"🛑 Run {run_id} cancelado: {counts[RunDocumentStatus.queued]} en cola, "
+        f"{counts[RunDocumentStatus.processing]} en curso"
+    )
+    return counts[RunDocumentStatus.queued], counts[RunDocumentStatus.processing]
@@ -11,6 +11,8 @@ class PlanLimits:
     max_docs_concurrent: int
     rate_limit_rpm: int
     ai_enabled: bool
+    # Share of the workers under contention (deficit round-robin weight)
+    scheduler_weight: int = 1
 
 
 FREE = PlanLimits(
@@ -29,6 +31,7 @@ PREMIUM = PlanLimits(
     max_docs_concurrent=3,
     rate_limit_rpm=300,
     ai_enabled=True,
+    scheduler_weight=3,
 )
 
 # System-wide default workers for local single-node deployment
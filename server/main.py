@@ -4,10 +4,11 @@ import logging
 import os
 
 try:
-    from fastapi import FastAPI, HTTPException
+    from fastapi import Depends, FastAPI, HTTPException
     from fastapi.middleware.cors import CORSMiddleware
 except Exception:  # pragma: no cover - only needed when running the server
     FastAPI = None  # type: ignore
+    Depends = None  # type: ignore
     HTTPException = Exception  # type: ignore
     CORSMiddleware = None  # type: ignore
 
@@ -22,16 +23,16 @@ logging.basicConfig(
 )
 
 from .db import init_db, session_scope
+from .deps import get_current_user
 from .limits import FREE, PREMIUM
-from .models import Run, RunDocument, RunDocumentStatus, User
+from .models import User
 from .routes_auth import router as auth_router
 from .routes_documents import router as documents_router
 from .routes_projects import router as projects_router
 from .routes_runs import router as runs_router
 from .routes_suggestions import router as suggestions_router
-from .scheduler import RunJob, User as SUser
-from .scheduler_registry import get_scheduler
-from .schemas import MeLimits
+from .scheduler_registry import embedded_worker, get_job_queue, get_scheduler
+from .schemas import MeLimits, WorkerPoolResize, WorkerPoolStats
 
 
 def create_app() -> FastAPI:  # type: ignore
@@ -123,11 +124,27 @@ def create_app() -> FastAPI:  # type: ignore
 
     # Startup background worker and rebuild scheduler from DB (persistent queue)
     try:
-        from .worker import Worker
+        from .worker import Worker, enqueue_queued_tasks
 
         _worker = Worker()
         print("✅ Worker initialized successfully")
 
+        def _require_admin(current: User) -> None:
+            role = current.role.value if hasattr(current.role, "value") else str(current.role)
+            if role != "admin":
+                raise HTTPException(status_code=403, detail="Solo administradores")
+
+        @app.get("/system/workers", response_model=WorkerPoolStats)
+        def worker_pool_stats(current: User = Depends(get_current_user)):
+            _require_admin(current)
+            return _worker.stats()
+
+        @app.put("/system/workers", response_model=WorkerPoolStats)
+        def resize_worker_pool(req: WorkerPoolResize, current: User = Depends(get_current_user)):
+            _require_admin(current)
+            _worker.resize(req.size)
+            return _worker.stats()
+
         @app.on_event("startup")
         def _start_worker():  # pragma: no cover
             print("🚀 Starting worker...")
@@ -180,36 +197,29 @@ def create_app() -> FastAPI:  # type: ignore
             except Exception as e:
                 print(f"⚠️  Error setting up demo data: {e}")
 
-            # Rebuild the in-memory scheduler from queued tasks in DB
+            # Rebuild the in-memory scheduler from queued tasks in DB (the DB queue
+            # needs no rebuild: its state is the queued rows)
+            if embedded_worker() and not get_job_queue().durable:
+                try:
+                    rebuilt = enqueue_queued_tasks(get_scheduler())
+                    print(f"📋 Found {rebuilt} queued tasks to rebuild")
+                except Exception as e:
+                    print(f"⚠️  Error rebuilding scheduler: {e}")
+            else:
+                print("📨 API en modo solo-encolar: las tareas las procesa corrector-worker")
+
+            # Profile documents uploaded before the preprocessing stage existed
             try:
-                with session_scope() as session:
-                    rows = session.exec(
-                        select(RunDocument, Run)
-                        .join(Run, Run.id == RunDocument.run_id)
-                        .where(RunDocument.status == RunDocumentStatus.queued)
-                    ).all()
-                    print(f"📋 Found {len(rows)} queued tasks to rebuild")
-                    for rd, run in rows:
-                        user = session.get(User, run.submitted_by)
-                        plan = (
-                            (user.role.value if hasattr(user, "role") else "free")
-                            if user
-                            else "free"
-                        )
-                        get_scheduler().register_user(SUser(id=run.submitted_by, plan=plan))
-                        job = RunJob(
-                            user_id=run.submitted_by,
-                            run_id=run.id,
-                            project_id=run.project_id,
-                            documents=[rd.document_id],
-                            mode=run.mode.value if hasattr(run.mode, "value") else str(run.mode),
-                            use_ai=rd.use_ai if hasattr(rd, "use_ai") else False,
-                        )
-                        get_scheduler().enqueue_run(job)
+                from .preprocess import submit_pending_preprocessing
+
+                pending = submit_pending_preprocessing()
+                if pending:
+                    print(f"🧮 Preprocessing {pending} document(s) in background")
             except Exception as e:
-                print(f"⚠️  Error rebuilding scheduler: {e}")
-            _worker.start()
-            print("✅ Worker started successfully")
+                print(f"⚠️  Error queuing document preprocessing: {e}")
+            if embedded_worker():
+                _worker.start()
+                print("✅ Worker started successfully")
 
         @app.on_event("shutdown")
         def _stop_worker():  # pragma: no cover
@@ -25,6 +25,89 @@ def run_migrations():
         except Exception as e:
             logger.warning(f"Migration content_backup: {e}")
 
+        # Migration 2: artifact size and checksum on export
+        for column, ddl in (("size", "INTEGER"), ("checksum", "VARCHAR")):
+            try:
+                conn.execute(text(f"ALTER TABLE export ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+                conn.commit()
+                logger.info(f"✅ Migration: Added {column} column to export table")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Migration export.{column}: {e}")
+
+        # Migration 3: document size and chunk plan from the upload preprocessing
+        for column, ddl in (
+            ("word_count", "INTEGER"),
+            ("token_count", "INTEGER"),
+            ("chunk_count", "INTEGER"),
+            ("chunk_plan", "TEXT"),
+        ):
+            try:
+                conn.execute(text(f"ALTER TABLE document ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+                conn.commit()
+                logger.info(f"✅ Migration: Added {column} column to document table")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Migration document.{column}: {e}")
+
+        # Migration 4: queue order of the DB job queue, and the index its claims scan
+        for label, ddl in (
+            (
+                "rundocument.priority",
+                "ALTER TABLE rundocument ADD COLUMN IF NOT EXISTS priority FLOAT",
+            ),
+            (
+                "ix_rundocument_status_priority",
+                "CREATE INDEX IF NOT EXISTS ix_rundocument_status_priority "
+                "ON rundocument (status, priority)",
+            ),
+        ):
+            try:
+                conn.execute(text(ddl))
+                conn.commit()
+                logger.info(f"✅ Migration: {label}")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Migration {label}: {e}")
+
+        # Migration 5: retry backoff and the dead-letter status of the lease reaper
+        for label, ddl in (
+            (
+                "rundocument.available_at",
+                "ALTER TABLE rundocument ADD COLUMN IF NOT EXISTS available_at TIMESTAMP",
+            ),
+            # PostgreSQL stores the status as a native enum; SQLite as plain text
+            (
+                "rundocumentstatus.dead_letter",
+                "ALTER TYPE rundocumentstatus ADD VALUE IF NOT EXISTS 'dead_letter'",
+            ),
+        ):
+            try:
+                conn.execute(text(ddl))
+                conn.commit()
+                logger.info(f"✅ Migration: {label}")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Migration {label}: {e}")
+
+        # Migration 6: documents of a canceled run
+        try:
+            conn.execute(text("ALTER TYPE rundocumentstatus ADD VALUE IF NOT EXISTS 'canceled'"))
+            conn.commit()
+            logger.info("✅ Migration: rundocumentstatus.canceled")
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Migration rundocumentstatus.canceled: {e}")
+
+        # Migration 7: documents whose exports are being written
+        try:
+            conn.execute(text("ALTER TYPE rundocumentstatus ADD VALUE IF NOT EXISTS 'exporting'"))
+            conn.commit()
+            logger.info("✅ Migration: rundocumentstatus.exporting")
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Migration rundocumentstatus.exporting: {e}")
+
     logger.info("✅ Database migrations complete")
 
 
@@ -4,6 +4,7 @@ import datetime as dt
 import uuid
 from enum import Enum
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -53,6 +54,11 @@ class Document(SQLModel, table=True):
     checksum: str | None = None
     status: DocumentStatus = Field(default=DocumentStatus.new)
     content_backup: str | None = None  # Stores content for demo/ephemeral storage
+    # Filled by the upload preprocessing (server/preprocess.py); None until it has run
+    word_count: int | None = None
+    token_count: int | None = None
+    chunk_count: int | None = None
+    chunk_plan: str | None = None  # JSON [[start, end], ...] token ranges of the auto plan
 
 
 class RunMode(str, Enum):
@@ -84,11 +90,17 @@ class Run(SQLModel, table=True):
 class RunDocumentStatus(str, Enum):
     queued = "queued"
     processing = "processing"
+    exporting = "exporting"  # corrected, artifacts being written: outside the plan limits
     completed = "completed"
     failed = "failed"
+    dead_letter = "dead_letter"  # lease lost MAX_ATTEMPTS times: not retried again
+    canceled = "canceled"  # its run was canceled (partial suggestions may be stored)
 
 
 class RunDocument(SQLModel, table=True):
+    # Workers claim the lowest priority queued row (server/job_queue.py)
+    __table_args__ = (Index("ix_rundocument_status_priority", "status", "priority"),)
+
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     run_id: str = Field(foreign_key="run.id")
     document_id: str = Field(foreign_key="document.id")
@@ -96,9 +108,21 @@ class RunDocument(SQLModel, table=True):
     use_ai: bool = Field(default=True)
     locked_by: str | None = None
     locked_at: dt.datetime | None = None
-    heartbeat_at: dt.datetime | None = None
+    heartbeat_at: dt.datetime | None = None  # renewed while the lease holder is alive
     attempt_count: int = Field(default=0)
+    available_at: dt.datetime | None = None  # retry backoff: not claimed before this
     last_error: str | None = None
+    # Queue order set on enqueue (lower first): arrival time (fifo) or SJF key with aging
+    priority: float | None = None
+
+
+class SchedulerCredit(SQLModel, table=True):
+    """Deficit round-robin state of a user with queued documents (server/job_queue.py)."""
+
+    user_id: str = Field(foreign_key="user.id", primary_key=True)
+    deficit: int = Field(default=0)  # chunks of credit
+    ring: int | None = None  # position among the ready users (lower first); None: not ready
+    turn: bool = Field(default=False)  # at the cursor, with its quantum granted
 
 
 class ExportKind(str, Enum):
@@ -113,6 +137,8 @@ class Export(SQLModel, table=True):
     run_id: str = Field(foreign_key="run.id")
     kind: ExportKind
     path: str
+    size: int | None = None  # bytes, recorded when the artifact is written
+    checksum: str | None = None  # SHA-256 hex
 
 
 class StyleProfile(SQLModel, table=True):
@@ -0,0 +1,140 @@
+"""Upload preprocessing: parse, tokenize and plan chunks off the request and worker paths.
+
+``upload_documents`` only stores the bytes. Each new document is then profiled on a
+small background pool: the parse cache entry is built (so the worker loads tokens and
+DOCX nodes instead of parsing), and the word/token counts plus the worker's chunk plan
+are saved on the ``Document`` row. The scheduler reads those sizes when a run is
+enqueued; the worker reuses the plan when the token count still matches.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from sqlmodel import select
+
+from corrector import jsonio
+from corrector.doccache import get_parse_cache
+from corrector.engine import plan_chunks
+
+from .models import Document, DocumentKind, DocumentStatus
+
+logger = logging.getLogger(__name__)
+
+# Kinds the parse cache reads; ``read_paragraphs`` picks the reader by extension
+_PROFILED_EXTENSIONS = {DocumentKind.docx: ".docx", DocumentKind.txt: ".txt"}
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                workers = int(os.environ.get("PREPROCESS_WORKERS", "2"))
+            except ValueError:
+                workers = 2
+            _pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="preprocess")
+        return _pool
+
+
+@dataclass
+class DocumentProfile:
+    words: int
+    tokens: int
+    chunks: list[tuple[int, int]]  # token ranges, as the worker plans them
+
+
+def profile_document(path: str, checksum: str | None) -> DocumentProfile:
+    """Warm the parse cache for ``path`` and plan its chunks like the worker does."""
+    cached = get_parse_cache().load(path, checksum)
+    # The worker corrects with chunk_words=0: auto plan by character budget
+    chunks = plan_chunks(cached.tokens(), chunk_words=0, overlap_words=0)
+    return DocumentProfile(words=cached.word_count, tokens=cached.token_count, chunks=chunks)
+
+
+def preprocess_document(document_id: str) -> DocumentProfile | None:
+    """Profile one document and store the result; the document ends ``ready`` either way.
+
+    Documents of a kind the parse cache cannot read (Markdown, unknown extensions) are
+    not profiled.
+    """
+    from .db import session_scope
+
+    with session_scope() as session:
+        doc = session.get(Document, document_id)
+        if not doc:
+            return None
+        path, checksum, name, kind = doc.path, doc.checksum, doc.name, doc.kind
+
+    profile = None
+    if path and _PROFILED_EXTENSIONS.get(kind) != os.path.splitext(path)[1].lower():
+        # Markdown and other uploads are not parsed here: nothing to profile
+        logger.debug(f"Preprocesado omitido para {name} (tipo {kind})")
+    elif path and os.path.exists(path):
+        t0 = time.perf_counter()
+        try:
+            profile = profile_document(path, checksum)
+            logger.info(
+                f"🧮 {name}: {profile.words:,} palabras, {profile.tokens:,} tokens, "
+                f"{len(profile.chunks)} chunk(s) en {time.perf_counter() - t0:.2f}s"
+            )
+        except Exception:
+            # The worker parses the document itself when the profile is missing
+            logger.exception(f"⚠️ Preprocesado fallido para {name}")
+
+    with session_scope() as session:
+        doc = session.get(Document, document_id)
+        if not doc:
+            return profile
+        if profile is not None:
+            doc.word_count = profile.words
+            doc.token_count = profile.tokens
+            doc.chunk_count = len(profile.chunks)
+            doc.chunk_plan = jsonio.dumps(profile.chunks)
+        doc.status = DocumentStatus.ready
+        session.add(doc)
+    return profile
+
+
+def submit_preprocessing(document_ids: Iterable[str]) -> list[Future[DocumentProfile | None]]:
+    pool = _executor()
+    return [pool.submit(preprocess_document, did) for did in document_ids]
+
+
+def submit_pending_preprocessing() -> int:
+    """Queue documents stored before preprocessing existed (no token count yet)."""
+    from .db import session_scope
+
+    with session_scope() as session:
+        ids = session.exec(
+            select(Document.id).where(Document.token_count.is_(None), Document.path.is_not(None))
+        ).all()
+    submit_preprocessing(ids)
+    return len(ids)
+
+
+def load_chunk_plan(
+    chunk_plan: str | None, planned_tokens: int | None, token_count: int
+) -> list[tuple[int, int]] | None:
+    """Stored ``Document.chunk_plan``, if it was computed for a text of ``token_count`` tokens."""
+    if not chunk_plan or planned_tokens != token_count:
+        return None
+    return [(start, end) for start, end in jsonio.loads(chunk_plan)]
+
+
+def document_sizes(docs: Iterable[Document]) -> dict[str, tuple[int, int]]:
+    """``{document_id: (words, chunks)}`` for the documents already preprocessed."""
+    return {
+        d.id: (d.word_count, d.chunk_count)
+        for d in docs
+        if d.word_count is not None and d.chunk_count is not None
+    }
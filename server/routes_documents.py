@@ -9,6 +9,7 @@ from sqlmodel import Session, select
 from .db import get_session
 from .deps import get_current_user
 from .models import Document, DocumentKind, DocumentStatus, Project, User
+from .preprocess import submit_preprocessing
 from .storage import save_upload_for_project
 
 router = APIRouter(prefix="/projects/{project_id}/documents", tags=["documents"])
@@ -69,7 +70,7 @@ def upload_documents(
             path=str(dest_path),
             kind=DocumentKind(kind),
             checksum=checksum,
-            status=DocumentStatus.ready,
+            status=DocumentStatus.processing,
         )
         session.add(doc)
         saved_docs.append(doc)
@@ -81,6 +82,8 @@ def upload_documents(
     for doc in saved_docs:
         session.refresh(doc)
 
+    # Parse, count and plan in the background; each document turns ready when profiled
+    submit_preprocessing([doc.id for doc in saved_docs])
     return saved_docs
 
 
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import json
 import os
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
 
+from corrector import jsonio
+
 from .db import get_session
 from .deps import get_current_user
+from .job_queue import cancel_run_documents
 from .limits import FREE, PREMIUM
 from .models import (
     Document,
@@ -22,8 +24,10 @@ from .models import (
     RunStatus,
     User,
 )
+from .preprocess import document_sizes
 from .scheduler import RunJob, User as SUser
-from .scheduler_registry import get_scheduler
+from .scheduler_registry import embedded_worker, get_job_queue
+from .worker import cancel_run_in_process
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
@@ -47,6 +51,49 @@ class RunStatusResponse(BaseModel):
     status: str
     processed_documents: int
     total_documents: int
+    eta_seconds: float | None = None  # scheduler estimate until all documents are corrected
+
+
+class CancelRunResponse(BaseModel):
+    run_id: str
+    status: str
+    canceled_queued: int  # documents taken out of the queue
+    canceled_in_progress: int  # corrections told to stop (their finished chunks are kept)
+
+
+class EstimateRunRequest(BaseModel):
+    project_id: str
+    document_ids: list[str]
+    model: str | None = Field(
+        default=None, description="Modelo a estimar (por defecto GEMINI_MODEL)"
+    )
+
+
+class DocumentEstimate(BaseModel):
+    document_id: str
+    name: str
+    checksum: str | None
+    words: int
+    chunks: int
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    expected_seconds: float
+    worst_case_seconds: float
+    cost_usd: dict[str, float]
+
+
+class EstimateRunResponse(BaseModel):
+    model: str
+    fallback_models: list[str]
+    min_interval_seconds: float
+    documents: list[DocumentEstimate]
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    expected_seconds: float
+    worst_case_seconds: float
+    cost_usd: dict[str, float]
 
 
 def _limits_for(role: str):
@@ -86,7 +133,7 @@ def create_run(
         submitted_by=current.id,
         mode=req.mode,
         status=RunStatus.queued,
-        params_json=json.dumps({"use_ai": req.use_ai}),
+        params_json=jsonio.dumps({"use_ai": req.use_ai}),
     )
     session.add(run)
     session.commit()
@@ -111,10 +158,14 @@ def create_run(
         session.add(rd)
     session.commit()
 
-    # Enqueue into in-memory scheduler (fair-share) and respect per-plan limits
+    # Enqueue (fair-share, per-plan limits). The DB queue orders the rows just written;
+    # the in-memory one is fed here only when this process runs the worker, otherwise
+    # corrector-worker reads the queued rows
+    queue = get_job_queue()
+    if not queue.durable and not embedded_worker():
+        return CreateRunResponse(run_id=run.id, accepted_documents=[], queued=len(docs))
     role_value = current.role.value if hasattr(current.role, "value") else str(current.role)
-    sched = get_scheduler()
-    sched.register_user(SUser(id=current.id, plan=role_value))
+    queue.register_user(SUser(id=current.id, plan=role_value))
     job = RunJob(
         user_id=current.id,
         run_id=run.id,
@@ -122,12 +173,91 @@ def create_run(
         documents=[d.id for d in docs],
         mode=req.mode.value,
         use_ai=req.use_ai,
+        sizes=document_sizes(docs),
     )
-    sched.enqueue_run(job)
+    queue.enqueue_run(job)
     # Dejar que el worker procese; inicialmente nada aceptado aún
     return CreateRunResponse(run_id=run.id, accepted_documents=[], queued=len(docs))
 
 
+def _estimate_model_name(requested: str | None) -> str:
+    if requested:
+        return requested
+    try:
+        from settings import get_settings
+
+        return get_settings().gemini_model or "gemini-2.5-pro"
+    except Exception:
+        return "gemini-2.5-pro"
+
+
+@router.post("/estimate", response_model=EstimateRunResponse)
+def estimate_run(
+    req: EstimateRunRequest,
+    session: Session = Depends(get_session),
+    current: User = Depends(get_current_user),
+):
+    """Dry-run: estimate requests, tokens, wall time and cost without calling the model.
+
+    Mirrors the worker's chunk plan (auto char budget) and is cached by document checksum.
+    """
+    from corrector.doccache import CachedDocument, get_parse_cache
+    from corrector.estimate import estimate_paragraphs, summarize
+
+    proj = session.get(Project, req.project_id)
+    if not proj or proj.owner_id != current.id:
+        raise HTTPException(status_code=404, detail="Proyecto no encontrado")
+    if not req.document_ids:
+        raise HTTPException(status_code=400, detail="Debe indicar al menos un documento")
+
+    model_name = _estimate_model_name(req.model)
+    estimates = []
+    per_doc: list[DocumentEstimate] = []
+    for did in req.document_ids:
+        d = session.get(Document, did)
+        if not d or d.project_id != req.project_id:
+            raise HTTPException(status_code=404, detail=f"Documento inválido: {did}")
+
+        def _load(doc: Document = d) -> list[str] | CachedDocument:
+            if doc.path and os.path.exists(doc.path):
+                return get_parse_cache().load(doc.path, doc.checksum)
+            if doc.content_backup:
+                return doc.content_backup.split("\n")
+            raise HTTPException(status_code=404, detail=f"Documento sin contenido: {doc.id}")
+
+        est = estimate_paragraphs(None, model_name=model_name, checksum=d.checksum, loader=_load)
+        estimates.append(est)
+        per_doc.append(
+            DocumentEstimate(
+                document_id=d.id,
+                name=d.name,
+                checksum=d.checksum,
+                words=est.words,
+                chunks=est.chunks,
+                requests=est.requests,
+                input_tokens=est.input_tokens,
+                output_tokens=est.output_tokens,
+                expected_seconds=est.expected_seconds,
+                worst_case_seconds=est.worst_case_seconds,
+                cost_usd=est.cost_usd,
+            )
+        )
+
+    total = summarize(estimates)
+    return EstimateRunResponse(
+        model=model_name,
+        fallback_models=estimates[0].fallback_models,
+        min_interval_seconds=estimates[0].min_interval_seconds,
+        documents=per_doc,
+        requests=total["requests"],
+        input_tokens=total["input_tokens"],
+        output_tokens=total["output_tokens"],
+        expected_seconds=total["expected_seconds"],
+        worst_case_seconds=total["worst_case_seconds"],
+        cost_usd=total["cost_usd"],
+    )
+
+
 @router.get("/{run_id}", response_model=RunStatusResponse)
 def get_run_status(
     run_id: str, session: Session = Depends(get_session), current: User = Depends(get_current_user)
@@ -144,8 +274,40 @@ def get_run_status(
         if processed == total and total > 0
         else (RunStatus.processing.value if processed > 0 else RunStatus.queued.value)
     )
+    if run.status == RunStatus.canceled:
+        status = RunStatus.canceled.value
     return RunStatusResponse(
-        run_id=run.id, status=status, processed_documents=processed, total_documents=total
+        run_id=run.id,
+        status=status,
+        processed_documents=processed,
+        total_documents=total,
+        eta_seconds=None if run.status == RunStatus.canceled else get_job_queue().run_eta(run.id),
+    )
+
+
+@router.post("/{run_id}/cancel", response_model=CancelRunResponse)
+def cancel_run(
+    run_id: str, session: Session = Depends(get_session), current: User = Depends(get_current_user)
+):
+    """Cancel a run: its queued documents leave the queue and corrections in progress stop.
+
+    A correction stops at its next chunk or retry wait; the suggestions of the chunks it
+    finished are kept.
+    """
+    run = session.get(Run, run_id)
+    if not run or run.submitted_by != current.id:
+        raise HTTPException(status_code=404, detail="Run no encontrado")
+    if run.status in (RunStatus.completed, RunStatus.failed, RunStatus.canceled):
+        raise HTTPException(status_code=409, detail=f"El run ya ha terminado ({run.status.value})")
+    queued, in_progress = cancel_run_documents(run.id)
+    # Leases are gone, so workers elsewhere stop at their next heartbeat; ours right now
+    get_job_queue().cancel_run(run.id)
+    cancel_run_in_process(run.id)
+    return CancelRunResponse(
+        run_id=run.id,
+        status=RunStatus.canceled.value,
+        canceled_queued=queued,
+        canceled_in_progress=in_progress,
     )
 
 
@@ -156,6 +318,7 @@ class ExportInfo(BaseModel):
     name: str
     category: str
     size: int
+    checksum: str | None = None
 
 
 def _categorize_export(path: str) -> str:
@@ -183,10 +346,12 @@ def list_exports(
     exps = session.exec(select(Export).where(Export.run_id == run_id)).all()
     results: list[ExportInfo] = []
     for e in exps:
-        try:
-            size = os.path.getsize(e.path)
-        except Exception:
-            size = 0
+        size = e.size
+        if size is None:  # exports recorded before sizes were stored
+            try:
+                size = os.path.getsize(e.path)
+            except Exception:
+                size = 0
         results.append(
             ExportInfo(
                 id=e.id,
@@ -194,15 +359,19 @@ def list_exports(
                 name=os.path.basename(e.path),
                 category=_categorize_export(e.path),
                 size=size,
+                checksum=e.checksum,
             )
         )
     return results
 
 
 import csv
-import json as _json
+import tempfile
+from pathlib import Path
 
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse
+
+from corrector.engine import CHANGELOG_FIELDS
 
 
 @router.get("/{run_id}/exports/{export_id}/download")
@@ -219,6 +388,28 @@ def download_export(
     return FileResponse(exp.path, filename=filename)
 
 
+def _build_run_changelog(csv_path: Path, jsonl_paths: list[str]) -> None:
+    """Aggregate the run's JSONL logs into one CSV (written atomically)."""
+    fd, tmp = tempfile.mkstemp(dir=csv_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(["document", *CHANGELOG_FIELDS])
+            for p in jsonl_paths:
+                docname = os.path.basename(p).replace(".corrections.jsonl", "")
+                try:
+                    writer.writerows(
+                        [docname, *(obj.get(field, "") for field in CHANGELOG_FIELDS)]
+                        for obj in jsonio.read_jsonl(p)
+                    )
+                except FileNotFoundError:
+                    continue
+        os.replace(tmp, csv_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
 @router.get("/{run_id}/exports/csv")
 def export_csv(
     run_id: str, session: Session = Depends(get_session), current: User = Depends(get_current_user)
@@ -235,64 +426,13 @@ def export_csv(
     if not jsonl_paths:
         raise HTTPException(status_code=404, detail="No hay logs JSONL para este run")
 
-    def iter_csv():
-        out = io.StringIO()
-        writer = csv.writer(out)
-        header = [
-            "document",
-            "token_id",
-            "line",
-            "original",
-            "corrected",
-            "reason",
-            "context",
-            "chunk_index",
-            "sentence",
-        ]
-        writer.writerow(header)
-        yield out.getvalue()
-        out.seek(0)
-        out.truncate(0)
-        for p in jsonl_paths:
-            docname = os.path.basename(p).replace(".corrections.jsonl", "")
-            try:
-                with open(p, encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = _json.loads(line)
-                        except Exception:
-                            continue
-                        row = [
-                            docname,
-                            obj.get("token_id", ""),
-                            obj.get("line", ""),
-                            obj.get("original", ""),
-                            obj.get("corrected", ""),
-                            obj.get("reason", ""),
-                            obj.get("context", ""),
-                            obj.get("chunk_index", ""),
-                            obj.get("sentence", ""),
-                        ]
-                        writer.writerow(row)
-                        data = out.getvalue()
-                        if data:
-                            yield data
-                            out.seek(0)
-                            out.truncate(0)
-            except FileNotFoundError:
-                continue
-
-    import io
-
+    # The aggregate is cached next to the logs and rebuilt only when a log is newer
     filename = f"run_{run_id}_changelog.csv"
-    return StreamingResponse(
-        iter_csv(),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    csv_path = Path(jsonl_paths[0]).parent / filename
+    newest = max((os.path.getmtime(p) for p in jsonl_paths if os.path.exists(p)), default=0.0)
+    if not csv_path.exists() or csv_path.stat().st_mtime < newest:
+        _build_run_changelog(csv_path, jsonl_paths)
+    return FileResponse(str(csv_path), filename=filename, media_type="text/csv")
 
 
 @router.get("/{run_id}/changelog.csv")
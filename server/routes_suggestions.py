@@ -3,8 +3,11 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlmodel import Session, select
 
+from corrector import jsonio
+
 from .db import get_session
 from .deps import get_current_user
 from .models import Run, Suggestion, SuggestionStatus, User
@@ -15,28 +18,38 @@ from .schemas import (
     UpdateSuggestionStatusRequest,
 )
 
-router = APIRouter(prefix="/suggestions", tags=["suggestions"])
+# Suggestion lists of a whole book run into tens of thousands of items
+FastJSONResponse = ORJSONResponse if jsonio.HAS_ORJSON else JSONResponse
+
+router = APIRouter(
+    prefix="/suggestions", tags=["suggestions"], default_response_class=FastJSONResponse
+)
+
+
+def _suggestion_to_dict(suggestion: Suggestion) -> dict:
+    """Plain-dict form of SuggestionResponse (skips model validation for large lists)."""
+    return {
+        "id": suggestion.id,
+        "run_id": suggestion.run_id,
+        "document_id": suggestion.document_id,
+        "token_id": suggestion.token_id,
+        "line": suggestion.line,
+        "suggestion_type": suggestion.suggestion_type.value,
+        "severity": suggestion.severity.value,
+        "before": suggestion.before,
+        "after": suggestion.after,
+        "reason": suggestion.reason,
+        "source": suggestion.source.value,
+        "confidence": suggestion.confidence,
+        "context": suggestion.context,
+        "sentence": suggestion.sentence,
+        "status": suggestion.status.value,
+    }
 
 
 def _suggestion_to_response(suggestion: Suggestion) -> SuggestionResponse:
     """Convert Suggestion model to API response."""
-    return SuggestionResponse(
-        id=suggestion.id,
-        run_id=suggestion.run_id,
-        document_id=suggestion.document_id,
-        token_id=suggestion.token_id,
-        line=suggestion.line,
-        suggestion_type=suggestion.suggestion_type.value,
-        severity=suggestion.severity.value,
-        before=suggestion.before,
-        after=suggestion.after,
-        reason=suggestion.reason,
-        source=suggestion.source.value,
-        confidence=suggestion.confidence,
-        context=suggestion.context,
-        sentence=suggestion.sentence,
-        status=suggestion.status.value,
-    )
+    return SuggestionResponse(**_suggestion_to_dict(suggestion))
 
 
 @router.get("/runs/{run_id}/suggestions", response_model=SuggestionsListResponse)
@@ -65,10 +78,13 @@ def list_suggestions(
 
     suggestions = session.exec(query).all()
 
-    return SuggestionsListResponse(
-        run_id=run_id,
-        total=len(suggestions),
-        suggestions=[_suggestion_to_response(s) for s in suggestions],
+    # Serialized directly: the dicts already match SuggestionsListResponse
+    return FastJSONResponse(
+        {
+            "run_id": run_id,
+            "total": len(suggestions),
+            "suggestions": [_suggestion_to_dict(s) for s in suggestions],
+        }
     )
 
 
@@ -217,13 +233,8 @@ def export_document_with_accepted_corrections(
 
     from fastapi.responses import Response
 
-    from corrector.docx_utils import read_paragraphs
-    from corrector.text_utils import (
-        Correction,
-        apply_token_corrections,
-        detokenize,
-        tokenize,
-    )
+    from corrector.doccache import get_parse_cache
+    from corrector.text_utils import Correction, apply_token_corrections, detokenize
     from server.models import Document, RunDocument
     from server.storage import storage_base
 
@@ -258,10 +269,8 @@ def export_document_with_accepted_corrections(
     if not input_path.exists():
         raise HTTPException(status_code=404, detail="Source document file not found")
 
-    # Process document with accepted corrections only
-    paragraphs = read_paragraphs(str(input_path))
-    full_text = "\n".join(paragraphs)
-    tokens = tokenize(full_text)
+    # Same token ids the worker used: served from the parse cache by document checksum
+    tokens = get_parse_cache().load(str(input_path), doc.checksum).tokens()
 
     # Convert Suggestion records to correction specs
     corrections = []
@@ -1,12 +1,32 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field
+from typing import Any
 
 from .limits import FREE, PREMIUM, SYSTEM_MAX_WORKERS, PlanLimits
 
+# Queue order within a user: "fifo" (arrival) or "sjf" (shortest expected job first + aging).
+# Users always share the workers by weighted deficit round-robin, whatever the policy.
+POLICIES = ("fifo", "sjf")
+# Size assumed for a task whose document was not profiled yet (about a chapter)
+DEFAULT_TASK_WORDS = 10_000
+# SJF aging: a queued task gains this many words of priority per second it waits, so a
+# 100k-word novel goes ahead of newly arrived chapters after ~30 minutes
+AGING_WORDS_PER_SECOND = 50.0
+# Chunk count assumed per this many words when a document has no chunk plan yet
+ESTIMATED_CHUNK_WORDS = 1_000
+# Deficit round-robin: chunks of credit a user gets per turn and unit of plan weight
+DRR_QUANTUM_CHUNKS = 8
+# Throughput assumed for ETAs until finished tasks provide a measurement (EWMA)
+DEFAULT_SECONDS_PER_WORD = 0.02
+ETA_SMOOTHING = 0.2
+
 
 @dataclass
 class User:
@@ -26,6 +46,9 @@ class DocumentTask:
     mode: str  # "rapido" | "profesional"
     use_ai: bool = True
     created_at: float = field(default_factory=time.time)
+    # Size from the upload preprocessing; None when the document was not profiled yet
+    words: int | None = None
+    chunks: int | None = None
 
 
 @dataclass
@@ -36,28 +59,155 @@ class RunJob:
     documents: list[str]
     mode: str
     use_ai: bool = True
+    sizes: dict[str, tuple[int, int]] = field(default_factory=dict)  # doc id -> (words, chunks)
+
+
+class QueueNotifier:
+    """Wake-up channel for idle workers: a generation counter under a condition.
+
+    A waiter reads ``generation`` before looking for work and passes it to ``wait``,
+    so a ``notify`` that lands between an empty dispatch and the wait is not lost.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def wake(self) -> None:
+        """Wake the waiters of this process."""
+        with self._cond:
+            self._generation += 1
+            self._cond.notify_all()
+
+    def notify(self) -> None:
+        """New work or free capacity: wake every worker that may take it."""
+        self.wake()
+
+    def wait(self, seen: int, timeout: float) -> bool:
+        """Block until the generation moves past ``seen`` (True) or ``timeout`` (False)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._generation != seen, timeout)
+
+
+def task_words(task: DocumentTask) -> int:
+    return task.words if task.words is not None else DEFAULT_TASK_WORDS
+
+
+def task_chunks(task: DocumentTask) -> int:
+    """Cost of a task for deficit round-robin: its planned chunks, else an estimate."""
+    return chunk_cost(task.words, task.chunks)
+
+
+def chunk_cost(words: int | None, chunks: int | None) -> int:
+    if chunks is not None:
+        return max(1, chunks)
+    words = words if words is not None else DEFAULT_TASK_WORDS
+    return max(1, -(-words // ESTIMATED_CHUNK_WORDS))
+
+
+def drr_passes(needs: Iterable[tuple[int, int]]) -> tuple[int, int]:
+    """``(position, passes)`` of the ready user deficit round-robin serves next.
+
+    ``needs`` yields, in ring order from the cursor, each user's missing credit (its next
+    task's chunks minus its deficit) and its quantum. Rather than circling the ring until
+    some credit covers a task, the passes each user needs are computed directly and the
+    first user needing the fewest wins. ``needs`` is consumed only up to the first user a
+    single quantum satisfies. The caller credits the users up to the winner ``passes``
+    quanta and the ones after it ``passes - 1``, as those passes would have.
+    """
+    best: tuple[int, int] | None = None
+    for pos, (missing, quantum) in enumerate(needs):
+        passes = max(1, -(-missing // quantum))
+        if best is None or passes < best[1]:
+            best = (pos, passes)
+            if passes == 1:
+                break
+    if best is None:
+        raise ValueError("drr_passes needs at least one ready user")
+    return best
 
 
 class InMemoryScheduler:
     """Fair-share scheduler with per-user queues and plan-based quotas.
 
-    - Per-user queue of DocumentTask items.
-    - Round-robin across users (weighted by plan).
-    - Enforces per-user concurrent runs/docs and system-wide workers.
-    - Thread-safe, single process.
+    - Per-run queue of DocumentTask items, ordered by ``policy``: arrival order ("fifo")
+      or shortest expected job first with aging ("sjf", the default). The SJF priority is
+      ``words - aging * seconds_waited``; every queued task ages at the same rate, so it
+      is kept as the static heap key ``words + aging * enqueued_at``. A user's next task
+      is the best head among its runs.
+    - Users whose next task may start under their plan limits are *ready*, and are served
+      by weighted deficit round-robin under either policy: each turn in the ring grants a
+      user ``DRR_QUANTUM_CHUNKS * scheduler_weight`` chunks of credit and it dispatches
+      while its credit covers the next task's chunks, so premium gets three times the
+      share of free and a giant book waits for credit instead of starving small chapters.
+      A user at a limit leaves the ring until one of its documents finishes; its credit
+      is dropped once its queue empties.
+    - Enforces per-user concurrent runs/docs and system-wide workers with per-user and
+      per-run queued/active counters: dispatch and finish never scan the queues. A run
+      holds its slot while it has documents queued or running; a user whose run slots
+      are taken goes on with the best head among its active runs.
+    - Per-run ETA from the queued work and the measured seconds per word.
+    - Thread-safe, single process. The ``JOB_QUEUE=memory`` backend of
+      ``server.job_queue``: ``claim`` only dispatches, the worker leases the row itself.
+    - ``notifier`` wakes idle workers when tasks are enqueued or capacity is freed.
     """
 
-    def __init__(self, system_max_workers: int = SYSTEM_MAX_WORKERS) -> None:
-        self._queues: dict[str, deque[DocumentTask]] = defaultdict(deque)
+    durable = False
+
+    def __init__(
+        self,
+        system_max_workers: int = SYSTEM_MAX_WORKERS,
+        *,
+        policy: str = "sjf",
+        aging_words_per_s: float = AGING_WORDS_PER_SECOND,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Política de planificación desconocida: {policy}")
+        # Heap entries: (priority, sequence, task); only runs with queued tasks
+        self._run_queues: dict[str, list[tuple[float, int, DocumentTask]]] = {}
+        # Per user, lazy heap of its runs' heads: (priority, sequence, run_id), an entry
+        # being current while it is still the head of that run's queue
+        self._run_heads: dict[str, list[tuple[float, int, str]]] = {}
+        self._queued_by_user: dict[str, int] = defaultdict(int)
         self._active_docs_by_user: dict[str, int] = defaultdict(int)
         self._active_runs_by_user: dict[str, set[str]] = defaultdict(set)
+        self._active_by_run: dict[str, int] = defaultdict(int)
         self._active_total = 0
+        # Ready users in turn order, and their deficit round-robin credit in chunks
+        self._ring: OrderedDict[str, None] = OrderedDict()
+        self._deficit: dict[str, int] = {}
+        self._turn: str | None = None  # user at the cursor whose quantum was granted
         self._lock = threading.Lock()
         self._system_max_workers = system_max_workers
         self._users: dict[str, User] = {}
+        self.policy = policy
+        self._aging = aging_words_per_s
+        self._clock = clock
+        self._seq = itertools.count()
+        # (run_id, document_id) -> (task, dispatch time)
+        self._started: dict[tuple[str, str], tuple[DocumentTask, float]] = {}
+        self.seconds_per_word = DEFAULT_SECONDS_PER_WORD
+        self.notifier = QueueNotifier()
+
+    @property
+    def system_max_workers(self) -> int:
+        return self._system_max_workers
+
+    def set_system_max_workers(self, workers: int) -> None:
+        with self._lock:
+            self._system_max_workers = max(1, workers)
+        self.notifier.notify()
 
     def register_user(self, user: User) -> None:
-        self._users[user.id] = user
+        with self._lock:
+            self._users[user.id] = user
+            if user.id in self._run_heads:
+                self._refresh(user.id)  # the plan may have changed
 
     def _user_limits(self, user_id: str) -> PlanLimits:
         user = self._users.get(user_id) or User(id=user_id, plan="free")
@@ -66,33 +216,113 @@ class InMemoryScheduler:
     def enqueue_run(self, job: RunJob) -> None:
         lim = self._user_limits(job.user_id)
         docs = job.documents[: lim.max_docs_per_run]
+        if not docs:
+            return
         with self._lock:
+            now = self._clock()
+            queue = self._run_queues.setdefault(job.run_id, [])
             for doc_id in docs:
-                self._queues[job.user_id].append(
-                    DocumentTask(
-                        project_id=job.project_id,
-                        document_id=doc_id,
-                        user_id=job.user_id,
-                        run_id=job.run_id,
-                        mode=job.mode,
-                        use_ai=job.use_ai and lim.ai_enabled,
-                    )
+                words, chunks = job.sizes.get(doc_id, (None, None))
+                task = DocumentTask(
+                    project_id=job.project_id,
+                    document_id=doc_id,
+                    user_id=job.user_id,
+                    run_id=job.run_id,
+                    mode=job.mode,
+                    use_ai=job.use_ai and lim.ai_enabled,
+                    created_at=now,
+                    words=words,
+                    chunks=chunks,
                 )
+                heapq.heappush(queue, (self._priority(task), next(self._seq), task))
+            self._queued_by_user[job.user_id] += len(docs)
+            heads = self._run_heads.setdefault(job.user_id, [])
+            heapq.heappush(heads, (*queue[0][:2], job.run_id))
+            self._refresh(job.user_id)
+        self.notifier.notify()
 
-    def _can_dispatch(self, task: DocumentTask) -> bool:
-        lim = self._user_limits(task.user_id)
-        if self._active_total >= self._system_max_workers:
-            return False
-        if self._active_docs_by_user[task.user_id] >= lim.max_docs_concurrent:
-            return False
-        # Count runs: if this run is not already active, ensure we have capacity
-        run_active = task.run_id in self._active_runs_by_user[task.user_id]
-        if (
-            not run_active
-            and len(self._active_runs_by_user[task.user_id]) >= lim.max_runs_concurrent
-        ):
-            return False
-        return True
+    def _priority(self, task: DocumentTask) -> float:
+        if self.policy == "fifo":
+            return 0.0  # ties are broken by the arrival sequence
+        return task_words(task) + self._aging * task.created_at
+
+    def expected_seconds(self, task: DocumentTask) -> float:
+        return task_words(task) * self.seconds_per_word
+
+    def _next_run(self, user_id: str) -> str | None:
+        """Run whose head the user would start next under its plan limits, if any."""
+        if not self._queued_by_user.get(user_id):
+            return None
+        lim = self._user_limits(user_id)
+        if self._active_docs_by_user.get(user_id, 0) >= lim.max_docs_concurrent:
+            return None
+        runs = self._active_runs_by_user.get(user_id, ())
+        if len(runs) >= lim.max_runs_concurrent:
+            # No free run slot: only the active runs (a handful) may go on
+            heads = [(self._run_queues[r][0][:2], r) for r in runs if r in self._run_queues]
+            return min(heads)[1] if heads else None
+        heads = self._run_heads[user_id]
+        while True:  # drop the entries of heads already dispatched
+            _, seq, run_id = heads[0]
+            queue = self._run_queues.get(run_id)
+            if queue and queue[0][1] == seq:
+                return run_id
+            heapq.heappop(heads)
+
+    def _refresh(self, user_id: str) -> None:
+        """Move the user in or out of the ready set after its queue or counters changed."""
+        if self._next_run(user_id) is None:
+            self._ring.pop(user_id, None)
+            if self._turn == user_id:
+                self._turn = None
+            if user_id not in self._queued_by_user:
+                self._deficit.pop(user_id, None)
+            return
+        self._ring.setdefault(user_id, None)  # a newly ready user joins at the back
+
+    def _next_ready_user(self) -> str | None:
+        return self._next_drr_user()
+
+    def _quantum(self, user_id: str) -> int:
+        return DRR_QUANTUM_CHUNKS * self._user_limits(user_id).scheduler_weight
+
+    def _head_chunks(self, user_id: str) -> int:
+        return task_chunks(self._run_queues[self._next_run(user_id)][0][2])
+
+    def _next_drr_user(self) -> str | None:
+        """Weighted deficit round-robin over the ring of ready users (see ``drr_passes``).
+
+        A turn starts when the cursor reaches a user: it gets a quantum of credit and
+        keeps the turn while the credit covers its next task. A pick scans the ring at
+        most once, and stops at the first user a single quantum satisfies.
+        """
+        if not self._ring:
+            return None
+        first = next(iter(self._ring))
+        if self._turn == first:
+            if self._deficit[first] >= self._head_chunks(first):
+                return first
+            self._turn = None
+            self._ring.move_to_end(first)
+        quanta: list[int] = []
+
+        def needs() -> Iterator[tuple[int, int]]:
+            for user_id in self._ring:
+                quanta.append(self._quantum(user_id))
+                yield self._head_chunks(user_id) - self._deficit.get(user_id, 0), quanta[-1]
+
+        winner_pos, passes = drr_passes(needs())
+        # Users up to the winner are reached `passes` times, the ones after it one less
+        for pos, user_id in enumerate(self._ring):
+            if pos > winner_pos and passes == 1:
+                break
+            quantum = quanta[pos] if pos < len(quanta) else self._quantum(user_id)
+            grants = passes if pos <= winner_pos else passes - 1
+            self._deficit[user_id] = self._deficit.get(user_id, 0) + grants * quantum
+        for _ in range(winner_pos):
+            self._ring.move_to_end(next(iter(self._ring)))
+        self._turn = winner = next(iter(self._ring))
+        return winner
 
     def try_dispatch(self) -> DocumentTask | None:
         """Pick the next runnable DocumentTask based on fair-share.
@@ -100,39 +330,120 @@ class InMemoryScheduler:
         Returns a task and marks slots as used. Caller must call `finish(task)` when done.
         """
         with self._lock:
-            if not self._queues:
+            if self._active_total >= self._system_max_workers:
                 return None
-            # Create a stable round-robin order of users with queued tasks
-            users = [uid for uid, q in self._queues.items() if q]
-            if not users:
+            user_id = self._next_ready_user()
+            if user_id is None:
                 return None
-            # Simple round-robin: rotate users in-place
-            for uid in list(users):
-                q = self._queues[uid]
-                if not q:
-                    continue
-                peek = q[0]
-                if self._can_dispatch(peek):
-                    task = q.popleft()
-                    self._active_total += 1
-                    self._active_docs_by_user[task.user_id] += 1
-                    self._active_runs_by_user[task.user_id].add(task.run_id)
-                    return task
-            return None
+            run_id = self._next_run(user_id)
+            queue = self._run_queues[run_id]
+            task = heapq.heappop(queue)[2]
+            self._deficit[user_id] -= task_chunks(task)
+            if queue:
+                heapq.heappush(self._run_heads[user_id], (*queue[0][:2], run_id))
+            else:
+                del self._run_queues[run_id]
+            self._queued_by_user[user_id] -= 1
+            if not self._queued_by_user[user_id]:
+                del self._queued_by_user[user_id], self._run_heads[user_id]
+            self._active_by_run[run_id] += 1
+            self._active_total += 1
+            self._active_docs_by_user[user_id] += 1
+            self._active_runs_by_user[user_id].add(run_id)
+            self._started[(run_id, task.document_id)] = (task, self._clock())
+            self._refresh(user_id)  # keeps its turn / next head, if still runnable
+            return task
+
+    def claim(self, owner: str) -> DocumentTask | None:
+        """``JobQueue`` entry point: dispatch only (``owner`` leases the row in the DB)."""
+        return self.try_dispatch()
 
     def finish(self, task: DocumentTask) -> None:
+        self._release(task, processed=True)
+
+    def release(self, task: DocumentTask) -> None:
+        """Free the slot of a dispatched task nobody processed (its lease was taken)."""
+        self._release(task, processed=False)
+
+    def _release(self, task: DocumentTask, *, processed: bool) -> None:
+        with self._lock:
+            started = self._started.pop((task.run_id, task.document_id), None)
+            if started is None:
+                return  # not dispatched by this scheduler, or already finished
+            if processed and task.words:
+                # Learn the throughput used for ETAs from profiled documents only
+                sample = (self._clock() - started[1]) / task.words
+                self.seconds_per_word += ETA_SMOOTHING * (sample - self.seconds_per_word)
+            user_id, run_id = task.user_id, task.run_id
+            self._active_total -= 1
+            self._active_docs_by_user[user_id] -= 1
+            if not self._active_docs_by_user[user_id]:
+                del self._active_docs_by_user[user_id]
+            self._active_by_run[run_id] -= 1
+            if not self._active_by_run[run_id]:
+                del self._active_by_run[run_id]
+                # The run slot is free once none of its documents is running or queued
+                if run_id not in self._run_queues:
+                    runs = self._active_runs_by_user[user_id]
+                    runs.discard(run_id)
+                    if not runs:
+                        del self._active_runs_by_user[user_id]
+            self._refresh(user_id)
+        self.notifier.notify()
+
+    def cancel_run(self, run_id: str) -> int:
+        """Drop the queued tasks of ``run_id``; returns how many were dropped.
+
+        Its dispatched tasks are left to their workers (which ``finish`` them as usual);
+        the run slot is freed once none of them is left.
+        """
+        with self._lock:
+            queue = self._run_queues.pop(run_id, None)
+            if not queue:
+                return 0
+            user_id = queue[0][2].user_id
+            # The run's entries in _run_heads go stale and are dropped lazily
+            self._queued_by_user[user_id] -= len(queue)
+            if not self._queued_by_user[user_id]:
+                del self._queued_by_user[user_id], self._run_heads[user_id]
+            if not self._active_by_run.get(run_id):
+                runs = self._active_runs_by_user.get(user_id)
+                if runs is not None:
+                    runs.discard(run_id)
+                    if not runs:
+                        del self._active_runs_by_user[user_id]
+            self._refresh(user_id)
+        self.notifier.notify()
+        return len(queue)
+
+    def pending_keys(self) -> set[tuple[str, str]]:
+        """``(run_id, document_id)`` of the tasks queued or dispatched and not finished."""
+        with self._lock:
+            keys = {(e[2].run_id, e[2].document_id) for q in self._run_queues.values() for e in q}
+            return keys | set(self._started)
+
+    def run_eta(self, run_id: str) -> float | None:
+        """Seconds until every document of ``run_id`` is corrected; None if none is pending.
+
+        Adds the expected work of the queued tasks ordered up to the run's last one and
+        what is left of the active tasks, spread over the system workers. Tasks that arrive
+        later and jump ahead (SJF) or per-user limits that leave workers idle are not
+        foreseen, so it is an estimate, not a bound.
+        """
         with self._lock:
-            self._active_total = max(0, self._active_total - 1)
-            self._active_docs_by_user[task.user_id] = max(
-                0, self._active_docs_by_user[task.user_id] - 1
-            )
-            # If no more tasks for this run are active or queued for the user, free the run slot
-            if not any(t.run_id == task.run_id for t in self._queues[task.user_id]):
-                # Check also active docs for this run
-                still_active_for_run = False
-                # In this in-memory scheduler we can't easily count per-run actives; assume sequential per doc
-                if not still_active_for_run:
-                    self._active_runs_by_user[task.user_id].discard(task.run_id)
+            now = self._clock()
+            left = [
+                (t, max(0.0, self.expected_seconds(t) - (now - at)))
+                for t, at in self._started.values()
+            ]
+            ordered = [e[2] for e in sorted(e for q in self._run_queues.values() for e in q)]
+            last = max((i for i, t in enumerate(ordered) if t.run_id == run_id), default=-1)
+            if last < 0:
+                # Nothing queued: the run ends with its slowest active document
+                return max((s for t, s in left if t.run_id == run_id), default=None)
+            work = sum(self.expected_seconds(t) for t in ordered[: last + 1])
+            work += sum(s for _, s in left)
+            return work / max(1, self._system_max_workers)
 
     # Helper to drain tasks for testing/demo
     def drain(self) -> list[DocumentTask]:
@@ -145,3 +456,96 @@ class InMemoryScheduler:
             # Simulate immediate finish for demo purposes
             self.finish(task)
         return dispatched
+
+
+class ChunkJob:
+    """Chunk subtasks of one document being corrected; see ``ChunkFanout``."""
+
+    def __init__(self, count: int, run: Callable[[int], Any]) -> None:
+        self.count = count
+        self.results: list[Any] = [None] * count
+        self.error: BaseException | None = None
+        self._run = run
+        self._next = 0  # first chunk nobody took yet
+        self._running = 0
+
+    @property
+    def _open(self) -> bool:
+        return self.error is None and self._next < self.count
+
+
+class ChunkFanout:
+    """Process-local queue of the chunk subtasks of the documents in correction.
+
+    The thread that claimed a document (and holds its lease and scheduler slot) submits
+    its chunks and works through them; idle threads of the pool take chunks too
+    (``run_one``), oldest document first, so one large document uses every free worker
+    instead of one. Results are kept by chunk index for an ordered merge, and the first
+    error stops handing out the document's remaining chunks.
+    """
+
+    def __init__(self, on_submit: Callable[[], None] | None = None) -> None:
+        self._cond = threading.Condition()
+        self._jobs: deque[ChunkJob] = deque()  # documents with chunks nobody took yet
+        self._on_submit = on_submit
+
+    def submit(self, count: int, run: Callable[[int], Any]) -> ChunkJob:
+        """Offer ``count`` chunks; ``run(index)`` returns the result of chunk ``index``."""
+        job = ChunkJob(count, run)
+        with self._cond:
+            self._jobs.append(job)
+        if self._on_submit is not None:
+            self._on_submit()  # wake idle threads to help
+        return job
+
+    def _take(self, job: ChunkJob | None) -> tuple[ChunkJob, int] | None:
+        with self._cond:
+            if job is None:
+                if not self._jobs:
+                    return None
+                job = self._jobs[0]
+            if not job._open:
+                return None
+            index = job._next
+            job._next += 1
+            job._running += 1
+            if not job._open:
+                self._jobs.remove(job)  # the owner is at most a few jobs away from the head
+            return job, index
+
+    def run_one(
+        self, job: ChunkJob | None = None, on_start: Callable[[], None] | None = None
+    ) -> bool:
+        """Correct the next chunk of ``job`` (any document if None); False if none is left.
+
+        ``on_start`` is called once a chunk is taken, before it runs.
+        """
+        taken = self._take(job)
+        if taken is None:
+            return False
+        job, index = taken
+        if on_start is not None:
+            on_start()
+        try:
+            result = job._run(index)
+        except BaseException as e:
+            with self._cond:
+                if job.error is None:
+                    job.error = e
+                    if job in self._jobs:
+                        self._jobs.remove(job)
+        else:
+            job.results[index] = result
+        finally:
+            with self._cond:
+                job._running -= 1
+                self._cond.notify_all()
+        return True
+
+    def wait(self, job: ChunkJob) -> list[Any]:
+        """Wait for the chunks other threads took; results in chunk order or the error."""
+        with self._cond:
+            self._cond.wait_for(lambda: job._running == 0 and not job._open)
+        if job.error is not None:
+            raise job.error
+        return job.results
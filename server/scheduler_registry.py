@@ -2,15 +2,46 @@ from __future__ import annotations
 
 import os
 
+from .job_queue import LEASE_TTL_SECONDS, DBJobQueue, JobQueue
 from .limits import SYSTEM_MAX_WORKERS
 from .scheduler import InMemoryScheduler
 
 _scheduler: InMemoryScheduler | None = None
+_job_queue: JobQueue | None = None
 
 
 def get_scheduler() -> InMemoryScheduler:
     global _scheduler
     if _scheduler is None:
         sys_workers = int(os.environ.get("SYSTEM_MAX_WORKERS", str(SYSTEM_MAX_WORKERS)))
-        _scheduler = InMemoryScheduler(system_max_workers=sys_workers)
+        _scheduler = InMemoryScheduler(
+            system_max_workers=sys_workers,
+            policy=os.environ.get("SCHEDULER_POLICY", "sjf"),
+        )
     return _scheduler
+
+
+def get_job_queue() -> JobQueue:
+    """Queue backend from JOB_QUEUE: "db" (default, shared by processes) or "memory"."""
+    global _job_queue
+    if _job_queue is None:
+        if os.environ.get("JOB_QUEUE", "db").strip().lower() == "memory":
+            _job_queue = get_scheduler()
+        else:
+            _job_queue = DBJobQueue(
+                system_max_workers=int(
+                    os.environ.get("SYSTEM_MAX_WORKERS", str(SYSTEM_MAX_WORKERS))
+                ),
+                policy=os.environ.get("SCHEDULER_POLICY", "sjf"),
+                lock_ttl=float(os.environ.get("LOCK_TTL_SECONDS", str(LEASE_TTL_SECONDS))),
+            )
+    return _job_queue
+
+
+def embedded_worker() -> bool:
+    """Whether API processes run the worker pool (EMBEDDED_WORKER, default on).
+
+    With ``EMBEDDED_WORKER=0`` the API only writes queued RunDocuments; dedicated
+    ``corrector-worker`` processes claim and correct them.
+    """
+    return os.environ.get("EMBEDDED_WORKER", "1").strip().lower() not in ("0", "false", "no")
@@ -12,6 +12,22 @@ class MeLimits(BaseModel):
     ai_enabled: bool
 
 
+class WorkerPoolStats(BaseModel):
+    size: int
+    threads: int
+    busy: int
+    utilization: float  # busy / size right now
+    avg_utilization: float  # busy thread-seconds / (size * uptime)
+    busy_seconds: float
+    uptime_seconds: float
+    tasks_done: int
+    pending_exports: int
+
+
+class WorkerPoolResize(BaseModel):
+    size: int = Field(ge=1, le=64)
+
+
 class CreateRunRequest(BaseModel):
     project_id: str
     documents: list[str] = Field(default_factory=list)
@@ -5,81 +5,464 @@ import os
 import threading
 import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from sqlmodel import select
 
-from corrector.docx_utils import read_paragraphs, write_docx_preserving_runs, write_paragraphs
-from corrector.engine import LogEntry, process_paragraphs
-from corrector.model import HeuristicCorrector
-
+from corrector.cancel import Cancelled, CancelToken, cancel_scope, current_token
+from corrector.doccache import get_parse_cache
+from corrector.docx_utils import TrackChanges, write_paragraphs
+from corrector.engine import (
+    CorrectionResult,
+    LogEntry,
+    attach_partial,
+    correct_chunk,
+    correct_paragraphs,
+    merge_chunk_corrections,
+    plan_chunks,
+)
+from corrector.model import BaseCorrector, HeuristicCorrector
+from corrector.ratelimit import UsageScope, get_governor, llm_usage_scope
+from corrector.reasons import suggestion_type_for
+from corrector.text_utils import Token
+
+from .artifacts import ArtifactInputs, collect_artifacts, submit_artifacts
+from .job_queue import (
+    LEASE_TTL_SECONDS,
+    MAX_ATTEMPTS,
+    mark_exporting,
+    reap_expired_leases,
+    renew_lease,
+)
 from .models import (
     Document,
     Export,
-    ExportKind,
     Run,
     RunDocument,
     RunDocumentStatus,
     RunStatus,
+    UsageLog,
+    User,
 )
-from .scheduler import DocumentTask
-from .scheduler_registry import get_scheduler
+from .preprocess import document_sizes, load_chunk_plan
+from .scheduler import ChunkFanout, DocumentTask, InMemoryScheduler, RunJob, User as SUser
+from .scheduler_registry import get_job_queue
 from .storage import storage_base
 
 logger = logging.getLogger(__name__)
 
 
+def _docx_export_options() -> tuple[TrackChanges | None, bool]:
+    """Track-changes settings for the corrected DOCX and whether to build the table report."""
+    try:
+        from settings import get_settings
+
+        s = get_settings()
+    except Exception:
+        return None, True
+    track = TrackChanges(author=s.docx_revision_author) if s.docx_track_changes else None
+    return track, s.corrections_report_docx
+
+
+def enqueue_queued_tasks(sched: InMemoryScheduler) -> int:
+    """Put the DB's claimable queued RunDocuments into ``sched``; returns how many were added.
+
+    With the in-memory queue the DB rows stay the durable queue: the API rebuilds its
+    scheduler from them on startup, and the worker pool calls this on every reaper sweep
+    (``corrector-worker`` also every poll) to pick up runs created by other processes
+    and documents requeued after a lost lease once their backoff is over. Tasks already
+    queued or running in ``sched`` are skipped.
+    """
+    import datetime as dt
+
+    from sqlalchemy import or_
+
+    from .db import session_scope
+
+    pending = sched.pending_keys()
+    added = 0
+    with session_scope() as session:
+        rows = session.exec(
+            select(RunDocument, Run)
+            .join(Run, Run.id == RunDocument.run_id)
+            .where(
+                RunDocument.status == RunDocumentStatus.queued,
+                or_(
+                    RunDocument.available_at.is_(None),
+                    RunDocument.available_at <= dt.datetime.utcnow(),
+                ),
+            )
+        ).all()
+        for rd, run in rows:
+            if (rd.run_id, rd.document_id) in pending:
+                continue
+            user = session.get(User, run.submitted_by)
+            plan = (user.role.value if hasattr(user, "role") else "free") if user else "free"
+            sched.register_user(SUser(id=run.submitted_by, plan=plan))
+            doc = session.get(Document, rd.document_id)
+            sched.enqueue_run(
+                RunJob(
+                    user_id=run.submitted_by,
+                    run_id=run.id,
+                    project_id=run.project_id,
+                    documents=[rd.document_id],
+                    mode=run.mode.value if hasattr(run.mode, "value") else str(run.mode),
+                    use_ai=rd.use_ai if hasattr(rd, "use_ai") else False,
+                    sizes=document_sizes([doc] if doc else []),
+                )
+            )
+            added += 1
+    return added
+
+
+# Cancel tokens of the corrections running in this process, by run
+_run_tokens: dict[str, set[CancelToken]] = {}
+_run_tokens_lock = threading.Lock()
+
+
+def cancel_run_in_process(run_id: str) -> int:
+    """Cancel the corrections of ``run_id`` running in this process; returns how many.
+
+    Other processes learn it from their next heartbeat: ``cancel_run_documents`` took
+    their leases, so the renewal fails and ``_LeaseHeartbeat`` cancels the correction.
+    """
+    with _run_tokens_lock:
+        tokens = list(_run_tokens.get(run_id, ()))
+    for token in tokens:
+        token.cancel("run cancelado")
+    return len(tokens)
+
+
+def _track_cancel(run_id: str, token: CancelToken) -> None:
+    with _run_tokens_lock:
+        _run_tokens.setdefault(run_id, set()).add(token)
+
+
+def _untrack_cancel(run_id: str, token: CancelToken) -> None:
+    with _run_tokens_lock:
+        tokens = _run_tokens.get(run_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del _run_tokens[run_id]
+
+
+class _LeaseHeartbeat:
+    """Renews the lease of one document every ``interval`` seconds until stopped.
+
+    Once the lease is lost (reaped, or taken by a run cancellation) ``cancel`` is
+    cancelled, so the correction stops instead of spending LLM calls for nobody.
+    """
+
+    def __init__(
+        self, task: DocumentTask, owner: str, interval: float, cancel: CancelToken | None = None
+    ) -> None:
+        self._stop = threading.Event()
+        self._cancel = cancel
+        self.lost = False
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(task, owner, interval),
+            name=f"heartbeat-{task.document_id[:8]}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, task: DocumentTask, owner: str, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                if renew_lease(task.run_id, task.document_id, owner):
+                    continue
+            except Exception:
+                logger.warning("Error renovando lease", exc_info=True)
+                continue
+            if not self._stop.is_set():
+                self.lost = True
+                logger.warning(f"⚠️ Lease perdido: {task.document_id} ya no es de {owner}")
+                if self._cancel is not None:
+                    self._cancel.cancel("lease perdido")
+            return
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
 class Worker:
-    """Simple background worker that consumes scheduler tasks and runs the engine.
+    """Background worker pool that consumes scheduler tasks and runs the engine.
 
     - Uses HeuristicCorrector (cost 0) por ahora.
-    - Genera exportables: corrected doc + JSONL y DOCX de informe.
-    - Actualiza estados en DB.
+    - ``size`` correction threads (default: the scheduler's SYSTEM_MAX_WORKERS), each
+      dispatching and leasing its own tasks, so plan concurrency limits become parallel
+      documents. ``resize`` changes the pool (and the scheduler capacity) at runtime;
+      surplus threads leave after their current task. ``stats`` reports utilization.
+    - Chunk subtasks: the chunks of a document in correction go to a ``ChunkFanout``;
+      threads with nothing to claim correct them alongside the owner, so a large
+      document finishes faster the more workers are free. The merge keeps chunk order.
+    - Two stages: correction holds a scheduler slot; exports (corrected doc, JSONL, DOCX
+      de informe...) run on a separate export pool (EXPORT_WORKERS) after the slot is freed.
+    - Actualiza estados en DB (RunDocument/Run completed once its export is done).
+    - Cancellation: each correction runs under a ``CancelToken`` that
+      ``cancel_run_in_process`` or a lost lease cancels; it stops between chunks or in
+      a retry/quota wait and the suggestions of the chunks already done are kept.
+    - Leases: a heartbeat thread renews the lease of each document in hand (correction
+      and export, every LOCK_TTL_SECONDS/4); a reaper thread requeues documents of dead
+      workers with backoff, or dead-letters them after MAX_ATTEMPTS lost leases.
     """
 
-    def __init__(self, poll_interval: float = 0.5) -> None:
-        self._thread: threading.Thread | None = None
+    def __init__(self, poll_interval: float = 5.0, size: int | None = None) -> None:
+        self._threads: dict[int, threading.Thread] = {}
+        self._size = size
+        self._pool_lock = threading.Lock()
         self._stop = threading.Event()
+        # Idle threads sleep on the queue's notifier; this is only the fallback re-check
+        # (work from processes it cannot hear from, retries whose backoff ended)
         self._poll_interval = poll_interval
         self._worker_id = str(uuid.uuid4())
-        # Lease TTL (seconds) for locks; no heartbeat loop yet
+        # Lease TTL (seconds): renewed by heartbeats, reaped when a holder misses a TTL
         try:
-            self._lock_ttl = int(os.environ.get("LOCK_TTL_SECONDS", "300"))
+            self._lock_ttl = float(os.environ.get("LOCK_TTL_SECONDS", str(LEASE_TTL_SECONDS)))
         except ValueError:
-            self._lock_ttl = 300
+            self._lock_ttl = LEASE_TTL_SECONDS
+        try:
+            self._max_attempts = max(1, int(os.environ.get("MAX_ATTEMPTS", str(MAX_ATTEMPTS))))
+        except ValueError:
+            self._max_attempts = MAX_ATTEMPTS
+        self._heartbeats: dict[tuple[str, str], _LeaseHeartbeat] = {}
+        self._chunks = ChunkFanout(on_submit=lambda: get_job_queue().notifier.wake())
+        self._exporting: set[tuple[str, str]] = set()
+        self._reaper: threading.Thread | None = None
+        # How long stop() waits for in-flight corrections before giving up on them
+        try:
+            self._shutdown_timeout = float(os.environ.get("WORKER_SHUTDOWN_TIMEOUT", "10"))
+        except ValueError:
+            self._shutdown_timeout = 10.0
+        # Export stage: CPU-bound writers run on their own pool, apart from scheduler slots
+        try:
+            self._export_workers = max(1, int(os.environ.get("EXPORT_WORKERS", "2")))
+        except ValueError:
+            self._export_workers = 2
+        self._export_pool: ThreadPoolExecutor | None = None
+        self._pending_exports: set[Future] = set()
+        self._exports_lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        # Utilization: slot -> start of its current task, plus totals of finished ones
+        self._busy_since: dict[int, float] = {}
+        self._busy_seconds = 0.0
+        self._tasks_done = 0
+        self._started_at: float | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size or 0
 
     def start(self) -> None:
-        if self._thread and self._thread.is_alive():
-            return
-        self._stop.clear()
-        self._thread = threading.Thread(target=self._run_loop, name="worker", daemon=False)
-        self._thread.start()
-        logger.info("Worker started")
+        with self._pool_lock:
+            if any(t.is_alive() for t in self._threads.values()):
+                return
+            self._stop.clear()
+            if self._size is None:
+                self._size = get_job_queue().system_max_workers
+            if self._export_pool is None:
+                self._export_pool = ThreadPoolExecutor(
+                    max_workers=self._export_workers, thread_name_prefix="export"
+                )
+            self._started_at = time.monotonic()
+            self._spawn()
+            self._reaper = threading.Thread(target=self._reap_loop, name="lease-reaper")
+            self._reaper.start()
+        logger.info(f"Worker started ({self._size} hilos)")
+
+    def _spawn(self) -> None:
+        """Start a thread for every slot below the pool size that has none (pool lock held)."""
+        for slot in range(self.size):
+            thread = self._threads.get(slot)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(
+                    target=self._run_loop, args=(slot,), name=f"worker-{slot}", daemon=False
+                )
+                self._threads[slot] = thread
+                thread.start()
+
+    def resize(self, size: int) -> None:
+        """Set the number of correction threads and the scheduler's system capacity."""
+        size = max(1, size)
+        with self._pool_lock:
+            previous, self._size = self._size, size
+            # Also wakes idle threads: surplus ones leave, new capacity is used
+            get_job_queue().set_system_max_workers(size)
+            if self._started_at is not None and not self._stop.is_set():
+                self._spawn()
+        logger.info(f"🔧 Pool de workers: {previous} → {size} hilos")
 
     def stop(self) -> None:
         self._stop.set()
-        if self._thread:
-            self._thread.join(timeout=2)
+        get_job_queue().notifier.wake()  # idle threads see the stop flag now
+        # Threads finish the task in hand; all share one deadline
+        deadline = time.monotonic() + self._shutdown_timeout
+        with self._pool_lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        still_running = [t.name for t in threads if t.is_alive()]
+        if still_running:
+            logger.warning(f"⚠️ Hilos aún corrigiendo al parar: {', '.join(still_running)}")
+        if self._export_pool is not None:
+            # Let exports already handed over finish: their corrections are done
+            self._export_pool.shutdown(wait=True)
+            self._export_pool = None
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+
+    def _reap_loop(self) -> None:
+        """Every half TTL: requeue or dead-letter expired leases (any process may do it)."""
+        while not self._stop.wait(self._lock_ttl / 2):
+            try:
+                reap_expired_leases(self._lock_ttl, self._max_attempts)
+                queue = get_job_queue()
+                if not queue.durable:
+                    # The in-memory queue learns about requeued and new rows from the DB
+                    enqueue_queued_tasks(queue)
+            except Exception:
+                logger.exception("Error revisando leases expirados")
 
-    def _run_loop(self) -> None:
-        sched = get_scheduler()
-        while not self._stop.is_set():
-            task = sched.try_dispatch()
+    def _start_heartbeat(
+        self, task: DocumentTask, owner: str, cancel: CancelToken | None = None
+    ) -> None:
+        with self._exports_lock:
+            self._heartbeats[(task.run_id, task.document_id)] = _LeaseHeartbeat(
+                task, owner, self._lock_ttl / 4, cancel
+            )
+
+    def _stop_heartbeat(self, key: tuple[str, str], *, unless_exporting: bool = False) -> None:
+        with self._exports_lock:
+            if unless_exporting and key in self._exporting:
+                return  # the export stage holds the lease until it is saved
+            heartbeat = self._heartbeats.pop(key, None)
+        if heartbeat is not None:
+            heartbeat.stop()
+
+    def stats(self) -> dict:
+        """Pool size, busy threads and utilization (current and since start)."""
+        now = time.monotonic()
+        with self._pool_lock:
+            busy = len(self._busy_since)
+            busy_seconds = self._busy_seconds + sum(now - t for t in self._busy_since.values())
+            alive = sum(1 for t in self._threads.values() if t.is_alive())
+            uptime = now - self._started_at if self._started_at is not None else 0.0
+            size = self.size
+            tasks_done = self._tasks_done
+        return {
+            "size": size,
+            "threads": alive,
+            "busy": busy,
+            "utilization": busy / size if size else 0.0,
+            "avg_utilization": busy_seconds / (uptime * size) if uptime and size else 0.0,
+            "busy_seconds": busy_seconds,
+            "uptime_seconds": uptime,
+            "tasks_done": tasks_done,
+            "pending_exports": self.pending_exports,
+        }
+
+    def _run_loop(self, slot: int = 0) -> None:
+        queue = get_job_queue()
+        # Each thread holds its own leases
+        lease_owner = f"{self._worker_id}:{slot}"
+        while not self._stop.is_set() and slot < self.size:
+            seen = queue.notifier.generation
+            try:
+                task = queue.claim(lease_owner)
+            except Exception:
+                logger.exception("Error claiming a task")
+                task = None
             if not task:
-                time.sleep(self._poll_interval)
+                if not self._help_with_chunks(slot):
+                    queue.notifier.wait(seen, self._poll_interval)
                 continue
+            with self._pool_lock:
+                self._busy_since[slot] = time.monotonic()
+            cancel = CancelToken()
+            _track_cancel(task.run_id, cancel)
+            # A durable queue leased the row when claiming; otherwise lock it in DB now
+            locked = queue.durable
             try:
-                # Try to lock task in DB; if cannot, skip
-                if not self._try_lock_task(task):
-                    continue
-                self._process_task(task)
+                if not locked:
+                    locked = self._try_lock_task(task, lease_owner)
+                    if not locked:
+                        continue
+                self._start_heartbeat(task, lease_owner, cancel)
+                with cancel_scope(cancel):
+                    self._process_task(task)
             except Exception:
                 logger.exception("Error processing task")
             finally:
+                _untrack_cancel(task.run_id, cancel)
+                if locked:
+                    self._stop_heartbeat((task.run_id, task.document_id), unless_exporting=True)
                 try:
-                    sched.finish(task)
+                    # A task leased by another process is given back, not counted as done
+                    if locked:
+                        queue.finish(task)
+                    else:
+                        queue.release(task)
                 except Exception:
                     logger.warning("Error finishing task", exc_info=True)
+                with self._pool_lock:
+                    self._busy_seconds += time.monotonic() - self._busy_since.pop(slot)
+                    self._tasks_done += int(locked)
+
+    def _help_with_chunks(self, slot: int) -> bool:
+        """Correct one chunk of a document another thread is on; False if there is none.
+
+        The slot only counts as busy while the chunk runs, not while looking for one.
+        """
+
+        def busy() -> None:
+            with self._pool_lock:
+                self._busy_since[slot] = time.monotonic()
+
+        try:
+            return self._chunks.run_one(on_start=busy)
+        finally:
+            with self._pool_lock:
+                since = self._busy_since.pop(slot, None)
+                if since is not None:
+                    self._busy_seconds += time.monotonic() - since
+
+    def _correct(
+        self,
+        paragraphs: list[str],
+        corrector: BaseCorrector,
+        tokens: list[Token],
+        ranges: list[tuple[int, int]],
+        usage: UsageScope | None = None,
+    ) -> CorrectionResult:
+        """Correct a document, sharing its chunks with idle threads when it has several.
+
+        LLM calls are attributed to ``usage`` (and paced by its plan RPM) on every thread,
+        and the active cancel token is checked there too: a cancellation raises
+        ``Cancelled`` with the merge of the chunks already corrected.
+        """
+        if len(ranges) < 2 or self.size < 2:
+            with llm_usage_scope(usage):
+                return correct_paragraphs(paragraphs, corrector, tokens=tokens, chunks=ranges)
+
+        cancel = current_token()
+
+        def run(i: int) -> list:
+            with llm_usage_scope(usage), cancel_scope(cancel):
+                return correct_chunk(tokens, ranges, i, corrector)
+
+        job = self._chunks.submit(len(ranges), run)
+        while self._chunks.run_one(job):
+            pass
+        try:
+            results = self._chunks.wait(job)
+        except Cancelled as e:
+            attach_partial(e, paragraphs, tokens, ranges, job.results)
+            raise
+        return merge_chunk_corrections(paragraphs, tokens, ranges, results)
 
     def _process_task(self, task: DocumentTask) -> None:
         from .db import session_scope
@@ -100,7 +483,14 @@ class Worker:
             # Extraer valores antes de salir de la sesión
             doc_path = doc.path
             doc_name = doc.name
+            doc_checksum = doc.checksum
+            chunk_plan, planned_tokens = doc.chunk_plan, doc.token_count
             use_ai = run_doc.use_ai if hasattr(run_doc, "use_ai") else False
+            user = session.get(User, task.user_id)
+            plan = user.role.value if user and hasattr(user, "role") else "free"
+            usage = UsageScope(
+                task.user_id, SUser(id=task.user_id, plan=plan).limits().rate_limit_rpm
+            )
 
             # status/lock were set in _try_lock_task
             session.add(run_doc)
@@ -131,13 +521,7 @@ class Worker:
         out_base.mkdir(parents=True, exist_ok=True)
         # Usar el nombre original del documento (sin el prefijo de checksum) para los outputs
         stem = Path(doc_name).stem
-        # Salidas
         corrected_ext = ".docx" if input_path.suffix.lower() == ".docx" else ".txt"
-        corrected_path = out_base / f"{stem}.corrected{corrected_ext}"
-        log_jsonl_path = out_base / f"{stem}.corrections.jsonl"
-        log_docx_path = out_base / f"{stem}.corrections.docx"
-        changelog_csv_path = out_base / f"{stem}.changelog.csv"
-        summary_md_path = out_base / f"{stem}.summary.md"
 
         # Seleccionar corrector según configuración
         if use_ai:
@@ -157,92 +541,182 @@ class Worker:
         try:
             logger.info("📄 Processing document: %s", doc_name)
             logger.info("   Input: %s", input_path)
-            logger.info("   Output: %s", corrected_path)
-
-            # Process using process_paragraphs to get LogEntry objects
-            paragraphs = read_paragraphs(str(input_path))
-            corrected_paragraphs, log_entries = process_paragraphs(
-                paragraphs, corrector, chunk_words=0, overlap_words=0
+            logger.info("   Output: %s", out_base)
+
+            # Parse once (or load the parse cached at upload by checksum): the same
+            # paragraphs and tokens are corrected and written back
+            cached = get_parse_cache().load(str(input_path), doc_checksum)
+            parsed = cached.parsed(str(input_path))
+            paragraphs = parsed.texts if parsed else cached.paragraphs
+            tokens = cached.tokens()
+            ranges = load_chunk_plan(chunk_plan, planned_tokens, cached.token_count)
+            if ranges is None:
+                ranges = plan_chunks(tokens, chunk_words=0, overlap_words=0)
+            try:
+                result = self._correct(paragraphs, corrector, tokens, ranges, usage)
+            finally:
+                self._record_llm_usage(task.user_id)
+            cancel = current_token()
+            if cancel is not None and cancel.cancelled:
+                # Canceled during the last chunk: everything is corrected but not exported
+                error = Cancelled(cancel.reason)
+                error.partial = result
+                error.chunks_done = error.chunks_total = len(ranges)
+                raise error
+
+            # Corrections are merged: exports go to the export pool so the scheduler slot
+            # (LLM capacity) is released now instead of after the CPU-bound writing
+            track_changes, report_docx = _docx_export_options()
+            self._submit_export(
+                task,
+                ArtifactInputs(
+                    out_base=out_base,
+                    stem=stem,
+                    source_filename=doc_name,
+                    result=result,
+                    parsed=parsed,
+                    corrected_ext=corrected_ext,
+                    track_changes=track_changes,
+                    report_docx=report_docx,
+                ),
             )
+        except Cancelled as e:
+            self._record_canceled(task, e)
+        except Exception as e:
+            logger.exception("❌ Processing error: %s", e)
+            self._mark_failed(task, reason=f"engine error: {str(e)}")
 
-            # Save corrected document
-            if input_path.suffix.lower() == ".docx":
-                write_docx_preserving_runs(
-                    str(input_path), corrected_paragraphs, str(corrected_path)
-                )
-            else:
-                write_paragraphs(corrected_paragraphs, str(corrected_path))
-
-            # Persist suggestions to database
-            logger.info("💾 Saving %d suggestions to database...", len(log_entries))
-            self._persist_suggestions(task, log_entries)
-
-            # Write JSONL log for compatibility
-            self._write_log_jsonl(log_jsonl_path, log_entries)
+    def _record_canceled(self, task: DocumentTask, error: Cancelled) -> None:
+        """Keep the suggestions of the chunks corrected before the run was canceled."""
+        from .db import session_scope
 
-            # Write DOCX log
-            self._write_log_docx(log_docx_path, log_entries, source_filename=doc_name)
+        with session_scope() as session:
+            rd = session.exec(
+                select(RunDocument).where(
+                    RunDocument.run_id == task.run_id, RunDocument.document_id == task.document_id
+                )
+            ).first()
+            if rd is None or rd.status != RunDocumentStatus.canceled:
+                # Lease lost to the reaper: the document is requeued for someone else
+                logger.warning(f"⚠️ Corrección abandonada ({error.reason}): {task.document_id}")
+                return
+            if error.chunks_total:
+                rd.last_error = f"cancelado tras {error.chunks_done}/{error.chunks_total} chunks"
+                session.add(rd)
+        entries = error.partial.log_entries if error.partial is not None else []
+        if entries:
+            self._persist_suggestions(task, entries)
+        logger.info(
+            f"🛑 Documento {task.document_id} cancelado: "
+            f"{error.chunks_done}/{error.chunks_total} chunks, {len(entries)} sugerencias"
+        )
+
+    def _record_llm_usage(self, user_id: str) -> None:
+        """Write the LLM usage attributed to ``user_id`` in this process to UsageLog."""
+        from .db import session_scope
 
-            logger.info("✅ Document processing completed: %s", doc_name)
-            logger.info("📊 Building CSV changelog...")
-            # Construir CSV a partir del JSONL
-            self._build_csv_from_jsonl(log_jsonl_path, changelog_csv_path)
+        usage = get_governor().drain_usage(user_id)
+        if not any(usage.values()):
+            return
+        try:
+            with session_scope() as session:
+                session.add_all(
+                    [UsageLog(user_id=user_id, metric=m, amount=a) for m, a in usage.items() if a]
+                )
+        except Exception:
+            logger.warning("Error guardando el uso LLM", exc_info=True)
+
+    def _submit_export(self, task: DocumentTask, inputs: ArtifactInputs) -> None:
+        # Out of the plan limits while exporting; a canceled run still gets its suggestions
+        # saved (its status stays canceled), a reaped lease was requeued for someone else
+        if mark_exporting(task.run_id, task.document_id):
+            get_job_queue().notifier.notify()  # its plan slot is free for the user's next one
+        else:
+            logger.warning(f"⚠️ Documento {task.document_id} ya no está en curso al exportar")
+        pool = self._export_pool
+        if pool is None:  # worker not started (direct calls): export inline
+            self._export_document(task, inputs)
+            return
+        key = (task.run_id, task.document_id)
+        with self._exports_lock:
+            self._exporting.add(key)  # keeps the lease heartbeat beyond the correction
+        future = pool.submit(self._export_document, task, inputs)
+        with self._exports_lock:
+            self._pending_exports.add(future)
+        future.add_done_callback(lambda f: self._export_done(f, key))
+
+    def _export_done(self, future: Future, key: tuple[str, str]) -> None:
+        with self._exports_lock:
+            self._pending_exports.discard(future)
+            self._exporting.discard(key)
+        self._stop_heartbeat(key)
+
+    @property
+    def pending_exports(self) -> int:
+        """Documents corrected whose exports are still being written."""
+        with self._exports_lock:
+            return len(self._pending_exports)
+
+    def _export_document(self, task: DocumentTask, inputs: ArtifactInputs) -> None:
+        """Export stage: artifacts, suggestions and the RunDocument/Run status updates."""
+        from .db import session_scope
 
-            logger.info("📝 Building summary/editorial letter...")
-            # Construir carta editorial (resumen)
-            self._build_summary_md(summary_md_path, docname=stem, jsonl_path=log_jsonl_path)
+        t_export = time.perf_counter()
+        try:
+            # Every artifact is written in parallel from the in-memory entries while the
+            # suggestions are persisted on this thread
+            futures = submit_artifacts(inputs)
+            logger.info("💾 Saving %d suggestions to database...", len(inputs.entries))
+            self._persist_suggestions(task, inputs.entries)
+            artifacts = collect_artifacts(futures)
+            logger.info(
+                "✅ Document processing completed: %s (exports en %.2fs)",
+                inputs.source_filename,
+                time.perf_counter() - t_export,
+            )
+        except Exception as e:
+            logger.exception("❌ Export error: %s", e)
+            self._mark_failed(task, reason=f"export error: {str(e)}")
+            return
 
-            logger.info("💾 Saving exports to database...")
-            # Guardar exports
-            try:
-                with session_scope() as session:
-                    session.add_all(
-                        [
-                            Export(
-                                run_id=task.run_id, kind=ExportKind.docx, path=str(corrected_path)
-                            ),
-                            Export(
-                                run_id=task.run_id, kind=ExportKind.jsonl, path=str(log_jsonl_path)
-                            ),
-                            Export(
-                                run_id=task.run_id, kind=ExportKind.docx, path=str(log_docx_path)
-                            ),
-                            Export(
-                                run_id=task.run_id,
-                                kind=ExportKind.csv,
-                                path=str(changelog_csv_path),
-                            ),
-                            Export(
-                                run_id=task.run_id, kind=ExportKind.md, path=str(summary_md_path)
-                            ),
-                        ]
-                    )
-                    rd = session.exec(
-                        select(RunDocument).where(
-                            RunDocument.run_id == task.run_id,
-                            RunDocument.document_id == task.document_id,
+        logger.info("💾 Saving exports to database...")
+        try:
+            # Serialized so concurrent exports of one run agree on when it is complete
+            with self._status_lock, session_scope() as session:
+                session.add_all(
+                    [
+                        Export(
+                            run_id=task.run_id,
+                            kind=a.kind,
+                            path=str(a.path),
+                            size=a.size,
+                            checksum=a.checksum,
                         )
-                    ).first()
-                    if rd:
-                        rd.status = RunDocumentStatus.completed
-                        session.add(rd)
-                    # Update run status if all docs done
-                    rdocs = session.exec(
-                        select(RunDocument).where(RunDocument.run_id == task.run_id)
-                    ).all()
-                    if rdocs and all(r.status == RunDocumentStatus.completed for r in rdocs):
-                        r = session.get(Run, task.run_id)
-                        if r:
-                            r.status = RunStatus.completed
-                            session.add(r)
-                logger.info("✅ Exports saved successfully")
-            except Exception as db_error:
-                logger.exception("❌ Database error while saving exports: %s", db_error)
-                self._mark_failed(task, reason=f"database error: {str(db_error)}")
-                raise
-        except Exception as e:
-            logger.exception("❌ Processing error: %s", e)
-            self._mark_failed(task, reason=f"engine error: {str(e)}")
+                        for a in artifacts
+                    ]
+                )
+                rd = session.exec(
+                    select(RunDocument).where(
+                        RunDocument.run_id == task.run_id,
+                        RunDocument.document_id == task.document_id,
+                    )
+                ).first()
+                if rd and rd.status != RunDocumentStatus.canceled:
+                    rd.status = RunDocumentStatus.completed
+                    session.add(rd)
+                # Update run status if all docs done
+                rdocs = session.exec(
+                    select(RunDocument).where(RunDocument.run_id == task.run_id)
+                ).all()
+                if rdocs and all(r.status == RunDocumentStatus.completed for r in rdocs):
+                    r = session.get(Run, task.run_id)
+                    if r and r.status != RunStatus.canceled:
+                        r.status = RunStatus.completed
+                        session.add(r)
+            logger.info("✅ Exports saved successfully")
+        except Exception as db_error:
+            logger.exception("❌ Database error while saving exports: %s", db_error)
+            self._mark_failed(task, reason=f"database error: {str(db_error)}")
 
     def _mark_failed(self, task: DocumentTask, reason: str) -> None:
         from .db import session_scope
@@ -253,89 +727,55 @@ class Worker:
                     RunDocument.run_id == task.run_id, RunDocument.document_id == task.document_id
                 )
             ).first()
-            if rd:
+            if rd and rd.status != RunDocumentStatus.canceled:
                 rd.status = RunDocumentStatus.failed
                 rd.last_error = reason
                 rd.locked_by = None
                 rd.locked_at = None
                 session.add(rd)
             r = session.get(Run, task.run_id)
-            if r:
+            if r and r.status != RunStatus.canceled:
                 r.status = RunStatus.failed
                 session.add(r)
         logger.error("Task failed: %s (%s)", task, reason)
 
-    def _try_lock_task(self, task: DocumentTask) -> bool:
+    def _try_lock_task(self, task: DocumentTask, lease_owner: str | None = None) -> bool:
         """Attempt to acquire a DB lock (lease) for the RunDocument before processing.
 
+        Used with the in-memory queue (the DB queue leases when claiming). The lease is
+        taken with a single conditional UPDATE, so when several processes (API and
+        ``corrector-worker`` nodes) hold the same task only one of them wins it.
         Returns True if lock acquired; False otherwise.
         """
         import datetime as dt
 
+        from sqlalchemy import update
+
         from .db import session_scope
+        from .job_queue import claimable
 
         now = dt.datetime.utcnow()
         lease_deadline = now - dt.timedelta(seconds=self._lock_ttl)
 
         with session_scope() as session:
-            rd = session.exec(
-                select(RunDocument).where(
-                    RunDocument.run_id == task.run_id, RunDocument.document_id == task.document_id
+            result = session.execute(
+                update(RunDocument)
+                .where(
+                    RunDocument.run_id == task.run_id,
+                    RunDocument.document_id == task.document_id,
+                    # Queued and free (or its lease expired); never a finished one
+                    claimable(now, lease_deadline),
                 )
-            ).first()
-            if not rd:
-                return False
-            # If locked and not expired, someone else is working on it
-            if rd.locked_by and rd.locked_at and rd.locked_at > lease_deadline:
-                return False
-            # Acquire lock
-            rd.locked_by = self._worker_id
-            rd.locked_at = now
-            rd.status = RunDocumentStatus.processing
-            rd.attempt_count = (rd.attempt_count or 0) + 1
-            session.add(rd)
-            return True
-
-    def _build_csv_from_jsonl(self, jsonl_path: Path, csv_path: Path) -> None:
-        import csv
-        import json
-
-        with csv_path.open("w", newline="", encoding="utf-8") as f_out:
-            writer = csv.writer(f_out)
-            header = [
-                "token_id",
-                "line",
-                "original",
-                "corrected",
-                "reason",
-                "context",
-                "chunk_index",
-                "sentence",
-            ]
-            writer.writerow(header)
-            try:
-                with open(jsonl_path, encoding="utf-8") as f_in:
-                    for line in f_in:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                        except Exception:
-                            continue
-                        row = [
-                            obj.get("token_id", ""),
-                            obj.get("line", ""),
-                            obj.get("original", ""),
-                            obj.get("corrected", ""),
-                            obj.get("reason", ""),
-                            obj.get("context", ""),
-                            obj.get("chunk_index", ""),
-                            obj.get("sentence", ""),
-                        ]
-                        writer.writerow(row)
-            except FileNotFoundError:
-                pass
+                .values(
+                    locked_by=lease_owner or self._worker_id,
+                    locked_at=now,
+                    heartbeat_at=now,
+                    available_at=None,
+                    status=RunDocumentStatus.processing,
+                    attempt_count=RunDocument.attempt_count + 1,
+                )
+            )
+            return result.rowcount == 1
 
     def _persist_suggestions(self, task: DocumentTask, log_entries: list[LogEntry]) -> None:
         """Persist log entries as Suggestion records in database."""
@@ -344,10 +784,12 @@ class Worker:
 
         with session_scope() as session:
             for entry in log_entries:
-                # Classify suggestion type based on reason keywords
+                # Classify suggestion type: catalog code if present, else reason keywords
                 reason_lower = entry.reason.lower()
                 suggestion_type = SuggestionType.otro
-                if any(kw in reason_lower for kw in ["ortografía", "ortografia", "spelling"]):
+                if entry.reason_code:
+                    suggestion_type = SuggestionType(suggestion_type_for(entry.reason_code))
+                elif any(kw in reason_lower for kw in ["ortografía", "ortografia", "spelling"]):
                     suggestion_type = SuggestionType.ortografia
                 elif any(kw in reason_lower for kw in ["puntuación", "puntuacion", "punctuation"]):
                     suggestion_type = SuggestionType.puntuacion
@@ -385,79 +827,3 @@ class Worker:
                 )
                 session.add(suggestion)
             session.commit()
-
-    def _write_log_jsonl(self, path: Path, entries: list[LogEntry]) -> None:
-        """Write log entries to JSONL file."""
-        import json
-
-        with path.open("w", encoding="utf-8") as f:
-            for e in entries:
-                f.write(
-                    json.dumps(
-                        {
-                            "token_id": e.token_id,
-                            "line": e.line,
-                            "original": e.original,
-                            "corrected": e.corrected,
-                            "reason": e.reason,
-                            "context": e.context,
-                            "chunk_index": e.chunk_index,
-                            "sentence": e.sentence,
-                        },
-                        ensure_ascii=False,
-                    )
-                    + "\n"
-                )
-
-    def _write_log_docx(
-        self, path: Path, entries: list[LogEntry], source_filename: str | None = None
-    ) -> None:
-        """Write log entries to formatted DOCX file."""
-        # Import the existing function from engine
-        from corrector.engine import _write_log_docx as engine_write_log_docx
-
-        engine_write_log_docx(str(path), entries, source_filename=source_filename)
-
-    def _build_summary_md(self, summary_path: Path, *, docname: str, jsonl_path: Path) -> None:
-        import json
-        from collections import Counter
-
-        total = 0
-        reasons: Counter[str] = Counter()
-        try:
-            with open(jsonl_path, encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        obj = json.loads(line)
-                    except Exception:
-                        continue
-                    total += 1
-                    reasons[obj.get("reason", "")] += 1
-        except FileNotFoundError:
-            pass
-
-        top_reasons = reasons.most_common(10)
-        lines: list[str] = []
-        lines.append(f"# Carta de edición — {docname}")
-        lines.append("")
-        lines.append(f"Total de correcciones: {total}")
-        if top_reasons:
-            lines.append("")
-            lines.append("## Principales motivos")
-            for r, c in top_reasons:
-                if not r:
-                    r = "(sin motivo)"
-                lines.append(f"- {r}: {c}")
-        lines.append("")
-        lines.append("## Observaciones")
-        lines.append("- Este resumen se genera automáticamente a partir del log de correcciones.")
-        lines.append("- Revise las decisiones finales en el documento con control de cambios.")
-        lines.append("")
-        lines.append("## Próximos pasos sugeridos")
-        lines.append("- Acepte/rechace cambios en DOCX según criterio editorial.")
-        lines.append("- Revise consistencias intercapítulos y glosario del proyecto.")
-
-        summary_path.write_text("\n".join(lines), encoding="utf-8")
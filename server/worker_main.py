@@ -0,0 +1,141 @@
+"""``corrector-worker``: correction worker processes apart from the API.
+
+Run the API with ``EMBEDDED_WORKER=0`` so it only writes queued RunDocuments. With the
+DB job queue (default) each ``corrector-worker`` thread claims rows straight from the
+database; with ``JOB_QUEUE=memory`` each process keeps its own scheduler fed from those
+rows (every ``--poll`` seconds) and leases a document before correcting it. Either way
+several processes and machines can share one database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+
+from .limits import SYSTEM_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker process gets to finish its tasks after SIGTERM before it is killed
+STOP_GRACE_SECONDS = 60.0
+
+
+def serve(
+    threads: int | None = None, poll: float = 1.0, stop: threading.Event | None = None
+) -> None:
+    """Run one worker pool until ``stop`` is set (SIGINT/SIGTERM in the main thread)."""
+    from .db import init_db
+    from .migrate import run_migrations
+    from .scheduler_registry import get_job_queue, get_scheduler
+    from .worker import Worker, enqueue_queued_tasks
+
+    init_db()
+    try:
+        run_migrations()
+    except Exception as e:
+        logger.warning(f"⚠️ Error de migración: {e}")
+
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+    queue = get_job_queue()
+    worker = Worker(poll_interval=poll, size=threads)
+    if threads:
+        queue.set_system_max_workers(threads)
+    worker.start()
+    logger.info(f"🚀 corrector-worker (pid {os.getpid()}): {worker.size} hilos, sondeo {poll}s")
+    try:
+        while not stop.is_set():
+            if queue.durable:
+                stop.wait(poll)
+                continue
+            try:
+                added = enqueue_queued_tasks(get_scheduler())
+                if added:
+                    logger.info(f"📋 {added} tarea(s) nueva(s) en cola")
+            except Exception:
+                logger.exception("Error leyendo la cola de la base de datos")
+            stop.wait(poll)
+    finally:
+        logger.info("🛑 Parando corrector-worker...")
+        worker.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s", datefmt="%H:%M:%S")
+
+    parser = argparse.ArgumentParser(
+        description="Worker de corrección: reclama documentos en cola desde la base de datos"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.environ.get("SYSTEM_MAX_WORKERS", str(SYSTEM_MAX_WORKERS))),
+        help="Hilos de corrección por proceso (por defecto SYSTEM_MAX_WORKERS)",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Procesos worker a lanzar (por defecto 1)"
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=1.0,
+        help="Segundos entre re-comprobaciones de la cola sin aviso de otro proceso "
+        "(con PostgreSQL avisa LISTEN/NOTIFY; con SQLite solo el propio proceso)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        serve(args.threads, args.poll)
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    procs = [
+        multiprocessing.Process(
+            target=serve, args=(args.threads, args.poll), name=f"corrector-worker-{i}"
+        )
+        for i in range(args.processes)
+    ]
+    for proc in procs:
+        proc.start()
+    code = _supervise(procs, stop)
+    if code:
+        raise SystemExit(code)
+
+
+def _supervise(procs: list[multiprocessing.Process], stop: threading.Event) -> int:
+    """Wait on the worker processes until ``stop`` is set or one of them exits.
+
+    The others then get SIGTERM (``serve`` stops gracefully) and are joined, and killed
+    past ``STOP_GRACE_SECONDS``. Returns 1 if any process crashed, 0 otherwise.
+    """
+    while not stop.is_set() and all(proc.is_alive() for proc in procs):
+        wait([proc.sentinel for proc in procs], timeout=0.5)
+    for proc in procs:
+        if proc.is_alive():
+            proc.terminate()
+    deadline = time.monotonic() + STOP_GRACE_SECONDS
+    for proc in procs:
+        proc.join(max(0.0, deadline - time.monotonic()))
+        if proc.is_alive():
+            logger.error(f"⏱️ {proc.name} no paró en {STOP_GRACE_SECONDS:.0f}s: se mata")
+            proc.kill()
+            proc.join()
+    crashed = [proc for proc in procs if proc.exitcode]
+    for proc in crashed:
+        logger.error(f"💥 {proc.name} terminó con código {proc.exitcode}")
+    return 1 if crashed else 0
+
+
+if __name__ == "__main__":
+    main()
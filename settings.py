@@ -11,6 +11,15 @@ class Settings(BaseModel):
     google_api_key: str | None = None
     gemini_model: str | None = None
     gemini_fallback_model: str | None = None
+    # Structured output: "schema" (response schema), "tools" (function calling) or "json"
+    llm_structured_output: str = "schema"
+    # Output contract: "verbose" (objects with reasons) or "compact" (tuples with reason codes)
+    llm_output_format: str = "verbose"
+    llm_with_reasons: bool = False
+    # Corrected DOCX as Word track changes; the corrections table report becomes optional
+    docx_track_changes: bool = False
+    docx_revision_author: str = "Corrector"
+    corrections_report_docx: bool = True
 
     # Azure OpenAI settings
     azure_openai_endpoint: str | None = None
@@ -29,6 +38,13 @@ def get_settings() -> Settings:
         google_api_key=os.getenv("GOOGLE_API_KEY"),
         gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.5-pro"),
         gemini_fallback_model=os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.5-flash"),
+        llm_structured_output=os.getenv("LLM_STRUCTURED_OUTPUT", "schema"),
+        llm_output_format=os.getenv("LLM_OUTPUT_FORMAT", "verbose"),
+        llm_with_reasons=os.getenv("LLM_WITH_REASONS", "0").lower() in ("1", "true", "yes"),
+        docx_track_changes=os.getenv("DOCX_TRACK_CHANGES", "0").lower() in ("1", "true", "yes"),
+        docx_revision_author=os.getenv("DOCX_REVISION_AUTHOR", "Corrector"),
+        corrections_report_docx=os.getenv("CORRECTIONS_REPORT_DOCX", "1").lower()
+        in ("1", "true", "yes"),
         azure_openai_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         azure_openai_api_key=os.getenv("AZURE_OPENAI_API_KEY"),
         azure_openai_deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
@@ -0,0 +1,43 @@
+import hashlib
+from pathlib import Path
+
+from corrector.docx_utils import parse_document, read_paragraphs, write_paragraphs
+from corrector.engine import correct_paragraphs
+from corrector.model import HeuristicCorrector
+from server.artifacts import ArtifactInputs, write_artifacts
+from server.models import ExportKind
+
+
+def test_artifacts_written_from_memory_with_size_and_checksum(tmp_path: Path):
+    src = tmp_path / "capitulo.docx"
+    write_paragraphs(["La baca del coche estaba sucia.", "Luego decidió ojear el libro."], str(src))
+    parsed = parse_document(str(src))
+    result = correct_paragraphs(parsed.texts, HeuristicCorrector())
+
+    out = tmp_path / "run"
+    out.mkdir()
+    artifacts = write_artifacts(
+        ArtifactInputs(
+            out_base=out,
+            stem="capitulo",
+            source_filename="capitulo.docx",
+            result=result,
+            parsed=parsed,
+        )
+    )
+
+    assert [(a.kind, a.path.name) for a in artifacts] == [
+        (ExportKind.docx, "capitulo.corrected.docx"),
+        (ExportKind.jsonl, "capitulo.corrections.jsonl"),
+        (ExportKind.docx, "capitulo.corrections.docx"),
+        (ExportKind.csv, "capitulo.changelog.csv"),
+        (ExportKind.md, "capitulo.summary.md"),
+    ]
+    for a in artifacts:
+        data = a.path.read_bytes()
+        assert a.size == len(data) > 0
+        assert a.checksum == hashlib.sha256(data).hexdigest()
+    assert "La vaca del coche" in read_paragraphs(str(artifacts[0].path))[0]
+    assert len(artifacts[3].path.read_text(encoding="utf-8").splitlines()) == 1 + len(
+        result.log_entries
+    )
@@ -0,0 +1,101 @@
+import json
+from pathlib import Path
+
+from corrector import batch, engine
+from corrector.batch import build_jobs, plan_inputs, run_batch
+from corrector.docx_utils import read_paragraphs, write_paragraphs
+from corrector.text_utils import tokenize
+
+
+def test_plan_inputs_expands_dirs_and_globs(tmp_path: Path):
+    for name in ["cap1.docx", "cap2.docx", "cap1.corrected.docx", "~$cap1.docx", "notas.md"]:
+        write_paragraphs(["Hola."], str(tmp_path / name))
+    planned = plan_inputs([str(tmp_path), str(tmp_path / "cap*.docx")])
+    assert [p.name for p in planned] == ["cap1.docx", "cap2.docx"]
+
+
+def test_run_batch_process_pool_writes_outputs_and_summary(tmp_path: Path):
+    src = tmp_path / "libro"
+    src.mkdir()
+    for i in range(3):
+        write_paragraphs(
+            [f"Capítulo {i}.", "La baca del coche estaba sucia."], str(src / f"c{i}.docx")
+        )
+
+    out_dir = tmp_path / "out"
+    jobs = build_jobs(
+        plan_inputs([str(src)]),
+        out_dir,
+        model_name="local",
+        base_prompt="",
+        chunk_words=0,
+        overlap_words=0,
+        auto_chunk=False,
+        local_heuristics=True,
+        preserve_format=True,
+        log_docx=False,
+    )
+    summary_path = out_dir / "run_summary.json"
+    results = run_batch(jobs, max_workers=2, summary_path=summary_path)
+
+    assert [Path(r.input_path).name for r in results] == ["c0.docx", "c1.docx", "c2.docx"]
+    assert all(r.error is None and r.corrections == 1 for r in results)
+    assert "La vaca del coche" in "\n".join(read_paragraphs(str(out_dir / "c1.corrected.docx")))
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert summary["documents"] == 3
+    assert summary["corrections"] == 3
+
+
+def test_inputs_sharing_a_stem_get_distinct_outputs(tmp_path: Path):
+    for name in ["a/cap1.docx", "b/cap1.docx", "b/cap1.txt", "b/cap2.docx"]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        write_paragraphs(["Hola."], str(tmp_path / name))
+    inputs = [tmp_path / n for n in ["a/cap1.docx", "b/cap1.docx", "b/cap1.txt", "b/cap2.docx"]]
+    jobs = build_jobs(
+        inputs,
+        tmp_path / "out",
+        model_name="local",
+        base_prompt="",
+        chunk_words=0,
+        overlap_words=0,
+        auto_chunk=False,
+        local_heuristics=True,
+        preserve_format=True,
+        log_docx=True,
+    )
+    assert [Path(j.out_path).name for j in jobs] == [
+        "a__cap1.docx.corrected.docx",
+        "b__cap1.docx.corrected.docx",
+        "b__cap1.txt.corrected.txt",
+        "cap2.corrected.docx",
+    ]
+    for attr in ("out_path", "log_path", "log_docx_path"):
+        assert len({getattr(j, attr) for j in jobs}) == len(jobs)
+
+
+def test_run_document_tokenizes_once(tmp_path: Path, monkeypatch):
+    write_paragraphs(["La baca del coche.", "Otra frase."], str(tmp_path / "cap.docx"))
+    (job,) = build_jobs(
+        [tmp_path / "cap.docx"],
+        tmp_path / "out",
+        model_name="local",
+        base_prompt="",
+        chunk_words=0,
+        overlap_words=0,
+        auto_chunk=True,
+        local_heuristics=True,
+        preserve_format=True,
+        log_docx=False,
+    )
+    calls: list[str] = []
+
+    def counting_tokenize(text: str):
+        calls.append(text)
+        return tokenize(text)
+
+    monkeypatch.setattr(batch, "tokenize", counting_tokenize)
+    monkeypatch.setattr(engine, "tokenize", counting_tokenize)
+    result = batch.run_document(job)
+
+    assert result.error is None and result.corrections == 1
+    assert len(calls) == 1
@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+
+from docx import Document
+
+from corrector.doccache import FORMAT_VERSION, CachedDocument, ParseCache
+from corrector.docx_utils import parse_docx, write_docx_edits
+from corrector.text_utils import TextEdit, build_sentence_context, tokenize
+
+
+def _sample_docx(path: Path) -> None:
+    doc = Document()
+    p = doc.add_paragraph("Vio una ")
+    p.add_run("baca").bold = True
+    p.add_run(" & un «gato».")
+    p.add_run().add_tab()
+    p.add_run("¿Fin? Sí.")
+    doc.add_paragraph("Segundo párrafo 2024").add_run().add_break()
+    doc.add_paragraph("")
+    doc.save(str(path))
+
+
+def test_cached_entry_round_trips_tokens_and_parse(tmp_path: Path):
+    path = tmp_path / "libro.docx"
+    _sample_docx(path)
+    cache = ParseCache(tmp_path / "cache")
+
+    built = cache.load(str(path), "abc")
+    loaded = cache.get("abc")
+    assert loaded is not None and loaded._tokens is None  # decoded from disk
+    assert (tmp_path / "cache" / f"abc.v{FORMAT_VERSION}.bin").exists()
+
+    fresh = parse_docx(str(path))
+    assert loaded.paragraphs == built.paragraphs == fresh.texts
+    assert loaded.tokens() == tokenize("\n".join(fresh.texts))
+    assert loaded.word_count == sum(t.kind == "word" for t in loaded.tokens())
+
+    parsed = loaded.parsed(str(path))
+    assert parsed == fresh
+    # The writer works from the cached paragraph spans
+    out = tmp_path / "out.docx"
+    write_docx_edits(parsed, [TextEdit(0, 8, 12, "vaca")], str(out))
+    assert Document(str(out)).paragraphs[0].text.startswith("Vio una vaca & un")
+
+
+def test_sentence_span_matches_boundaries(tmp_path: Path):
+    path = tmp_path / "t.txt"
+    path.write_text("Hola, mundo. ¿Qué tal? (Bien.)\nOtra línea", encoding="utf-8")
+    doc = CachedDocument.build(str(path), "t")
+    tokens = tokenize(doc.text)
+    for i in range(len(tokens)):
+        start, end = doc.sentence_span(i)
+        if tokens[i].kind == "word":
+            text = "".join(t.text for t in tokens[start:end]).strip()
+            assert text == build_sentence_context(tokens, i)
+    assert doc.sentence_count == 4
+
+
+def test_other_versions_and_damaged_entries_are_misses(tmp_path: Path):
+    path = tmp_path / "t.txt"
+    path.write_text("Uno dos.", encoding="utf-8")
+    cache = ParseCache(tmp_path)
+    cache.put(CachedDocument.build(str(path), "k"))
+    entry = cache.entry_path("k")
+    data = bytearray(entry.read_bytes())
+    data[4] = FORMAT_VERSION + 1
+    entry.write_bytes(bytes(data))
+    assert cache.get("k") is None and not entry.exists()
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path: Path):
+    path = tmp_path / "t.txt"
+    path.write_text("palabra " * 200, encoding="utf-8")
+    cache = ParseCache(tmp_path / "c", max_bytes=10**9)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(CachedDocument.build(str(path), key))
+        os.utime(cache.entry_path(key), (1000 + i, 1000 + i))
+    assert cache.get("a") is not None  # touches "a": "b" is now the oldest
+    size = cache.entry_path("a").stat().st_size
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert [cache.get(k) is not None for k in "abc"] == [True, False, True]
+
+
+def test_load_ignores_entry_of_a_different_file(tmp_path: Path):
+    path = tmp_path / "t.txt"
+    path.write_text("Primera versión.", encoding="utf-8")
+    cache = ParseCache(tmp_path / "c")
+    cache.load(str(path), "k")
+    path.write_text("Texto recreado desde la copia.", encoding="utf-8")
+    assert cache.load(str(path), "k").paragraphs == ["Texto recreado desde la copia."]
+    assert cache.get("k").paragraphs == ["Primera versión."]
@@ -0,0 +1,224 @@
+import io
+import zipfile
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from corrector.docx_utils import (
+    TrackChanges,
+    UnsplicedEditError,
+    parse_docx,
+    read_docx_paragraphs,
+    read_paragraphs,
+    write_docx_edits,
+    write_docx_preserving_runs,
+)
+from corrector.text_utils import TextEdit
+
+
+def _sample_docx(path: Path) -> None:
+    doc = Document()
+    p = doc.add_paragraph("Hola ")
+    p.add_run("mundo").bold = True
+    p.add_run().add_tab()
+    p.add_run("tras tab")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "celda"
+    doc.add_paragraph("Segundo").add_run().add_break()
+    doc.add_paragraph("")
+    doc.save(str(path))
+
+
+def test_streaming_reader_matches_python_docx_paragraphs(tmp_path: Path):
+    path = tmp_path / "muestra.docx"
+    _sample_docx(path)
+
+    paras = read_docx_paragraphs(str(path))
+    expected = [p.text for p in Document(str(path)).paragraphs]
+    assert len(paras) == len(expected)  # table cells are not body-level paragraphs
+    assert paras[0].text == expected[0] == "Hola mundo\ttras tab"
+    assert paras[0].run_lengths == [5, 5, 8]
+    assert paras[0].fixed_offsets == [10]
+    # Line breaks are read as a space so the engine never splits the paragraph
+    assert paras[1].text == "Segundo "
+    assert paras[2].text == "" and paras[2].run_lengths == []
+    assert read_paragraphs(str(path)) == [p.text for p in paras]
+
+
+def test_minimal_writer_splices_text_and_copies_other_parts(tmp_path: Path):
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    doc = Document()
+    p = doc.add_paragraph("Vio una ")
+    p.add_run("ba").bold = True
+    p.add_run("ca & <b>")
+    p.add_run().add_tab()
+    p.add_run("fin")
+    doc.add_paragraph("Sin cambios")
+    doc.save(str(src))
+
+    # "baca" spans the bold and plain runs; the tab must survive
+    write_docx_preserving_runs(str(src), ["Vio una vaca & <c>\tfin", "Sin cambios"], str(out))
+
+    runs = Document(str(out)).paragraphs[0].runs
+    assert [(r.text, r.bold) for r in runs] == [
+        ("Vio una ", None),
+        ("va", True),
+        ("ca & <c>", None),
+        ("\t", None),
+        ("fin", None),
+    ]
+    with zipfile.ZipFile(src) as a, zipfile.ZipFile(out) as b:
+        assert b.testzip() is None
+        assert sorted(a.namelist()) == sorted(b.namelist())
+        for name in a.namelist():
+            if name != "word/document.xml":
+                assert a.read(name) == b.read(name)
+
+    write_docx_edits(str(src), [TextEdit(1, 0, 3, "Con")], str(out))
+    assert read_paragraphs(str(out)) == ["Vio una baca & <b>\tfin", "Con cambios"]
+
+
+def test_parsed_docx_matches_reader_and_feeds_the_writer(tmp_path: Path):
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    _sample_docx(src)
+
+    parsed = parse_docx(str(src))
+    assert parsed.paragraphs == read_docx_paragraphs(str(src))
+    assert parsed.prefix == "w" and len(parsed.spans) == len(parsed.paragraphs)
+    with zipfile.ZipFile(src) as zf:
+        xml = zf.read("word/document.xml")
+    for start, end in parsed.spans:
+        assert xml[start:].startswith(b"<w:p") and xml[:end].endswith((b"</w:p>", b"/>"))
+
+    # Edits are spliced into the paragraph spans of the same parse
+    write_docx_edits(parsed, [TextEdit(0, 5, 10, "gente"), TextEdit(1, 0, 7, "Otro")], str(out))
+    assert read_paragraphs(str(out))[:2] == ["Hola gente\ttras tab", "Otro "]
+
+
+def test_track_changes_writer_emits_revisions(tmp_path: Path):
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    _sample_docx(src)
+    parsed = parse_docx(str(src))
+
+    track = TrackChanges(author="Editorial", date=datetime(2026, 1, 2, tzinfo=UTC))
+    # "mundo" (bold run) -> "gente"
+    write_docx_edits(parsed, [TextEdit(0, 5, 10, "gente")], str(out), track_changes=track)
+
+    with zipfile.ZipFile(out) as zf:
+        xml = zf.read("word/document.xml").decode("utf-8")
+    assert '<w:del w:id="1" w:author="Editorial" w:date="2026-01-02T00:00:00Z">' in xml
+    assert '<w:delText xml:space="preserve">mundo</w:delText>' in xml
+    assert '<w:ins w:id="2"' in xml
+    # The bold run is split: before, deleted, inserted and after all keep its properties
+    assert xml.count("<w:b/>") == 4
+    # Accepting all changes gives the corrected text
+    assert read_paragraphs(str(out))[0] == "Hola gente\ttras tab"
+
+
+def _with_body(src: Path, dst: Path, body: str) -> None:
+    """Copy of ``src`` whose document.xml has ``body`` as the content of w:body."""
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item)
+            if item.filename == "word/document.xml":
+                xml = data.decode("utf-8")
+                start = xml.index("<w:body>") + len("<w:body>")
+                data = (xml[:start] + body + xml[xml.index("</w:body>") :]).encode("utf-8")
+            zout.writestr(item, data)
+
+
+def test_writer_skips_markup_and_quoted_gt_inside_paragraphs(tmp_path: Path):
+    plain, src, out = tmp_path / "plain.docx", tmp_path / "in.docx", tmp_path / "out.docx"
+    _sample_docx(plain)
+    _with_body(
+        plain,
+        src,
+        '<w:p><w:r><w:rPr><w:rFonts w:ascii="a>b"/></w:rPr><w:t>Hola </w:t></w:r>'
+        "<!-- <w:r><w:t>oculto</w:t></w:r> --><?editor <w:t>pi</w:t>?>"
+        "<w:r><w:t>mun<!-- c -->d<![CDATA[o<]]></w:t></w:r></w:p>",
+    )
+    assert read_paragraphs(str(src)) == ["Hola mundo<"]
+
+    write_docx_edits(str(src), [TextEdit(0, 5, 11, "gente")], str(out))
+    assert read_paragraphs(str(out)) == ["Hola gente"]
+    with zipfile.ZipFile(out) as zf:
+        xml = zf.read("word/document.xml").decode("utf-8")
+    assert 'w:ascii="a>b"' in xml and "<!-- <w:r><w:t>oculto</w:t></w:r> -->" in xml
+
+
+def test_writer_refuses_edits_for_paragraphs_without_text_nodes(tmp_path: Path):
+    plain, src, out = tmp_path / "plain.docx", tmp_path / "in.docx", tmp_path / "out.docx"
+    _sample_docx(plain)
+    _with_body(plain, src, "<w:p><w:r><w:tab/></w:r></w:p><w:p><w:r><w:t>Otro</w:t></w:r></w:p>")
+    assert read_paragraphs(str(src)) == ["\t", "Otro"]
+
+    with pytest.raises(UnsplicedEditError):
+        write_docx_edits(str(src), [TextEdit(0, 1, 1, "fin")], str(out))
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream, so zipfile falls back to data descriptors (flag bit 3)."""
+
+    def __init__(self, sink: io.BytesIO) -> None:
+        self.sink = sink
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.sink.write(data)
+
+
+def _rewrap(src: Path, dst: Path, **open_kwargs) -> None:
+    """Copy ``src`` member by member into ``dst`` with ``ZipFile.open(..., "w", **open_kwargs)``."""
+    sink = io.BytesIO()
+    target = _Unseekable(sink) if open_kwargs.pop("unseekable", False) else sink
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zout:
+        for name in zin.namelist():
+            with zout.open(name, "w", **open_kwargs) as member:
+                member.write(zin.read(name))
+    dst.write_bytes(sink.getvalue())
+
+
+def test_writer_copies_zip64_and_data_descriptor_members(tmp_path: Path):
+    plain = tmp_path / "plain.docx"
+    _sample_docx(plain)
+    for variant, kwargs in [("zip64", {"force_zip64": True}), ("stream", {"unseekable": True})]:
+        src, out = tmp_path / f"{variant}.docx", tmp_path / f"{variant}_out.docx"
+        _rewrap(plain, src, **kwargs)
+
+        write_docx_edits(str(src), [TextEdit(1, 0, 7, "Otro")], str(out))
+        with zipfile.ZipFile(src) as a, zipfile.ZipFile(out) as b:
+            assert b.testzip() is None
+            assert a.namelist() == b.namelist()
+            for name in a.namelist():
+                if name != "word/document.xml":
+                    assert a.read(name) == b.read(name)
+        assert read_paragraphs(str(out))[1] == "Otro "
+
+
+def test_writer_keeps_member_bytes_names_and_archive_comment(tmp_path: Path):
+    plain, src, out = tmp_path / "plain.docx", tmp_path / "src.docx", tmp_path / "out.docx"
+    _sample_docx(plain)
+    with zipfile.ZipFile(plain) as zin, zipfile.ZipFile(src, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            zout.writestr(item, zin.read(item))
+        zout.writestr("media/ñandú.bin", b"\x00" * 1000, compress_type=zipfile.ZIP_STORED)
+        zout.comment = b"comentario"
+
+    write_docx_edits(str(src), [TextEdit(1, 0, 7, "Otro")], str(out))
+    with zipfile.ZipFile(src) as a, zipfile.ZipFile(out) as b:
+        assert b.testzip() is None
+        assert b.comment == b"comentario"
+        assert a.namelist() == b.namelist()
+        for name in a.namelist():
+            if name != "word/document.xml":
+                old, new = a.getinfo(name), b.getinfo(name)
+                assert (old.compress_type, old.compress_size, old.CRC) == (
+                    new.compress_type,
+                    new.compress_size,
+                    new.CRC,
+                )
+                assert a.read(name) == b.read(name)
+    assert read_paragraphs(str(out))[1] == "Otro "
@@ -1,8 +1,19 @@
 from pathlib import Path
 
+import pytest
+
+from corrector.cancel import Cancelled, CancelToken
 from corrector.docx_utils import read_paragraphs, write_paragraphs
-from corrector.engine import process_document
+from corrector.engine import (
+    correct_chunk,
+    correct_paragraphs,
+    merge_chunk_corrections,
+    paragraphs_to_text,
+    plan_chunks,
+    process_document,
+)
 from corrector.model import HeuristicCorrector
+from corrector.text_utils import tokenize
 
 
 def test_process_document_with_heuristic_corrector(tmp_path: Path):
@@ -35,3 +46,42 @@ def test_process_document_with_heuristic_corrector(tmp_path: Path):
     # Quick shape check: JSON lines contain keys we expect
     assert '"original"' in log_lines[0]
     assert '"corrected"' in log_lines[0]
+
+
+def test_chunks_corrected_out_of_order_merge_like_sequential():
+    paragraphs = ["La baca del coche estaba sucia.", "Luego decidió ojear el libro."] * 4
+    corrector = HeuristicCorrector()
+    tokens = tokenize(paragraphs_to_text(paragraphs))
+    ranges = plan_chunks(tokens, chunk_words=6, overlap_words=2)
+    assert len(ranges) > 2
+
+    by_chunk = [None] * len(ranges)
+    for i in reversed(range(len(ranges))):  # as helper threads may finish them
+        by_chunk[i] = correct_chunk(tokens, ranges, i, corrector)
+    merged = merge_chunk_corrections(paragraphs, tokens, ranges, by_chunk)
+
+    sequential = correct_paragraphs(paragraphs, corrector, chunk_words=6, overlap_words=2)
+    assert merged.paragraphs == sequential.paragraphs
+    assert [(e.token_id, e.chunk_index) for e in merged.log_entries] == [
+        (e.token_id, e.chunk_index) for e in sequential.log_entries
+    ]
+
+
+def test_cancel_stops_between_chunks_and_keeps_the_chunks_done():
+    paragraphs = ["La baca del coche estaba sucia."] * 4
+    token = CancelToken()
+    calls = []
+
+    class CancelAfterFirst(HeuristicCorrector):
+        def correct_tokens(self, tokens):
+            calls.append(len(tokens))
+            token.cancel()  # e.g. POST /runs/{id}/cancel while the first chunk is in flight
+            return super().correct_tokens(tokens)
+
+    with pytest.raises(Cancelled) as exc:
+        correct_paragraphs(paragraphs, CancelAfterFirst(), chunk_words=6, cancel=token)
+    err = exc.value
+    assert len(calls) == 1 and err.chunks_done == 1 and err.chunks_total > 1
+    assert err.partial.paragraphs[0] == "La vaca del coche estaba sucia."
+    assert err.partial.paragraphs[1:] == paragraphs[1:]
+    assert [e.chunk_index for e in err.partial.log_entries] == [0]
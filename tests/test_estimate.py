@@ -0,0 +1,58 @@
+from corrector.estimate import estimate_paragraphs, model_profile, summarize
+from corrector.prompt import build_json_prompt
+
+
+def test_estimate_pro_vs_flash_pacing_and_cost():
+    paragraphs = ["La baca del coche estaba sucia. " * 200] * 10
+    pro = estimate_paragraphs(
+        paragraphs, model_name="gemini-2.5-pro", chunk_words=1000, fallback_models=[]
+    )
+    flash = estimate_paragraphs(
+        paragraphs, model_name="gemini-2.5-flash", chunk_words=1000, fallback_models=[]
+    )
+    assert pro.words == 12000
+    assert pro.requests == pro.chunks >= 12
+    assert pro.min_interval_seconds == 30 and flash.min_interval_seconds == 4
+    # Pacing dominates: at least (n-1) intervals
+    assert pro.expected_seconds >= 30 * (pro.requests - 1)
+    assert flash.expected_seconds < pro.expected_seconds
+    assert flash.cost_usd["gemini-2.5-flash"] < pro.cost_usd["gemini-2.5-pro"]
+
+
+def test_estimate_is_cached_by_checksum():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return ["Hola mundo."]
+
+    kwargs = dict(model_name="gemini-2.5-flash", checksum="abc123", fallback_models=["gpt-5"])
+    first = estimate_paragraphs(None, loader=loader, **kwargs)
+    second = estimate_paragraphs(None, loader=loader, **kwargs)
+    assert first is second
+    assert len(calls) == 1
+    assert set(first.cost_usd) == {"gemini-2.5-flash", "gpt-5"}
+    assert first.worst_case_seconds >= first.expected_seconds
+    assert summarize([first, second])["requests"] == 2
+
+
+def test_model_profile_prefix_match():
+    assert model_profile("gemini-2.5-flash-preview-09").name == "gemini-2.5-flash"
+    assert model_profile("gpt-4.1-mini").name == "gpt-4.1-mini"
+
+
+def test_compact_output_changes_the_prompt_and_the_cache_entry():
+    paragraphs = ["La baca del coche estaba sucia. " * 50] * 4
+    kwargs = dict(model_name="gemini-2.5-flash", fallback_models=[], checksum="cmp")
+    verbose = estimate_paragraphs(paragraphs, **kwargs)
+    compact = estimate_paragraphs(paragraphs, compact_output=True, **kwargs)
+
+    prompt_delta = (
+        len(build_json_prompt("", [], compact=True)) - len(build_json_prompt("", []))
+    ) // 4
+    assert compact is not verbose
+    assert abs(compact.input_tokens - verbose.input_tokens - prompt_delta * compact.chunks) <= (
+        compact.chunks
+    )
+    assert compact.output_tokens < verbose.output_tokens
+    assert estimate_paragraphs(None, compact_output=True, loader=lambda: [], **kwargs) is compact
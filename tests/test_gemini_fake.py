@@ -31,9 +31,9 @@ class _Resp:
         self.candidates = candidates
 
 
-class _ResponsesAPI:
-    def generate(self, model, contents, **kwargs):
-        prompt = contents
+class _ModelsAPI:
+    def generate_content(self, model, contents, config=None):
+        prompt = contents[0]["parts"][0]["text"]
         # find token ids for target words in the prompt rendering
         m_baca = re.search(r"(\d+):W:baca\b", prompt)
         m_ojear = re.search(r"(\d+):W:ojear\b", prompt)
@@ -62,11 +62,11 @@ class _ResponsesAPI:
 
 class _FakeClient:
     def __init__(self):
-        self.responses = _ResponsesAPI()
+        self.models = _ModelsAPI()
 
 
 def test_gemini_corrector_with_tools_preserves_proper_names(monkeypatch, tmp_path: Path):
-    # Monkeypatch client factory to use fake responses API
+    # Monkeypatch client factory to use fake models API
     import corrector.model as model_mod
 
     monkeypatch.setattr(model_mod, "get_gemini_client", lambda: _FakeClient())
@@ -85,7 +85,7 @@ def test_gemini_corrector_with_tools_preserves_proper_names(monkeypatch, tmp_pat
     out_doc = tmp_path / "salida.docx"
     log_json = tmp_path / "log.jsonl"
 
-    corr = GeminiCorrector(base_prompt_text="")
+    corr = GeminiCorrector(base_prompt_text="", structured_output="tools")
     process_document(
         str(input_doc), str(out_doc), str(log_json), corr, chunk_words=0, overlap_words=0
     )
@@ -0,0 +1,274 @@
+import datetime as dt
+import threading
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlmodel import SQLModel, create_engine, select
+
+from server import db
+from server.db import session_scope
+from server.job_queue import (
+    DBJobQueue,
+    cancel_run_documents,
+    mark_exporting,
+    reap_expired_leases,
+    renew_lease,
+)
+from server.models import (
+    Document,
+    Project,
+    Run,
+    RunDocument,
+    RunDocumentStatus,
+    RunStatus,
+    SchedulerCredit,
+    User,
+)
+from server.scheduler import RunJob
+
+
+@pytest.fixture()
+def queue(tmp_path: Path, monkeypatch) -> DBJobQueue:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db, "engine", engine)
+    return DBJobQueue(system_max_workers=4)
+
+
+def _submit(queue: DBJobQueue, role: str, words: list[int], user_id: str | None = None) -> str:
+    """Create a user (unless given), a run of one document per entry of ``words`` and enqueue it."""
+    with session_scope() as session:
+        if user_id is None:
+            user = User(email=f"{uuid.uuid4()}@example.com", password_hash="x", role=role)
+            session.add(user)
+            user_id = user.id
+        project = Project(owner_id=user_id, name="p")
+        run = Run(project_id=project.id, submitted_by=user_id)
+        docs = [Document(project_id=project.id, name=f"{n}.txt", word_count=n) for n in words]
+        session.add_all([project, run, *docs])
+        session.add_all([RunDocument(run_id=run.id, document_id=d.id, use_ai=False) for d in docs])
+        job = RunJob(
+            user_id,
+            run.id,
+            project.id,
+            [d.id for d in docs],
+            "rapido",
+            sizes={d.id: (d.word_count, 1) for d in docs},
+        )
+    queue.enqueue_run(job)
+    return user_id
+
+
+def test_claims_follow_plan_limits_and_shortest_first(queue):
+    premium = _submit(queue, "premium", [90_000, 2_000, 30_000])
+    free = _submit(queue, "free", [5_000])
+    _submit(queue, "free", [1_000], user_id=free)  # a second run of the same free user
+
+    claimed = [queue.claim("w") for _ in range(6)]
+    tasks = [t for t in claimed if t is not None]
+    # Premium: 3 documents of one run; free: 1 document (the shortest of its 2 runs)
+    assert sorted((t.user_id, t.words) for t in tasks) == sorted(
+        [(premium, 2_000), (premium, 30_000), (premium, 90_000), (free, 1_000)]
+    )
+    # Fair share: the free user gets its document before premium's second one
+    assert [t.user_id for t in tasks[:2]].count(free) == 1
+    assert queue.claim("w") is None
+
+    with session_scope() as session:
+        rd = session.exec(
+            select(RunDocument).where(RunDocument.document_id == tasks[0].document_id)
+        ).one()
+        assert rd.status == RunDocumentStatus.processing and rd.locked_by == "w"
+        rd.status = RunDocumentStatus.completed  # done: the free user may go on
+        session.add(rd)
+    follow_up = queue.claim("w")
+    assert follow_up is not None and follow_up.user_id == tasks[0].user_id
+
+
+def test_plan_caps_documents_per_run(queue):
+    _submit(queue, "free", [1_000, 2_000])
+    with session_scope() as session:
+        statuses = sorted(rd.status.value for rd in session.exec(select(RunDocument)).all())
+    assert statuses == ["failed", "queued"]
+
+
+def test_concurrent_claims_never_share_a_document(queue):
+    for _ in range(12):
+        _submit(queue, "premium", [1_000, 2_000, 3_000])
+    taken: list[str] = []
+    lock = threading.Lock()
+
+    def worker(n: int) -> None:
+        while (task := queue.claim(f"w{n}")) is not None:
+            with lock:
+                taken.append(task.document_id)
+            with session_scope() as session:
+                rd = session.exec(
+                    select(RunDocument).where(RunDocument.document_id == task.document_id)
+                ).one()
+                rd.status = RunDocumentStatus.completed
+                session.add(rd)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(taken) == len(set(taken)) == 36
+
+
+def _complete(document_id: str) -> None:
+    with session_scope() as session:
+        rd = session.exec(select(RunDocument).where(RunDocument.document_id == document_id)).one()
+        rd.status = RunDocumentStatus.completed
+        session.add(rd)
+
+
+def test_claims_share_by_plan_weight_with_deficit_round_robin(queue):
+    free = None
+    for _ in range(4):
+        free = _submit(queue, "free", [8_000], user_id=free)  # one document per run
+    premium = None
+    for _ in range(2):
+        premium = _submit(queue, "premium", [8_000, 8_000, 8_000], user_id=premium)
+
+    order = []
+    for _ in range(8):
+        task = queue.claim("w")
+        order.append("f" if task.user_id == free else "u")
+        _complete(task.document_id)
+    # 8 chunks per document: a free quantum pays one, a premium quantum three
+    assert order == ["f", "u", "u", "u", "f", "u", "u", "u"]
+    with session_scope() as session:
+        credit = {c.user_id: c.deficit for c in session.exec(select(SchedulerCredit)).all()}
+    assert credit == {free: 0, premium: 0}
+
+
+def test_claims_do_not_starve_small_chapters_behind_a_giant_book(queue):
+    free = _submit(queue, "free", [400_000])  # 400 chunks, arrived first
+    premium = _submit(queue, "premium", [4_000, 4_000, 4_000])
+    order = []
+    for _ in range(4):
+        task = queue.claim("w")
+        order.append(task.user_id)
+        _complete(task.document_id)
+    assert order == [premium, premium, premium, free]
+
+
+def _silence(document_id: str, seconds: float) -> None:
+    """Pretend the lease holder of ``document_id`` has not been heard of for ``seconds``."""
+    with session_scope() as session:
+        rd = session.exec(select(RunDocument).where(RunDocument.document_id == document_id)).one()
+        rd.locked_at = rd.heartbeat_at = dt.datetime.utcnow() - dt.timedelta(seconds=seconds)
+        session.add(rd)
+
+
+def _row(document_id: str) -> RunDocument:
+    with session_scope() as session:
+        rd = session.exec(select(RunDocument).where(RunDocument.document_id == document_id)).one()
+        session.expunge(rd)
+        return rd
+
+
+def test_heartbeat_keeps_the_lease_alive(queue):
+    _submit(queue, "premium", [1_000])
+    task = queue.claim("w")
+    _silence(task.document_id, 50)
+    assert renew_lease(task.run_id, task.document_id, "w")
+    assert not renew_lease(task.run_id, task.document_id, "other")
+    assert reap_expired_leases(lock_ttl=60) == (0, 0)
+    assert _row(task.document_id).locked_by == "w"
+
+
+def test_reaper_requeues_with_backoff_then_dead_letters(queue):
+    _submit(queue, "premium", [1_000])
+    task = queue.claim("w1")
+    _silence(task.document_id, 120)
+
+    assert reap_expired_leases(lock_ttl=60, max_attempts=2) == (1, 0)
+    rd = _row(task.document_id)
+    assert rd.status == RunDocumentStatus.queued and rd.locked_by is None
+    assert rd.available_at > dt.datetime.utcnow()
+    assert queue.claim("w2") is None  # still backing off
+
+    with session_scope() as session:
+        row = session.get(RunDocument, rd.id)
+        row.available_at = dt.datetime.utcnow()
+        session.add(row)
+    assert queue.claim("w2") is not None
+    assert _row(task.document_id).attempt_count == 2
+
+    _silence(task.document_id, 120)
+    assert reap_expired_leases(lock_ttl=60, max_attempts=2) == (0, 1)
+    assert _row(task.document_id).status == RunDocumentStatus.dead_letter
+    with session_scope() as session:
+        assert session.get(Run, task.run_id).status == RunStatus.failed
+    assert queue.claim("w3") is None
+
+
+def test_cancel_takes_queued_rows_and_leases_of_a_run(queue):
+    _submit(queue, "premium", [1_000, 2_000])
+    task = queue.claim("w")
+    assert cancel_run_documents(task.run_id) == (1, 1)
+
+    # The holder's next heartbeat fails, so it stops; nothing is left to claim or reap
+    assert not renew_lease(task.run_id, task.document_id, "w")
+    assert queue.claim("w2") is None
+    assert reap_expired_leases(lock_ttl=0) == (0, 0)
+    with session_scope() as session:
+        rows = session.exec(select(RunDocument).where(RunDocument.run_id == task.run_id)).all()
+        assert {(rd.status, rd.locked_by) for rd in rows} == {(RunDocumentStatus.canceled, None)}
+        run = session.get(Run, task.run_id)
+        assert run.status == RunStatus.canceled and run.finished_at is not None
+
+
+def test_exporting_documents_keep_the_lease_but_not_the_plan_slot(queue):
+    free = _submit(queue, "free", [1_000])
+    _submit(queue, "free", [2_000], user_id=free)
+    task = queue.claim("w")
+    assert queue.claim("w") is None  # the free plan runs one document at a time
+
+    assert mark_exporting(task.run_id, task.document_id)
+    assert _row(task.document_id).status == RunDocumentStatus.exporting
+    follow_up = queue.claim("w")
+    assert follow_up is not None and follow_up.user_id == free
+
+    # Still leased: renewed by the heartbeat, reaped if its holder dies, taken by a cancel
+    assert renew_lease(task.run_id, task.document_id, "w")
+    _silence(task.document_id, 120)
+    assert reap_expired_leases(lock_ttl=60) == (1, 0)
+    assert _row(task.document_id).status == RunDocumentStatus.queued
+    assert not mark_exporting(task.run_id, task.document_id)
+    with session_scope() as session:
+        row = session.get(RunDocument, _row(follow_up.document_id).id)
+        row.status = RunDocumentStatus.exporting
+        session.add(row)
+    assert cancel_run_documents(follow_up.run_id) == (0, 1)
+
+
+def test_run_eta_counts_only_the_queue_up_to_the_run(queue):
+    first = _submit(queue, "premium", [4_000, 1_000])
+    second = _submit(queue, "premium", [2_000, 8_000])
+    with session_scope() as session:
+        runs = {r.submitted_by: r.id for r in session.exec(select(Run)).all()}
+        queued = session.exec(
+            select(RunDocument, Document)
+            .join(Document, Document.id == RunDocument.document_id)
+            .order_by(RunDocument.priority, RunDocument.id)
+        ).all()
+        order = [(rd.run_id, doc.word_count) for rd, doc in queued]
+    spw = queue.seconds_per_word
+
+    for user in (first, second):
+        last = max(i for i, (run_id, _) in enumerate(order) if run_id == runs[user])
+        ahead = sum(words for _, words in order[: last + 1])
+        assert queue.run_eta(runs[user]) == pytest.approx(ahead * spw / 4)
+
+    for _ in range(4):
+        queue.claim("w")
+    # Nothing queued: the run's longest remaining lease
+    assert queue.run_eta(runs[second]) == pytest.approx(8_000 * spw, rel=0.01)
+    assert queue.run_eta("missing") is None
@@ -0,0 +1,58 @@
+import datetime as dt
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+
+import pytest
+
+from corrector import jsonio
+
+
+def test_jsonl_roundtrip_batches_and_skips_bad_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    rows = [{"token_id": i, "reason": "Tilde en «está»"} for i in range(25)]
+    assert jsonio.write_jsonl(path, rows, batch_rows=10) == 25
+    with path.open("ab") as f:
+        f.write(b"\n{broken\n")
+    assert list(jsonio.read_jsonl(path)) == rows
+    assert "está" in path.read_text(encoding="utf-8")
+
+
+def test_stdlib_fallback_matches(monkeypatch, tmp_path):
+    monkeypatch.setattr(jsonio, "_orjson", None)
+    obj = {"a": "ñ", "b": [1, 2]}
+    assert jsonio.loads(jsonio.dumps(obj)) == obj
+    assert "ñ" in jsonio.dumps(obj, indent=True)
+    path = tmp_path / "x.jsonl"
+    jsonio.write_jsonl(path, [obj, obj])
+    assert list(jsonio.read_jsonl(path)) == [obj, obj]
+
+
+class _Kind(Enum):
+    docx = "docx"
+
+
+@dataclass
+class _Row:
+    at: dt.datetime
+    kind: _Kind
+
+
+def test_backends_serialize_non_json_types_identically(monkeypatch):
+    if not jsonio.HAS_ORJSON:
+        pytest.skip("orjson not installed")
+    obj = {
+        "naive": dt.datetime(2026, 1, 2, 3, 4, 5, 678),
+        "utc": dt.datetime(2026, 1, 2, tzinfo=dt.UTC),
+        "day": dt.date(2026, 1, 2),
+        "id": uuid.UUID(int=1),
+        "path": Path("out") / "cap.docx",
+        "row": _Row(dt.datetime(2026, 1, 2), _Kind.docx),
+        "kind": _Kind.docx,
+        1: ["ñ", 1.5, None, True],
+    }
+    fast = [jsonio.dumpb(obj), jsonio.dumpb(obj, indent=True)]
+    monkeypatch.setattr(jsonio, "_orjson", None)
+    assert [jsonio.dumpb(obj), jsonio.dumpb(obj, indent=True)] == fast
+    assert jsonio.loads(fast[0])["row"] == {"at": "2026-01-02T00:00:00", "kind": "docx"}
@@ -0,0 +1,81 @@
+import logging
+from pathlib import Path
+
+from sqlmodel import SQLModel, create_engine
+
+from corrector.doccache import ParseCache
+from corrector.engine import correct_paragraphs, plan_chunks
+from corrector.model import HeuristicCorrector
+from corrector.text_utils import tokenize
+from server import db, preprocess
+from server.db import session_scope
+from server.models import Document, DocumentKind, DocumentStatus, Project, User as DBUser
+from server.scheduler import InMemoryScheduler, RunJob, User
+
+
+def test_profile_warms_cache_and_matches_worker_plan(tmp_path: Path, monkeypatch):
+    cache = ParseCache(tmp_path / "cache")
+    monkeypatch.setattr(preprocess, "get_parse_cache", lambda: cache)
+    path = tmp_path / "cap.txt"
+    paragraphs = ["Vio una baca en el campo.", "", "Otra frase, 2024."]
+    path.write_text("\n".join(paragraphs), encoding="utf-8")
+
+    profile = preprocess.profile_document(str(path), "abc")
+
+    tokens = tokenize("\n".join(paragraphs))
+    assert profile.tokens == len(tokens)
+    assert profile.words == sum(t.kind == "word" for t in tokens)
+    assert profile.chunks == plan_chunks(tokens)
+    assert cache.get("abc") is not None
+
+    plan = preprocess.load_chunk_plan(
+        preprocess.jsonio.dumps(profile.chunks), profile.tokens, len(tokens)
+    )
+    assert plan == profile.chunks
+    assert preprocess.load_chunk_plan("[[0, 1]]", profile.tokens + 1, len(tokens)) is None
+    planned = correct_paragraphs(paragraphs, HeuristicCorrector(), tokens=tokens, chunks=plan)
+    assert planned == correct_paragraphs(paragraphs, HeuristicCorrector())
+
+
+def test_enqueued_tasks_carry_document_sizes():
+    sched = InMemoryScheduler()
+    sched.register_user(User(id="u", plan="premium"))
+    sched.enqueue_run(
+        RunJob(
+            user_id="u",
+            run_id="r",
+            project_id="p",
+            documents=["a", "b"],
+            mode="rapido",
+            sizes={"a": (1200, 3)},
+        )
+    )
+    tasks = sched.drain()
+    assert [(t.words, t.chunks) for t in tasks] == [(1200, 3), (None, None)]
+
+
+def test_unsupported_kinds_are_skipped_quietly(tmp_path: Path, monkeypatch, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pre.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db, "engine", engine)
+    notes = tmp_path / "notas.md"
+    notes.write_text("# Notas\n\nUna baca.", encoding="utf-8")
+    with session_scope() as session:
+        user = DBUser(email="a@example.com", password_hash="x")
+        project = Project(owner_id=user.id, name="p")
+        doc = Document(
+            project_id=project.id,
+            name=notes.name,
+            path=str(notes),
+            kind=DocumentKind.md,
+            status=DocumentStatus.processing,
+        )
+        session.add_all([user, project, doc])
+        document_id = doc.id
+
+    with caplog.at_level(logging.WARNING):
+        assert preprocess.preprocess_document(document_id) is None
+    assert not caplog.records
+    with session_scope() as session:
+        doc = session.get(Document, document_id)
+        assert doc.status == DocumentStatus.ready and doc.token_count is None
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from corrector.cancel import Cancelled, CancelToken, cancel_scope
+from corrector.ratelimit import (
+    FileGovernorState,
+    GovernorTimeout,
+    LLMGovernor,
+    ModelQuota,
+    UsageScope,
+    llm_usage_scope,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _governor(clock: Clock, state=None) -> LLMGovernor:
+    return LLMGovernor(state, clock=clock, sleep=clock.sleep)
+
+
+def test_permits_wait_for_the_rpm_and_tpm_window():
+    clock = Clock()
+    gov = _governor(clock)
+    quota = ModelQuota(rpm=2, tpm=1_000)
+    gov.acquire("m", quota, 100).release()
+    gov.acquire("m", quota, 100).release()
+    assert clock.slept == []
+    gov.acquire("m", quota, 100).release()  # third request of the minute
+    assert sum(clock.slept) == pytest.approx(60.0)
+
+    clock.slept.clear()
+    gov.acquire("big", quota, 900).release()
+    gov.acquire("big", quota, 200).release()  # 1,100 tokens would exceed the TPM
+    assert sum(clock.slept) == pytest.approx(60.0)
+    with pytest.raises(GovernorTimeout):
+        gov.acquire("big", quota, 900, timeout=10)
+
+
+def test_rate_limits_throttle_and_cooldown_every_caller():
+    clock = Clock()
+    gov = _governor(clock)
+    quota = ModelQuota(rpm=10, tpm=1_000_000)
+    gov.acquire("m", quota, 10).release(ok=False, rate_limited=True)
+    assert gov.stats()["m"]["factor"] == 0.5 and gov.stats()["m"]["error_rate"] == 1.0
+
+    gov.cooldown("m", 30)
+    gov.acquire("m", quota, 10).release()
+    assert sum(clock.slept) == pytest.approx(30.0)
+    for _ in range(3):  # 5 of the 10 RPM while throttled
+        gov.acquire("m", quota, 10).release()
+    assert gov.stats()["m"]["factor"] == pytest.approx(0.9)
+
+
+def test_usage_is_attributed_and_capped_per_user():
+    clock = Clock()
+    gov = _governor(clock)
+    quota = ModelQuota(rpm=100, tpm=1_000_000)
+    with llm_usage_scope(UsageScope("u", rpm=1)):
+        gov.acquire("m", quota, 50).release(output_tokens=7)
+        gov.acquire("m", quota, 50).release(output_tokens=3)
+    gov.acquire("m", quota, 50).release()  # no scope: not attributed
+    assert sum(clock.slept) == pytest.approx(60.0)  # the user's plan allows 1 per minute
+    assert gov.drain_usage("u") == {
+        "llm_requests": 2,
+        "llm_input_tokens": 100,
+        "llm_output_tokens": 10,
+    }
+    assert gov.drain_usage("u") == {}
+
+
+def test_file_state_is_shared_between_governors(tmp_path):
+    clock = Clock()
+    path = tmp_path / "governor.json"
+    quota = ModelQuota(rpm=2, tpm=1_000_000)
+    a = _governor(clock, FileGovernorState(path))
+    b = _governor(clock, FileGovernorState(path))  # as another process would
+    a.acquire("m", quota, 10).release()
+    b.acquire("m", quota, 10).release()
+    assert clock.slept == []
+    a.acquire("m", quota, 10).release()
+    assert sum(clock.slept) == pytest.approx(60.0)
+
+
+def test_cancellation_interrupts_the_wait_for_a_permit():
+    gov = LLMGovernor()  # real clock and cancellable sleep
+    quota = ModelQuota(rpm=1, tpm=1_000)
+    gov.acquire("m", quota, 10).release()
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    with cancel_scope(token), pytest.raises(Cancelled):
+        gov.acquire("m", quota, 10)  # would wait a whole minute
+    assert time.monotonic() - started < 2
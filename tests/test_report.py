@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from docx import Document
+from docx.shared import Pt, RGBColor
+
+from corrector.engine import LogEntry, _write_log_docx
+
+
+def _entry(i: int, **kw) -> LogEntry:
+    base = dict(
+        token_id=i,
+        line=i + 1,
+        original="baca",
+        corrected="vaca",
+        reason="Confusión baca/vaca",
+        context="vio una baca en el prado",
+        chunk_index=0,
+        sentence="Vio una baca en el prado.",
+    )
+    base.update(kw)
+    return LogEntry(**base)
+
+
+def test_report_rows_keep_table_styling(tmp_path: Path):
+    path = tmp_path / "informe.docx"
+    entries = [
+        _entry(0),
+        _entry(1, original="a & b", corrected="<c>", reason="dos\nlíneas", context="x" * 80),
+        {"original": " ", "corrected": "", "reason": "dict", "context": "", "line": 7},
+    ]
+    _write_log_docx(str(path), entries, source_filename="libro.docx")
+
+    doc = Document(str(path))
+    assert [p.text for p in doc.paragraphs[:3]] == [
+        "Informe de Correcciones",
+        "Documento: libro.docx",
+        "Total de correcciones: 3",
+    ]
+    table = doc.tables[0]
+    assert table.style.name == "Light Grid Accent 1"
+    rows = [[c.text for c in r.cells] for r in table.rows]
+    assert rows[0] == ["#", "Original → Corregido", "Motivo", "Contexto", "Línea"]
+    assert rows[1] == ["1", "baca → vaca", "Confusión baca/vaca", "vio una baca en el prado", "1"]
+    assert rows[2] == ["2", "a & b → <c>", "dos\nlíneas", "x" * 47 + "...", "2"]
+    assert rows[3] == ["3", "  → ", "dict", "", "7"]
+
+    original, arrow, corrected = table.rows[1].cells[1].paragraphs[0].runs
+    assert original.bold and original.font.color.rgb == RGBColor(192, 0, 0)
+    assert corrected.bold and corrected.font.color.rgb == RGBColor(0, 176, 80)
+    assert {r.font.size for r in (original, arrow, corrected)} == {Pt(10)}
+    header_run = table.rows[0].cells[0].paragraphs[0].runs[0]
+    assert header_run.bold and header_run.font.size == Pt(11)
@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+from server.scheduler import DEFAULT_SECONDS_PER_WORD, InMemoryScheduler, RunJob, User
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _job(run_id: str, words: int | None, user: str = "u") -> RunJob:
+    sizes = {f"{run_id}-d": (words, 1)} if words is not None else {}
+    return RunJob(user, run_id, "p", [f"{run_id}-d"], "rapido", sizes=sizes)
+
+
+def _sched(policy: str, clock: Clock, workers: int = 1, **kw) -> InMemoryScheduler:
+    sched = InMemoryScheduler(workers, policy=policy, clock=clock, **kw)
+    for uid in ("u", "v"):
+        sched.register_user(User(id=uid, plan="premium"))
+    return sched
+
+
+@pytest.mark.parametrize(
+    ("policy", "order"), [("fifo", ["novela", "capitulo"]), ("sjf", ["capitulo", "novela"])]
+)
+def test_policy_orders_queued_documents(policy, order):
+    clock = Clock()
+    sched = _sched(policy, clock)
+    sched.enqueue_run(_job("novela", 120_000))
+    sched.enqueue_run(_job("capitulo", 3_000))
+    assert [t.run_id for t in sched.drain()] == order
+
+
+def test_aging_lets_a_long_wait_win():
+    clock = Clock()
+    sched = _sched("sjf", clock, aging_words_per_s=100.0)
+    sched.enqueue_run(_job("novela", 100_000))
+    clock.now += 1200  # 20 minutes waiting: 120k words of priority
+    sched.enqueue_run(_job("capitulo", 3_000))
+    assert sched.drain()[0].run_id == "novela"
+
+
+def test_run_eta_counts_work_ahead_and_learns_throughput():
+    clock = Clock()
+    sched = _sched("sjf", clock)
+    sched.enqueue_run(_job("a", 1_000))
+    sched.enqueue_run(_job("b", 2_000))
+    assert sched.run_eta("b") == pytest.approx(3_000 * DEFAULT_SECONDS_PER_WORD)
+
+    task = sched.try_dispatch()
+    clock.now += 10
+    assert sched.run_eta("a") == pytest.approx(max(0.0, 1_000 * DEFAULT_SECONDS_PER_WORD - 10))
+    sched.finish(task)  # 10 s for 1,000 words
+    assert 0.01 < sched.seconds_per_word < DEFAULT_SECONDS_PER_WORD
+    assert sched.run_eta("a") is None
+    assert sched.run_eta("b") == pytest.approx(2_000 * sched.seconds_per_word)
+
+
+def test_enqueue_and_finish_wake_idle_workers():
+    sched = _sched("sjf", Clock())
+    seen = sched.notifier.generation
+    woke: list[bool] = []
+    waiter = threading.Thread(target=lambda: woke.append(sched.notifier.wait(seen, 5.0)))
+    waiter.start()
+    t0 = time.monotonic()
+    sched.enqueue_run(_job("a", 1_000))
+    waiter.join()
+    assert woke == [True] and time.monotonic() - t0 < 1.0
+
+    # A notification between an empty dispatch and the wait is not lost
+    seen = sched.notifier.generation
+    sched.finish(sched.try_dispatch())
+    assert sched.notifier.wait(seen, 0.0)
+    assert not sched.notifier.wait(sched.notifier.generation, 0.0)
+
+
+def _chunked(run_id: str, user: str, chunks: list[int]) -> RunJob:
+    docs = [f"{run_id}-{i}" for i in range(len(chunks))]
+    sizes = {d: (c * 1_000, c) for d, c in zip(docs, chunks, strict=True)}
+    return RunJob(user, run_id, "p", docs, "rapido", sizes=sizes)
+
+
+def _dispatch_order(sched: InMemoryScheduler) -> list[str]:
+    return [t.user_id for t in sched.drain()]
+
+
+@pytest.mark.parametrize("policy", ["fifo", "sjf"])
+def test_drr_shares_workers_by_plan_weight(policy):
+    sched = _sched(policy, Clock())
+    sched.register_user(User(id="f", plan="free"))
+    for i in range(4):
+        sched.enqueue_run(_chunked(f"f{i}", "f", [8]))  # free: one document per run
+    for i in range(2):
+        sched.enqueue_run(_chunked(f"u{i}", "u", [8, 8, 8]))
+    assert _dispatch_order(sched)[:8] == ["f", "u", "u", "u", "f", "u", "u", "u"]
+
+
+@pytest.mark.parametrize("policy", ["fifo", "sjf"])
+def test_drr_small_chapters_are_not_starved_by_a_giant_book(policy):
+    sched = _sched(policy, Clock())
+    sched.register_user(User(id="f", plan="free"))
+    sched.enqueue_run(_chunked("libro", "f", [40]))  # arrived first
+    sched.enqueue_run(_chunked("caps", "u", [4, 4, 4]))
+    assert _dispatch_order(sched) == ["u", "u", "u", "f"]
+
+
+def test_run_keeps_its_slot_until_all_documents_finish():
+    sched = _sched("fifo", Clock(), workers=10)
+    sched.enqueue_run(RunJob("u", "a", "p", ["a1", "a2"], "rapido"))
+    sched.enqueue_run(_job("b", 1_000))
+    sched.enqueue_run(_job("c", 1_000))  # premium: 2 concurrent runs, a and b
+
+    first = [sched.try_dispatch() for _ in range(3)]
+    assert sorted(t.document_id for t in first) == ["a1", "a2", "b-d"]
+    assert sched.try_dispatch() is None
+    a1, a2 = sorted((t for t in first if t.run_id == "a"), key=lambda t: t.document_id)
+    sched.finish(a1)
+    assert sched.try_dispatch() is None  # a2 still running: run a holds its slot
+    sched.finish(a2)
+    assert sched.try_dispatch().run_id == "c"
+
+
+def test_sjf_goes_on_with_active_runs_when_run_slots_are_taken():
+    sched = _sched("sjf", Clock(), workers=10)
+    for run_id, words in (("a", [1_000, 50_000]), ("b", [2_000, 60_000]), ("c", [3_000])):
+        docs = [f"{run_id}{i}" for i in range(len(words))]
+        sizes = {d: (w, 1) for d, w in zip(docs, words, strict=True)}
+        sched.enqueue_run(RunJob("u", run_id, "p", docs, "rapido", sizes=sizes))
+    first = [sched.try_dispatch() for _ in range(3)]
+    assert [t.words for t in first] == [1_000, 2_000, 50_000]  # c is shorter but has no slot
+    sched.finish(first[0])
+    sched.finish(first[1])
+    assert sched.try_dispatch().words == 60_000  # run b still holds its slot
+
+
+def test_cancel_run_drops_its_queue_and_frees_the_slot():
+    sched = _sched("fifo", Clock(), workers=10)
+    sched.enqueue_run(RunJob("u", "a", "p", ["a1", "a2", "a3"], "rapido"))
+    sched.enqueue_run(_job("b", 1_000))
+    sched.enqueue_run(_job("c", 1_000))  # premium: 2 concurrent runs
+
+    running = [sched.try_dispatch() for _ in range(2)]
+    assert [t.document_id for t in running] == ["a1", "a2"]
+    assert sched.cancel_run("a") == 1  # a3 was still queued
+    assert sched.cancel_run("a") == 0
+    assert ("a", "a3") not in sched.pending_keys()
+    assert sched.try_dispatch().run_id == "b"
+    assert sched.try_dispatch() is None  # a1 and a2 are still being stopped
+    for task in running:
+        sched.finish(task)
+    assert sched.try_dispatch().run_id == "c"
+    assert sched.try_dispatch() is None
+
+
+def test_drr_picks_a_huge_task_without_circling_the_ring(monkeypatch):
+    from server import scheduler as sched_mod
+
+    sched = _sched("fifo", Clock())
+    sched.register_user(User(id="f", plan="free"))
+    sched.enqueue_run(_chunked("enciclopedia", "f", [100_000]))  # 12,500 quanta of credit
+    sched.enqueue_run(_chunked("caps", "u", [4, 4]))
+    calls = []
+    real = sched_mod.task_chunks
+    monkeypatch.setattr(sched_mod, "task_chunks", lambda task: calls.append(1) or real(task))
+
+    order = []
+    for _ in range(3):
+        calls.clear()
+        task = sched.try_dispatch()
+        order.append(task.user_id)
+        sched.finish(task)
+        assert len(calls) <= 6  # a few per ready user, not one per pass over the ring
+    assert order == ["u", "u", "f"]
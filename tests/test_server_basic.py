@@ -116,3 +116,13 @@ def test_create_run_queue_and_status(client):
     dl_sum = client.get(f"/runs/{res['run_id']}/summary.md", headers=headers)
     assert dl_sum.status_code == 200
     assert b"Carta de edici" in dl_sum.content  # substring tolerant to accents encoding
+
+
+def test_worker_pool_endpoints_are_admin_only(client):
+    assert client.get("/system/workers").status_code == 401
+    rr = client.post("/auth/register", json={"email": "pool@example.com", "password": "secret123"})
+    if rr.status_code != 200:
+        rr = client.post("/auth/login", json={"email": "pool@example.com", "password": "secret123"})
+    headers = {"Authorization": f"Bearer {rr.json()['access_token']}"}
+    assert client.get("/system/workers", headers=headers).status_code == 403
+    assert client.put("/system/workers", json={"size": 1}, headers=headers).status_code == 403
@@ -0,0 +1,99 @@
+from corrector.metrics import LLMMetrics, merge_snapshots
+from corrector.model import (
+    CORRECTIONS_FUNCTION,
+    CorrectionsResponse,
+    _build_tools_from_pydantic,
+    _strict_json_schema,
+    parse_corrections,
+)
+
+
+def test_parse_corrections_ok_and_fenced():
+    payload = '{"corrections": [{"token_id": 3, "replacement": "vaca", "reason": "baca/vaca"}]}'
+    specs, status = parse_corrections(payload)
+    assert status == "ok"
+    assert specs[0].token_id == 3
+
+    specs, status = parse_corrections("```json\n" + payload + "\n```")
+    assert status == "ok" and len(specs) == 1
+
+
+def test_parse_corrections_salvages_truncated_array():
+    truncated = (
+        '{"corrections": [{"token_id": 1, "replacement": "a", "reason": "r"}, '
+        '{"token_id": 5, "replacement": "b", "reason": "r"}, {"token_id": 9, "repl'
+    )
+    specs, status = parse_corrections(truncated)
+    assert status == "salvaged"
+    assert [s.token_id for s in specs] == [1, 5]
+
+
+def test_parse_corrections_skips_invalid_items_and_reports_failures():
+    specs, status = parse_corrections(
+        '{"corrections": [{"token_id": "x"}, {"token_id": 2, "replacement": "c", "reason": "r"}]}'
+    )
+    assert status == "salvaged" and [s.token_id for s in specs] == [2]
+
+    assert parse_corrections('{"corrections": []}') == ([], "ok")
+    assert parse_corrections("no json at all")[1] == "failed"
+    assert parse_corrections("")[1] == "failed"
+
+
+def test_schemas_are_inlined_for_providers():
+    strict = _strict_json_schema(CorrectionsResponse)
+    item = strict["properties"]["corrections"]["items"]
+    assert "$defs" not in strict and "$ref" not in str(strict)
+    assert item["additionalProperties"] is False
+    assert set(item["required"]) == {"token_id", "replacement", "reason", "original"}
+
+    tools = _build_tools_from_pydantic(CORRECTIONS_FUNCTION, CorrectionsResponse)
+    decl = tools[0]["function_declarations"][0]
+    assert decl["name"] == CORRECTIONS_FUNCTION
+    assert "$ref" not in str(decl["parameters"])
+
+
+def test_metrics_parse_failure_rate_and_merge():
+    m = LLMMetrics()
+    m.record_parse("gemini/x", "ok")
+    m.record_parse("gemini/x", "failed")
+    m.record_chunk("gemini/x", 3.0, attempts=2)
+    snap = m.snapshot()
+    assert snap["gemini/x"]["parse_failed"] == 1
+    assert snap["gemini/x"]["retried_chunks"] == 1
+    merged = merge_snapshots([snap, snap])
+    assert merged["gemini/x"]["requests"] == 4
+    assert "50.0%" in m.report()
+
+
+def test_parse_compact_tuples_and_truncation():
+    specs, status = parse_corrections(
+        '{"c": [["3", "vaca", "LEX"], [7, "hojear", "lex", "ojo"]]}', compact=True
+    )
+    assert status == "ok"
+    assert [(s.token_id, s.reason_code, s.reason) for s in specs] == [
+        (3, "LEX", ""),
+        (7, "LEX", "ojo"),
+    ]
+    specs, status = parse_corrections(
+        '{"c": [["1", "a", "ORT"], ["x", "b"], ["2", "c", "ZZZ"], ["9"', compact=True
+    )
+    assert status == "salvaged"
+    assert [(s.token_id, s.reason_code) for s in specs] == [(1, "ORT"), (2, "OTR")]
+
+
+def test_engine_expands_reason_codes():
+    from corrector.engine import process_paragraphs
+    from corrector.model import CorrectionSpec
+    from corrector.reasons import expand_reason, suggestion_type_for
+
+    class _Compact:
+        def correct_tokens(self, tokens):
+            tid = next(t.id for t in tokens if t.text == "baca")
+            return [CorrectionSpec(token_id=tid, replacement="vaca", reason="", reason_code="LEX")]
+
+    paragraphs, entries = process_paragraphs(["La baca del coche."], _Compact())
+    assert paragraphs == ["La vaca del coche."]
+    assert entries[0].reason == expand_reason("LEX")
+    assert entries[0].reason_code == "LEX"
+    assert suggestion_type_for("LEX") == "lexico"
+    assert suggestion_type_for("nope") == "otro"
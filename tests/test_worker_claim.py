@@ -0,0 +1,55 @@
+import uuid
+
+from sqlmodel import select
+
+from server.db import init_db, session_scope
+from server.models import Document, Project, Run, RunDocument, RunDocumentStatus, User
+from server.scheduler import DocumentTask, InMemoryScheduler
+from server.worker import Worker, enqueue_queued_tasks
+
+
+def _queued_task() -> DocumentTask:
+    init_db()
+    with session_scope() as session:
+        user = User(email=f"{uuid.uuid4()}@example.com", password_hash="x", role="premium")
+        project = Project(owner_id=user.id, name="p")
+        doc = Document(project_id=project.id, name="cap.txt", word_count=1200, chunk_count=2)
+        run = Run(project_id=project.id, submitted_by=user.id)
+        session.add_all([user, project, doc, run])
+        session.add(RunDocument(run_id=run.id, document_id=doc.id, use_ai=False))
+        session.flush()
+        return DocumentTask(
+            project_id=project.id, document_id=doc.id, user_id=user.id, run_id=run.id, mode="rapido"
+        )
+
+
+def test_only_one_process_claims_a_queued_document():
+    task = _queued_task()
+    api_node, worker_node = Worker(), Worker()
+
+    assert worker_node._try_lock_task(task, "node-b:0")
+    assert not api_node._try_lock_task(task, "node-a:0")  # lease held by node-b
+
+    with session_scope() as session:
+        rd = session.exec(select(RunDocument).where(RunDocument.run_id == task.run_id)).one()
+        assert rd.locked_by == "node-b:0" and rd.attempt_count == 1
+        rd.status = RunDocumentStatus.completed
+        rd.locked_at = None  # even a lapsed lease never reopens a finished document
+        session.add(rd)
+    assert not api_node._try_lock_task(task, "node-a:0")
+
+
+def test_db_queue_feeds_the_scheduler_once():
+    task = _queued_task()
+    key = (task.run_id, task.document_id)
+    sched = InMemoryScheduler()
+
+    enqueue_queued_tasks(sched)
+    assert key in sched.pending_keys()
+    assert enqueue_queued_tasks(sched) == 0  # already queued in the scheduler
+    queued = [t for t in sched.drain() if t.run_id == task.run_id]
+    assert [(t.document_id, t.words, t.chunks) for t in queued] == [(task.document_id, 1200, 2)]
+
+    Worker()._try_lock_task(task, "node-b:0")
+    enqueue_queued_tasks(sched)
+    assert key not in sched.pending_keys()  # claimed: no longer part of the DB queue
@@ -0,0 +1,80 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from server.artifacts import ArtifactInputs
+from server.scheduler import DocumentTask
+from server.worker import Worker
+
+
+def test_export_stage_runs_after_the_correction_returns():
+    worker = Worker()
+    worker._export_pool = ThreadPoolExecutor(max_workers=1)
+    release, exported = threading.Event(), threading.Event()
+
+    def slow_export(task, inputs):
+        release.wait(5)
+        exported.set()
+
+    worker._export_document = slow_export  # type: ignore[method-assign]
+    task = DocumentTask(project_id="p", document_id="d", user_id="u", run_id="r", mode="rapido")
+
+    worker._submit_export(task, inputs=None)  # type: ignore[arg-type]
+    # The correction thread is free (its scheduler slot can be released) while exporting
+    assert worker.pending_exports == 1 and not exported.is_set()
+
+    release.set()
+    worker._export_pool.shutdown(wait=True)
+    assert exported.is_set() and worker.pending_exports == 0
+
+
+def test_cancel_during_export_keeps_the_document_canceled(monkeypatch):
+    from sqlmodel import select
+
+    from corrector.engine import CorrectionResult
+    from server import worker as worker_mod
+    from server.db import init_db, session_scope
+    from server.job_queue import cancel_run_documents
+    from server.models import Document, Project, Run, RunDocument, RunDocumentStatus, User
+
+    init_db()
+    with session_scope() as session:
+        user = User(email=f"{uuid.uuid4()}@example.com", password_hash="x", role="premium")
+        project = Project(owner_id=user.id, name="p")
+        docs = [Document(project_id=project.id, name=f"{n}.txt") for n in ("a", "b")]
+        run = Run(project_id=project.id, submitted_by=user.id)
+        session.add_all([user, project, run, *docs])
+        session.add_all([RunDocument(run_id=run.id, document_id=d.id) for d in docs])
+        session.flush()
+        tasks = [
+            DocumentTask(
+                project_id=project.id, document_id=d.id, user_id=user.id, run_id=run.id, mode="r"
+            )
+            for d in docs
+        ]
+    worker = Worker()
+    for task in tasks:
+        assert worker._try_lock_task(task, "w")
+
+    def cancel_while_writing(inputs):
+        cancel_run_documents(tasks[0].run_id)  # POST /runs/{id}/cancel meanwhile
+        return []
+
+    monkeypatch.setattr(worker_mod, "submit_artifacts", cancel_while_writing)
+    monkeypatch.setattr(worker_mod, "collect_artifacts", lambda futures: futures)
+    inputs = ArtifactInputs(
+        out_base=Path("."),
+        stem="a",
+        source_filename="a.txt",
+        result=CorrectionResult(paragraphs=[], log_entries=[], edits=[]),
+        parsed=None,
+    )
+    worker._export_document(tasks[0], inputs)
+    worker._mark_failed(tasks[1], reason="engine error: boom")
+
+    with session_scope() as session:
+        run_id = tasks[0].run_id
+        rows = session.exec(select(RunDocument).where(RunDocument.run_id == run_id)).all()
+        assert {rd.status for rd in rows} == {RunDocumentStatus.canceled}
+        assert session.get(Run, run_id).status.value == "canceled"
@@ -0,0 +1,41 @@
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+
+from server import worker_main
+
+
+def _serve_until_sigterm() -> None:
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    time.sleep(30)
+
+
+def _crash() -> None:
+    sys.exit(3)
+
+
+def _start(*targets) -> list[multiprocessing.Process]:
+    procs = [multiprocessing.Process(target=t) for t in targets]
+    for proc in procs:
+        proc.start()
+    return procs
+
+
+def test_stop_terminates_and_joins_the_worker_processes():
+    procs = _start(_serve_until_sigterm, _serve_until_sigterm)
+    stop = threading.Event()
+    threading.Timer(0.3, stop.set).start()
+
+    assert worker_main._supervise(procs, stop) == 0
+    assert [proc.exitcode for proc in procs] == [0, 0]
+
+
+def test_a_crashed_worker_stops_the_others_with_an_error_code():
+    procs = _start(_serve_until_sigterm, _crash)
+
+    t0 = time.monotonic()
+    assert worker_main._supervise(procs, threading.Event()) == 1
+    assert time.monotonic() - t0 < 10
+    assert [proc.exitcode for proc in procs] == [0, 3]
@@ -0,0 +1,169 @@
+import threading
+import time
+
+from server import worker as worker_mod
+from server.scheduler import InMemoryScheduler, RunJob, User
+from server.worker import Worker
+
+
+def _pool(monkeypatch, size: int) -> tuple[Worker, InMemoryScheduler, list]:
+    sched = InMemoryScheduler(size)
+    sched.register_user(User(id="u", plan="premium"))
+    monkeypatch.setattr(worker_mod, "get_job_queue", lambda: sched)
+    w = Worker(poll_interval=0.01, size=size)
+    running: list[str] = []
+    lock = threading.Lock()
+    peak = [0]
+
+    def fake_process(task):
+        with lock:
+            running.append(task.document_id)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.2)
+        with lock:
+            running.remove(task.document_id)
+
+    w._try_lock_task = lambda task, owner=None: True  # type: ignore[method-assign]
+    w._process_task = fake_process  # type: ignore[method-assign]
+    return w, sched, peak
+
+
+def test_pool_processes_plan_concurrency_in_parallel(monkeypatch):
+    w, sched, peak = _pool(monkeypatch, 3)
+    sched.enqueue_run(RunJob("u", "r", "p", ["a", "b", "c"], "rapido"))
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while w.stats()["tasks_done"] < 3 and time.time() < deadline:
+            time.sleep(0.02)
+        stats = w.stats()
+    finally:
+        w.stop()
+    assert peak[0] == 3  # premium max_docs_concurrent, one per thread
+    assert stats["tasks_done"] == 3 and stats["size"] == 3
+    assert 0 < stats["avg_utilization"] <= 1
+    assert not any(t.is_alive() for t in w._threads.values())
+
+
+def test_tasks_locked_elsewhere_are_released_not_counted(monkeypatch):
+    w, sched, _ = _pool(monkeypatch, 2)
+    w._try_lock_task = lambda task, owner=None: task.document_id != "b"  # type: ignore
+    finished: list[str] = []
+    finish = sched.finish
+    monkeypatch.setattr(
+        sched, "finish", lambda task: (finished.append(task.document_id), finish(task))
+    )
+    sched.enqueue_run(RunJob("u", "r", "p", ["a", "b", "c"], "rapido"))
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while w.stats()["tasks_done"] < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.05)
+        stats = w.stats()
+    finally:
+        w.stop()
+    assert stats["tasks_done"] == 2 and sorted(finished) == ["a", "c"]
+    assert sched._active_total == 0  # the slot of "b" was given back
+
+
+def test_idle_polling_is_not_busy_time(monkeypatch):
+    w, _, _ = _pool(monkeypatch, 2)
+    w.start()
+    try:
+        time.sleep(0.2)  # about 20 polls per thread, with no task nor chunk to run
+        stats = w.stats()
+    finally:
+        w.stop()
+    assert stats["busy"] == 0 and stats["busy_seconds"] == 0
+
+
+def test_resize_changes_threads_and_scheduler_capacity(monkeypatch):
+    w, sched, _ = _pool(monkeypatch, 2)
+    w.start()
+    try:
+        w.resize(4)
+        assert sched.system_max_workers == 4 and w.stats()["threads"] == 4
+        w.resize(1)
+        deadline = time.time() + 2
+        while w.stats()["threads"] > 1 and time.time() < deadline:
+            time.sleep(0.02)
+        assert w.stats()["threads"] == 1 and sched.system_max_workers == 1
+    finally:
+        w.stop()
+
+
+def test_idle_threads_correct_chunks_of_one_large_document(monkeypatch):
+    from corrector.engine import correct_paragraphs, plan_chunks
+    from corrector.model import HeuristicCorrector
+    from corrector.text_utils import tokenize
+
+    paragraphs = ["La baca del coche estaba sucia y decidió ojear el libro."] * 8
+    tokens = tokenize("\n".join(paragraphs))
+    ranges = plan_chunks(tokens, chunk_words=10, overlap_words=2)
+    threads: set[str] = set()
+
+    class SlowCorrector(HeuristicCorrector):
+        def correct_tokens(self, tokens):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.05)
+            return super().correct_tokens(tokens)
+
+    w, sched, _ = _pool(monkeypatch, 4)
+    results = []
+    w._process_task = lambda task: results.append(  # type: ignore[method-assign]
+        w._correct(paragraphs, SlowCorrector(), tokens, ranges)
+    )
+    sched.enqueue_run(RunJob("u", "r", "p", ["libro"], "rapido"))
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while not results and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        w.stop()
+    assert len(ranges) >= 8 and len(threads) > 1
+    expected = correct_paragraphs(paragraphs, HeuristicCorrector(), tokens=tokens, chunks=ranges)
+    assert results[0].paragraphs == expected.paragraphs
+
+
+def test_cancel_run_stops_the_chunks_of_a_document_in_flight(monkeypatch):
+    from corrector.cancel import Cancelled
+    from corrector.engine import plan_chunks
+    from corrector.model import HeuristicCorrector
+    from corrector.text_utils import tokenize
+
+    paragraphs = ["La baca del coche estaba sucia y decidió ojear el libro."] * 8
+    tokens = tokenize("\n".join(paragraphs))
+    ranges = plan_chunks(tokens, chunk_words=10, overlap_words=2)
+    calls = []
+
+    class CancelingCorrector(HeuristicCorrector):
+        def correct_tokens(self, tokens):
+            calls.append(1)
+            worker_mod.cancel_run_in_process("r")  # as POST /runs/r/cancel does
+            return super().correct_tokens(tokens)
+
+    w, sched, _ = _pool(monkeypatch, 2)
+    errors = []
+
+    def process(task):
+        try:
+            w._correct(paragraphs, CancelingCorrector(), tokens, ranges)
+        except Cancelled as e:
+            errors.append(e)
+
+    w._process_task = process  # type: ignore[method-assign]
+    sched.enqueue_run(RunJob("u", "r", "p", ["libro"], "rapido"))
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while not errors and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        w.stop()
+    err = errors[0]
+    assert err.chunks_total == len(ranges) and 1 <= err.chunks_done == len(calls) <= 2
+    assert err.partial.paragraphs[0] != paragraphs[0]  # the first chunk's corrections stay
+    assert err.partial.paragraphs[-1] == paragraphs[-1]
+    assert worker_mod._run_tokens == {}